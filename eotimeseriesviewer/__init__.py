@@ -22,9 +22,8 @@ import inspect
 import os
 from pathlib import Path
 
-from eotimeseriesviewer.qgispluginsupport.qps.pyqtgraph.pyqtgraph import PlotDataItem
-from qgis.PyQt.QtGui import QIcon
-from qgis.core import Qgis, QgsApplication
+# Do not import QGIS or Qt modules on the package level. Modules like eotimeseriesviewer.sourceinfo
+# are imported in worker processes that run with GDAL only.
 
 # the version and commit hash this version refers to.
 # will be replaced during the plugin build process
@@ -85,15 +84,20 @@ def debugLog(msg: str = '', skip_prefix: bool = False):
             prefix = f'{stack_class}.{FOI.function}: {os.path.basename(FOI.filename)}:{FOI.lineno}:'
 
         msg = f'DEBUG::{prefix}{msg}'
+        from qgis.core import Qgis, QgsApplication
         QgsApplication.messageLog().logMessage(msg, tag=LOG_MESSAGE_TAG, level=Qgis.Info)
 
 
-def messageLog(msg, level=Qgis.Info):
+def messageLog(msg, level=None):
     """
     Writes a log message to the QGIS EO TimeSeriesViewer log
     :param msg: log message string
-    :param level: QgsMessageLog::MessageLevel with MessageLevel =[INFO |  ALL | WARNING | CRITICAL | NONE]
+    :param level: QgsMessageLog::MessageLevel with MessageLevel =[INFO |  ALL | WARNING | CRITICAL | NONE],
+                  defaults to Qgis.Info
     """
+    from qgis.core import Qgis, QgsApplication
+    if level is None:
+        level = Qgis.Info
     QgsApplication.instance().messageLog().logMessage(msg, LOG_MESSAGE_TAG, level)
 
 
@@ -160,10 +164,11 @@ def unloadAll():
     unregisterOptionsWidgetFactory()
 
 
-def icon() -> QIcon:
+def icon():
     """
     Returns the EO Time Series Viewer icon
     :return: QIcon
     """
+    from qgis.PyQt.QtGui import QIcon
     path = os.path.join(os.path.dirname(__file__), 'icon.png')
     return QIcon(path)
@@ -26,10 +26,14 @@ def run():
         from eotimeseriesviewer.tests import start_app
         start_app()
 
+    from eotimeseriesviewer.instrumentation import beginStartup, startupPhase
+    beginStartup()
     from eotimeseriesviewer import initAll
-    initAll()
+    with startupPhase('init all'):
+        initAll()
 
-    from eotimeseriesviewer.main import EOTimeSeriesViewer
+    with startupPhase('import main'):
+        from eotimeseriesviewer.main import EOTimeSeriesViewer
 
     ts = EOTimeSeriesViewer()
     ts.show()
@@ -3,11 +3,12 @@ import os
 import re
 from datetime import date, datetime, timedelta
 from pathlib import Path
-from typing import Optional, Union, Any
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 from numpy import datetime64, int16, timedelta64
 from osgeo import gdal
 
+from eotimeseriesviewer.sourceinfo import dateTimeMetadataValues, rxDateTimeMetadataKey
 from qgis.PyQt.QtCore import QDate, QDateTime, Qt, QTime
 from qgis.core import Qgis, QgsDateTimeRange, QgsRasterDataProvider, QgsRasterLayer, QgsRasterLayerTemporalProperties
 
@@ -270,6 +271,16 @@ class ImageDateReaderPLEIADES(ImageDateReader):
 
 
 class ImageDateReaderSentinel2(ImageDateReader):
+    """
+    Reader for date in Sentinel-2 images
+    # see https://sentiwiki.copernicus.eu/web/s2-products
+    """
+
+    # e.g. S2A_MSIL2A_20170105T013442_N0204_R031_T53NMJ_20170105T013443
+    regSentinel2ProductID = re.compile(r'S2[A-D]_MSI(L1C|L2A)_(?P<dtg>\d{8}T\d{6})_')
+    # e.g. T33UUU_20200101T101031_B02.jp2
+    regSentinel2GranuleImage = re.compile(r'T\d{2}[A-Z]{3}_(?P<dtg>\d{8}T\d{6})_')
+
     def __init__(self, dataSet):
         super(ImageDateReaderSentinel2, self).__init__(dataSet)
 
@@ -280,6 +291,10 @@ class ImageDateReaderSentinel2(ImageDateReader):
             timeStamp = md.get('DATATAKE_1_DATATAKE_SENSING_START', '')
         if len(timeStamp) > 0:
             return datetime64(timeStamp)
+        for rx in [ImageDateReaderSentinel2.regSentinel2ProductID, ImageDateReaderSentinel2.regSentinel2GranuleImage]:
+            if match := rx.search(self.baseName):
+                dtg = match.group('dtg')
+                return datetime64(f'{dtg[0:4]}-{dtg[4:6]}-{dtg[6:11]}:{dtg[11:13]}:{dtg[13:15]}')
         return None
 
 
@@ -291,7 +306,8 @@ class ImageDateParserLandsat(ImageDateReader):
 
     regLandsatSceneID = re.compile(r'L[COTEM][4578]\d{3}\d{3}\d{4}\d{3}[A-Z]{2}[A-Z1]\d{2}')
     regLandsatProductID = re.compile(
-        r'L[COTEM]0[78]_(L1TP|L1GT|L1GS)_\d{3}\d{3}_\d{4}\d{2}\d{2}_\d{4}\d{2}\d{2}_0\d{1}_(RT|T1|T2)')
+        r'L[COTEM]0[789]_(L1TP|L1GT|L1GS|L2SP|L2SR)_\d{3}\d{3}_(?P<dtg>\d{4}\d{2}\d{2})_'
+        r'\d{4}\d{2}\d{2}_0\d{1}_(RT|T1|T2)')
 
     def __init__(self, dataSet):
         super(ImageDateParserLandsat, self).__init__(dataSet)
@@ -349,7 +365,83 @@ DATETIME_FORMATS = [
     ('%Y%m%d', re.compile(r'(?P<dtg>\d{8})_LEVEL\d_.+_(BOA|QAI|DST|HOT|VZN)')),
 ]
 
-rxDTGKey = re.compile(r'(acquisition|observation|product_start)[ _]*(time|date|datetime)', re.IGNORECASE)
+# FORCE Level 2 products, e.g. 20180101_LEVEL2_LND08_BOA.tif
+rx_FORCE_L2_Product = re.compile(
+    r'(?P<date>\d{8})_LEVEL2_(?P<sensor>[^_. ]+)_(?P<product>[^_. ]+)\.(?P<ext>tif|bsq|bil|bip|cog|vrt)$')
+
+
+class FilenameDateRule(object):
+    """
+    A pre-compiled, product-specific rule to extract the date-time from a file name
+    without reading any image metadata.
+    """
+
+    def __init__(self, name: str, rx: re.Pattern, group: Union[str, int], fmt: str,
+                 refineFromMetadata: Optional[bool] = None):
+        """
+        :param name: rule name
+        :param rx: compiled regular expression that is searched in the file name
+        :param group: name or index of the regex group with the date-time string
+        :param fmt: format of the date-time string: 'YYYYMMDD', 'YYYYDOY' or 'YYYYMMDDTHHMMSS'
+        :param refineFromMetadata: set True to read the image metadata for a more precise date-time
+                                   of the same date. Defaults to True if fmt does not include the time of day.
+        """
+        assert fmt in ['YYYYMMDD', 'YYYYDOY', 'YYYYMMDDTHHMMSS']
+        self.name = name
+        self.rx = rx
+        self.group = group
+        self.fmt = fmt
+        self.nHits = 0
+        if refineFromMetadata is None:
+            refineFromMetadata = not self.hasTime()
+        self.refineFromMetadata: bool = refineFromMetadata
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}("{self.name}", hits={self.nHits})'
+
+    def hasTime(self) -> bool:
+        """
+        Returns True if the rule extracts the time of day, and not only the date
+        """
+        return self.fmt == 'YYYYMMDDTHHMMSS'
+
+    def dateTime(self, filename: str) -> Optional[QDateTime]:
+        """
+        Returns the date-time extracted from the file name, or None
+        """
+        match = self.rx.search(filename)
+        if not match:
+            return None
+        text = match.group(self.group)
+        try:
+            if self.fmt == 'YYYYMMDD':
+                dtg = QDateTime(QDate(int(text[0:4]), int(text[4:6]), int(text[6:8])), QTime())
+            elif self.fmt == 'YYYYDOY':
+                dtg = QDateTime(QDate(int(text[0:4]), 1, 1).addDays(int(text[4:7]) - 1), QTime())
+            else:
+                dtg = QDateTime(QDate(int(text[0:4]), int(text[4:6]), int(text[6:8])),
+                                QTime(int(text[9:11]), int(text[11:13]), int(text[13:15])))
+        except ValueError:
+            return None
+        if not dtg.isValid():
+            return None
+        self.nHits += 1
+        return dtg
+
+
+# ordered list of rules to read the date-time from file names. Tried before any metadata is read
+FILENAME_DATE_RULES = [
+    # FORCE products of the same date are combined from different acquisitions, their metadata is not used
+    FilenameDateRule('FORCE L2', rx_FORCE_L2_Product, 'date', 'YYYYMMDD', refineFromMetadata=False),
+    FilenameDateRule('Landsat Product ID', ImageDateParserLandsat.regLandsatProductID, 'dtg', 'YYYYMMDD'),
+    FilenameDateRule('Landsat Scene ID', rxLandsatSceneID, 'dtg', 'YYYYDOY'),
+    FilenameDateRule('Sentinel-2 Product ID', ImageDateReaderSentinel2.regSentinel2ProductID, 'dtg',
+                     'YYYYMMDDTHHMMSS'),
+    FilenameDateRule('Sentinel-2 Granule Image', ImageDateReaderSentinel2.regSentinel2GranuleImage, 'dtg',
+                     'YYYYMMDDTHHMMSS'),
+]
+
+rxDTGKey = rxDateTimeMetadataKey
 rxDTG = re.compile(r'((acquisition|observation)[ _]*(time|date|datetime)=(?P<dtg>[^<]+))', re.IGNORECASE)
 
 GDAL_DATETIME_ITEMS = [
@@ -380,6 +472,11 @@ class ImageDateUtils(object):
             except Exception as ex:
                 pass
 
+        # try the pre-compiled rules of known product names, e.g. for file names
+        dtg, rule = cls.filenameRuleDateTime(text, basename=False)
+        if dtg:
+            return dtg
+
         for fmt in DATETIME_FORMATS:
             try:
                 if isinstance(fmt, str):
@@ -409,21 +506,123 @@ class ImageDateUtils(object):
         return None
 
     @classmethod
-    def dateTimeFromGDALDataset(cls, ds: gdal.Dataset) -> Optional[QDateTime]:
-        assert isinstance(ds, gdal.Dataset)
+    def filenameRules(cls) -> List[FilenameDateRule]:
+        """
+        Returns the ordered list of rules to extract date-times from file names
+        """
+        return FILENAME_DATE_RULES[:]
+
+    @classmethod
+    def registerFilenameRule(cls, rule: FilenameDateRule, index: Optional[int] = None):
+        """
+        Registers a rule to extract date-times from file names.
+        :param rule: FilenameDateRule
+        :param index: position in the rule list. Appends the rule by default.
+        """
+        assert isinstance(rule, FilenameDateRule)
+        if rule in FILENAME_DATE_RULES:
+            FILENAME_DATE_RULES.remove(rule)
+        if index is None:
+            FILENAME_DATE_RULES.append(rule)
+        else:
+            FILENAME_DATE_RULES.insert(index, rule)
 
+    @classmethod
+    def unregisterFilenameRule(cls, rule: Union[str, FilenameDateRule]):
+        """
+        Removes a file name rule, given by its name or the rule itself
+        """
+        for r in FILENAME_DATE_RULES[:]:
+            if r == rule or r.name == rule:
+                FILENAME_DATE_RULES.remove(r)
+
+    @classmethod
+    def filenameRuleStatistics(cls) -> Dict[str, int]:
+        """
+        Returns the number of file names from which each rule has extracted a date-time
+        """
+        return {r.name: r.nHits for r in FILENAME_DATE_RULES}
+
+    @classmethod
+    def resetFilenameRuleStatistics(cls):
+        for r in FILENAME_DATE_RULES:
+            r.nHits = 0
+
+    @classmethod
+    def dateTimeFromFilename(cls, path: Union[str, Path]) -> Optional[QDateTime]:
+        """
+        Extracts the date-time from a file name, using the product-specific rules in FILENAME_DATE_RULES
+        :param path: file path or file name
+        :return: QDateTime or None
+        """
+        return cls.filenameRuleDateTime(path)[0]
+
+    @classmethod
+    def filenameRuleDateTime(cls,
+                             path: Union[str, Path],
+                             basename: bool = True) -> Tuple[Optional[QDateTime], Optional[FilenameDateRule]]:
+        """
+        Extracts the date-time from a file name and returns it together with the FilenameDateRule that matched
+        :param path: file path or file name
+        :param basename: set False to search the rules in the full path
+        :return: (QDateTime, FilenameDateRule) or (None, None)
+        """
+        filename = os.path.basename(str(path)) if basename else str(path)
+        for rule in FILENAME_DATE_RULES:
+            dtg = rule.dateTime(filename)
+            if dtg:
+                return dtg, rule
+        return None, None
+
+    @classmethod
+    def refinedDateTime(cls,
+                        dtg_filename: Optional[QDateTime],
+                        dtg_metadata: Optional[QDateTime]) -> Optional[QDateTime]:
+        """
+        Combines a date-only date-time from a file name with a date-time read from metadata.
+        The metadata date-time is used if it refers to the same date, as it is more precise.
+        """
+        if not isinstance(dtg_filename, QDateTime):
+            return dtg_metadata
+        if isinstance(dtg_metadata, QDateTime) and dtg_metadata.isValid() \
+                and dtg_metadata.date() == dtg_filename.date():
+            return dtg_metadata
+        return dtg_filename
+
+    @classmethod
+    def dateTimeFromFilenameAndMetadata(cls,
+                                        path: Union[str, Path],
+                                        values: Union[List[str], Callable[[], List[str]]]) -> Optional[QDateTime]:
+        """
+        Returns the date-time of a source from its file name and its date-time metadata values.
+        The metadata values are used only if no file name rule matches or if the matching rule
+        allows to refine its date, see FilenameDateRule.refineFromMetadata.
+        :param path: file path or file name
+        :param values: date-time metadata values, see sourceinfo.dateTimeMetadataValues,
+                       or a function that returns them on request
+        :return: QDateTime or None
+        """
+        # known product names define the date in the file name
+        dtg_filename, rule = cls.filenameRuleDateTime(path)
+        if dtg_filename and not rule.refineFromMetadata:
+            return dtg_filename
+
+        if callable(values):
+            values = values()
         dtg = None
+        for v in values:
+            dtg = cls.dateTimeFromString(v)
+            if isinstance(dtg, QDateTime):
+                break
+        return cls.refinedDateTime(dtg_filename, dtg)
 
-        # search in dataset metadata
-        domains = ds.GetMetadataDomainList()
-        domains = sorted(domains, key=lambda d: d in ['IMAGE_STRUCTURE', 'ENVI'], reverse=True)
+    @classmethod
+    def dateTimeFromGDALDataset(cls, ds: gdal.Dataset) -> Optional[QDateTime]:
+        assert isinstance(ds, gdal.Dataset)
 
-        for domain in domains:
-            for k, v in ds.GetMetadata_Dict(domain).items():
-                if rxDTGKey.search(k):
-                    dtg = cls.dateTimeFromString(v)
-                if isinstance(dtg, QDateTime):
-                    return dtg
+        dtg = cls.dateTimeFromFilenameAndMetadata(ds.GetDescription(), lambda: dateTimeMetadataValues(ds))
+        if dtg:
+            return dtg
 
         filenames = ds.GetFileList()
         if len(filenames) > 0:
@@ -480,6 +679,13 @@ class ImageDateUtils(object):
                             dtg = d
                             break
 
+            dtg_filename = None
+            if not dtg and layer.providerType() == 'gdal':
+                # known product names define the date in the file name
+                dtg_filename, rule = ImageDateUtils.filenameRuleDateTime(layer.source().split('|')[0])
+                if dtg_filename and not rule.refineFromMetadata:
+                    dtg = dtg_filename
+
             if not dtg:
                 # read from raster data provider
                 dp: QgsRasterDataProvider = layer.dataProvider()
@@ -491,6 +697,10 @@ class ImageDateUtils(object):
                 if match := cls.rxDTG.search(html):
                     dtg = ImageDateUtils.dateTimeFromString(match.group('dtg'))
 
+            if dtg_filename and dtg is not dtg_filename:
+                # metadata can add the time of day to a date read from the file name
+                dtg = ImageDateUtils.refinedDateTime(dtg_filename, dtg)
+
             if isinstance(dtg, QDateTime) and dtg.isValid():
                 return dtg
             return None
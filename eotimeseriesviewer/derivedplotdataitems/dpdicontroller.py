@@ -1,6 +1,10 @@
+import hashlib
+import marshal
 import os
 import re
 import types
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 from typing import Any, Dict, Generator, List, Optional, Tuple, Union
 
@@ -30,12 +34,169 @@ def dpdiInputData(pdi: PlotDataItem) -> dict[str, Any]:
     return kwds
 
 
+# header line to declare the contract of a user function, e.g. "# CONTRACT: batch"
+rxFunctionContract = re.compile(r'^#\s*CONTRACT:\s*(\w+)\s*$', re.MULTILINE | re.IGNORECASE)
+
+# PlotDataItem options that batch user functions can return to style all derived PlotDataItems
+DPDI_STYLE_KEYS = ['pen', 'shadowPen', 'fillLevel', 'fillBrush', 'symbol', 'symbolSize', 'symbolPen',
+                   'symbolBrush', 'name', 'connect', 'stepMode', 'antialias']
+
+
+class DPDIGuiThreadRequired(Exception):
+    """
+    Raised if a user function that runs outside the GUI thread needs the GUI thread,
+    i.e. if it accesses the input PlotDataItem ``_item_`` or returns PlotDataItems.
+    """
+    pass
+
+
+class DPDIItemPlaceholder(object):
+    """
+    Replaces the input PlotDataItem ``_item_`` of user functions that run outside the GUI thread.
+    Any use raises a DPDIGuiThreadRequired exception.
+    """
+
+    def __getattr__(self, name):
+        raise DPDIGuiThreadRequired(f'_item_.{name} can be used in the GUI thread only')
+
+    def __bool__(self):
+        raise DPDIGuiThreadRequired('_item_ can be used in the GUI thread only')
+
+
+def dpdiArrayData(pdi: PlotDataItem) -> dict[str, Any]:
+    """
+    Returns the input data of a PlotDataItem as copies that do not refer to the PlotDataItem itself.
+    This allows to run user functions outside the GUI thread. ``_item_`` is replaced by a DPDIItemPlaceholder.
+    :param pdi: PlotDataItem
+    :return: dict
+    """
+    kwds = dpdiInputData(pdi)
+    kwds['_item_'] = DPDIItemPlaceholder()
+    kwds['x'] = np.array(kwds['x'], copy=True)
+    kwds['y'] = np.array(kwds['y'], copy=True)
+    return kwds
+
+
+def dpdiBatchInputData(pdis: List[PlotDataItem]) -> dict[str, Any]:
+    """
+    Returns the input data of multiple PlotDataItems for user functions that implement the batch contract.
+    The values and time stamps of all profiles are concatenated into ragged arrays. The values of
+    the i-th profile are ``values[offsets[i]:offsets[i + 1]]``.
+    :param pdis: list of PlotDataItems
+    :return: dict
+    """
+    n_values = [len(pdi.yData) if pdi.yData is not None else 0 for pdi in pdis]
+    offsets = np.zeros(len(pdis) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(n_values)
+    if len(pdis) > 0:
+        timestamps = np.concatenate([np.asarray(pdi.xData, dtype=float) for pdi, n in zip(pdis, n_values) if n > 0]
+                                    or [np.empty(0)])
+        values = np.concatenate([np.asarray(pdi.yData, dtype=float) for pdi, n in zip(pdis, n_values) if n > 0]
+                                or [np.empty(0)])
+    else:
+        timestamps = np.empty(0)
+        values = np.empty(0)
+    kwds = {
+        'timestamps': timestamps,
+        'values': values,
+        'offsets': offsets,
+        'names': [pdi.name() for pdi in pdis],
+        'n': len(pdis),
+    }
+    return kwds
+
+
+def dpdiDataHash(kwds: dict) -> str:
+    """
+    Returns a hash of the input data returned by dpdiArrayData or dpdiBatchInputData
+    """
+    h = hashlib.sha1()
+    for k in ['x', 'y', 'timestamps', 'values', 'offsets']:
+        if k in kwds:
+            a = np.ascontiguousarray(kwds[k])
+            h.update(k.encode())
+            h.update(str(a.dtype).encode())
+            h.update(a.tobytes())
+    h.update(str(kwds.get('name', kwds.get('names'))).encode())
+    return h.hexdigest()
+
+
+def dpdiExecute(func: types.CodeType, kwds: dict) -> List[dict]:
+    """
+    Executes a user function outside the GUI thread and returns its results as list of dictionaries,
+    each with the keyword arguments to create a derived PlotDataItem in the GUI thread.
+    Raises a DPDIGuiThreadRequired exception if the function uses ``_item_`` or returns PlotDataItems.
+    :param func: compiled user function
+    :param kwds: input data from dpdiArrayData
+    :return: list of dictionaries
+    """
+    exec(func, kwds)
+    results = kwds.get('results')
+
+    if isinstance(results, (dict, PlotDataItem)):
+        results = [results]
+
+    data = []
+    if isinstance(results, list):
+        for r in results:
+            if isinstance(r, dict):
+                data.append(r)
+            elif isinstance(r, PlotDataItem):
+                raise DPDIGuiThreadRequired('PlotDataItems can be created in the GUI thread only')
+    return data
+
+
+def dpdiExecuteBatch(func: types.CodeType, kwds: dict) -> List[List[dict]]:
+    """
+    Executes a user function that implements the batch contract.
+    :param func: compiled user function
+    :param kwds: input data from dpdiBatchInputData
+    :return: for each input profile a list of dictionaries with keyword arguments to create a derived PlotDataItem
+    """
+    exec(func, kwds)
+    results = kwds.get('results')
+    n = kwds['n']
+    if results is None:
+        return [[] for _ in range(n)]
+    if not isinstance(results, dict):
+        raise TypeError(f'Batch user functions need to return a dict, not {type(results)}')
+
+    values = np.asarray(results['values'])
+    offsets = np.asarray(results.get('offsets', kwds['offsets']))
+    timestamps = np.asarray(results.get('timestamps', kwds['timestamps']))
+    names = results.get('names', [None] * n)
+    if len(offsets) != n + 1:
+        raise ValueError(f'Batch user function returned {len(offsets) - 1} instead of {n} profiles')
+    if len(values) != len(timestamps) or len(values) != offsets[-1]:
+        raise ValueError('Batch user function returned timestamps and values of different lengths')
+
+    style = {k: v for k, v in results.items() if k in DPDI_STYLE_KEYS}
+    data = []
+    for i in range(n):
+        i0, i1 = offsets[i], offsets[i + 1]
+        if i1 > i0:
+            d = dict(style)
+            d['x'] = timestamps[i0:i1]
+            d['y'] = values[i0:i1]
+            if names[i] is not None:
+                d['name'] = names[i]
+            data.append([d])
+        else:
+            data.append([])
+    return data
+
+
 class DPDIController(QObject):
     """
     Creates, updates and removes PlotDataItems which are derived from a parent PlotDataItem
     """
     visibilityChanged = pyqtSignal(bool)
 
+    # the user function is called for each profile with x, y, dates and name
+    CONTRACT_PROFILE = 'profile'
+    # the user function is called once for all profiles with timestamps, values, offsets and names
+    CONTRACT_BATCH = 'batch'
+
     def __init__(self,
                  messageBar: QgsMessageBar = None,
                  name: str = 'Profile Function',
@@ -46,6 +207,9 @@ class DPDIController(QObject):
         self.mName = name
         self.mError: Optional[str] = None
         self.mFunc: Optional[types.CodeType] = None
+        self.mFuncHash: Optional[str] = None
+        self.mContract: str = self.CONTRACT_PROFILE
+        self.mRequiresGuiThread: bool = False
         self.mCode: Optional[str] = ''
         self.mFile: Optional[Path] = None
 
@@ -82,6 +246,9 @@ class DPDIController(QObject):
             # already exits
             return self.derivedPlotDataItems(pdi)
 
+        if self.mContract == self.CONTRACT_BATCH:
+            return self.createDerivedPlotDataItemsBatch([pdi])
+
         kwds = dpdiInputData(pdi)
 
         try:
@@ -109,6 +276,43 @@ class DPDIController(QObject):
 
         return derived_items
 
+    def createDerivedPlotDataItemsFromData(self, pdi: PlotDataItem, data: List[dict]) -> List[PlotDataItem]:
+        """
+        Creates the derived PlotDataItems for the input PlotDataItem ``pdi`` from
+        results that have been calculated before, e.g., with `dpdiExecute`.
+        :param pdi: PlotDataItem
+        :param data: list of dictionaries with PlotDataItem keyword arguments
+        :return: list of derived plot data items
+        """
+        derived_items = [PlotDataItem(**d) for d in data]
+        self.mDerivedCurves[pdi] = derived_items
+        return derived_items
+
+    def createDerivedPlotDataItemsBatch(self, pdis: List[PlotDataItem]) -> List[PlotDataItem]:
+        """
+        Creates the derived PlotDataItems for multiple input PlotDataItems with a single call
+        of a user function that implements the batch contract.
+        :param pdis: list of PlotDataItems
+        :return: list of derived plot data items
+        """
+        derived_items = []
+        for pdi in pdis:
+            if pdi in self.mDerivedCurves:
+                # already exits
+                derived_items.extend(self.derivedPlotDataItems(pdi))
+        pdis = [pdi for pdi in pdis if pdi not in self.mDerivedCurves]
+        if len(pdis) == 0:
+            return derived_items
+        try:
+            data = dpdiExecuteBatch(self.mFunc, dpdiBatchInputData(pdis))
+        except Exception as ex:
+            self.mError = str(ex)
+            return derived_items
+
+        for pdi, pdi_data in zip(pdis, data):
+            derived_items.extend(self.createDerivedPlotDataItemsFromData(pdi, pdi_data))
+        return derived_items
+
     def derivedPlotDataItems(self, pdi: Union[str, PlotDataItem]) -> List[PlotDataItem]:
         """
         Returns all DerivedPlotDataItems that relate to the PlotDataItem
@@ -129,27 +333,81 @@ class DPDIController(QObject):
         a: QAction = menu.addAction(f'Show {self.mName}')
         a.setChecked(self.mShow)
 
-    def evaluateFunction(self, func) -> Tuple[bool, Optional[str]]:
+    def evaluateFunction(self, func, contract: str = CONTRACT_PROFILE) -> Tuple[bool, Optional[str]]:
         """
         Tests if a given function returns valid output for test data
         :param func: types.CodeType
+        :param contract: contract implemented by the function
         :return: bool [, str]
         """
+        success, error, _ = self.testFunction(func, contract=contract)
+        return success, error
 
+    def testFunction(self, func, contract: str = CONTRACT_PROFILE) -> Tuple[bool, Optional[str], bool]:
+        """
+        Runs a given function with test data in the calling thread.
+        :param func: types.CodeType
+        :param contract: contract implemented by the function
+        :return: bool, error str, and True if the function requires the GUI thread, e.g. to access ``_item_``
+        """
         if not isinstance(func, types.CodeType):
-            return False, f'Wrong type:{func} is not a precompiled code type'
+            return False, f'Wrong type:{func} is not a precompiled code type', False
 
         # set test arguments
+        if contract == self.CONTRACT_BATCH:
+            _globals = {'timestamps': np.asarray([1., 2., 3., 1., 2.]),
+                        'values': np.asarray([1., 2., 3., 1., 2.]),
+                        'offsets': np.asarray([0, 3, 5]),
+                        'names': ['A', 'B'],
+                        'n': 2,
+                        }
+            try:
+                dpdiExecuteBatch(func, _globals)
+            except Exception as ex:
+                return False, str(ex), False
+            return True, None, False
+
         _globals = {'x': np.asarray([1, 2, 3]),
                     'y': np.asarray([1, 2, 3]),
+                    '_item_': DPDIItemPlaceholder(),
                     }
 
         try:
-            exec(func, _globals)
-            results = _globals['results']
+            dpdiExecute(func, _globals)
+        except DPDIGuiThreadRequired:
+            return True, None, True
         except Exception as ex:
-            return False, str(ex)
-        return True, None
+            return False, str(ex), False
+        return True, None, False
+
+    @classmethod
+    def functionContract(cls, code: str) -> str:
+        """
+        Returns the contract implemented by the code of a user function. Functions that implement
+        the batch contract declare it with the header line ``# CONTRACT: batch``.
+        :param code: user function code
+        :return: CONTRACT_BATCH or CONTRACT_PROFILE
+        """
+        if isinstance(code, str) and (match := rxFunctionContract.search(code)):
+            if match.group(1).lower() == cls.CONTRACT_BATCH:
+                return cls.CONTRACT_BATCH
+        return cls.CONTRACT_PROFILE
+
+    def contract(self) -> str:
+        """
+        Returns the contract implemented by the current user function
+        """
+        return self.mContract
+
+    def requiresGuiThread(self) -> bool:
+        """
+        Returns True if the current user function needs to run in the GUI thread,
+        because it uses the input PlotDataItem ``_item_`` or returns PlotDataItems.
+        """
+        return self.mRequiresGuiThread
+
+    def setRequiresGuiThread(self, requires_gui_thread: bool):
+        self.mRequiresGuiThread = requires_gui_thread
 
     def prepareFunction(self, code: str) -> Tuple[Optional[types.CodeType], Optional[str]]:
         assert isinstance(code, str)
@@ -166,17 +424,33 @@ class DPDIController(QObject):
     def code(self) -> str:
         return self.mCode
 
+    def function(self) -> Optional[types.CodeType]:
+        return self.mFunc
+
+    def functionHash(self) -> Optional[str]:
+        """
+        Returns a hash of the compiled user function
+        """
+        return self.mFuncHash
+
     def error(self) -> Optional[str]:
         return self.mError
 
     def setFunction(self,
                     func: Union[types.FunctionType, str],
-                    description: str = None) -> bool:
+                    description: str = None,
+                    contract: Optional[str] = None) -> bool:
         """
         Set the user-defined function to generate derived plot data items
         :param func:
+        :param contract: contract implemented by the function, CONTRACT_PROFILE or CONTRACT_BATCH.
+                         Defaults to the contract declared in the function code or to CONTRACT_PROFILE.
         :return:
         """
+        if contract is None:
+            contract = self.functionContract(func)
+        assert contract in [self.CONTRACT_PROFILE, self.CONTRACT_BATCH]
+
         if isinstance(func, str):
             # compile the code
             self.mCode = func
@@ -188,7 +462,7 @@ class DPDIController(QObject):
         if func != self.mFunc:
             self.clear()
 
-        success, error = self.evaluateFunction(func)
+        success, error, requires_gui_thread = self.testFunction(func, contract=contract)
         if not success:
             if self.mMessageBar:
                 self.mMessageBar.pushCritical('Failed test', error)
@@ -197,6 +471,9 @@ class DPDIController(QObject):
 
         self.mError = None
         self.mFunc = func
+        self.mFuncHash = hashlib.sha1(marshal.dumps(func)).hexdigest()
+        self.mContract = contract
+        self.mRequiresGuiThread = requires_gui_thread
         return True
 
     def clear(self):
@@ -213,6 +490,13 @@ class DPDIControllerModel(QObject):
     controllerRemoved = pyqtSignal(object)
     modelUpdated = pyqtSignal()
     itemsRemoved = pyqtSignal(list)
+    # emitted with the parent PlotDataItem and its derived items, when calculated in background
+    derivedItemsReady = pyqtSignal(object, list)
+
+    # internal signal to return the results of worker threads into the GUI thread
+    _futureDone = pyqtSignal(object)
+
+    MAX_CACHED_RESULTS: int = 1024
 
     def __init__(self, *args, **kwds):
         super().__init__(*args, **kwds)
@@ -222,12 +506,66 @@ class DPDIControllerModel(QObject):
         self.mExampleFolder: Optional[Path] = None
         self.mExamplePDI: Optional[PlotDataItem] = None
 
+        # background computation
+        self.mAsync: bool = False
+        self.mMaxWorkers: int = min(4, os.cpu_count())
+        self.mExecutor: Optional[ThreadPoolExecutor] = None
+        self.mGeneration: int = 0
+        self.mPendingResults: Dict[Future, Tuple[int, DPDIController, Union[PlotDataItem, List[PlotDataItem]],
+                                                 Tuple[str, str]]] = dict()
+        self.mResultCache: OrderedDict[Tuple[str, str], List[dict]] = OrderedDict()
+        self._futureDone.connect(self.onFutureDone)
+
     def setPlotDataItemExample(self, pdi: PlotDataItem):
         self.mExamplePDI = pdi
 
+    def setAsync(self, run_async: bool):
+        """
+        Set True to run user functions in background threads. Derived items are then
+        returned with the derivedItemsReady signal.
+        """
+        if self.mAsync != run_async:
+            self.mAsync = run_async
+            if not run_async:
+                self.shutdownExecutor()
+            self.modelUpdated.emit()
+
+    def isAsync(self) -> bool:
+        return self.mAsync
+
+    def executor(self) -> ThreadPoolExecutor:
+        if self.mExecutor is None:
+            self.mExecutor = ThreadPoolExecutor(max_workers=self.mMaxWorkers, thread_name_prefix='DPDI')
+            # the slot must not refer to this model, which is already deleted when destroyed is emitted
+            self.destroyed.connect(lambda *args, e=self.mExecutor: e.shutdown(wait=False, cancel_futures=True))
+        return self.mExecutor
+
+    def shutdownExecutor(self):
+        """
+        Stops the background threads. Calculations that have not been started yet are cancelled,
+        results of running calculations are ignored.
+        """
+        if self.mExecutor is not None:
+            self.mExecutor.shutdown(wait=False, cancel_futures=True)
+            self.mExecutor = None
+        self.mPendingResults.clear()
+
+    def hasPendingResults(self) -> bool:
+        return len(self.mPendingResults) > 0
+
+    def cancelPendingResults(self):
+        """
+        Cancels the computation of results that have not been started yet
+        """
+        for future in list(self.mPendingResults.keys()):
+            if future.cancel():
+                self.mPendingResults.pop(future, None)
+
     def createDerivedItems(self, items: List[PlotDataItem]) -> List[PlotDataItem]:
         """
         Gets a list of items and create a list of derived items according to the controller settings.
+        In async mode, only derived items with cached results are returned. All others are
+        calculated in background and returned with the derivedItemsReady signal.
         :return:
         """
 
@@ -239,13 +577,105 @@ class DPDIControllerModel(QObject):
             if controller.isVisible():
                 controllers_to_show.append(controller)
 
+        self.mGeneration += 1
+        self.cancelPendingResults()
+
+        items = list(items)
         new_items = []
-        for item in items:
-            for controller in controllers_to_show:
-                new_items.extend(controller.createDerivedPlotDataItems(item))
+        for controller in controllers_to_show:
+            if controller.contract() == DPDIController.CONTRACT_BATCH:
+                # one call for all items
+                if self.mAsync:
+                    new_items.extend(self.submitDerivedItemsBatch(controller, items))
+                else:
+                    new_items.extend(controller.createDerivedPlotDataItemsBatch(items))
+            else:
+                for item in items:
+                    # functions that use _item_ or create PlotDataItems run in the GUI thread
+                    if self.mAsync and not controller.requiresGuiThread():
+                        new_items.extend(self.submitDerivedItems(controller, item))
+                    else:
+                        new_items.extend(controller.createDerivedPlotDataItems(item))
 
         return new_items
 
+    def submitDerivedItems(self, controller: DPDIController, pdi: PlotDataItem) -> List[PlotDataItem]:
+        """
+        Calculates the derived items of a controller in a background thread.
+        :return: list with derived items, if results for the same function and data were cached before
+        """
+        if not isinstance(controller.function(), types.CodeType):
+            return []
+
+        data = dpdiArrayData(pdi)
+        key = (controller.functionHash(), dpdiDataHash(data))
+        if key in self.mResultCache:
+            self.mResultCache.move_to_end(key)
+            return controller.createDerivedPlotDataItemsFromData(pdi, self.mResultCache[key])
+
+        future = self.executor().submit(dpdiExecute, controller.function(), data)
+        self.mPendingResults[future] = (self.mGeneration, controller, pdi, key)
+        future.add_done_callback(self._futureDone.emit)
+        return []
+
+    def submitDerivedItemsBatch(self, controller: DPDIController, pdis: List[PlotDataItem]) -> List[PlotDataItem]:
+        """
+        Calculates the derived items of a batch contract controller in a background thread.
+        :return: list with derived items, if results for the same function and data were cached before
+        """
+        if not isinstance(controller.function(), types.CodeType) or len(pdis) == 0:
+            return []
+
+        data = dpdiBatchInputData(pdis)
+        key = (controller.functionHash(), dpdiDataHash(data))
+        if key in self.mResultCache:
+            self.mResultCache.move_to_end(key)
+            derived_items = []
+            for pdi, pdi_data in zip(pdis, self.mResultCache[key]):
+                derived_items.extend(controller.createDerivedPlotDataItemsFromData(pdi, pdi_data))
+            return derived_items
+
+        future = self.executor().submit(dpdiExecuteBatch, controller.function(), data)
+        self.mPendingResults[future] = (self.mGeneration, controller, pdis, key)
+        future.add_done_callback(self._futureDone.emit)
+        return []
+
+    def onFutureDone(self, future: Future):
+        if future not in self.mPendingResults:
+            return
+        generation, controller, pdis, key = self.mPendingResults.pop(future)
+        if future.cancelled():
+            return
+
+        error = future.exception()
+        if isinstance(error, DPDIGuiThreadRequired):
+            # run this and all further calls of the function in the GUI thread
+            controller.setRequiresGuiThread(True)
+            if generation == self.mGeneration and controller in self.mController and controller.isVisible():
+                derived_items = controller.createDerivedPlotDataItems(pdis)
+                if len(derived_items) > 0:
+                    self.derivedItemsReady.emit(pdis, derived_items)
+            return
+        elif error:
+            controller.mError = str(error)
+            return
+
+        data = future.result()
+        self.mResultCache[key] = data
+        while len(self.mResultCache) > self.MAX_CACHED_RESULTS:
+            self.mResultCache.popitem(last=False)
+
+        if generation == self.mGeneration and controller in self.mController and controller.isVisible():
+            if isinstance(pdis, list):
+                # results of a batch contract function
+                parent_data = zip(pdis, data)
+            else:
+                parent_data = [(pdis, data)]
+            for pdi, pdi_data in parent_data:
+                derived_items = controller.createDerivedPlotDataItemsFromData(pdi, pdi_data)
+                if len(derived_items) > 0:
+                    self.derivedItemsReady.emit(pdi, derived_items)
+
     def showControllerSettingsDialog(self):
 
         d = DPDIControllerSettingsDialog(self)
@@ -283,8 +713,11 @@ class DPDIControllerModel(QObject):
             code = data.get('code')
             try:
                 func = compile(code, f'<user_code: "{code}">', 'exec')
-                kwds = dpdiInputData(pdi)
-                exec(func, kwds)
+                if DPDIController.functionContract(code) == DPDIController.CONTRACT_BATCH:
+                    dpdiExecuteBatch(func, dpdiBatchInputData([pdi]))
+                else:
+                    kwds = dpdiInputData(pdi)
+                    exec(func, kwds)
                 data['success'] = True
                 data['error'] = None
             except Exception as ex:
@@ -301,6 +734,12 @@ class DPDIControllerModel(QObject):
         a.setChecked(self.showSelectedOnly())
         a.toggled.connect(self.setShowSelectedOnly)
 
+        a = m.addAction('Run in Background')
+        a.setToolTip('Calculate user functions in background threads')
+        a.setCheckable(True)
+        a.setChecked(self.isAsync())
+        a.toggled.connect(self.setAsync)
+
         a = m.addAction('Settings')
         a.triggered.connect(self.showControllerSettingsDialog)
 
@@ -327,6 +766,7 @@ class DPDIControllerModel(QObject):
         """Remove all controllers from this model"""
         for c in self.mController[:]:
             self.removeController(c)
+        self.shutdownExecutor()
 
     def setShowSelectedOnly(self, showSelectedOnly: bool):
         if self.mShowSelectedOnly != showSelectedOnly:
@@ -1,18 +1,59 @@
-from typing import List, Optional
+from typing import Callable, List, Optional
 
-from eotimeseriesviewer.labeling.attributetable import QuickLabelAttributeTableWidget
-from eotimeseriesviewer.qgispluginsupport.qps.speclib.gui.spectrallibrarywidget import SpectralLibraryWidget
+from eotimeseriesviewer.instrumentation import startupPhase
 from eotimeseriesviewer.settings.settings import EOTSVSettingsManager
+from qgis.PyQt.QtCore import pyqtSignal
+from qgis.PyQt.QtWidgets import QWidget
 from qgis.core import QgsVectorLayer, QgsVectorLayerTools, QgsProject
 from qgis.gui import QgsDockWidget
 
 
+class LazyDockWidget(QgsDockWidget):
+    """
+    A dock widget that creates its content widget when it becomes visible for the first time.
+    """
+    sigWidgetCreated = pyqtSignal(QWidget)
+
+    def __init__(self, title: str, factory: Callable[[], QWidget], *args, **kwds):
+        """
+        :param title: dock title
+        :param factory: function that returns the content widget
+        """
+        super().__init__(title, *args, **kwds)
+        self.mFactory: Optional[Callable[[], QWidget]] = factory
+        self.visibilityChanged.connect(self.onVisibilityChanged)
+
+    def isCreated(self) -> bool:
+        """
+        Returns True if the content widget has been created
+        """
+        return self.mFactory is None
+
+    def createWidget(self) -> QWidget:
+        """
+        Creates the content widget, if not done before, and returns it
+        """
+        if self.mFactory is not None:
+            factory, self.mFactory = self.mFactory, None
+            with startupPhase(f'create {self.windowTitle()}'):
+                w = factory()
+            self.setWidget(w)
+            self.sigWidgetCreated.emit(w)
+        return self.widget()
+
+    def onVisibilityChanged(self, visible: bool):
+        if visible:
+            self.createWidget()
+
+
 class SpectralLibraryDockWidget(QgsDockWidget):
     def __init__(self, *args,
                  speclib: Optional[QgsVectorLayer] = None,
                  project: Optional[QgsProject] = None,
                  **kwds):
         super().__init__(*args, **kwds)
+        # imported on demand, as the spectral library widget loads the plotting modules
+        from eotimeseriesviewer.qgispluginsupport.qps.speclib.gui.spectrallibrarywidget import SpectralLibraryWidget
 
         settings = EOTSVSettingsManager.settings()
         style_candidates = settings.profileStyleCurrent.clone()
@@ -37,6 +78,7 @@ class LabelDockWidget(QgsDockWidget):
 
     def __init__(self, layer, *args, **kwds):
         super().__init__(*args, **kwds)
+        from eotimeseriesviewer.labeling.attributetable import QuickLabelAttributeTableWidget
         self.mLabelWidget = QuickLabelAttributeTableWidget(layer)
         self.setWidget(self.mLabelWidget)
         self.setWindowTitle(self.mLabelWidget.windowTitle())
@@ -108,7 +108,10 @@ class EOTimeSeriesViewerPlugin:
             raise Exception(longText)
 
     def run(self):
-        from eotimeseriesviewer.main import EOTimeSeriesViewer
+        from eotimeseriesviewer.instrumentation import beginStartup, startupPhase
+        beginStartup()
+        with startupPhase('import main'):
+            from eotimeseriesviewer.main import EOTimeSeriesViewer
         eotsv = EOTimeSeriesViewer.instance()
         if isinstance(eotsv, EOTimeSeriesViewer):
             eotsv.ui.show()
@@ -119,7 +122,8 @@ class EOTimeSeriesViewerPlugin:
             from eotimeseriesviewer.settings.settings import EOTSVSettingsManager
             settings = EOTSVSettingsManager.settings()
             if settings.restoreProjectSettings:
-                self.mEOTSV.reloadProject()
+                with startupPhase('reload project'):
+                    self.mEOTSV.reloadProject()
 
             self.mEOTSV.show()
 
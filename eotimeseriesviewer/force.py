@@ -1,9 +1,68 @@
 import os
 import re
-from typing import Iterator, List, Union
+from functools import lru_cache
+from typing import Iterator, List, Optional, Tuple, Union
 from pathlib import Path
 
 rxFORCE_TILE = re.compile(r'^X\d+_Y\d+$')
+rxFORCE_TILE_XY = re.compile(r'^X(?P<x>-?\d+)_Y(?P<y>-?\d+)$')
+
+
+class FORCECubeDefinition(object):
+    """
+    The grid of a FORCE data cube, as described in its datacube-definition.prj file:
+    projection (WKT), origin longitude, origin latitude, origin x, origin y, tile size and block size.
+    """
+    FILE_NAME = 'datacube-definition.prj'
+
+    def __init__(self, wkt: str, origin_x: float, origin_y: float, tile_size: float, block_size: float):
+        assert tile_size > 0
+        self.mWkt = wkt
+        self.mOriginX = origin_x
+        self.mOriginY = origin_y
+        self.mTileSize = tile_size
+        self.mBlockSize = block_size
+
+    @classmethod
+    def fromFile(cls, path: Union[str, Path]) -> Optional['FORCECubeDefinition']:
+        """
+        Reads a datacube-definition.prj file
+        :param path: file path
+        :return: FORCECubeDefinition or None, if the file does not describe a FORCE data cube grid
+        """
+        with open(path, 'r') as f:
+            lines = [line.strip() for line in f.readlines() if line.strip() != '']
+        if len(lines) < 7:
+            return None
+        try:
+            return FORCECubeDefinition(lines[0], float(lines[3]), float(lines[4]), float(lines[5]), float(lines[6]))
+        except ValueError:
+            return None
+
+    def wkt(self) -> str:
+        return self.mWkt
+
+    def tileSize(self) -> float:
+        return self.mTileSize
+
+    def tileExtent(self, tile_id: str) -> Tuple[float, float, float, float]:
+        """
+        Returns the extent of a tile in cube coordinates
+        :param tile_id: tile id, e.g. 'X0066_Y0058'
+        :return: (xmin, ymin, xmax, ymax)
+        """
+        match = rxFORCE_TILE_XY.match(tile_id)
+        assert match, f'Not a FORCE tile id: {tile_id}'
+        xmin = self.mOriginX + int(match.group('x')) * self.mTileSize
+        ymax = self.mOriginY - int(match.group('y')) * self.mTileSize
+        return xmin, ymax - self.mTileSize, xmin + self.mTileSize, ymax
+
+
+@lru_cache(maxsize=32)
+def _readCubeDefinition(path: str) -> Optional[FORCECubeDefinition]:
+    if not os.path.isfile(path):
+        return None
+    return FORCECubeDefinition.fromFile(path)
 
 
 class FORCEUtils(object):
@@ -22,6 +81,16 @@ class FORCEUtils(object):
                     if d.is_dir() and rxFORCE_TILE.match(d.name):
                         yield Path(d.path)
 
+    @staticmethod
+    def cubeDefinition(tileDir: Union[str, Path]) -> Optional[FORCECubeDefinition]:
+        """
+        Returns the definition of the data cube a tile folder belongs to
+        :param tileDir: tile folder
+        :return: FORCECubeDefinition or None
+        """
+        path = Path(tileDir).parent / FORCECubeDefinition.FILE_NAME
+        return _readCubeDefinition(path.as_posix())
+
     @staticmethod
     def productFiles(tileDir: Union[str, Path], product: str) -> List[Path]:
         assert isinstance(product, str) and len(product) > 0
@@ -1,18 +1,22 @@
 import datetime
 import os.path
 import re
+import threading
+from concurrent.futures import as_completed, ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional, Set, Union
+from typing import Dict, List, Optional, Set, Tuple, Union
 
 from eotimeseriesviewer import DIR_UI
-from eotimeseriesviewer.dateparser import ImageDateUtils
+from eotimeseriesviewer.dateparser import ImageDateUtils, rx_FORCE_L2_Product
+from eotimeseriesviewer.force import FORCEUtils
 from eotimeseriesviewer.qgispluginsupport.qps.models import Option, OptionListModel
-from eotimeseriesviewer.qgispluginsupport.qps.utils import file_search, loadUi
+from eotimeseriesviewer.qgispluginsupport.qps.utils import loadUi
 from eotimeseriesviewer.tasks import EOTSVTask
+from eotimeseriesviewer.timeseries.source import extentToWGS84, TimeSeriesSource, utcOffset
 from qgis.PyQt.QtCore import pyqtSignal, QDate, Qt
 from qgis.PyQt.QtGui import QColor
 from qgis.PyQt.QtWidgets import QComboBox, QDialog, QDialogButtonBox, QLabel
-from qgis.core import QgsApplication, QgsTask
+from qgis.core import QgsApplication, QgsRectangle, QgsTask
 from qgis.gui import QgsFileWidget
 
 FORCE_PRODUCTS = {
@@ -28,8 +32,43 @@ FORCE_PRODUCTS = {
 
 rx_FORCE_TILEID = re.compile(r'(X-?\d+)_(Y-?\d+)', re.MULTILINE)
 rx_FORCE_TILEFOLDER = re.compile(f'^{rx_FORCE_TILEID.pattern}$')
-rx_FORCE_L2_Product = re.compile(
-    r'(?P<date>\d{8})_LEVEL2_(?P<sensor>[^_. ]+)_(?P<product>[^_. ]+)\.(?P<ext>tif|bsq|bil|bip|cog|vrt)$')
+
+# cached directory listings: folder -> (modification time in ns, entry names)
+_DIRECTORY_LISTINGS: Dict[str, Tuple[int, List[str]]] = dict()
+_DIRECTORY_LISTINGS_LOCK = threading.Lock()
+
+
+def list_directory(folder: Union[str, Path], use_cache: bool = False) -> List[str]:
+    """
+    Returns the names of all entries in a folder, without calling stat on any of them.
+    :param folder: folder path
+    :param use_cache: set True to reuse the last listing of the folder as long as its modification time is unchanged
+    :return: list of entry names
+    """
+    folder = str(folder)
+    mtime = None
+    if use_cache:
+        mtime = os.stat(folder).st_mtime_ns
+        with _DIRECTORY_LISTINGS_LOCK:
+            cached = _DIRECTORY_LISTINGS.get(folder)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+    with os.scandir(folder) as scan:
+        names = [e.name for e in scan]
+
+    if use_cache:
+        with _DIRECTORY_LISTINGS_LOCK:
+            _DIRECTORY_LISTINGS[folder] = (mtime, names)
+    return names
+
+
+def clear_directory_listings():
+    """
+    Clears the cached directory listings
+    """
+    with _DIRECTORY_LISTINGS_LOCK:
+        _DIRECTORY_LISTINGS.clear()
 
 
 def read_tileids(text: str) -> List[str]:
@@ -47,16 +86,106 @@ def read_tileids(text: str) -> List[str]:
     return sorted(tile_ids)
 
 
-def find_tile_folders(root: Union[str, Path]) -> List[Path]:
+def find_tile_folders(root: Union[str, Path], _visited: Optional[Set[str]] = None) -> List[Path]:
+    """
+    Returns the FORCE tile folders in a root folder and its sub-folders.
+    Symbolic links are followed, but each folder is visited only once, which avoids endless
+    recursion in case of link cycles. Sub-folders that cannot be listed are skipped.
+    :param root: folder path
+    :return: list of tile folders
+    """
     root = Path(root)
     if rx_FORCE_TILEFOLDER.match(root.name):
         return [root]
-    else:
-        folders = []
-        for f in file_search(root, rx_FORCE_TILEFOLDER, directories=True):
-            folders.append(Path(f))
 
-        return folders
+    if _visited is None:
+        _visited = set()
+    _visited.add(os.path.realpath(root))
+
+    # do not descend into tile folders, which can contain thousands of files
+    folders = []
+    with os.scandir(root) as scan:
+        for e in scan:
+            try:
+                if not e.is_dir():
+                    continue
+            except OSError:
+                continue
+            real_path = os.path.realpath(e.path)
+            if real_path in _visited:
+                continue
+            if rx_FORCE_TILEFOLDER.match(e.name):
+                _visited.add(real_path)
+                folders.append(Path(e.path))
+            else:
+                try:
+                    folders.extend(find_tile_folders(e.path, _visited))
+                except OSError:
+                    continue
+    return sorted(folders)
+
+
+def create_force_sources(files: List[Union[str, Path]]) -> Tuple[List[TimeSeriesSource], List[str]]:
+    """
+    Creates TimeSeriesSources for FORCE level 2 products in tile folders without opening each file.
+    Date, sensor and product are read from the file name, CRS and extent from the tile id and the
+    datacube-definition.prj of the data cube. Only one file per sensor and product is opened to read
+    the band metadata.
+    :param files: list of FORCE product files
+    :return: list of TimeSeriesSources, list of files that need to be loaded as usual
+    """
+    sources: List[TimeSeriesSource] = []
+    remaining: List[str] = []
+
+    groups: Dict[Tuple[str, str, str, str], List[Path]] = dict()
+    for file in files:
+        file = Path(file)
+        match = rx_FORCE_L2_Product.match(file.name)
+        if match and rx_FORCE_TILEFOLDER.match(file.parent.name) and FORCEUtils.cubeDefinition(file.parent):
+            key = (file.parent.parent.as_posix(), match.group('sensor'), match.group('product'), match.group('ext'))
+            groups.setdefault(key, []).append(file)
+        else:
+            remaining.append(str(file))
+
+    for key, group in groups.items():
+        cube = FORCEUtils.cubeDefinition(group[0].parent)
+        try:
+            sample = TimeSeriesSource.create(group[0])
+        except Exception:
+            sample = None
+
+        # the sample file needs to fit into the cube grid
+        if isinstance(sample, TimeSeriesSource):
+            px_size = (sample.mExtent[2] - sample.mExtent[0]) / sample.ns()
+            tile_extent = cube.tileExtent(group[0].parent.name)
+            if max(abs(a - b) for a, b in zip(tile_extent, sample.mExtent)) > 0.5 * px_size:
+                sample = None
+
+        if not isinstance(sample, TimeSeriesSource):
+            remaining.extend(str(f) for f in group)
+            continue
+
+        sources.append(sample)
+        sensors = [sample.sid()]
+        crs = [sample.mCrsKey]
+        sample_crs = sample.crs()
+        tile_extents = dict()
+        for file in group[1:]:
+            tile_id = file.parent.name
+            extents = tile_extents.get(tile_id)
+            if extents is None:
+                extent = cube.tileExtent(tile_id)
+                r = extentToWGS84(sample_crs, QgsRectangle(*extent)).boundingBox()
+                extents = (extent, (r.xMinimum(), r.yMinimum(), r.xMaximum(), r.yMaximum()))
+                tile_extents[tile_id] = extents
+
+            # FORCE file names define the date without any metadata, as for the opened sample file
+            dtg = ImageDateUtils.dateTimeFromFilenameAndMetadata(file.name, [])
+            values = [str(file), file.name, 'gdal', 0, dtg.toMSecsSinceEpoch(), utcOffset(dtg),
+                      sample.mDims, 0, extents[0], extents[1], True]
+            sources.append(TimeSeriesSource.fromValues(values, sensors, crs))
+
+    return sources, remaining
 
 
 class FindFORCEProductsTask(EOTSVTask):
@@ -69,7 +198,18 @@ class FindFORCEProductsTask(EOTSVTask):
                  tile_ids: List[str] = None,
                  dateMin: Union[None, QDate, str, datetime.datetime] = None,
                  dateMax: Union[None, QDate, str, datetime.datetime] = None,
+                 n_threads: int = 4,
+                 use_cache: bool = True,
                  **kwds):
+        """
+        :param product: FORCE product, e.g. 'BOA'
+        :param path: FORCE data cube folder, tile folder or mosaic folder
+        :param tile_ids: optional list of tile ids to search in
+        :param dateMin: optional minimum observation date
+        :param dateMax: optional maximum observation date
+        :param n_threads: number of tile folders to scan in parallel
+        :param use_cache: set True to reuse directory listings of unchanged tile folders
+        """
         super().__init__(
             *args,
             flags=QgsTask.Silent | QgsTask.CanCancel | QgsTask.CancelWithoutPrompt,
@@ -81,6 +221,7 @@ class FindFORCEProductsTask(EOTSVTask):
             assert rx_FORCE_TILEID.match(tile_id), f'Not a force tile_id: {tile_id}'
 
         assert product in FORCE_PRODUCTS.keys(), f'Unknown FORCE product: {product}'
+        assert n_threads > 0
         path = Path(path)
         assert path.is_dir()
 
@@ -92,6 +233,9 @@ class FindFORCEProductsTask(EOTSVTask):
         self.setDescription(f'Search {self.mProduct} in "../{self.mPath.name}"')
         self.mFiles: List[Path] = []
         self.mFileTiles: Set[str] = set()
+        self.mErrors: List[Tuple[Path, str]] = []
+        self.mThreads = n_threads
+        self.mUseCache = use_cache
 
     def searchId(self) -> str:
         return f'{self.mProduct}:{self.mPath}:{self.mTileIDs}:{self.mDateMin}:{self.mDateMax}'
@@ -102,6 +246,37 @@ class FindFORCEProductsTask(EOTSVTask):
     def files(self) -> List[Path]:
         return self.mFiles
 
+    def errors(self) -> List[Tuple[Path, str]]:
+        """
+        Returns the tile folders that could not be scanned, together with the error message
+        """
+        return self.mErrors[:]
+
+    def scanFolder(self, folder: Path) -> List[Path]:
+        """
+        Returns the product files in a tile folder. Dates are filtered by file name.
+        :param folder: Path
+        :return: list of file paths
+        """
+        filter_dates = isinstance(self.mDateMin, QDate) or isinstance(self.mDateMax, QDate)
+        files = []
+        for name in list_directory(folder, use_cache=self.mUseCache):
+            if not self.mRxProduct.match(name):
+                continue
+
+            if filter_dates:
+                match = rx_FORCE_L2_Product.match(name)
+                if not match:
+                    continue
+
+                image_date = QDate.fromString(match.group('date'), 'yyyyMMdd')
+                if self.mDateMin and image_date < self.mDateMin:
+                    continue
+                if self.mDateMax and image_date > self.mDateMax:
+                    continue
+            files.append(folder / name)
+        return files
+
     def run(self):
 
         self.taskInfo.emit(f'Search for {self.mProduct} files...')
@@ -135,31 +310,33 @@ class FindFORCEProductsTask(EOTSVTask):
                 if progress:
                     self.setProgress(progress)
 
+        # scan tile folders in parallel and report the number of found files as results arrive
         n_folders = len(tile_folders) + 10
-        for i_folder, folder in enumerate(tile_folders):
-
-            for i, file in enumerate(file_search(folder, self.mRxProduct, recursive=False)):
-                file = Path(file)
-
-                if isinstance(self.mDateMin, QDate) or isinstance(self.mDateMax, QDate):
-                    match = rx_FORCE_L2_Product.match(file.name)
-                    if not match:
-                        continue
-
-                    image_date = QDate.fromString(match.group('date'), 'yyyyMMdd')
-                    if self.mDateMin and image_date < self.mDateMin:
-                        continue
-                    if self.mDateMax and image_date > self.mDateMax:
-                        continue
-
-                if rx_FORCE_TILEFOLDER.match(file.parent.name) and file.parent.name not in self.mFileTiles:
-                    self.mFileTiles.add(file.parent.name)
-
-                self.mFiles.append(file)
-                if i % 100:
-                    if self.isCanceled():
-                        return False
-                    info_check(progress=100 * i_folder / n_folders)
+        results: Dict[int, List[Path]] = dict()
+        executor = ThreadPoolExecutor(max_workers=self.mThreads)
+        try:
+            futures = {executor.submit(self.scanFolder, folder): i for i, folder in enumerate(tile_folders)}
+            for n_done, future in enumerate(as_completed(futures), start=1):
+                if self.isCanceled():
+                    return False
+                i_folder = futures[future]
+                try:
+                    files = future.result()
+                except Exception as ex:
+                    # skip unreadable tile folders instead of stopping the whole search
+                    self.mErrors.append((tile_folders[i_folder], str(ex)))
+                    self.addErrors(1)
+                    files = []
+                results[i_folder] = files
+                if len(files) > 0 and rx_FORCE_TILEFOLDER.match(tile_folders[i_folder].name):
+                    self.mFileTiles.add(tile_folders[i_folder].name)
+                self.mFiles.extend(files)
+                info_check(progress=100 * n_done / n_folders)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+        # return files in order of tile folders
+        self.mFiles = [file for i in sorted(results.keys()) for file in results[i]]
 
         self.setProgress(100.0)
         self.taskInfo.emit(self.infoMessage() + '.')
@@ -170,6 +347,8 @@ class FindFORCEProductsTask(EOTSVTask):
         n = len(self.mFileTiles)
         if n > 0:
             msg += f' in {n} tiles'
+        if len(self.mErrors) > 0:
+            msg += f' ({len(self.mErrors)} folders could not be read)'
         return msg
 
 
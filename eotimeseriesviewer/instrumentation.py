@@ -0,0 +1,350 @@
+"""
+Lightweight timing instrumentation of hot code paths.
+
+Timings are recorded only if the instrumentation is enabled, e.g. with setEnabled(True) or by
+setting the environment variable EOTSV_TIMING=1. When disabled, the timed() decorator and the
+timer() context manager just call the wrapped code.
+
+    @timed()
+    def readSource(path):
+        ...
+
+    with timer('Read profiles'):
+        array = ds.ReadAsArray(x, y, 1, 1)
+        addBytes(array.nbytes)
+
+Recorded metrics can be exported as JSON or in the Chrome trace event format, which can be
+opened with chrome://tracing or https://ui.perfetto.dev
+
+The phases of the EOTSV startup are recorded in any case, see startupPhase() and startupReport().
+"""
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+# maximum number of single events kept for the trace export
+MAX_EVENTS = 100000
+# maximum number of durations kept per timer name to estimate percentiles
+MAX_SAMPLES = 10000
+
+_ENABLED: bool = os.environ.get('EOTSV_TIMING', '').lower() in ['1', 'true', 'yes']
+_LOCK = threading.Lock()
+_LOCAL = threading.local()
+_T0_NS: int = time.perf_counter_ns()
+
+# events as (name, start [ns], duration [ns], thread id, bytes)
+_EVENTS: Deque[Tuple[str, int, int, int, int]] = deque(maxlen=MAX_EVENTS)
+_STATS: Dict[str, '_TimerStats'] = dict()
+
+# startup phases as (name, start [ns], duration [ns], nesting level)
+_STARTUP: List[Tuple[str, int, int, int]] = []
+_STARTUP_T0: Optional[int] = None
+_STARTUP_END: Optional[int] = None
+_STARTUP_LEVEL: int = 0
+
+
+class _TimerStats(object):
+    __slots__ = ('count', 'total', 'max', 'bytes', 'samples')
+
+    def __init__(self):
+        self.count: int = 0
+        self.total: int = 0
+        self.max: int = 0
+        self.bytes: int = 0
+        self.samples: Deque[int] = deque(maxlen=MAX_SAMPLES)
+
+
+def isEnabled() -> bool:
+    return _ENABLED
+
+
+def setEnabled(enabled: bool):
+    """
+    Enables or disables the recording of timings
+    """
+    global _ENABLED
+    _ENABLED = bool(enabled)
+
+
+def clear():
+    """
+    Removes all recorded timings
+    """
+    with _LOCK:
+        _EVENTS.clear()
+        _STATS.clear()
+
+
+def record(name: str, start_ns: int, duration_ns: int, n_bytes: int = 0):
+    """
+    Records a timing
+    :param name: timer name
+    :param start_ns: start time as returned by time.perf_counter_ns()
+    :param duration_ns: duration in nanoseconds
+    :param n_bytes: number of bytes read
+    """
+    with _LOCK:
+        _EVENTS.append((name, start_ns, duration_ns, threading.get_ident(), n_bytes))
+        stats = _STATS.get(name)
+        if stats is None:
+            stats = _STATS[name] = _TimerStats()
+        stats.count += 1
+        stats.total += duration_ns
+        stats.max = max(stats.max, duration_ns)
+        stats.bytes += n_bytes
+        stats.samples.append(duration_ns)
+
+
+def _timerStack() -> List['Timer']:
+    stack = getattr(_LOCAL, 'stack', None)
+    if stack is None:
+        stack = _LOCAL.stack = []
+    return stack
+
+
+class Timer(object):
+    """
+    Context manager that records the time spent in its context
+    """
+    __slots__ = ('mName', 'mStart', 'mBytes')
+
+    def __init__(self, name: str):
+        self.mName = name
+        self.mStart: int = 0
+        self.mBytes: int = 0
+
+    def addBytes(self, n: int):
+        self.mBytes += int(n)
+
+    def __enter__(self) -> 'Timer':
+        _timerStack().append(self)
+        self.mStart = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> bool:
+        duration = time.perf_counter_ns() - self.mStart
+        stack = _timerStack()
+        if stack and stack[-1] is self:
+            stack.pop()
+        record(self.mName, self.mStart, duration, self.mBytes)
+        return False
+
+
+class _NullTimer(object):
+    """
+    Timer that does nothing, used when the instrumentation is disabled
+    """
+    __slots__ = ()
+
+    def addBytes(self, n: int):
+        pass
+
+    def __enter__(self) -> '_NullTimer':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> bool:
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timer(name: str) -> Union[Timer, _NullTimer]:
+    """
+    Returns a context manager that records the time spent in its context
+    :param name: timer name
+    """
+    if _ENABLED:
+        return Timer(name)
+    return _NULL_TIMER
+
+
+def timed(name: Optional[str] = None) -> Callable:
+    """
+    Decorator to record the time spent in a function
+    :param name: timer name. Defaults to the qualified name of the function.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        key = name if name else func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwds):
+            if not _ENABLED:
+                return func(*args, **kwds)
+            with Timer(key):
+                return func(*args, **kwds)
+
+        return wrapper
+
+    return decorator
+
+
+def addBytes(n: int):
+    """
+    Adds the number of bytes read to the innermost timer of the current thread
+    """
+    if _ENABLED:
+        stack = _timerStack()
+        if stack:
+            stack[-1].addBytes(n)
+
+
+def metrics() -> Dict[str, Dict[str, Any]]:
+    """
+    Returns the metrics of each timer: count, total, mean, p50, p95 and max duration in seconds and bytes read.
+    Percentiles are estimated from the latest MAX_SAMPLES durations.
+    """
+    with _LOCK:
+        items = [(name, s.count, s.total, s.max, s.bytes, np.fromiter(s.samples, dtype=np.int64))
+                 for name, s in _STATS.items()]
+
+    results = dict()
+    for name, count, total, max_ns, n_bytes, samples in items:
+        p50, p95 = np.percentile(samples, [50, 95]) if len(samples) > 0 else (0, 0)
+        results[name] = {'count': count,
+                         'total': total * 1e-9,
+                         'mean': total * 1e-9 / count if count > 0 else 0,
+                         'p50': float(p50) * 1e-9,
+                         'p95': float(p95) * 1e-9,
+                         'max': max_ns * 1e-9,
+                         'bytes': n_bytes,
+                         }
+    return results
+
+
+def chromeTrace() -> Dict[str, Any]:
+    """
+    Returns the recorded events in the Chrome trace event format
+    """
+    with _LOCK:
+        events = list(_EVENTS)
+    pid = os.getpid()
+    traceEvents = []
+    for name, start, duration, tid, n_bytes in events:
+        e = {'name': name,
+             'ph': 'X',
+             'ts': (start - _T0_NS) * 1e-3,
+             'dur': duration * 1e-3,
+             'pid': pid,
+             'tid': tid,
+             }
+        if n_bytes > 0:
+            e['args'] = {'bytes': n_bytes}
+        traceEvents.append(e)
+    return {'traceEvents': traceEvents, 'displayTimeUnit': 'ms'}
+
+
+def writeJson(path: Union[str, Path]):
+    """
+    Writes the timer metrics into a JSON file
+    """
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(metrics(), f, indent=2)
+
+
+def writeChromeTrace(path: Union[str, Path]):
+    """
+    Writes the recorded events into a JSON file in the Chrome trace event format
+    """
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(chromeTrace(), f)
+
+
+def beginStartup():
+    """
+    Marks the start of the EOTSV startup, e.g. when the EOTSV has been opened from the QGIS toolbar.
+    Calls during a running startup are ignored, so that the earliest call defines the start.
+    """
+    global _STARTUP_T0, _STARTUP_END, _STARTUP_LEVEL
+    if isStartupRunning():
+        return
+    _STARTUP.clear()
+    _STARTUP_T0 = time.perf_counter_ns()
+    _STARTUP_END = None
+    _STARTUP_LEVEL = 0
+
+
+def isStartupRunning() -> bool:
+    return _STARTUP_T0 is not None and _STARTUP_END is None
+
+
+@contextmanager
+def startupPhase(name: str) -> Iterator[None]:
+    """
+    Records the time spent in a startup phase, e.g. to import a module or to create a dock.
+    Phases are recorded only between beginStartup() and endStartup(), and, if the instrumentation
+    is enabled, as timer 'startup: <name>' as well.
+    :param name: phase name
+    """
+    global _STARTUP_LEVEL
+    if not isStartupRunning():
+        with timer(f'startup: {name}'):
+            yield
+        return
+
+    level = _STARTUP_LEVEL
+    _STARTUP_LEVEL += 1
+    t0 = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter_ns() - t0
+        _STARTUP_LEVEL = level
+        _STARTUP.append((name, t0, duration, level))
+        if _ENABLED:
+            record(f'startup: {name}', t0, duration)
+
+
+def endStartup() -> Optional[float]:
+    """
+    Marks the end of the EOTSV startup, i.e. when the main window with its first maps has been shown
+    :return: startup duration in seconds or None, if no startup is running
+    """
+    global _STARTUP_END
+    if not isStartupRunning():
+        return None
+    _STARTUP_END = time.perf_counter_ns()
+    if _ENABLED:
+        record('startup', _STARTUP_T0, _STARTUP_END - _STARTUP_T0)
+    return (_STARTUP_END - _STARTUP_T0) * 1e-9
+
+
+def startupReport() -> Dict[str, Any]:
+    """
+    Returns the duration of the last startup and of its phases, in seconds relative to the startup begin.
+    """
+    if _STARTUP_T0 is None:
+        return {'total': None, 'phases': []}
+    end = _STARTUP_END if _STARTUP_END is not None else time.perf_counter_ns()
+    phases = [{'name': name,
+               'start': (start - _STARTUP_T0) * 1e-9,
+               'duration': duration * 1e-9,
+               'level': level}
+              for name, start, duration, level in sorted(_STARTUP, key=lambda p: (p[1], p[3]))]
+    return {'total': (end - _STARTUP_T0) * 1e-9,
+            'finished': _STARTUP_END is not None,
+            'phases': phases}
+
+
+def formatStartupReport() -> str:
+    """
+    Returns the startup report as text table
+    """
+    report = startupReport()
+    if report['total'] is None:
+        return 'No startup recorded'
+    lines = [f'EOTSV startup: {report["total"] * 1000:.0f} ms'
+             + ('' if report['finished'] else ' (running)')]
+    for p in report['phases']:
+        indent = '  ' * (p['level'] + 1)
+        lines.append(f'{p["start"] * 1000:7.0f} ms {p["duration"] * 1000:7.1f} ms {indent}{p["name"]}')
+    return '\n'.join(lines)
@@ -0,0 +1,204 @@
+"""
+Optional accounting of GDAL I/O operations.
+
+When enabled, the raster access in the loading, overlap and profile tasks counts dataset opens,
+ReadAsArray calls, the blocks touched by them, the bytes read and the hits and misses of the
+sensor id cache. Counts are added to process-wide totals and to the IOStats of the current
+thread, e.g. the IOStats of an EOTSVTask, see EOTSVTask.ioStats().
+
+    iostats.setEnabled(True)
+    task.run_serial()
+    print(task.ioStats().asMap())
+
+Sources that are accessed with GDAL's network file systems (/vsicurl/, /vsis3/, ...) are
+additionally counted by GDAL, see networkStatistics().
+"""
+import json
+import math
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from osgeo import gdal
+
+COUNTERS = ['opens', 'open_errors', 'reads', 'blocks', 'bytes', 'cache_hits', 'cache_misses']
+
+_ENABLED: bool = os.environ.get('EOTSV_IO_STATS', '').lower() in ['1', 'true', 'yes']
+_LOCAL = threading.local()
+
+
+class IOStats(object):
+    """
+    Thread-safe I/O counters, in total and per source
+    """
+
+    def __init__(self):
+        self.mLock = threading.Lock()
+        self.mTotals: Dict[str, int] = {k: 0 for k in COUNTERS}
+        self.mSources: Dict[str, Dict[str, int]] = dict()
+
+    def add(self, source: Optional[str] = None, **counts):
+        """
+        Adds counts, e.g. add('image.tif', reads=1, bytes=1024)
+        :param source: source uri. Counts without source are added to the totals only.
+        """
+        with self.mLock:
+            for k, v in counts.items():
+                self.mTotals[k] += v
+            if source is not None:
+                s = self.mSources.get(source)
+                if s is None:
+                    s = self.mSources[source] = {k: 0 for k in COUNTERS}
+                for k, v in counts.items():
+                    s[k] += v
+
+    def merge(self, other: 'IOStats'):
+        for source, counts in other.sources().items():
+            self.add(source, **counts)
+        with other.mLock:
+            rest = {k: v - sum(s[k] for s in other.mSources.values()) for k, v in other.mTotals.items()}
+        self.add(None, **rest)
+
+    def clear(self):
+        with self.mLock:
+            self.mTotals = {k: 0 for k in COUNTERS}
+            self.mSources.clear()
+
+    def totals(self) -> Dict[str, int]:
+        with self.mLock:
+            return dict(self.mTotals)
+
+    def sources(self) -> Dict[str, Dict[str, int]]:
+        with self.mLock:
+            return {k: dict(v) for k, v in self.mSources.items()}
+
+    def asMap(self, per_source: bool = False) -> Dict[str, Any]:
+        """
+        Returns the counts as JSON-serializable dictionary
+        :param per_source: set True to include the counts of each source
+        """
+        data = self.totals()
+        if per_source:
+            data['sources'] = self.sources()
+        return data
+
+    def __repr__(self):
+        return f'IOStats({self.totals()})'
+
+
+# process-wide totals
+TOTALS = IOStats()
+
+
+def isEnabled() -> bool:
+    return _ENABLED
+
+
+def setEnabled(enabled: bool):
+    """
+    Enables or disables the I/O accounting, including GDAL's network statistics
+    """
+    global _ENABLED
+    _ENABLED = bool(enabled)
+    gdal.SetConfigOption('CPL_VSIL_NETWORK_STATS_ENABLED', 'YES' if _ENABLED else None)
+
+
+def clear():
+    """
+    Resets the process-wide totals and GDAL's network statistics
+    """
+    TOTALS.clear()
+    if hasattr(gdal, 'NetworkStatsReset'):
+        gdal.NetworkStatsReset()
+
+
+def _collectors() -> List[IOStats]:
+    stack = getattr(_LOCAL, 'stack', None)
+    if stack is None:
+        stack = _LOCAL.stack = []
+    return stack
+
+
+@contextmanager
+def collect(stats: IOStats) -> Iterator[IOStats]:
+    """
+    Adds the I/O operations of the current thread to stats while in this context
+    """
+    stack = _collectors()
+    if any(s is stats for s in stack):
+        yield stats
+        return
+    stack.append(stats)
+    try:
+        yield stats
+    finally:
+        stack.pop()
+
+
+def count(source: Optional[str] = None, **counts):
+    """
+    Adds counts to the process-wide totals and the IOStats collected in the current thread
+    """
+    if not _ENABLED:
+        return
+    TOTALS.add(source, **counts)
+    for stats in _collectors():
+        stats.add(source, **counts)
+
+
+def countCacheLookup(hit: bool, source: Optional[str] = None):
+    if hit:
+        count(source, cache_hits=1)
+    else:
+        count(source, cache_misses=1)
+
+
+def blockCount(band: gdal.Band, xoff: int, yoff: int, xsize: int, ysize: int) -> int:
+    """
+    Returns the number of blocks a raster window touches
+    """
+    bx, by = band.GetBlockSize()
+    nx = math.ceil((xoff + xsize) / bx) - xoff // bx
+    ny = math.ceil((yoff + ysize) / by) - yoff // by
+    return max(0, nx) * max(0, ny)
+
+
+def openDataset(path: str) -> Optional[gdal.Dataset]:
+    """
+    Opens a raster source with gdal.Open and counts the open
+    """
+    ds = gdal.Open(path)
+    if _ENABLED:
+        if isinstance(ds, gdal.Dataset):
+            count(path, opens=1)
+        else:
+            count(path, open_errors=1)
+    return ds
+
+
+def readAsArray(obj, xoff: int, yoff: int, xsize: int, ysize: int, source: Optional[str] = None):
+    """
+    Calls ReadAsArray of a gdal.Dataset or gdal.Band and counts the read
+    :param obj: gdal.Dataset or gdal.Band
+    :param source: source uri to count the read for
+    """
+    array = obj.ReadAsArray(xoff, yoff, xsize, ysize)
+    if _ENABLED and array is not None:
+        if isinstance(obj, gdal.Dataset):
+            blocks = blockCount(obj.GetRasterBand(1), xoff, yoff, xsize, ysize) * obj.RasterCount
+        else:
+            blocks = blockCount(obj, xoff, yoff, xsize, ysize)
+        count(source, reads=1, blocks=blocks, bytes=array.nbytes)
+    return array
+
+
+def networkStatistics() -> Optional[Dict[str, Any]]:
+    """
+    Returns GDAL's statistics of network file system accesses, if available (GDAL >= 3.2).
+    The statistics are collected only while the accounting is enabled.
+    """
+    if not hasattr(gdal, 'NetworkStatsGetAsSerializedJSON'):
+        return None
+    data = gdal.NetworkStatsGetAsSerializedJSON()
+    return json.loads(data) if data else None
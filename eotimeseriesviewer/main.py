@@ -28,18 +28,14 @@ from pathlib import Path
 from typing import Dict, List, Match, Optional, Pattern, Tuple, Union
 
 import eotimeseriesviewer
-import eotimeseriesviewer.labeling
 import qgis.utils
-from eotimeseriesviewer import DIR_UI, DOCUMENTATION, LOG_MESSAGE_TAG
-from eotimeseriesviewer.about import AboutDialogUI
+from eotimeseriesviewer import DIR_UI, DOCUMENTATION, LOG_MESSAGE_TAG, messageLog
 from eotimeseriesviewer.dateparser import DateTimePrecision
-from eotimeseriesviewer.docks import LabelDockWidget, SpectralLibraryDockWidget
-from eotimeseriesviewer.forceinputs import FindFORCEProductsTask, FORCEProductImportDialog
+from eotimeseriesviewer.docks import LabelDockWidget, LazyDockWidget, SpectralLibraryDockWidget
+from eotimeseriesviewer.instrumentation import beginStartup, endStartup, formatStartupReport, isStartupRunning, \
+    startupPhase, timer
 from eotimeseriesviewer.mapcanvas import MapCanvas
 from eotimeseriesviewer.mapvisualization import MapView, MapViewDock, MapWidget
-from eotimeseriesviewer.processing.algorithmdialog import AlgorithmDialog
-from eotimeseriesviewer.processing.processingalgorithms import CreateEmptyTemporalProfileLayer, EOTSVProcessingProvider, \
-    ReadTemporalProfiles
 from eotimeseriesviewer.qgispluginsupport.qps.cursorlocationvalue import CursorLocationInfoDock
 from eotimeseriesviewer.qgispluginsupport.qps.layerproperties import showLayerPropertiesDialog, pasteStyleFromClipboard, \
     pasteStyleToClipboard
@@ -49,13 +45,12 @@ from eotimeseriesviewer.qgispluginsupport.qps.speclib.core import create_profile
     is_spectral_library
 from eotimeseriesviewer.qgispluginsupport.qps.speclib.core.spectrallibrary import SpectralLibraryUtils
 from eotimeseriesviewer.qgispluginsupport.qps.speclib.core.spectralprofile import encodeProfileValueDict
-from eotimeseriesviewer.qgispluginsupport.qps.speclib.gui.spectrallibrarywidget import SpectralLibraryWidget
-from eotimeseriesviewer.qgispluginsupport.qps.speclib.gui.spectralprofilesources import StandardLayerProfileSource
 from eotimeseriesviewer.qgispluginsupport.qps.subdatasets import subLayers
 from eotimeseriesviewer.qgispluginsupport.qps.utils import file_search, loadUi, SpatialExtent, SpatialPoint
 from eotimeseriesviewer.sensors import has_sensor_id, SensorInstrument, SensorMockupDataProvider
 from eotimeseriesviewer.settings.settings import EOTSVSettingsManager
 from eotimeseriesviewer.settings.widget import EOTSVSettingsWidgetFactory
+from eotimeseriesviewer.spectralprofiles import SpectralProfileCollectionTask
 from eotimeseriesviewer.tasks import EOTSVTask
 from eotimeseriesviewer.temporalprofile.temporalprofile import TemporalProfileUtils
 from eotimeseriesviewer.temporalprofile.visualization import TemporalProfileDock
@@ -64,7 +59,7 @@ from eotimeseriesviewer.timeseries.timeseries import TimeSeries, \
 from eotimeseriesviewer.timeseries.widgets import TimeSeriesDock, TimeSeriesTreeView, TimeSeriesWidget
 from eotimeseriesviewer.utils import fixMenuButtons
 from eotimeseriesviewer.vectorlayertools import EOTSVVectorLayerTools
-from qgis.PyQt.QtCore import pyqtSignal, pyqtSlot, QDateTime, QFile, QObject, QRect, QSize, Qt
+from qgis.PyQt.QtCore import pyqtSignal, pyqtSlot, QDateTime, QFile, QObject, QRect, QSize, Qt, QTimer
 from qgis.PyQt.QtGui import QCloseEvent, QIcon
 from qgis.PyQt.QtWidgets import QAction, QApplication, QComboBox, QDialog, QDialogButtonBox, QDockWidget, QFileDialog, \
     QHBoxLayout, QLabel, QMainWindow, QMenu, QProgressBar, QProgressDialog, QSizePolicy, QToolBar, QToolButton, QWidget
@@ -73,8 +68,8 @@ from qgis.PyQt.QtXml import QDomCDATASection, QDomDocument, QDomElement
 from qgis.core import edit, Qgis, QgsApplication, QgsCoordinateReferenceSystem, QgsCoordinateTransform, \
     QgsExpressionContext, QgsFeature, QgsField, QgsFields, QgsFillSymbol, QgsGeometry, QgsMapLayer, QgsMessageOutput, \
     QgsPointXY, QgsProcessingContext, QgsProcessingFeedback, QgsProcessingMultiStepFeedback, QgsProcessingRegistry, \
-    QgsProcessingUtils, QgsProject, QgsProjectArchive, QgsProviderRegistry, QgsRasterLayer, QgsSingleSymbolRenderer, \
-    QgsTask, QgsTaskManager, QgsVectorLayer, QgsWkbTypes, QgsZipUtils
+    QgsProcessingUtils, QgsProject, QgsProjectArchive, QgsProviderRegistry, QgsRasterLayer, QgsRectangle, \
+    QgsSingleSymbolRenderer, QgsTask, QgsTaskManager, QgsVectorLayer, QgsWkbTypes, QgsZipUtils
 from qgis.gui import QgisInterface, QgsDockWidget, QgsFileWidget, QgsLayerTreeView, QgsMapCanvas, QgsMessageBar, \
     QgsMessageViewer, QgsStatusBar, QgsTaskManagerWidget
 
@@ -95,7 +90,8 @@ class EOTimeSeriesViewerUI(QMainWindow):
     def __init__(self, parent=None):
         """Constructor."""
         super(EOTimeSeriesViewerUI, self).__init__(parent)
-        loadUi(DIR_UI / 'timeseriesviewer.ui', self)
+        with startupPhase('load main window'):
+            loadUi(DIR_UI / 'timeseriesviewer.ui', self)
 
         self.setCentralWidget(self.mMapWidget)
 
@@ -118,7 +114,8 @@ class EOTimeSeriesViewerUI(QMainWindow):
         # self.dockRendering = addDockWidget(docks.RenderingDockUI(self))
 
         from eotimeseriesviewer.mapvisualization import MapViewDock
-        self.dockMapViews: MapViewDock = self.addDockWidget(area, MapViewDock(self))
+        with startupPhase('create map view dock'):
+            self.dockMapViews: MapViewDock = self.addDockWidget(area, MapViewDock(self))
         # self.dockProcessingToolbox = self.addDockWidget(area, processing.gui.ProcessingToolbox.ProcessingToolbox())
         # self.tabifyDockWidget(self.dockMapViews, self.dockProcessingToolbox)
         self.dockMapViews.raise_()
@@ -130,7 +127,8 @@ class EOTimeSeriesViewerUI(QMainWindow):
         # from timeseriesviewer.mapvisualization import MapViewDockUI
         # self.dockMapViews = addDockWidget(MapViewDockUI(self))
 
-        self.dockTimeSeries: TimeSeriesDock = self.addDockWidget(area, TimeSeriesDock(self))
+        with startupPhase('create time series dock'):
+            self.dockTimeSeries: TimeSeriesDock = self.addDockWidget(area, TimeSeriesDock(self))
 
         tbar: QToolBar = self.dockTimeSeries.timeSeriesWidget().toolBar()
         tbar.addSeparator()
@@ -142,7 +140,8 @@ class EOTimeSeriesViewerUI(QMainWindow):
         tbar.addAction(self.actionClearTS)
         self.dockTimeSeries.timeSeriesWidget().sigTimeSeriesDatesSelected.connect(self.actionRemoveTSD.setEnabled)
 
-        self.dockProfiles = self.addDockWidget(area, TemporalProfileDock(self))
+        with startupPhase('create temporal profile dock'):
+            self.dockProfiles = self.addDockWidget(area, TemporalProfileDock(self))
 
         area = Qt.BottomDockWidgetArea
         # panel = SpectralLibraryPanel(self)
@@ -155,23 +154,32 @@ class EOTimeSeriesViewerUI(QMainWindow):
 
         area = Qt.RightDockWidgetArea
 
-        self.dockTaskManager = QgsDockWidget('Task Manager')
-        self.dockTaskManager.setWidget(QgsTaskManagerWidget(QgsApplication.taskManager()))
+        # the task manager widget is created when the dock is shown for the first time
+        self.dockTaskManager = LazyDockWidget('Task Manager',
+                                              lambda: QgsTaskManagerWidget(QgsApplication.taskManager()))
+        self.dockTaskManager.setObjectName('TaskManagerDock')
         self.dockTaskManager.setAllowedAreas(Qt.LeftDockWidgetArea | Qt.RightDockWidgetArea)
         self.dockTaskManager = self.addDockWidget(area, self.dockTaskManager)
 
-        from eotimeseriesviewer.systeminfo import SystemInfoDock
-        from eotimeseriesviewer.sensorvisualization import SensorDockUI
+        with startupPhase('create info docks'):
+            from eotimeseriesviewer.systeminfo import SystemInfoDock
+            from eotimeseriesviewer.sensorvisualization import SensorDockUI
+            from eotimeseriesviewer.taskmonitor import TaskMonitorDock
 
-        self.dockSystemInfo = self.addDockWidget(area, SystemInfoDock(self))
-        self.dockSystemInfo.setVisible(False)
+            # the system info content is created when the dock is shown for the first time
+            self.dockSystemInfo = self.addDockWidget(area, SystemInfoDock(self))
+            self.dockSystemInfo.setVisible(False)
 
-        self.dockSensors = self.addDockWidget(area, SensorDockUI(self))
-        self.dockCursorLocation = self.addDockWidget(area, CursorLocationInfoDock(self))
+            self.dockTaskMonitor = self.addDockWidget(area, TaskMonitorDock(self))
+            self.dockTaskMonitor.setVisible(False)
+
+            self.dockSensors = self.addDockWidget(area, SensorDockUI(self))
+            self.dockCursorLocation = self.addDockWidget(area, CursorLocationInfoDock(self))
 
         self.tabifyDockWidget(self.dockSensors, self.dockCursorLocation)
         self.tabifyDockWidget(self.dockSensors, self.dockSystemInfo)
         self.tabifyDockWidget(self.dockSensors, self.dockTaskManager)
+        self.tabifyDockWidget(self.dockSensors, self.dockTaskMonitor)
         self.dockSensors.raise_()
 
         for dock in self.findChildren(QDockWidget):
@@ -389,7 +397,13 @@ class EOTimeSeriesViewer(QgisInterface, QObject):
 
         assert EOTimeSeriesViewer.instance() is None, 'EOTimeSeriesViewer instance already exists.'
         EOTimeSeriesViewer._instance = self
-        self.ui = EOTimeSeriesViewerUI()
+        # time series revision and JSON of the other sections when the project was written last
+        self.mSavedState: Optional[Tuple[int, Dict[str, str]]] = None
+        # set True to record the saved state once the sources of a project read have been restored
+        self.mRecordStateAfterRestore: bool = False
+        beginStartup()
+        with startupPhase('create main window'):
+            self.ui = EOTimeSeriesViewerUI()
 
         # create status bar
         self.ui.statusBar().setStyleSheet("QStatusBar::item {border: none;}")
@@ -453,6 +467,7 @@ class EOTimeSeriesViewer(QgisInterface, QObject):
         self.mTimeSeries.sigTimeSeriesDatesAdded.connect(self.onTimeSeriesChanged)
         self.mTimeSeries.sigTimeSeriesDatesRemoved.connect(self.onTimeSeriesChanged)
         self.mTimeSeries.sigSensorAdded.connect(self.onSensorAdded)
+        self.mTimeSeries.sigRestoreTaskFinished.connect(self.onRestoreTaskFinished)
 
         tswidget.setTimeSeries(self.mTimeSeries)
         self.ui.dockSensors.setTimeSeries(self.mTimeSeries)
@@ -504,6 +519,9 @@ class EOTimeSeriesViewer(QgisInterface, QObject):
         tstv.sigSetMapCrs.connect(self.setCrs)
         self.mCurrentMapLocation = None
         self.mCurrentMapSpectraLoading = 'TOP'
+        # dates to collect spectral profiles for: the clicked map ('CANVAS'), all maps ('VISIBLE') or all ('ALL')
+        self.mCurrentMapSpectraDates = 'VISIBLE'
+        self.mSpectralProfileTasks: List[SpectralProfileCollectionTask] = []
 
         self.ui.actionLockMapPanelSize.toggled.connect(self.lockCentralWidgetSize)
 
@@ -598,7 +616,7 @@ class EOTimeSeriesViewer(QgisInterface, QObject):
         # self.profileDock.actionLoadProfileRequest.triggered.connect(self.activateIdentifyTemporalProfileMapTool)
 
         # connect buttons with actions
-        self.ui.actionAbout.triggered.connect(lambda: AboutDialogUI(self.ui).exec_())
+        self.ui.actionAbout.triggered.connect(self.showAboutDialog)
 
         self.ui.actionSettings.triggered.connect(self.showSettingsDialog)
 
@@ -620,8 +638,10 @@ class EOTimeSeriesViewer(QgisInterface, QObject):
         # self.mapLayerStore().addMapLayer(temporalProfileLayer)
 
         # eotimeseriesviewer.labeling.MAP_LAYER_STORES.append(self.mapLayerStore())
-        eotimeseriesviewer.labeling.editorconfig.registerLabelShortcutEditorWidget()
-        self.applySettings()
+        from eotimeseriesviewer.labeling.editorconfig import registerLabelShortcutEditorWidget
+        registerLabelShortcutEditorWidget()
+        with startupPhase('apply settings'):
+            self.applySettings()
 
         self.initQGISConnection()
 
@@ -674,8 +694,10 @@ class EOTimeSeriesViewer(QgisInterface, QObject):
             QgsApplication.processEvents()
         QApplication.processEvents()
 
-    def asMap(self) -> dict:
-
+    def mainWindowMap(self) -> dict:
+        """
+        Returns the window geometry and the dock states
+        """
         dockInfos = dict()
         for dock in self.ui.findChildren(QDockWidget):
             dock: QDockWidget
@@ -687,27 +709,51 @@ class EOTimeSeriesViewer(QgisInterface, QObject):
             }
 
         g: QRect = self.ui.geometry()
-        mainWindow = {
+        return {
             'geometry': [g.x(), g.y(), g.width(), g.height()],
             'docks': dockInfos,
         }
 
-        d = {'MainWindow': mainWindow,
+    def asMap(self) -> dict:
+
+        d = {'MainWindow': self.mainWindowMap(),
              'TimeSeries': self.timeSeries().asMap(),
              'MapWidget': self.mapWidget().asMap()}
 
         return d
 
-    def fromMap(self, map_data: dict, feedback: QgsProcessingFeedback = QgsProcessingFeedback()):
+    def fromMap(self, map_data: dict,
+                feedback: QgsProcessingFeedback = QgsProcessingFeedback(),
+                runAsync: Optional[bool] = None):
+        """
+        Restores the time series, the map views and the window layout, e.g. from a project.
+        :param map_data: dict, see asMap()
+        :param feedback: QgsProcessingFeedback
+        :param runAsync: set True to restore only the sources shown in the maps immediately and all
+                         other sources and the auxiliary map layers afterwards. Defaults to the qgsTaskAsync setting.
+        """
+        if runAsync is None:
+            runAsync = EOTSVSettingsManager.settings().qgsTaskAsync
 
         multistep = QgsProcessingMultiStepFeedback(2, feedback)
         multistep.setCurrentStep(1)
 
+        mw_data = map_data.get('MapWidget')
         ts_data = map_data.get('TimeSeries', None)
         if ts_data:
-            self.timeSeries().fromMap(ts_data, clear=True, feedback=multistep)
+            with startupPhase('restore time series'):
+                cols, rows = self.mapWidget().mapsPerMapView()
+                date_of_interest = None
+                if isinstance(mw_data, dict):
+                    cols, rows = mw_data.get(MapWidget.MKeyMapsPerView, (cols, rows))
+                    date_of_interest = mw_data.get(MapWidget.MKeyCurrentDate)
+                self.timeSeries().fromMap(ts_data, clear=True, feedback=multistep,
+                                          runAsync=runAsync,
+                                          date_of_interest=date_of_interest,
+                                          n_dates=cols * rows)
         multistep.setCurrentStep(2)
-        self.mapWidget().fromMap(map_data.get('MapWidget'), feedback=multistep)
+        with startupPhase('restore map views'):
+            self.mapWidget().fromMap(mw_data, feedback=multistep, runAsync=runAsync)
 
         if mainWindow := map_data.get('MainWindow'):
 
@@ -729,8 +775,53 @@ class EOTimeSeriesViewer(QgisInterface, QObject):
                 QApplication.processEvents()
                 assert self.ui.height() == g[-1]
 
-    def asJson(self) -> str:
-        return json.dumps(self.asMap(), ensure_ascii=False)
+    def asJson(self, sections: Optional[Dict[str, str]] = None) -> str:
+        """
+        Returns the JSON representation of asMap()
+        :param sections: JSON sections to use, see jsonSections()
+        """
+        with timer('EOTimeSeriesViewer.asJson'):
+            if sections is None:
+                sections = self.jsonSections()
+            return '{' + ', '.join(f'"{k}": {v}' for k, v in sections.items()) + '}'
+
+    def jsonSections(self) -> Dict[str, str]:
+        """
+        Returns the JSON representations of the MainWindow, TimeSeries and MapWidget sections of asMap().
+        Time series sources that did not change since the last call are not serialized again,
+        see TimeSeries.asJson().
+        """
+        return {'MainWindow': json.dumps(self.mainWindowMap(), ensure_ascii=False),
+                'TimeSeries': self.timeSeries().asJson(),
+                'MapWidget': json.dumps(self.mapWidget().asMap(), ensure_ascii=False)}
+
+    def hasUnsavedChanges(self) -> bool:
+        """
+        Returns True if the time series, the map views or the window layout changed since
+        the project was written last, e.g. to decide whether an autosave is required.
+        The time series is compared by its revision, i.e. without serializing its sources.
+        """
+        if self.mSavedState is None:
+            return True
+        revision, sections = self.mSavedState
+        if revision != self.timeSeries().revision():
+            return True
+        return sections != {'MainWindow': json.dumps(self.mainWindowMap(), ensure_ascii=False),
+                            'MapWidget': json.dumps(self.mapWidget().asMap(), ensure_ascii=False)}
+
+    def recordSavedState(self):
+        """
+        Records the current state as saved, e.g. after the project has been read or written.
+        See hasUnsavedChanges().
+        """
+        sections = {'MainWindow': json.dumps(self.mainWindowMap(), ensure_ascii=False),
+                    'MapWidget': json.dumps(self.mapWidget().asMap(), ensure_ascii=False)}
+        self.mSavedState = (self.timeSeries().revision(), sections)
+
+    def onRestoreTaskFinished(self):
+        if self.mRecordStateAfterRestore and len(self.timeSeries().pendingSources()) == 0:
+            self.mRecordStateAfterRestore = False
+            self.recordSavedState()
 
     def fromJson(self, jsonText: str, feedback: QgsProcessingFeedback = None):
 
@@ -743,7 +834,10 @@ class EOTimeSeriesViewer(QgisInterface, QObject):
 
         node: QDomElement = dom.createElement('EOTSV')
         root = dom.documentElement()
-        cdata: QDomCDATASection = dom.createCDATASection(self.asJson())
+        revision = self.timeSeries().revision()
+        sections = self.jsonSections()
+        self.mSavedState = (revision, {k: sections[k] for k in ['MainWindow', 'MapWidget']})
+        cdata: QDomCDATASection = dom.createCDATASection(self.asJson(sections))
         jsonNode = dom.createElement('jsonSettings')
         jsonNode.appendChild(cdata)
         node.appendChild(jsonNode)
@@ -836,6 +930,12 @@ class EOTimeSeriesViewer(QgisInterface, QObject):
                         data.pop('TimeSeries')
                 self.fromMap(data, feedback=feedback)
                 # self.fromJson(jsonText, feedback=feedback)
+
+                # the read project is the saved state. Sources restored in a background task and
+                # the auxiliary map layers, which are restored with the next event loop, are part of it.
+                self.recordSavedState()
+                self.mRecordStateAfterRestore = len(self.timeSeries().pendingSources()) > 0
+                QTimer.singleShot(0, self.recordSavedState)
             except Exception as ex:
                 if True:
                     raise ex
@@ -1043,8 +1143,8 @@ class EOTimeSeriesViewer(QgisInterface, QObject):
     def spectralLibraryDockWidgets(self) -> List[SpectralLibraryDockWidget]:
         return self.ui.findChildren(SpectralLibraryDockWidget)
 
-    def spectralLibraryWidgets(self) -> List[SpectralLibraryWidget]:
-        return [dw.spectralLibraryWidget() for dw in self.spectralLibraryDockWidgets()]
+    def spectralLibraryWidgets(self) -> List[QWidget]:
+        return [dw.SLW for dw in self.spectralLibraryDockWidgets()]
 
     def spectralLibraries(self) -> List[QgsVectorLayer]:
         """
@@ -1481,42 +1581,81 @@ class EOTimeSeriesViewer(QgisInterface, QObject):
         self.ui.dockCursorLocation.loadCursorLocation(spatialPoint, mapCanvas)
 
     @pyqtSlot(SpatialPoint, QgsMapCanvas)
-    def loadCurrentSpectralProfile(self, spatialPoint: SpatialPoint, mapCanvas: QgsMapCanvas) \
-            -> List[Tuple[Dict, QgsExpressionContext]]:
-        """
-        Loads SpectralProfiles from a location defined by `spatialPoint`
+    def loadCurrentSpectralProfile(self,
+                                   spatialPoint: SpatialPoint,
+                                   mapCanvas: QgsMapCanvas,
+                                   runAsync: Optional[bool] = None) -> List[Tuple[Dict, QgsExpressionContext]]:
+        """
+        Loads SpectralProfiles from a location defined by `spatialPoint` for the dates
+        defined by mCurrentMapSpectraDates. The profiles are read in parallel in a SpectralProfileCollectionTask
+        and added to the spectral library at once.
         :param spatialPoint: SpatialPoint
         :param mapCanvas: QgsMapCanvas
+        :param runAsync: set False to wait for the profiles. Defaults to the qgsTaskAsync setting.
+        :return: the loaded profiles and their expression contexts. Empty if loaded asynchronously.
         """
         assert self.mCurrentMapSpectraLoading in ['TOP', 'ALL']
+        assert self.mCurrentMapSpectraDates in ['CANVAS', 'VISIBLE', 'ALL']
         assert isinstance(spatialPoint, SpatialPoint)
         from .mapcanvas import MapCanvas
         assert isinstance(mapCanvas, MapCanvas)
-        tsd: TimeSeriesDate = mapCanvas.tsd()
-
-        sensorLayers = [lyr for lyr in mapCanvas.layers() if has_sensor_id(lyr)]
 
-        profilesAndContext = []
-
-        for lyr in sensorLayers:
-
-            pt2 = spatialPoint.toCrs(lyr.crs())
-            if isinstance(pt2, SpatialPoint):
-                if not lyr.extent().contains(pt2):
-                    continue
-            source = StandardLayerProfileSource(lyr)
-            results = source.collectProfiles(spatialPoint, kernel_size=QSize(1, 1), snap=False)
-
-            if len(results) > 0:
-                profilesAndContext.extend(results)
+        settings = EOTSVSettingsManager.settings()
+        if runAsync is None:
+            runAsync = settings.qgsTaskAsync
 
-            if self.mCurrentMapSpectraLoading == 'TOP':
-                break
+        if self.mCurrentMapSpectraDates == 'CANVAS':
+            tsds = {mapCanvas.tsd()}
+        elif self.mCurrentMapSpectraDates == 'VISIBLE':
+            tsds = set(self.mapWidget().visibleTSDs())
+        else:
+            tsds = None
+
+        # visible sources whose bounding box contains the point
+        pt = spatialPoint.toCrs(QgsCoordinateReferenceSystem('EPSG:4326'))
+        sources = []
+        if isinstance(pt, SpatialPoint):
+            sources = self.timeSeries().querySources(visible=True, extent=QgsRectangle(pt, pt))
+        sources = [tss for tss in sources if tsds is None or tss.timeSeriesDate() in tsds]
+        # order by date and, within a date, like the source layers in a map
+        sources = sorted(sources, key=lambda tss: (tss.timeSeriesDate(),
+                                                   tss.timeSeriesDate().sources().index(tss)))
+
+        task = SpectralProfileCollectionTask(sources, spatialPoint, spatialPoint.crs(),
+                                             top_only=self.mCurrentMapSpectraLoading == 'TOP',
+                                             n_threads=settings.qgsTaskFileReadingThreads,
+                                             description=f'Collect spectral profiles from {len(sources)} images')
+
+        # cancel older collections if still running
+        for t in self.mSpectralProfileTasks:
+            t.cancel()
+
+        if runAsync:
+            task.executed.connect(self.onSpectralProfilesCollected)
+            task.taskCompleted.connect(self.onSpectralProfileTaskFinished)
+            task.taskTerminated.connect(self.onSpectralProfileTaskFinished)
+            self.mSpectralProfileTasks.append(task)
+            self.taskManager().addTask(task)
+            return []
+        else:
+            task.run_serial()
+            return self.onSpectralProfilesCollected(True, task)
 
+    def onSpectralProfilesCollected(self, success: bool, task: SpectralProfileCollectionTask) \
+            -> List[Tuple[Dict, QgsExpressionContext]]:
+        if not (success and isinstance(task, SpectralProfileCollectionTask)):
+            return []
+        for source, error in task.errors():
+            self.logMessage(f'Unable to read spectral profile from {source}: {error}', LOG_MESSAGE_TAG, Qgis.Warning)
+        profilesAndContext = task.profilesAndContexts()
         self.setCurrentSpectralProfiles(profilesAndContext)
-
         return profilesAndContext
 
+    def onSpectralProfileTaskFinished(self):
+        task = self.sender()
+        if task in self.mSpectralProfileTasks:
+            self.mSpectralProfileTasks.remove(task)
+
     def setCurrentSpectralProfiles(self, spectra: List[Tuple[Dict, QgsExpressionContext]]):
 
         speclibs = self.spectralLibraries()
@@ -1663,7 +1802,8 @@ class EOTimeSeriesViewer(QgisInterface, QObject):
             if isinstance(defPath, Path):
                 defDir = str(defPath.parent)
 
-            filters = "JSON (*.json);;" + \
+            filters = "JSON Lines (*.jsonl);;" + \
+                      "JSON (*.json);;" + \
                       "CSV (*.csv *.txt);;" + \
                       "All files (*.*)"
 
@@ -1711,7 +1851,6 @@ class EOTimeSeriesViewer(QgisInterface, QObject):
         Returns the EO Time Series Viewer icon
         :return: QIcon
         """
-        import eotimeseriesviewer
         return eotimeseriesviewer.icon()
 
     def temporalProfileDock(self) -> TemporalProfileDock:
@@ -1788,7 +1927,8 @@ class EOTimeSeriesViewer(QgisInterface, QObject):
             settings = EOTSVSettingsManager.settings()
             defFile = str(settings.timeSeriesDefinitionFile)
 
-            filters = "JSON (*.json);;" + \
+            filters = "JSON Lines (*.jsonl);;" + \
+                      "JSON (*.json);;" + \
                       "CSV (*.csv *.txt);;" + \
                       "All files (*.*)"
             path, filter = QFileDialog.getSaveFileName(caption='Save Time Series definition', filter=filters,
@@ -1802,6 +1942,7 @@ class EOTimeSeriesViewer(QgisInterface, QObject):
 
     def loadFORCEProducts(self, *args, force_cube=None, tile_ids: str = None):
 
+        from eotimeseriesviewer.forceinputs import FindFORCEProductsTask, FORCEProductImportDialog
         settings = EOTSVSettingsManager.settings()
 
         d = FORCEProductImportDialog(parent=self.ui)
@@ -1827,17 +1968,29 @@ class EOTimeSeriesViewer(QgisInterface, QObject):
             if not isinstance(search_results, list):
                 task = FindFORCEProductsTask(d.productType(), d.rootFolder(),
                                              tile_ids=d.tileIds(),
-                                             dateMin=d.minDate(), dateMax=d.maxDate())
+                                             dateMin=d.minDate(), dateMax=d.maxDate(),
+                                             n_threads=settings.qgsTaskFileReadingThreads)
 
                 def onCompleted(t: FindFORCEProductsTask):
                     files = t.files()
-                    self.addTimeSeriesImages(files)
+                    self.addFORCEProducts(files)
                     s = ""
 
                 task.taskCompleted.connect(lambda *args, t=task: onCompleted(task))
                 self.taskManager().addTask(task)
             else:
-                self.addTimeSeriesImages(search_results)
+                self.addFORCEProducts(search_results)
+
+    def addFORCEProducts(self, files: List[Union[str, Path]], loadAsync: bool = True):
+        """
+        Adds FORCE product files to the time series. Products in the tile folders of a FORCE data cube
+        are added from their file names and the cube definition, without opening each file.
+        The sources are created in the background loading task.
+        :param files: list of FORCE product files
+        :param loadAsync: set False to load the sources in the main thread
+        """
+        if len(files) > 0:
+            self.mTimeSeries.addSourceInputs(files, runAsync=loadAsync, force_products=True)
 
     def loadTimeSeriesStack(self):
 
@@ -1978,6 +2131,22 @@ class EOTimeSeriesViewer(QgisInterface, QObject):
 
     def show(self):
         self.ui.show()
+        if isStartupRunning():
+            # the startup ends when the event loop has shown the main window and its maps
+            QTimer.singleShot(0, self.onStartupFinished)
+
+    def onStartupFinished(self):
+        """
+        Ends the startup and reports the time spent in the startup phases
+        """
+        if endStartup() is not None:
+            report = formatStartupReport()
+            logger.info(report)
+            messageLog(report)
+
+    def showAboutDialog(self):
+        from eotimeseriesviewer.about import AboutDialogUI
+        AboutDialogUI(self.ui).exec_()
 
     def showAttributeTables(self, layers: List[QgsMapLayer]):
         for lyr in layers:
@@ -2087,6 +2256,8 @@ class EOTimeSeriesViewer(QgisInterface, QObject):
         return layers
 
     def loadTemporalProfilesForPoints(self):
+        from eotimeseriesviewer.processing.algorithmdialog import AlgorithmDialog
+        from eotimeseriesviewer.processing.processingalgorithms import EOTSVProcessingProvider, ReadTemporalProfiles
 
         reg: QgsProcessingRegistry = QgsApplication.processingRegistry()
         alg = reg.createAlgorithmById(f'{EOTSVProcessingProvider.id()}:{ReadTemporalProfiles.name()}')
@@ -2122,6 +2293,9 @@ class EOTimeSeriesViewer(QgisInterface, QObject):
         Create a new temporal profile layer
         :return:
         """
+        from eotimeseriesviewer.processing.algorithmdialog import AlgorithmDialog
+        from eotimeseriesviewer.processing.processingalgorithms import CreateEmptyTemporalProfileLayer, \
+            EOTSVProcessingProvider
 
         reg: QgsProcessingRegistry = QgsApplication.processingRegistry()
         alg = reg.createAlgorithmById(f'{EOTSVProcessingProvider.id()}:{CreateEmptyTemporalProfileLayer.name()}')
@@ -44,6 +44,7 @@ from qgis.core import Qgis, QgsContrastEnhancement, QgsCoordinateReferenceSystem
 from qgis.core import QgsApplication
 from qgis.gui import QgisInterface, QgsAdvancedDigitizingDockWidget, QgsFloatingWidget, QgsGeometryRubberBand, \
     QgsMapCanvas, QgsMapCanvasItem, QgsMapTool, QgsMapToolCapture, QgsMapToolPan, QgsMapToolZoom, QgsUserInputWidget
+from .instrumentation import timed
 from .labeling.quicklabeling import addQuickLabelMenu
 from .mapvis.tasks import LoadMapCanvasLayers
 from .qgispluginsupport.qps.crosshair.crosshair import CrosshairDialog, CrosshairMapCanvasItem, CrosshairStyle
@@ -688,6 +689,7 @@ class MapCanvas(QgsMapCanvas):
             if uri in loading_done or dt.total_seconds() > timeout:
                 del self.mSourcesInLoading[uri]
 
+    @timed()
     def onSourceLayerLoaded(self, success, task: LoadMapCanvasLayers):
 
         if isinstance(task, LoadMapCanvasLayers):
@@ -765,6 +767,7 @@ class MapCanvas(QgsMapCanvas):
         else:
             return mapView.visibleLayers()
 
+    @timed()
     def timedRefresh(self, load_async: bool = True) -> bool:
         """
         Called to refresh the map canvas with all things needed to be done.
@@ -1348,6 +1351,7 @@ class MapCanvas(QgsMapCanvas):
                                     p=p,
                                     layer=layer)
 
+    @timed()
     def stretchToExtent(self,
                         spatialExtent: SpatialExtent = None,
                         stretchType: str = 'linear_minmax',
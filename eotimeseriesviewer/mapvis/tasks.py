@@ -1,3 +1,4 @@
+import time
 from pathlib import Path
 from typing import Union, Optional, Tuple, Type, List, Dict
 
@@ -111,21 +112,28 @@ class LoadMapCanvasLayers(EOTSVTask):
 
     def run(self):
 
+        self.setItemCount(len(self.mSources))
         for info in self.mSources:
             uri = info.get('uri')
+            self.addItemsStarted()
             if uri is None:
+                self.addItemsDone()
                 continue
 
             legend_layer_id = info.get('legend_layer')
             lyr = None
+            t0 = time.perf_counter()
             try:
                 lyr, err = self.loadLayer(info)
                 if err:
                     self.mErrors[str(uri)] = err
+                    self.addItemsDone(n_errors=1, busy=time.perf_counter() - t0)
                     continue
             except Exception as ex:
                 self.mErrors[str(uri)] = f'Unable to load {uri} {ex}'.strip()
+                self.addItemsDone(n_errors=1, busy=time.perf_counter() - t0)
                 continue
+            self.addItemsDone(busy=time.perf_counter() - t0)
             if isinstance(lyr, QgsMapLayer):
                 result = {'uri': uri, 'legend_layer': legend_layer_id, 'layer': lyr}
                 self.mResults.append(result)
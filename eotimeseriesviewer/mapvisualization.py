@@ -31,6 +31,7 @@ from typing import Dict, Iterator, List, Optional, Tuple, Union
 
 import qgis.utils
 from eotimeseriesviewer import DIR_UI
+from eotimeseriesviewer.instrumentation import timer
 from eotimeseriesviewer.timeseries.source import TimeSeriesDate
 from eotimeseriesviewer.timeseries.timeseries import TimeSeries
 from eotimeseriesviewer.utils import copyMapLayerStyle, fixMenuButtons, index_window, layerStyleString, \
@@ -1723,8 +1724,14 @@ class MapWidget(QFrame):
         reds = ['nan' if math.isnan(r) else r for r in reds]
         return reds
 
-    def fromMap(self, data: dict, feedback: QgsProcessingFeedback = QgsProcessingFeedback()):
-
+    def fromMap(self, data: dict, feedback: QgsProcessingFeedback = QgsProcessingFeedback(), runAsync: bool = False):
+        """
+        Restores the map views and map settings, see asMap().
+        :param data: dict
+        :param feedback: QgsProcessingFeedback
+        :param runAsync: set True to restore the auxiliary map layers after returning to the event loop,
+                         i.e. after the map views have been shown.
+        """
         self.removeAllMapViews()
 
         if self.MKeyMapSize in data:
@@ -1757,9 +1764,18 @@ class MapWidget(QFrame):
             extent = QgsRectangle.fromWkt(extent)
             self.setSpatialExtent(SpatialExtent(self.crs(), extent))
 
-        CLASS2INIT = {c.__name__: c for c in [QgsVectorLayer, QgsRasterLayer]}
-
         if aux_layers := data.get(self.MKeyAuxMapLayers):
+            if runAsync:
+                QTimer.singleShot(0, lambda: self.restoreAuxMapLayers(aux_layers))
+            else:
+                self.restoreAuxMapLayers(aux_layers)
+
+    def restoreAuxMapLayers(self, aux_layers: dict):
+        """
+        Restores the auxiliary (non-sensor) map layers, e.g. vector layers, and adds them to the map views
+        :param aux_layers: dict, see asMap()
+        """
+        with timer('MapWidget.restoreAuxMapLayers'):
             new_layers = dict()
             if sources := aux_layers.get('sources'):
 
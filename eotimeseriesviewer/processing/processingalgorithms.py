@@ -1,18 +1,20 @@
+import math
 import os.path
 import re
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List
 
 from eotimeseriesviewer import icon
 from eotimeseriesviewer.processing.algorithmhelp import AlgorithmHelp
 from eotimeseriesviewer.qgispluginsupport.qps.fieldvalueconverter import GenericFieldValueConverter, \
     GenericPropertyTransformer
+from eotimeseriesviewer.qgispluginsupport.qps.utils import SpatialExtent
 from eotimeseriesviewer.temporalprofile.temporalprofile import LoadTemporalProfileTask, TemporalProfileUtils
 from eotimeseriesviewer.timeseries.source import TimeSeriesSource
 from eotimeseriesviewer.timeseries.timeseries import TimeSeries
 from qgis.PyQt.QtCore import NULL, QMetaType, QVariant
 from qgis.PyQt.QtGui import QIcon
-from qgis.core import QgsCoordinateTransform, QgsRasterLayer, QgsProject
+from qgis.core import QgsCoordinateReferenceSystem, QgsCoordinateTransform, QgsRasterLayer, QgsProject
 from qgis.core import (edit, Qgis, QgsApplication, QgsFeature, QgsFeatureSink, QgsField, QgsFields, QgsMapLayer,
                        QgsProcessing, QgsProcessingAlgorithm, QgsProcessingContext, QgsProcessingException,
                        QgsProcessingFeedback,
@@ -276,6 +278,9 @@ class ReadTemporalProfiles(QgsProcessingAlgorithm):
     OUTPUT = 'OUTPUT'
     ADD_SOURCES = 'ADD_SOURCES'
 
+    # number of points for which profiles are read and written at once
+    CHUNK_SIZE = 10000
+
     def __init__(self, *args, **kwds):
         super().__init__(*args, **kwds)
 
@@ -388,7 +393,8 @@ class ReadTemporalProfiles(QgsProcessingAlgorithm):
             from eotimeseriesviewer.main import EOTimeSeriesViewer
             tsv = EOTimeSeriesViewer.instance()
             if isinstance(tsv, EOTimeSeriesViewer):
-                sources = [s.source() for s in tsv.timeSeries().sources()]
+                extent = SpatialExtent.fromLayer(input_layer)
+                sources = [s.source() for s in tsv.timeSeries().querySources(extent=extent)]
         elif isinstance(time_series, list):
             sources = [str(l) for l in time_series]
         elif isinstance(time_series, str):
@@ -437,44 +443,8 @@ class ReadTemporalProfiles(QgsProcessingAlgorithm):
     def processAlgorithm(self, parameters: dict, context: QgsProcessingContext,
                          feedback: QgsProcessingFeedback) -> dict:
 
-        # collect geometries
         input_layer: QgsVectorLayer = self.parameterAsVectorLayer(parameters, self.INPUT, context)
         save_source_path: bool = self.parameterAsBoolean(parameters, self.ADD_SOURCES, context)
-        points = []
-        fids = []
-        for f in input_layer.getFeatures():
-            fids.append(f.id())
-            points.append(f.geometry().asPoint())
-
-        feedback.pushInfo(f'Load temporal profiles for {len(points)} points from up to {len(self._sources)} '
-                          f'raster sources with {self._n_threads} threads.')
-        task = LoadTemporalProfileTask(self._sources,
-                                       points,
-                                       input_layer.crs(),
-                                       n_threads=self._n_threads,
-                                       save_sources=save_source_path,
-                                       description='Load temporal profiles')
-
-        task.setDescription('Load Temporal Profile')
-
-        def onProgress(progress: float):
-
-            feedback.setProgress(progress)
-            if feedback.isCanceled():
-                task.cancel()
-
-        task.progressChanged.connect(onProgress)
-        try:
-            task.run_task_manager()
-        except Exception as ex:
-            feedback.pushError(str(ex))
-            return {}
-
-        if feedback.isCanceled():
-            feedback.pushInfo("Task canceled.")
-            return {}
-
-        points, profiles = task.profilePoints(), task.profiles()
         fn = self._field_name
 
         fields = QgsFields(input_layer.fields())
@@ -501,21 +471,102 @@ class ReadTemporalProfiles(QgsProcessingAlgorithm):
         if sink is None:
             raise QgsProcessingException(self.invalidSinkError(parameters, self.OUTPUT))
 
-        for i, feat in enumerate(input_layer.getFeatures()):
-            feat: QgsFeature
+        n_total = input_layer.featureCount()
+        n_chunks = max(1, math.ceil(n_total / self.CHUNK_SIZE))
+        feedback.pushInfo(f'Load temporal profiles for {n_total} points from up to {len(self._sources)} '
+                          f'raster sources with {self._n_threads} threads.')
+
+        # read and write the profiles in chunks of points, to keep the memory usage bounded
+        # for large layers. Each input feature is iterated only once.
+        chunk: List[QgsFeature] = []
+        i_chunk = 0
+        for feat in input_layer.getFeatures():
             if feedback.isCanceled():
                 break
+            chunk.append(QgsFeature(feat))
+            if len(chunk) >= self.CHUNK_SIZE:
+                if not self.writeProfileChunk(chunk, i_chunk, n_chunks, input_layer.crs(), save_source_path,
+                                              is_new, func, sink, feedback):
+                    return {}
+                chunk.clear()
+                i_chunk += 1
+
+        if len(chunk) > 0 and not feedback.isCanceled():
+            if not self.writeProfileChunk(chunk, i_chunk, n_chunks, input_layer.crs(), save_source_path,
+                                          is_new, func, sink, feedback):
+                return {}
+            i_chunk += 1
 
+        if feedback.isCanceled():
+            feedback.pushInfo("Task canceled.")
+            return {}
+
+        if hasattr(sink, 'finalize'):
+            sink.finalize()
+        else:
+            sink.flushBuffer()
+
+        context.feedback().setProgress(100)
+        self._dest_id = dest_id
+        return {self.OUTPUT: dest_id}
+
+    def writeProfileChunk(self,
+                          features: List[QgsFeature],
+                          i_chunk: int,
+                          n_chunks: int,
+                          crs: QgsCoordinateReferenceSystem,
+                          save_source_path: bool,
+                          is_new: bool,
+                          func,
+                          sink: QgsFeatureSink,
+                          feedback: QgsProcessingFeedback) -> bool:
+        """
+        Loads the temporal profiles for a chunk of point features and writes them to the sink.
+        :return: True, if the chunk has been written without errors
+        """
+        # fid -> position in the list of points and profiles
+        fid2slot: Dict[int, int] = dict()
+        points = []
+        for feat in features:
+            fid2slot[feat.id()] = len(points)
+            points.append(feat.geometry().asPoint())
+
+        task = LoadTemporalProfileTask(self._sources,
+                                       points,
+                                       crs,
+                                       n_threads=self._n_threads,
+                                       save_sources=save_source_path,
+                                       description='Load temporal profiles')
+
+        task.setDescription('Load Temporal Profile')
+
+        def onProgress(progress: float):
+
+            feedback.setProgress((i_chunk + progress / 100) / n_chunks * 100)
+            if feedback.isCanceled():
+                task.cancel()
+
+        task.progressChanged.connect(onProgress)
+        try:
+            task.run_task_manager()
+        except Exception as ex:
+            feedback.pushError(str(ex))
+            return False
+
+        if feedback.isCanceled():
+            return True
+
+        profiles = task.profiles()
+
+        for feat in features:
             attrs = feat.attributes()
 
             # set new profile field
             value = None
-            if feat.id() in fids:
-                i_profile = fids.index(feat.id())
-                profile = profiles[i_profile]
-                if profile:
-                    value = func(profile)
-                    s = ""
+            profile = profiles[fid2slot[feat.id()]]
+            if profile:
+                value = func(profile)
+
             # write features
             if is_new:
                 attrs.append(value)
@@ -523,20 +574,7 @@ class ReadTemporalProfiles(QgsProcessingAlgorithm):
             else:
                 feat.setAttribute(self._field_id, value)
             sink.addFeature(feat, QgsFeatureSink.Flag.FastInsert)
-
-        if hasattr(sink, 'finalize'):
-            sink.finalize()
-        else:
-            sink.flushBuffer()
-        # del sink
-
-        # lyr = QgsProcessingUtils.mapLayerFromString(dest_id, context)
-        # lyr.setEditorWidgetSetup(self._field_id, TemporalProfileUtils.widgetSetup())
-        # lyr.saveDefaultStyle(QgsMapLayer.StyleCategory.Forms)
-        # assert TemporalProfileUtils.isProfileLayer(lyr)
-        context.feedback().setProgress(100)
-        self._dest_id = dest_id
-        return {self.OUTPUT: dest_id}
+        return True
 
     def postProcessAlgorithm(self, context: QgsProcessingContext, feedback: QgsProcessingFeedback):
         s = ""
@@ -2,14 +2,17 @@ import enum
 import json
 import math
 import re
-from typing import Optional, Union
+import sys
+from typing import Dict, Optional, Union
 
 import numpy as np
 from osgeo import gdal
 
+from eotimeseriesviewer import iostats
 from eotimeseriesviewer.qgispluginsupport.qps.qgsrasterlayerproperties import QgsRasterLayerSpectralProperties
 from eotimeseriesviewer.qgispluginsupport.qps.unitmodel import UnitLookup
 from eotimeseriesviewer.qgispluginsupport.qps.utils import LUT_WAVELENGTH
+from eotimeseriesviewer.sourceinfo import rxSensorMetadataKey, sensorFingerprint  # noqa: F401
 from qgis.PyQt import sip
 from qgis.PyQt.QtCore import pyqtSignal, QObject
 from qgis.core import Qgis, QgsCoordinateReferenceSystem, QgsDataProvider, QgsMessageLog, QgsPointXY, \
@@ -29,14 +32,60 @@ for dt in Qgis.DataType:
         GDAL_TO_QGIS_DATATYPES[GDAL_DATATYPES[dt.name]] = dt
 
 
+# sensor ids of gdal.Datasets, stored by their sensorFingerprint
+_SENSOR_ID_CACHE: Dict[tuple, str] = dict()
+
+
+def internSensorId(sid: str) -> str:
+    """
+    Returns the interned sensor id string. Sources of the same sensor refer to the same string object,
+    which reduces memory usage and allows fast dictionary lookups.
+    :param sid: str
+    :return: str
+    """
+    return sys.intern(sid)
+
+
+def clearSensorIdCache():
+    """
+    Clears the sensor ids cached by create_sensor_id
+    """
+    _SENSOR_ID_CACHE.clear()
+
+
+def cachedSensorId(fingerprint: tuple) -> Optional[str]:
+    """
+    Returns the sensor id cached for a sensorFingerprint, if create_sensor_id was called for a dataset
+    with the same fingerprint before.
+    :param fingerprint: tuple
+    :return: str or None
+    """
+    return _SENSOR_ID_CACHE.get(tuple(fingerprint))
+
+
 def create_sensor_id(source: Union[QgsRasterLayer, gdal.Dataset]) -> Optional[str]:
     """
-    Creates a unique sensor id
+    Creates a unique sensor id. The ids of gdal.Datasets with the same sensorFingerprint
+    are created only once.
     :param source:
     :return: str
     """
     assert isinstance(source, (QgsRasterLayer, gdal.Dataset))
 
+    if isinstance(source, gdal.Dataset):
+        fingerprint = sensorFingerprint(source)
+        sid = _SENSOR_ID_CACHE.get(fingerprint)
+        iostats.countCacheLookup(sid is not None)
+        if sid is None:
+            sid = internSensorId(_create_sensor_id(source))
+            _SENSOR_ID_CACHE[fingerprint] = sid
+        return sid
+
+    return internSensorId(_create_sensor_id(source))
+
+
+def _create_sensor_id(source: Union[QgsRasterLayer, gdal.Dataset]) -> str:
+
     if isinstance(source, QgsRasterLayer):
         assert source.isValid()
 
@@ -54,6 +54,7 @@ class EOTSVSettings(object):
 
         self.qgsTaskAsync = True
         self.qgsTaskFileReadingThreads = 4
+        self.qgsTaskFileReadingProcesses = False
         self.bandStatsSampleSize = 256
         self.rasterOverlapSampleSize = 25
 
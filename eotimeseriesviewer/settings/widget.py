@@ -180,6 +180,7 @@ class EOTSVSettingsWidget(QgsOptionsPageWidget):
 
         settings.qgsTaskAsync = self.cbAsyncQgsTasks.isChecked()
         settings.qgsTaskFileReadingThreads = self.sbQgsTaskFileReadingThreads.value()
+        settings.qgsTaskFileReadingProcesses = self.cbQgsTaskFileReadingProcesses.isChecked()
         settings.bandStatsSampleSize = self.sbBandStatsSampleSize.value()
         settings.rasterOverlapSampleSize = self.sbRasterOverlapSampleSize.value()
         settings.profileStyleCurrent = self.btnProfileCurrent.plotStyle()
@@ -227,6 +228,7 @@ class EOTSVSettingsWidget(QgsOptionsPageWidget):
         self.cbDebug.setChecked(settings.debug)
         self.cbAsyncQgsTasks.setChecked(settings.qgsTaskAsync)
         self.sbQgsTaskFileReadingThreads.setValue(settings.qgsTaskFileReadingThreads)
+        self.cbQgsTaskFileReadingProcesses.setChecked(settings.qgsTaskFileReadingProcesses)
         self.sbBandStatsSampleSize.setValue(settings.bandStatsSampleSize)
         self.sbRasterOverlapSampleSize.setValue(settings.rasterOverlapSampleSize)
         self.btnProfileCurrent.setPlotStyle(settings.profileStyleCurrent.clone())
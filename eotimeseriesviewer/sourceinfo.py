@@ -0,0 +1,149 @@
+"""
+Reading of raster source metadata with GDAL only.
+Functions in this module do not create any QGIS objects and can therefore run in worker processes.
+"""
+import hashlib
+import math
+import os
+import re
+import sys
+from typing import List, Optional
+
+from osgeo import gdal
+
+from eotimeseriesviewer import iostats
+
+# GDAL configuration options used to open a source for reading its metadata only.
+# Sibling files like *.aux.xml or *.hdr are still found, but without listing the
+# content of the source directory, which is slow on network shares. Overviews are
+# not accessed when reading metadata.
+GDAL_METADATA_OPEN_OPTIONS = {
+    'GDAL_DISABLE_READDIR_ON_OPEN': 'TRUE',
+}
+
+# metadata keys that can change the sensor id, e.g. wavelength information and sensor names
+rxSensorMetadataKey = re.compile(r'(wavelength|fwhm|bbl|band[ _]?names?|satellite|sensor|product)', re.IGNORECASE)
+
+# metadata keys that describe the observation date-time
+rxDateTimeMetadataKey = re.compile(r'(acquisition|observation|product_start)[ _]*(time|date|datetime)',
+                                   re.IGNORECASE)
+
+
+def gdalOpenMetadataOnly(path: str) -> Optional[gdal.Dataset]:
+    """
+    Opens a raster source to read its metadata, using the GDAL_METADATA_OPEN_OPTIONS
+    :param path: str
+    :return: gdal.Dataset or None
+    """
+    previous = {k: gdal.GetThreadLocalConfigOption(k, None) for k in GDAL_METADATA_OPEN_OPTIONS.keys()}
+    try:
+        for k, v in GDAL_METADATA_OPEN_OPTIONS.items():
+            gdal.SetThreadLocalConfigOption(k, v)
+        ds = gdal.OpenEx(path, gdal.OF_RASTER | gdal.OF_READONLY)
+        if isinstance(ds, gdal.Dataset):
+            iostats.count(path, opens=1)
+        else:
+            iostats.count(path, open_errors=1)
+        return ds
+    finally:
+        for k, v in previous.items():
+            gdal.SetThreadLocalConfigOption(k, v)
+
+
+def sensorFingerprint(ds: gdal.Dataset) -> tuple:
+    """
+    Returns a tuple with the properties of a gdal.Dataset that define its sensor id, i.e.
+    driver, band count, data type, pixel size and the band description and wavelength metadata.
+    Reading it is much faster than creating the sensor id. The fingerprint does not depend
+    on the process it was created in.
+    :param ds: gdal.Dataset
+    :return: tuple
+    """
+    gt = ds.GetGeoTransform()
+    nb = ds.RasterCount
+    md = []
+    for domain in ds.GetMetadataDomainList() or []:
+        if domain.startswith('xml:') or domain.startswith('json:'):
+            continue
+        for k, v in (ds.GetMetadata_Dict(domain) or {}).items():
+            if rxSensorMetadataKey.search(k):
+                md.append((domain, k, v))
+    for b in range(nb):
+        band: gdal.Band = ds.GetRasterBand(b + 1)
+        md.append(band.GetDescription())
+        for domain in ['', 'IMAGERY']:
+            for k, v in (band.GetMetadata_Dict(domain) or {}).items():
+                if rxSensorMetadataKey.search(k):
+                    md.append((b, domain, k, v))
+
+    return (ds.GetDriver().ShortName,
+            nb,
+            ds.GetRasterBand(1).DataType if nb > 0 else None,
+            math.hypot(gt[1], gt[2]),
+            math.hypot(gt[4], gt[5]),
+            hashlib.sha1(repr(md).encode('utf-8')).hexdigest())
+
+
+def dateTimeMetadataValues(ds: gdal.Dataset) -> List[str]:
+    """
+    Returns the values of the dataset metadata items that describe the observation date-time,
+    in the order they are evaluated by ImageDateUtils.dateTimeFromGDALDataset
+    :param ds: gdal.Dataset
+    :return: list of str
+    """
+    domains = ds.GetMetadataDomainList() or []
+    domains = sorted(domains, key=lambda d: d in ['IMAGE_STRUCTURE', 'ENVI'], reverse=True)
+    values = []
+    for domain in domains:
+        for k, v in (ds.GetMetadata_Dict(domain) or {}).items():
+            if rxDateTimeMetadataKey.search(k):
+                values.append(v)
+    return values
+
+
+def readSourceInfo(path: str) -> dict:
+    """
+    Reads the metadata required to create a TimeSeriesSource
+    :param path: source uri
+    :return: dict with source, dims, geotransform, wkt, fingerprint and date-time metadata values,
+             or source and error
+    """
+    try:
+        ds = gdalOpenMetadataOnly(path)
+        if not isinstance(ds, gdal.Dataset):
+            return {'source': path, 'error': f'Unable to open {path} as gdal.Dataset'}
+        return {'source': ds.GetDescription(),
+                'dims': [ds.RasterCount, ds.RasterYSize, ds.RasterXSize],
+                'gt': list(ds.GetGeoTransform()),
+                'wkt': ds.GetProjectionRef(),
+                'fingerprint': sensorFingerprint(ds),
+                'dtg_values': dateTimeMetadataValues(ds),
+                }
+    except Exception as ex:
+        return {'source': path, 'error': str(ex)}
+
+
+def readSourceInfos(paths: List[str]) -> List[dict]:
+    """
+    Reads the metadata of multiple sources, see readSourceInfo.
+    Used to run a batch of sources in a worker process.
+    :param paths: list of source uris
+    :return: list of dicts
+    """
+    return [readSourceInfo(p) for p in paths]
+
+
+def pythonExecutable() -> Optional[str]:
+    """
+    Returns the python interpreter to start worker processes with. Inside QGIS, sys.executable can
+    be the QGIS application instead of a python interpreter.
+    :return: path or None, if no python interpreter was found
+    """
+    if re.match(r'^python', os.path.basename(sys.executable), re.I):
+        return sys.executable
+
+    for name in ['python.exe', 'pythonw.exe', os.path.join('bin', 'python3'), os.path.join('bin', 'python')]:
+        path = os.path.join(sys.exec_prefix, name)
+        if os.path.isfile(path):
+            return path
+    return None
@@ -1,15 +1,123 @@
+import hashlib
 import json
-from typing import List, Set
+import logging
+import pickle
+import threading
+import types
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Union
 
 from eotimeseriesviewer import DIR_REPO
 from qgis.PyQt.QtCore import QAbstractTableModel, QModelIndex, QSortFilterProxyModel, Qt
 
+logger = logging.getLogger(__name__)
+
 INDICES = dict()
 CONSTANTS = dict()
 
 DIR_SPYNDEX = DIR_REPO / 'eotimeseriesviewer' / 'spyndex'
 assert DIR_SPYNDEX.is_dir()
 
+SPYNDEX_JSON_FILES = ['spectral-indices-dict.json', 'bands.json', 'constants.json']
+
+# precompiled spyndex index, created by scripts/create_plugin.py
+PATH_SPYNDEX_INDEX = DIR_SPYNDEX / 'data' / 'spyndex.pkl'
+# increase if the structure of the compiled index changes
+SPYNDEX_INDEX_FORMAT = 1
+
+_SPYNDEX_INDEX: Optional[Dict[str, Any]] = None
+_SPYNDEX_LOCK = threading.Lock()
+_FORMULAS: Dict[str, types.CodeType] = dict()
+
+
+def spyndex_source_hash() -> str:
+    """
+    Returns a hash of the spyndex JSON files, used to detect an outdated compiled index
+    """
+    h = hashlib.sha1()
+    for name in SPYNDEX_JSON_FILES:
+        with open(DIR_SPYNDEX / 'data' / name, 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def compile_spyndex_index() -> Dict[str, Any]:
+    """
+    Parses the spyndex JSON files into the lookup tables used by the EOTSV:
+        'indices': spectral index definitions by acronym
+        'bands': band definitions by band acronym
+        'constants': constant definitions by acronym
+        'by_band': acronyms of the spectral indices that require a band
+        'by_requirements': acronyms of the spectral indices by the sorted tuple of required bands
+    :return: dict
+    """
+    dir_data = DIR_SPYNDEX / 'data'
+    with open(dir_data / 'spectral-indices-dict.json') as f:
+        indices = json.load(f)['SpectralIndices']
+    with open(dir_data / 'bands.json') as f:
+        bands = json.load(f)
+    with open(dir_data / 'constants.json') as f:
+        constants = json.load(f)
+
+    by_band: Dict[str, List[str]] = dict()
+    by_requirements: Dict[tuple, List[str]] = dict()
+    for acronym, info in indices.items():
+        required = tuple(sorted(b for b in info['bands'] if b not in constants))
+        for b in required:
+            by_band.setdefault(b, []).append(acronym)
+        by_requirements.setdefault(required, []).append(acronym)
+
+    return {'format': SPYNDEX_INDEX_FORMAT,
+            'source_hash': spyndex_source_hash(),
+            'indices': indices,
+            'bands': bands,
+            'constants': constants,
+            'by_band': by_band,
+            'by_requirements': by_requirements,
+            }
+
+
+def write_spyndex_index(path: Union[str, Path] = None) -> Path:
+    """
+    Writes the compiled spyndex index, e.g. when building the plugin
+    :param path: output file, defaults to PATH_SPYNDEX_INDEX
+    :return: Path
+    """
+    path = Path(path) if path else PATH_SPYNDEX_INDEX
+    with open(path, 'wb') as f:
+        # protocol 4 can be read by all python versions supported by QGIS
+        pickle.dump(compile_spyndex_index(), f, protocol=4)
+    return path
+
+
+def _read_spyndex_index() -> Dict[str, Any]:
+    if PATH_SPYNDEX_INDEX.is_file():
+        try:
+            with open(PATH_SPYNDEX_INDEX, 'rb') as f:
+                index = pickle.load(f)
+            if index.get('format') == SPYNDEX_INDEX_FORMAT and index.get('source_hash') == spyndex_source_hash():
+                return index
+            logger.info(f'Outdated spyndex index: {PATH_SPYNDEX_INDEX}')
+        except Exception as ex:
+            logger.warning(f'Unable to read spyndex index {PATH_SPYNDEX_INDEX}: {ex}')
+    return compile_spyndex_index()
+
+
+def spyndex_index() -> Dict[str, Any]:
+    """
+    Returns the spyndex index. It is loaded on first call from the precompiled index,
+    or, if missing or outdated, from the spyndex JSON files.
+    """
+    global _SPYNDEX_INDEX, INDICES, CONSTANTS
+    if _SPYNDEX_INDEX is None:
+        with _SPYNDEX_LOCK:
+            if _SPYNDEX_INDEX is None:
+                index = _read_spyndex_index()
+                INDICES = index['indices']
+                CONSTANTS = index['constants']
+                _SPYNDEX_INDEX = index
+    return _SPYNDEX_INDEX
+
 
 class BandIdentifier(object):
 
@@ -73,6 +181,8 @@ class SpectralIndexConstantModel(QAbstractTableModel):
         super().__init__(*args, **kwds)
 
         self.mConstantDefinitions: dict = dict()
+        # cached map of the constant definitions, see cachedMap()
+        self.mMap: Optional[dict] = None
         self.mColumnNames = {self.cIdentifier: 'Identifier',
                              self.cValue: 'Value',
                              self.cDescription: 'Description'}
@@ -88,6 +198,14 @@ class SpectralIndexConstantModel(QAbstractTableModel):
     def asMap(self) -> dict:
         return self.mConstantDefinitions.copy()
 
+    def cachedMap(self) -> dict:
+        """
+        Returns the constant definitions like asMap(), but without copying them. Do not modify.
+        """
+        if self.mMap is None:
+            self.mMap = self.asMap()
+        return self.mMap
+
     def rowCount(self, parent=None, *args, **kwargs):
         return len(self.mConstantDefinitions)
 
@@ -107,15 +225,16 @@ class SpectralIndexConstantModel(QAbstractTableModel):
             new_item['value'] = new_item.get('value', new_item['default'])
             new_data[short_name] = new_item
 
+        self.mMap = None
         existing_names = self.short_names()
         to_update = [i for i in new_data.values() if i['short_name'] in existing_names]
         to_add = [i for i in new_data.values() if i['short_name'] not in existing_names]
         for item in to_update:
-            row = existing_names.index(short_name)
-            self.mConstantDefinitions[short_name] = item
+            row = existing_names.index(item['short_name'])
+            self.mConstantDefinitions[item['short_name']] = item
             idx1 = self.index(row, 0, QModelIndex())
             idx2 = self.index(row, self.columnCount() - 1, QModelIndex())
-            self.dataChanged(QModelIndex(), idx1, idx2)
+            self.dataChanged.emit(idx1, idx2)
         n = len(to_add)
 
         if n > 0:
@@ -132,6 +251,7 @@ class SpectralIndexConstantModel(QAbstractTableModel):
         if isinstance(keys, str):
             keys = [keys]
 
+        self.mMap = None
         to_remove = [k for k in keys if k in self.short_names()]
         for k in to_remove:
             row = self.short_names().index(k)
@@ -141,14 +261,9 @@ class SpectralIndexConstantModel(QAbstractTableModel):
 
     def loadFromSpyndex(self):
         """
-        Loads the band definition for the given satellite sensor from the awesome-spectral-library model
-        :param plattform:
-        :return:
+        Loads the constants defined in the awesome-spectral-library model
         """
-        with open(DIR_SPYNDEX / 'data' / 'constants.json') as f:
-            constants = json.load(f)
-
-        self.addConstants(constants)
+        self.addConstants(spyndex_index()['constants'])
 
     def loadFromMap(self, data: dict):
 
@@ -207,6 +322,8 @@ class SpectralIndexBandIdentifierModel(QAbstractTableModel):
         super().__init__(*args, **kwds)
 
         self.mAcronyms: List[BandIdentifier] = []
+        # cached map of the band identifiers, see cachedMap()
+        self.mMap: Optional[dict] = None
 
         self.mColumnNames = {self.cIdentifier: 'Identifier',
                              self.cName: 'Name',
@@ -221,6 +338,14 @@ class SpectralIndexBandIdentifierModel(QAbstractTableModel):
             d[a.identifier] = a.asMap()
         return d
 
+    def cachedMap(self) -> dict:
+        """
+        Returns the band identifiers like asMap(), but without re-creating them. Do not modify.
+        """
+        if self.mMap is None:
+            self.mMap = self.asMap()
+        return self.mMap
+
     def rowCount(self, parent=None, *args, **kwargs):
         return len(self.mAcronyms)
 
@@ -294,6 +419,7 @@ class SpectralIndexBandIdentifierModel(QAbstractTableModel):
 
     def loadFromMap(self, data: dict):
 
+        self.mMap = None
         self.beginRemoveRows(QModelIndex(), 0, len(self.mAcronyms) - 1)
         self.mAcronyms.clear()
         self.endRemoveRows()
@@ -310,6 +436,7 @@ class SpectralIndexBandIdentifierModel(QAbstractTableModel):
 
     def addAcronyms(self, acronyms: List[BandIdentifier]):
 
+        self.mMap = None
         existing = self.acronyms()
         to_add = [a for a in acronyms if a.name not in existing]
         n = len(to_add)
@@ -324,6 +451,7 @@ class SpectralIndexBandIdentifierModel(QAbstractTableModel):
 
     def removeAcronyms(self, acronyms: List[BandIdentifier]):
 
+        self.mMap = None
         to_remove = [a for a in acronyms if a in self.mAcronyms]
 
         n = len(to_remove)
@@ -337,37 +465,68 @@ class SpectralIndexBandIdentifierModel(QAbstractTableModel):
 
 
 def band_acronyms(plattform: str = None) -> List[BandIdentifier]:
-    path_bands = DIR_SPYNDEX / 'data' / 'bands.json'
-
     to_add: List[BandIdentifier] = []
-    with open(path_bands) as f:
-        dump = json.load(f)
-        for acronym, infos in dump.items():
-            if plattform and plattform not in infos['platforms']:
-                continue
+    for acronym, infos in spyndex_index()['bands'].items():
+        if plattform and plattform not in infos['platforms']:
+            continue
 
-            a = BandIdentifier(infos['short_name'])
-            a.name = infos['long_name']
-            a.setWavelength(infos['min_wavelength'], infos['max_wavelength'])
+        a = BandIdentifier(infos['short_name'])
+        a.name = infos['long_name']
+        a.setWavelength(infos['min_wavelength'], infos['max_wavelength'])
 
-            to_add.append(a)
+        to_add.append(a)
     return to_add
 
 
 def spectral_indices() -> dict:
-    global INDICES, CONSTANTS
-    if len(INDICES) == 0:
-        path_indices = DIR_SPYNDEX / 'data' / 'spectral-indices-dict.json'
-        path_constants = DIR_SPYNDEX / 'data' / 'constants.json'
+    return spyndex_index()['indices']
 
-        with open(path_indices) as f:
-            dump = json.load(f)
-            INDICES = dump['SpectralIndices']
 
-        with open(path_constants) as f:
-            dump = json.load(f)
-            CONSTANTS = dump
-    return INDICES
+def spectral_index(acronym: str) -> Optional[dict]:
+    """
+    Returns the definition of a spectral index
+    :param acronym: spectral index acronym, e.g. 'NDVI'
+    :return: dict or None, if the acronym is unknown
+    """
+    return spyndex_index()['indices'].get(acronym)
+
+
+def spectral_index_formula(acronym: str) -> Optional[types.CodeType]:
+    """
+    Returns the compiled formula of a spectral index, to be evaluated with eval(code, {}, band_values)
+    :param acronym: spectral index acronym, e.g. 'NDVI'
+    :return: code object or None, if the acronym is unknown
+    """
+    code = _FORMULAS.get(acronym)
+    if code is None:
+        info = spectral_index(acronym)
+        if info is None:
+            return None
+        code = _FORMULAS[acronym] = compile(info['formula'], f'<spectral index {acronym}>', 'eval')
+    return code
+
+
+def spectral_indices_by_band(band: str) -> List[str]:
+    """
+    Returns the acronyms of the spectral indices that require a band
+    :param band: band acronym, e.g. 'N'
+    :return: list of spectral index acronyms
+    """
+    return spyndex_index()['by_band'].get(band, [])[:]
+
+
+def spectral_indices_for_bands(bands: Iterable[str]) -> List[str]:
+    """
+    Returns the acronyms of the spectral indices that can be calculated from the given bands
+    :param bands: available band acronyms, e.g. ['R', 'N']. Constants are not required to be listed.
+    :return: list of spectral index acronyms
+    """
+    bands = set(bands)
+    acronyms = []
+    for required, indices in spyndex_index()['by_requirements'].items():
+        if bands.issuperset(required):
+            acronyms.extend(indices)
+    return acronyms
 
 
 def spectral_index_acronyms(band_identifier_model: SpectralIndexBandIdentifierModel = None,
@@ -378,8 +537,8 @@ def spectral_index_acronyms(band_identifier_model: SpectralIndexBandIdentifierMo
     if constant_model is None:
         constant_model = SpectralIndexConstantModel.instance()
 
-    return {'band_identifier': band_identifier_model.asMap(),
-            'constants': constant_model.asMap()}
+    return {'band_identifier': band_identifier_model.cachedMap(),
+            'constants': constant_model.cachedMap()}
 
 
 class SpectralIndexModel(QAbstractTableModel):
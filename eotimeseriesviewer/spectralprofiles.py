@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+                              EO Time Series Viewer
+                              -------------------
+        begin                : 2026-10-19
+        copyright            : (C) 2026 by HU-Berlin
+        email                : benjamin.jakimow@geo.hu-berlin.de
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+from osgeo import gdal, osr
+from osgeo.ogr import OGRERR_NONE
+
+from eotimeseriesviewer import iostats
+from eotimeseriesviewer.instrumentation import addBytes, timed
+from eotimeseriesviewer.qgispluginsupport.qps.speclib.core.spectralprofile import prepareProfileValueDict
+from eotimeseriesviewer.tasks import EOTSVTask, WorkStealingExecutor
+from eotimeseriesviewer.timeseries.source import TimeSeriesDate, TimeSeriesSource
+from qgis.PyQt.QtCore import pyqtSignal
+from qgis.core import Qgis, QgsCoordinateReferenceSystem, QgsExpressionContext, QgsExpressionContextScope, \
+    QgsGeometry, QgsPointXY, QgsTask
+
+
+class SpectralProfileCollectionTask(EOTSVTask):
+    """
+    Reads the spectral profiles of a single location from many time series sources
+    in parallel GDAL worker threads.
+    """
+    executed = pyqtSignal(bool, EOTSVTask)
+
+    def __init__(self,
+                 sources: List[TimeSeriesSource],
+                 point: QgsPointXY,
+                 crs: QgsCoordinateReferenceSystem,
+                 top_only: bool = False,
+                 n_threads: int = 4,
+                 description: str = 'Collect spectral profiles'):
+        """
+        :param sources: sources to read the profiles from, in order of their priority within a TimeSeriesDate
+        :param point: profile location
+        :param crs: QgsCoordinateReferenceSystem of the profile location
+        :param top_only: set True to return the profile of the first source with valid pixel values
+                         of each TimeSeriesDate only.
+        :param n_threads: number of reading threads running in parallel.
+        """
+        super().__init__(description=description,
+                         flags=QgsTask.Silent | QgsTask.CanCancel | QgsTask.CancelWithoutPrompt)
+        assert isinstance(crs, QgsCoordinateReferenceSystem) and crs.isValid()
+        self.mSources: List[TimeSeriesSource] = list(sources)
+        self.mPoint = QgsPointXY(point)
+        self.mCrs = QgsCoordinateReferenceSystem(crs)
+        self.mWkt = crs.toWkt(Qgis.CrsWktVariant.PreferredGdal)
+        self.mNorthFirst = crs.axisOrdering()[0] == Qgis.CrsAxisDirection.North
+        self.mTopOnly = top_only
+        self.mThreads = n_threads
+        self.mProfiles: List[Tuple[TimeSeriesSource, Dict[str, Any]]] = []
+        self.mErrors: List[Tuple[str, str]] = []
+
+    def canCancel(self) -> bool:
+        return True
+
+    def errors(self) -> List[Tuple[str, str]]:
+        return self.mErrors[:]
+
+    @timed()
+    def readProfile(self, tss: TimeSeriesSource) -> Optional[Dict[str, Any]]:
+        """
+        Reads the pixel values of a source at the profile location
+        :return: dict with the values, the pixel position and the pixel center coordinate in the source CRS,
+                 or None, if the location is outside the source or all values are no-data.
+        """
+        source = tss.source()
+        ds: gdal.Dataset = iostats.openDataset(source)
+        assert isinstance(ds, gdal.Dataset), f'Unable to open {source} as gdal.Dataset'
+
+        srs = osr.SpatialReference()
+        srs.ImportFromWkt(self.mWkt)
+        assert srs.Validate() == OGRERR_NONE
+        if self.mNorthFirst:
+            pt = (self.mPoint.y(), self.mPoint.x())
+        else:
+            pt = (self.mPoint.x(), self.mPoint.y())
+
+        srs_raster = ds.GetSpatialRef()
+        if not srs.IsSame(srs_raster):
+            trans = osr.CoordinateTransformation(srs, srs_raster)
+            pt = trans.TransformPoint(*pt)[0:2]
+
+        transformer = gdal.Transformer(ds, None, [])
+        success, px = transformer.TransformPoint(True, *pt)
+        if not success:
+            return None
+        px_x, px_y = int(math.floor(px[0])), int(math.floor(px[1]))
+        if not (0 <= px_x < ds.RasterXSize and 0 <= px_y < ds.RasterYSize):
+            return None
+
+        array = iostats.readAsArray(ds, px_x, px_y, 1, 1, source=source)
+        addBytes(array.nbytes)
+        no_data_values = [ds.GetRasterBand(b + 1).GetNoDataValue() for b in range(ds.RasterCount)]
+        values = array.flatten().tolist()
+        is_no_data = [nd is not None and nd == v for nd, v in zip(no_data_values, values)]
+        if all(is_no_data):
+            return None
+        # keep the band positions of no-data values
+        values = [math.nan if nd else v for nd, v in zip(is_no_data, values)]
+
+        gt = ds.GetGeoTransform()
+        x = gt[0] + (px_x + 0.5) * gt[1] + (px_y + 0.5) * gt[2]
+        y = gt[3] + (px_x + 0.5) * gt[4] + (px_y + 0.5) * gt[5]
+        del ds
+        return {'values': values, 'px_x': px_x, 'px_y': px_y, 'x': x, 'y': y}
+
+    def run(self) -> bool:
+        results: Dict[str, Dict[str, Any]] = dict()
+        executor = WorkStealingExecutor(self, self.readProfile, self.mSources, n_threads=self.mThreads)
+        for tss, result, ex in executor.results():
+            if ex is not None:
+                self.mErrors.append((tss.source(), str(ex)))
+            elif result is not None:
+                results[tss.source()] = result
+
+        if self.isCanceled():
+            return False
+
+        # keep the input order, i.e. the order of sources within a TimeSeriesDate
+        tsds_done = set()
+        for tss in self.mSources:
+            result = results.get(tss.source())
+            if result is None:
+                continue
+            tsd = tss.timeSeriesDate()
+            if self.mTopOnly:
+                if tsd in tsds_done:
+                    continue
+                tsds_done.add(tsd)
+            self.mProfiles.append((tss, result))
+
+        self.setProgress(100)
+        self.executed.emit(True, self)
+        return True
+
+    def profiles(self) -> List[Tuple[TimeSeriesSource, Dict[str, Any]]]:
+        return self.mProfiles[:]
+
+    def profilesAndContexts(self) -> List[Tuple[Dict, QgsExpressionContext]]:
+        """
+        Returns the profiles as spectral profile value dictionaries, together with an expression
+        context that describes the source, observation date and sensor of each profile.
+        To be called from the main thread.
+        """
+        results = []
+        for tss, result in self.mProfiles:
+            tsd = tss.timeSeriesDate()
+            if isinstance(tsd, TimeSeriesDate):
+                scope = tsd.scope()
+                wl, wlu = tsd.sensor().wl, tsd.sensor().wlu
+            else:
+                scope = QgsExpressionContextScope()
+                wl = wlu = None
+            scope.setVariable('source', tss.source())
+            scope.setVariable('px_x', result['px_x'])
+            scope.setVariable('px_y', result['px_y'])
+            scope.setVariable('_source_crs', tss.crs())
+
+            context = QgsExpressionContext()
+            context.appendScope(scope)
+            context.setGeometry(QgsGeometry.fromPointXY(QgsPointXY(result['x'], result['y'])))
+
+            profileDict = prepareProfileValueDict(x=wl, y=result['values'], xUnit=wlu)
+            results.append((profileDict, context))
+        return results
@@ -19,17 +19,23 @@
  ***************************************************************************/
 """
 import os
+import platform
 import re
+import sys
 from collections import OrderedDict
+from typing import Any, Dict
 
 import numpy as np
-from qgis.PyQt.QtCore import QAbstractTableModel, QModelIndex, Qt
+from osgeo import gdal
+from qgis.PyQt.QtCore import QAbstractTableModel, QModelIndex, QSortFilterProxyModel, QT_VERSION_STR, Qt, QTimer
 from qgis.PyQt.QtGui import QCursor
 from qgis.PyQt.QtWidgets import QApplication, QFileDialog, QMenu, QTableView
-from qgis.core import QgsMapLayer, QgsProject, QgsRasterLayer, QgsVectorLayer
-from qgis.gui import QgsDockWidget
+from qgis.core import Qgis, QgsMapLayer, QgsProject, QgsRasterLayer, QgsVectorLayer
+from qgis.PyQt.QtWidgets import QWidget
 
 from eotimeseriesviewer import DIR_UI
+from eotimeseriesviewer import instrumentation
+from eotimeseriesviewer.docks import LazyDockWidget
 from eotimeseriesviewer.qgispluginsupport.qps.utils import loadUi
 
 PSUTIL_AVAILABLE = False
@@ -40,6 +46,40 @@ except ModuleNotFoundError:
     pass
 
 
+def environmentInfo() -> Dict[str, Any]:
+    """
+    Returns a description of the system and software environment, e.g. to be stored with benchmark results.
+    :return: dict
+    """
+    import eotimeseriesviewer
+
+    info = {'platform': platform.platform(),
+            'machine': platform.machine(),
+            'processor': platform.processor(),
+            'node': platform.node(),
+            'cpu_count': os.cpu_count(),
+            'python_implementation': platform.python_implementation(),
+            'python_version': platform.python_version(),
+            'python_executable': sys.executable,
+            'qgis_version': Qgis.version(),
+            'qt_version': QT_VERSION_STR,
+            'gdal_version': gdal.__version__,
+            'gdal_cache_max': gdal.GetCacheMax(),
+            'numpy_version': np.__version__,
+            'eotsv_version': eotimeseriesviewer.__version__,
+            }
+
+    if PSUTIL_AVAILABLE:
+        import psutil
+        info['memory_total'] = psutil.virtual_memory().total
+        info['memory_available'] = psutil.virtual_memory().available
+        freq = psutil.cpu_freq()
+        if freq:
+            info['cpu_freq_max'] = freq.max
+
+    return info
+
+
 def value2str(args, separator=''):
     return str(args)
 
@@ -304,10 +344,102 @@ class DataLoadingModel(QAbstractTableModel):
         return None
 
 
-class SystemInfoDock(QgsDockWidget):
+class TimingMetricsModel(QAbstractTableModel):
+    """
+    Shows the metrics recorded with the eotimeseriesviewer.instrumentation module
+    """
 
     def __init__(self, parent=None):
-        super(SystemInfoDock, self).__init__(parent)
+        super(TimingMetricsModel, self).__init__(parent)
+
+        self.cName = 'Name'
+        self.cCount = 'n'
+        self.cP50 = 'p50 [ms]'
+        self.cP95 = 'p95 [ms]'
+        self.cMax = 'max [ms]'
+        self.cTotal = 'total [s]'
+        self.cBytes = 'read [KiB]'
+
+        self.mNames = []
+        self.mMetrics = dict()
+
+    def refresh(self):
+        """
+        Reads the latest metrics
+        """
+        metrics = instrumentation.metrics()
+        if list(metrics.keys()) != self.mNames:
+            self.beginResetModel()
+            self.mMetrics = metrics
+            self.mNames = list(metrics.keys())
+            self.endResetModel()
+        else:
+            self.mMetrics = metrics
+            if len(self.mNames) > 0:
+                self.dataChanged.emit(self.index(0, 0), self.index(self.rowCount() - 1, self.columnCount() - 1))
+
+    def columnNames(self):
+        return [self.cName, self.cCount, self.cP50, self.cP95, self.cMax, self.cTotal, self.cBytes]
+
+    def headerData(self, col, orientation, role):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.columnNames()[col]
+        return None
+
+    def rowCount(self, parentIdx=None, *args, **kwargs):
+        return len(self.mNames)
+
+    def columnCount(self, QModelIndex_parent=None, *args, **kwargs):
+        return len(self.columnNames())
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role is None or not index.isValid():
+            return None
+
+        columnName = self.columnNames()[index.column()]
+        name = self.mNames[index.row()]
+        m = self.mMetrics[name]
+        value = None
+        if role in [Qt.DisplayRole, Qt.EditRole]:
+            if columnName == self.cName:
+                value = name
+            elif columnName == self.cCount:
+                value = m['count']
+            elif columnName == self.cP50:
+                value = round(m['p50'] * 1000, 2)
+            elif columnName == self.cP95:
+                value = round(m['p95'] * 1000, 2)
+            elif columnName == self.cMax:
+                value = round(m['max'] * 1000, 2)
+            elif columnName == self.cTotal:
+                value = round(m['total'], 3)
+            elif columnName == self.cBytes:
+                value = round(m['bytes'] / 1024, 1)
+        elif role == Qt.ToolTipRole and columnName == self.cName:
+            value = name
+        elif role == Qt.UserRole:
+            value = m
+        return value
+
+    def flags(self, index):
+        if index.isValid():
+            return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+        return None
+
+
+class SystemInfoDock(LazyDockWidget):
+    """
+    Shows system and timing information. The dock content is created when the dock is shown for the first time.
+    """
+
+    def __init__(self, parent=None):
+        super(SystemInfoDock, self).__init__('System Info', self.createContent, parent)
+        self.setObjectName('systemInfoPanel')
+
+    def createContent(self) -> QWidget:
+        """
+        Creates the dock content, see LazyDockWidget
+        """
         loadUi(DIR_UI / 'systeminfo.ui', self)
 
         self.lyrModel = MapLayerRegistryModel()
@@ -327,6 +459,23 @@ class SystemInfoDock(QgsDockWidget):
 
         self.btnResetDataLoadingModel.clicked.connect(resetModel)
 
+        self.timingMetricsModel = TimingMetricsModel()
+        self.timingProxyModel = QSortFilterProxyModel()
+        self.timingProxyModel.setSourceModel(self.timingMetricsModel)
+        self.tableViewTimings.setModel(self.timingProxyModel)
+        self.tableViewTimings.contextMenuEvent = \
+            lambda event: self.contextMenuEvent(self.tableViewTimings, event)
+        self.cbRecordTimings.setChecked(instrumentation.isEnabled())
+        self.cbRecordTimings.toggled.connect(self.setRecordTimings)
+        self.btnResetTimings.clicked.connect(self.resetTimings)
+        self.btnExportTimings.clicked.connect(self.exportTimings)
+
+        self.mTimingRefreshTimer = QTimer(self)
+        self.mTimingRefreshTimer.setInterval(1000)
+        self.mTimingRefreshTimer.timeout.connect(self.timingMetricsModel.refresh)
+        if instrumentation.isEnabled():
+            self.mTimingRefreshTimer.start()
+
         self.labelPSUTIL.setVisible(PSUTIL_AVAILABLE is False)
         if PSUTIL_AVAILABLE:
             self.tableViewSystemParameters.setVisible(True)
@@ -334,10 +483,43 @@ class SystemInfoDock(QgsDockWidget):
             # self.tableViewSystemParameters.setModel(self.systemInfoModel)
         else:
             self.systemInfoModel = None
+        return self.widget()
 
     def addTimeDelta(self, type, timedelta):
         self.dataLoadingModel.addTimeDelta(type, timedelta)
 
+    def setRecordTimings(self, enabled: bool):
+        instrumentation.setEnabled(enabled)
+        if enabled:
+            self.mTimingRefreshTimer.start()
+        else:
+            self.mTimingRefreshTimer.stop()
+        self.timingMetricsModel.refresh()
+
+    def resetTimings(self):
+        instrumentation.clear()
+        self.timingMetricsModel.refresh()
+
+    def exportTimings(self, path: str = None):
+        """
+        Saves the recorded timings. Files with a *.trace.json extension are written
+        in the Chrome trace event format, other files as JSON with the metrics of each timer.
+        :param path: file path. Opens a file dialog if not set.
+        """
+        if not isinstance(path, str):
+            filters = 'JSON (*.json);;Chrome Trace (*.trace.json)'
+            path, selected_filter = QFileDialog.getSaveFileName(parent=self, caption='Export Timings',
+                                                                directory='timings.json', filter=filters)
+            if path == '':
+                return
+            if selected_filter.startswith('Chrome') and not path.endswith('.trace.json'):
+                path = os.path.splitext(path)[0] + '.trace.json'
+
+        if path.endswith('.trace.json'):
+            instrumentation.writeChromeTrace(path)
+        else:
+            instrumentation.writeJson(path)
+
     def contextMenuEvent(self, tableView, event):
         assert isinstance(tableView, QTableView)
         menu = QMenu(self)
@@ -0,0 +1,351 @@
+# -*- coding: utf-8 -*-
+"""
+/***************************************************************************
+                              EO Time Series Viewer
+                              -------------------
+        begin                : 2026-10-19
+        copyright            : (C) 2026 by HU-Berlin
+        email                : benjamin.jakimow@geo.hu-berlin.de
+ ***************************************************************************/
+
+/***************************************************************************
+ *                                                                         *
+ *   This program is free software; you can redistribute it and/or modify  *
+ *   it under the terms of the GNU General Public License as published by  *
+ *   the Free Software Foundation; either version 2 of the License, or     *
+ *   (at your option) any later version.                                   *
+ *                                                                         *
+ ***************************************************************************/
+"""
+import datetime
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from qgis.PyQt.QtCore import QAbstractTableModel, QModelIndex, QSortFilterProxyModel, Qt, QTimer
+from qgis.PyQt.QtWidgets import QHBoxLayout, QPushButton, QSplitter, QTableView, QVBoxLayout, QWidget
+from qgis.core import QgsApplication, QgsTask, QgsTaskManager
+from qgis.gui import QgsDockWidget
+
+from eotimeseriesviewer.tasks import EOTSVTask
+
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_COMPLETED = 'completed'
+STATUS_CANCELED = 'canceled'
+STATUS_FAILED = 'failed'
+
+
+def taskStatus(task: QgsTask) -> str:
+    status = task.status()
+    if status == QgsTask.Running:
+        return STATUS_RUNNING
+    elif status == QgsTask.Complete:
+        return STATUS_COMPLETED
+    elif status == QgsTask.Terminated:
+        return STATUS_CANCELED if task.isCanceled() else STATUS_FAILED
+    return STATUS_QUEUED
+
+
+def taskRecord(task: EOTSVTask, parent: Optional[EOTSVTask] = None) -> Dict[str, Any]:
+    """
+    Returns a snapshot of an EOTSVTask and its statistics
+    :param task: EOTSVTask
+    :param parent: parent task, if task is a subtask
+    :return: dict
+    """
+    record = task.statistics()
+    record['type'] = task.__class__.__name__
+    record['description'] = task.description()
+    record['parent'] = parent.description() if isinstance(parent, EOTSVTask) else None
+    record['status'] = taskStatus(task)
+    record['created'] = task.mInitTime
+    # GDAL I/O, counted if enabled with iostats.setEnabled(True)
+    io = task.ioStats().totals()
+    record['opens'] = io['opens']
+    record['reads'] = io['reads']
+    record['bytes'] = io['bytes']
+    return record
+
+
+class TaskMonitorModel(QAbstractTableModel):
+    """
+    Lists active EOTSVTasks, their subtasks and the history of finished tasks
+    """
+
+    def __init__(self, taskManager: QgsTaskManager = None, max_history: int = 500, parent=None):
+        super().__init__(parent)
+        if taskManager is None:
+            taskManager = QgsApplication.taskManager()
+
+        self.mColumns = [
+            ('Task', 'description'),
+            ('Type', 'type'),
+            ('Status', 'status'),
+            ('Items', 'n_done'),
+            ('Total', 'n_items'),
+            ('Queue', 'queue_depth'),
+            ('In flight', 'in_flight'),
+            ('Workers', 'n_workers'),
+            ('Utilization [%]', 'utilization'),
+            ('Items/s', 'throughput'),
+            ('Errors', 'n_errors'),
+            ('Opens', 'opens'),
+            ('Reads', 'reads'),
+            ('Read [KiB]', 'bytes'),
+            ('Duration [s]', 'duration'),
+            ('Created', 'created'),
+        ]
+
+        self.mTaskManager = taskManager
+        # active tasks as (task, parent task)
+        self.mActive: List[tuple] = []
+        self.mHistory: Deque[Dict[str, Any]] = deque(maxlen=max_history)
+        self.mRecords: List[Dict[str, Any]] = []
+        self.mTaskManager.taskAdded.connect(self.onTaskAdded)
+
+    def onTaskAdded(self, taskID: int):
+        task = self.mTaskManager.task(taskID)
+        if isinstance(task, EOTSVTask):
+            self.addTask(task)
+
+    def addTask(self, task: EOTSVTask, parent: Optional[EOTSVTask] = None):
+        """
+        Adds a task and its EOTSVTask subtasks to the list of monitored tasks
+        """
+        assert isinstance(task, EOTSVTask)
+        self.mActive.append((task, parent))
+        task.statusChanged.connect(self.refresh)
+        for subTask in task.subTasks():
+            if isinstance(subTask, EOTSVTask):
+                self.addTask(subTask, parent=task)
+        self.refresh()
+
+    def history(self) -> List[Dict[str, Any]]:
+        """
+        Returns the records of finished tasks
+        """
+        return list(self.mHistory)
+
+    def clearHistory(self):
+        self.mHistory.clear()
+        self.refresh()
+
+    def refresh(self, *args):
+        """
+        Updates the task statistics and moves finished tasks into the history
+        """
+        active = []
+        records = []
+        for task, parent in self.mActive:
+            try:
+                record = taskRecord(task, parent)
+            except RuntimeError:
+                # task has been deleted
+                continue
+            if record['status'] in [STATUS_COMPLETED, STATUS_CANCELED, STATUS_FAILED]:
+                self.mHistory.append(record)
+            else:
+                active.append((task, parent))
+                records.append(record)
+        self.mActive = active
+        records.extend(reversed(self.mHistory))
+
+        self.beginResetModel()
+        self.mRecords = records
+        self.endResetModel()
+
+    def records(self) -> List[Dict[str, Any]]:
+        """
+        Returns the records of active tasks followed by the records of finished tasks, latest first
+        """
+        return self.mRecords[:]
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """
+        Summarizes the records by task type, e.g. to see which kind of task saturates the workers
+        """
+        summary: Dict[str, Dict[str, Any]] = dict()
+        for r in self.mRecords:
+            s = summary.setdefault(r['type'], {'type': r['type'],
+                                               'n_tasks': 0, 'n_active': 0, 'n_canceled': 0, 'n_failed': 0,
+                                               'n_done': 0, 'n_errors': 0, 'duration': 0.0, 'busy': 0.0,
+                                               'worker_time': 0.0})
+            s['n_tasks'] += 1
+            s['n_active'] += int(r['status'] in [STATUS_QUEUED, STATUS_RUNNING])
+            s['n_canceled'] += int(r['status'] == STATUS_CANCELED)
+            s['n_failed'] += int(r['status'] == STATUS_FAILED)
+            s['n_done'] += r['n_done']
+            s['n_errors'] += r['n_errors']
+            s['duration'] += r['duration']
+            s['busy'] += r['utilization'] * r['n_workers'] * r['duration']
+            s['worker_time'] += r['n_workers'] * r['duration']
+
+        results = []
+        for s in summary.values():
+            s['throughput'] = s['n_done'] / s['duration'] if s['duration'] > 0 else 0.0
+            s['utilization'] = s['busy'] / s['worker_time'] if s['worker_time'] > 0 else 0.0
+            del s['busy'], s['worker_time']
+            results.append(s)
+        return results
+
+    def rowCount(self, parent=QModelIndex(), *args, **kwargs):
+        return len(self.mRecords)
+
+    def columnCount(self, parent=QModelIndex(), *args, **kwargs):
+        return len(self.mColumns)
+
+    def headerData(self, col, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.mColumns[col][0]
+        return None
+
+    def data(self, index: QModelIndex, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        record = self.mRecords[index.row()]
+        key = self.mColumns[index.column()][1]
+
+        if role == Qt.DisplayRole:
+            value = record[key]
+            if key == 'description' and record['parent']:
+                return f'↳ {value}'
+            if key == 'utilization':
+                return round(100 * value, 1)
+            if key in ['throughput', 'duration']:
+                return round(value, 2)
+            if key == 'bytes':
+                return round(value / 1024, 1)
+            if key == 'created':
+                return value.strftime('%H:%M:%S')
+            return value
+        elif role == Qt.EditRole:
+            # used for sorting
+            value = record[key]
+            if isinstance(value, datetime.datetime):
+                return value.timestamp()
+            return value
+        elif role == Qt.ToolTipRole and key == 'description':
+            if record['parent']:
+                return f'{record["description"]}\nSubtask of: {record["parent"]}'
+            return record['description']
+        elif role == Qt.UserRole:
+            return record
+        return None
+
+
+class TaskSummaryModel(QAbstractTableModel):
+    """
+    Shows the statistics of a TaskMonitorModel summarized by task type
+    """
+
+    def __init__(self, taskModel: TaskMonitorModel, parent=None):
+        super().__init__(parent)
+        self.mColumns = [
+            ('Type', 'type'),
+            ('Tasks', 'n_tasks'),
+            ('Active', 'n_active'),
+            ('Canceled', 'n_canceled'),
+            ('Failed', 'n_failed'),
+            ('Items', 'n_done'),
+            ('Errors', 'n_errors'),
+            ('Items/s', 'throughput'),
+            ('Utilization [%]', 'utilization'),
+            ('Duration [s]', 'duration'),
+        ]
+        self.mSummary: List[Dict[str, Any]] = []
+        self.mTaskModel = taskModel
+        self.mTaskModel.modelReset.connect(self.refresh)
+        self.refresh()
+
+    def refresh(self):
+        self.beginResetModel()
+        self.mSummary = self.mTaskModel.summary()
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex(), *args, **kwargs):
+        return len(self.mSummary)
+
+    def columnCount(self, parent=QModelIndex(), *args, **kwargs):
+        return len(self.mColumns)
+
+    def headerData(self, col, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.mColumns[col][0]
+        return None
+
+    def data(self, index: QModelIndex, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        key = self.mColumns[index.column()][1]
+        value = self.mSummary[index.row()][key]
+        if role == Qt.DisplayRole:
+            if key == 'utilization':
+                return round(100 * value, 1)
+            if key in ['throughput', 'duration']:
+                return round(value, 2)
+            return value
+        elif role == Qt.EditRole:
+            return value
+        return None
+
+
+class TaskMonitorDock(QgsDockWidget):
+    """
+    Shows the throughput, queue depth, worker utilization, cancellations and errors
+    of EOTSVTasks, summarized by task type and for each single task.
+    """
+
+    def __init__(self, parent=None, taskManager: QgsTaskManager = None):
+        super().__init__(parent)
+        self.setWindowTitle('Task Performance')
+        self.setObjectName('TaskMonitorDock')
+
+        self.mTaskModel = TaskMonitorModel(taskManager=taskManager, parent=self)
+        self.mSummaryModel = TaskSummaryModel(self.mTaskModel, parent=self)
+
+        self.tableViewSummary = QTableView()
+        self.tableViewTasks = QTableView()
+        for tv, model in [(self.tableViewSummary, self.mSummaryModel),
+                          (self.tableViewTasks, self.mTaskModel)]:
+            proxy = QSortFilterProxyModel(tv)
+            proxy.setSourceModel(model)
+            proxy.setSortRole(Qt.EditRole)
+            tv.setModel(proxy)
+            tv.setSortingEnabled(True)
+            tv.horizontalHeader().setStretchLastSection(True)
+
+        self.btnClearHistory = QPushButton('Clear History')
+        self.btnClearHistory.clicked.connect(self.mTaskModel.clearHistory)
+
+        hbox = QHBoxLayout()
+        hbox.addStretch()
+        hbox.addWidget(self.btnClearHistory)
+
+        splitter = QSplitter(Qt.Vertical)
+        splitter.addWidget(self.tableViewSummary)
+        splitter.addWidget(self.tableViewTasks)
+        splitter.setStretchFactor(1, 3)
+
+        vbox = QVBoxLayout()
+        vbox.setContentsMargins(0, 0, 0, 0)
+        vbox.addLayout(hbox)
+        vbox.addWidget(splitter)
+        w = QWidget()
+        w.setLayout(vbox)
+        self.setWidget(w)
+
+        # update the statistics of running tasks while the dock is visible
+        self.mRefreshTimer = QTimer(self)
+        self.mRefreshTimer.setInterval(1000)
+        self.mRefreshTimer.timeout.connect(self.mTaskModel.refresh)
+        self.visibilityChanged.connect(self.onVisibilityChanged)
+
+    def taskModel(self) -> TaskMonitorModel:
+        return self.mTaskModel
+
+    def onVisibilityChanged(self, visible: bool):
+        if visible:
+            self.mTaskModel.refresh()
+            self.mRefreshTimer.start()
+        else:
+            self.mRefreshTimer.stop()
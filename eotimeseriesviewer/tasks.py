@@ -1,10 +1,171 @@
 import datetime
-from typing import List, Optional
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
+from qgis.PyQt.QtCore import Qt
 from qgis.core import QgsApplication, QgsTask, QgsTaskManager
 
+from eotimeseriesviewer import iostats
+
+# returned by a worker thread of the WorkStealingExecutor when the work queue is empty
+_WORKER_DONE = object()
+
+
+class WorkStealingExecutor(object):
+    """
+    Processes a list of work items in parallel worker threads. Instead of splitting the items
+    into fixed badges, all items are put into a shared queue from which each idle worker takes the
+    next item. A slow item therefore only delays the worker that is processing it.
+
+    Results are returned by results() to the thread that runs the task, usually within QgsTask.run().
+    Workers pause if more than max_pending results have not been consumed yet (back-pressure).
+    Workers check for a task cancellation before each item.
+    If the task is an EOTSVTask, the executor updates its item statistics, see EOTSVTask.statistics(),
+    and collects the I/O operations of the workers in EOTSVTask.ioStats().
+
+    Example:
+
+        def run(self):
+            executor = WorkStealingExecutor(self, self.readSource, self.mSources, n_threads=4)
+            for source, result, error in executor.results():
+                ...
+            return not self.isCanceled()
+    """
+
+    def __init__(self,
+                 task: QgsTask,
+                 function: Callable[[Any], Any],
+                 items: Iterable[Any],
+                 n_threads: int = 4,
+                 max_pending: int = 256,
+                 progress_interval: float = 1.0):
+        """
+        :param task: the task that runs the executor. Used for cancellation checks and to report the progress.
+        :param function: function that is called with a single work item
+        :param items: work items
+        :param n_threads: number of worker threads
+        :param max_pending: maximum number of results that are buffered before workers need to wait
+        :param progress_interval: minimum number of seconds between two progress updates
+        """
+        assert isinstance(task, QgsTask)
+        assert callable(function)
+        assert max_pending > 0
+        self.mTask = task
+        self.mFunction = function
+        self.mItems: List[Any] = list(items)
+        self.mThreads: int = max(1, n_threads)
+        self.mMaxPending: int = max_pending
+        self.mProgressInterval = datetime.timedelta(seconds=progress_interval)
+        self.mStop = threading.Event()
+        self.mNDone: int = 0
+        self.mStatsTask: Optional[EOTSVTask] = task if isinstance(task, EOTSVTask) else None
+
+    def __len__(self) -> int:
+        return len(self.mItems)
+
+    def nDone(self) -> int:
+        """
+        Returns the number of items that have been processed
+        """
+        return self.mNDone
+
+    def isStopped(self) -> bool:
+        return self.mStop.is_set() or self.mTask.isCanceled()
+
+    def _work(self, items: queue.SimpleQueue, results: queue.Queue):
+        try:
+            stats = self.mStatsTask
+            if stats:
+                with iostats.collect(stats.ioStats()):
+                    self._workItems(items, results, stats)
+            else:
+                self._workItems(items, results, None)
+        finally:
+            # always signal the end of this worker, otherwise results() waits forever
+            results.put(_WORKER_DONE)
+
+    def _workItems(self, items: queue.SimpleQueue, results: queue.Queue, stats: Optional['EOTSVTask']):
+        while not self.isStopped():
+            try:
+                item = items.get_nowait()
+            except queue.Empty:
+                break
+            if stats:
+                stats.addItemsStarted(1)
+            t0 = time.perf_counter()
+            try:
+                result = (item, self.mFunction(item), None)
+            except Exception as ex:
+                result = (item, None, ex)
+            if stats:
+                stats.addItemsDone(1, n_errors=0 if result[2] is None else 1, busy=time.perf_counter() - t0)
+            results.put(result)
+
+    def results(self) -> Iterator[Tuple[Any, Any, Optional[Exception]]]:
+        """
+        Starts the worker threads and returns the results in order of their completion.
+        Sets the task progress according to the number of processed items.
+        :return: iterator of (item, result, exception) tuples. exception is None if the function
+                 call succeeded, result is None otherwise.
+        """
+        n_total = len(self.mItems)
+        self.mNDone = 0
+        self.mStop.clear()
+        if n_total == 0:
+            return
+
+        items = queue.SimpleQueue()
+        for item in self.mItems:
+            items.put(item)
+        results = queue.Queue(maxsize=self.mMaxPending)
+
+        workers = [threading.Thread(target=self._work, args=(items, results), daemon=True)
+                   for _ in range(min(self.mThreads, n_total))]
+        if self.mStatsTask:
+            self.mStatsTask.setItemCount(n_total, n_workers=len(workers))
+        for worker in workers:
+            worker.start()
+
+        n_running = len(workers)
+        t0 = datetime.datetime.now()
+        try:
+            while n_running > 0:
+                result = results.get()
+                if result is _WORKER_DONE:
+                    n_running -= 1
+                    continue
+                self.mNDone += 1
+                if (t1 := datetime.datetime.now()) - t0 > self.mProgressInterval:
+                    self.mTask.setProgress(100 * self.mNDone / n_total)
+                    t0 = t1
+                yield result
+                if self.mTask.isCanceled():
+                    break
+        finally:
+            # stop the workers and release the ones waiting for a free result slot
+            self.mStop.set()
+            while n_running > 0:
+                if results.get() is _WORKER_DONE:
+                    n_running -= 1
+            for worker in workers:
+                worker.join()
+
+        if not self.mTask.isCanceled():
+            self.mTask.setProgress(100.0)
+
 
 class EOTSVTask(QgsTask):
+    """
+    Base class of EOTSV background tasks.
+
+    Tasks that process a list of items can report their progress with setItemCount(),
+    addItemsStarted(), addItemsDone() and addErrors(). The WorkStealingExecutor does this
+    automatically. The resulting statistics() are shown in the task performance dock.
+    GDAL I/O operations of the task are counted in ioStats(), if the accounting is enabled, see iostats.setEnabled().
+    """
+
     def __init__(self, *args, callback=None, info: dict = None, **kwds):
         super().__init__(*args, **kwds)
 
@@ -13,6 +174,92 @@ class EOTSVTask(QgsTask):
         self.mInfo = info.copy() if info else None
         self.mInitTime = datetime.datetime.now()
 
+        self.mStatsLock = threading.Lock()
+        self.mStartTime: Optional[datetime.datetime] = None
+        self.mEndTime: Optional[datetime.datetime] = None
+        self.mResult: Optional[bool] = None
+        self.mNItems: int = 0
+        self.mNStarted: int = 0
+        self.mNDone: int = 0
+        self.mNErrors: int = 0
+        self.mNWorkers: int = 1
+        self.mBusyTime: float = 0.0
+        self.mIOStats = iostats.IOStats()
+        self.begun.connect(self.markStarted, Qt.DirectConnection)
+
+    def markStarted(self):
+        """
+        Marks the start of the task execution. Called from the thread running the task.
+        """
+        with self.mStatsLock:
+            if self.mStartTime is None:
+                self.mStartTime = datetime.datetime.now()
+
+    def setItemCount(self, n_items: int, n_workers: int = 1):
+        """
+        Sets the number of items to process and the number of workers processing them.
+        Marks the start of the processing.
+        :param n_items: number of items
+        :param n_workers: number of worker threads or processes
+        """
+        with self.mStatsLock:
+            if self.mStartTime is None:
+                self.mStartTime = datetime.datetime.now()
+            self.mNItems = n_items
+            self.mNWorkers = max(1, n_workers)
+
+    def addItemsStarted(self, n: int = 1):
+        with self.mStatsLock:
+            self.mNStarted += n
+
+    def addItemsDone(self, n: int = 1, n_errors: int = 0, busy: float = 0.0):
+        """
+        Counts processed items
+        :param n: number of processed items
+        :param n_errors: number of items that failed
+        :param busy: seconds a worker spent on processing the items
+        """
+        with self.mStatsLock:
+            self.mNDone += n
+            self.mNErrors += n_errors
+            self.mBusyTime += busy
+
+    def ioStats(self) -> iostats.IOStats:
+        """
+        Returns the GDAL I/O operations of this task, collected in the worker threads of a
+        WorkStealingExecutor and in run_serial().
+        """
+        return self.mIOStats
+
+    def addErrors(self, n: int = 1):
+        with self.mStatsLock:
+            self.mNErrors += n
+
+    def statistics(self) -> Dict[str, Any]:
+        """
+        Returns the processing statistics of this task:
+        n_items, n_done, n_errors, n_workers, queue_depth (items not started yet), in_flight (items being processed),
+        duration [s], throughput [items/s], utilization (share of the time the workers were busy), canceled.
+        """
+        with self.mStatsLock:
+            start = self.mStartTime if self.mStartTime else self.mInitTime
+            end = self.mEndTime if self.mEndTime else datetime.datetime.now()
+            duration = max(0.0, (end - start).total_seconds())
+            n_done = self.mNDone
+            stats = {'n_items': self.mNItems,
+                     'n_done': n_done,
+                     'n_errors': self.mNErrors,
+                     'n_workers': self.mNWorkers,
+                     'queue_depth': max(0, self.mNItems - self.mNStarted),
+                     'in_flight': max(0, self.mNStarted - n_done),
+                     'duration': duration,
+                     'throughput': n_done / duration if duration > 0 else 0.0,
+                     'utilization': min(1.0, self.mBusyTime / (self.mNWorkers * duration)) if duration > 0 else 0.0,
+                     'canceled': self.isCanceled(),
+                     'result': self.mResult,
+                     }
+        return stats
+
     def setCallback(self, callback):
         self.mCallback = callback
 
@@ -28,6 +275,9 @@ class EOTSVTask(QgsTask):
         self._sub_tasks.append(subTask)
 
     def finished(self, result: bool):
+        with self.mStatsLock:
+            self.mEndTime = datetime.datetime.now()
+            self.mResult = result
         super().finished(result)
 
         if self.mCallback is not None:
@@ -41,7 +291,9 @@ class EOTSVTask(QgsTask):
         """
         for subTask in self._sub_tasks:
             subTask.run()
-        result = self.run()
+        self.markStarted()
+        with iostats.collect(self.mIOStats):
+            result = self.run()
         self.finished(result)
         return result
 
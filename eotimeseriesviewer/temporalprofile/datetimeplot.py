@@ -13,8 +13,7 @@ from eotimeseriesviewer.labeling.quicklabeling import addQuickLabelMenu
 from eotimeseriesviewer.qgispluginsupport.qps.plotstyling.plotstyling import PlotStyle
 from eotimeseriesviewer.qgispluginsupport.qps.pyqtgraph import pyqtgraph as pg
 from eotimeseriesviewer.qgispluginsupport.qps.pyqtgraph.pyqtgraph import PlotDataItem, ScatterPlotItem, SpotItem
-from eotimeseriesviewer.qgispluginsupport.qps.pyqtgraph.pyqtgraph.GraphicsScene.mouseEvents import HoverEvent, \
-    MouseClickEvent
+from eotimeseriesviewer.qgispluginsupport.qps.pyqtgraph.pyqtgraph.GraphicsScene.mouseEvents import MouseClickEvent
 from eotimeseriesviewer.qgispluginsupport.qps.pyqtgraph.pyqtgraph.graphicsItems.ViewBox.ViewBoxMenu import ViewBoxMenu
 from eotimeseriesviewer.qgispluginsupport.qps.utils import SpatialPoint
 from eotimeseriesviewer.temporalprofile.plotitems import MapDateRangeItem
@@ -24,7 +23,7 @@ from qgis.PyQt.QtGui import QAction, QClipboard, QColor
 from qgis.PyQt.QtGui import QPen
 from qgis.PyQt.QtWidgets import QDateTimeEdit, QFrame, QGraphicsItem, QGridLayout, QMenu, QRadioButton, QWidget, \
     QWidgetAction
-from qgis.core import QgsApplication, QgsVectorLayer
+from qgis.core import QgsApplication, QgsProject, QgsVectorLayer
 
 
 class DateTimePlotDataItem(pg.PlotDataItem):
@@ -40,6 +39,8 @@ class DateTimePlotDataItem(pg.PlotDataItem):
         super().__init__(*args, **kwds)
         self.mFeatureID = None
         self.mLayerId = None
+        # describes the data and settings the item was created from
+        self.mSignature: Optional[int] = None
         self.mTemporalProfile: Optional[dict] = None
         self.mObservationIndices: Optional[np.ndarray] = None
         self.mSelectedPoints: List[SpotItem] = []
@@ -103,29 +104,277 @@ class DateTimePlotDataItem(pg.PlotDataItem):
         self.mObservationIndices = obs_indices
 
 
+class DateTimePlotPointIndex(object):
+    """
+    A uniform grid index over the (timestamp, value) positions of plotted DateTimePlotDataItems.
+    Positions are indexed in pixel units, as the x and y axes use different scales.
+    The index is rebuilt lazily with the next query after the plot data or the view scaling has changed.
+    """
+
+    def __init__(self, cellSize: int = 16):
+        assert cellSize > 0
+        self.mCellSize: int = cellSize
+        self.mItems: List[PlotDataItem] = []
+
+        # view coordinates of all points and segments
+        self.mDataDirty: bool = True
+        self.mX: np.ndarray = np.empty(0)
+        self.mY: np.ndarray = np.empty(0)
+        self.mItemIndex: np.ndarray = np.empty(0, dtype=int)
+        self.mPointIndex: np.ndarray = np.empty(0, dtype=int)
+        self.mSegments: np.ndarray = np.empty((0, 4))
+        self.mSegmentItemIndex: np.ndarray = np.empty(0, dtype=int)
+        self.mSegmentXMin: np.ndarray = np.empty(0)
+        self.mSegmentMaxWidth: float = 0.0
+
+        # grid cells, in pixel units
+        self.mPixelSize: Optional[Tuple[float, float]] = None
+        self.mGridDirty: bool = True
+        self.mCellKeys: np.ndarray = np.empty(0, dtype=np.int64)
+        self.mCellOrder: np.ndarray = np.empty(0, dtype=int)
+        self.mCellYMin: int = 0
+        self.mCellYRange: int = 1
+
+    def setItems(self, items: Iterable[PlotDataItem]):
+        """
+        Sets the plot data items to index
+        """
+        self.mItems = list(items)
+        self.setDirty()
+
+    def items(self) -> List[PlotDataItem]:
+        return self.mItems[:]
+
+    def setDirty(self, *args):
+        """
+        Marks the plot data as changed. The index will be rebuilt with the next query.
+        """
+        self.mDataDirty = True
+        self.mGridDirty = True
+
+    def setPixelSize(self, dx: float, dy: float):
+        """
+        Sets the size of a screen pixel in view coordinates
+        """
+        pixelSize = (abs(float(dx)), abs(float(dy)))
+        if pixelSize != self.mPixelSize:
+            self.mPixelSize = pixelSize
+            self.mGridDirty = True
+
+    def __len__(self):
+        self._updateIndex()
+        return len(self.mX)
+
+    def _updateData(self):
+        if not self.mDataDirty:
+            return
+
+        all_x, all_y, all_item, all_point = [], [], [], []
+        all_segments, all_segment_items = [], []
+
+        for i, item in enumerate(self.mItems):
+            if not item.isVisible() or item.xData is None or item.yData is None:
+                continue
+            x = np.asarray(item.xData, dtype=float)
+            y = np.asarray(item.yData, dtype=float)
+            is_finite = np.isfinite(x) & np.isfinite(y)
+            indices = np.flatnonzero(is_finite)
+            if len(indices) == 0:
+                continue
+            all_x.append(x[indices])
+            all_y.append(y[indices])
+            all_item.append(np.full(len(indices), i))
+            all_point.append(indices)
+
+            # line segments between consecutive finite values
+            is_segment = is_finite[:-1] & is_finite[1:]
+            i0 = np.flatnonzero(is_segment)
+            if len(i0) > 0:
+                all_segments.append(np.column_stack((x[i0], y[i0], x[i0 + 1], y[i0 + 1])))
+                all_segment_items.append(np.full(len(i0), i))
+
+        if len(all_x) > 0:
+            self.mX = np.concatenate(all_x)
+            self.mY = np.concatenate(all_y)
+            self.mItemIndex = np.concatenate(all_item)
+            self.mPointIndex = np.concatenate(all_point)
+        else:
+            self.mX = np.empty(0)
+            self.mY = np.empty(0)
+            self.mItemIndex = np.empty(0, dtype=int)
+            self.mPointIndex = np.empty(0, dtype=int)
+
+        if len(all_segments) > 0:
+            segments = np.concatenate(all_segments)
+            segment_items = np.concatenate(all_segment_items)
+            # sort by the minimum x value to find candidate segments with a binary search
+            xmin = np.minimum(segments[:, 0], segments[:, 2])
+            order = np.argsort(xmin, kind='stable')
+            self.mSegments = segments[order]
+            self.mSegmentItemIndex = segment_items[order]
+            self.mSegmentXMin = xmin[order]
+            self.mSegmentMaxWidth = float(np.max(np.abs(segments[:, 2] - segments[:, 0])))
+        else:
+            self.mSegments = np.empty((0, 4))
+            self.mSegmentItemIndex = np.empty(0, dtype=int)
+            self.mSegmentXMin = np.empty(0)
+            self.mSegmentMaxWidth = 0.0
+
+        self.mDataDirty = False
+        self.mGridDirty = True
+
+    def _cells(self, x: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        dx, dy = self.mPixelSize
+        cx = np.floor(x / (dx * self.mCellSize)).astype(np.int64)
+        cy = np.floor(y / (dy * self.mCellSize)).astype(np.int64)
+        return cx, cy
+
+    def _updateIndex(self):
+        self._updateData()
+        if not self.mGridDirty or self.mPixelSize is None:
+            return
+
+        if len(self.mX) > 0:
+            cx, cy = self._cells(self.mX, self.mY)
+            self.mCellYMin = int(cy.min())
+            self.mCellYRange = int(cy.max()) - self.mCellYMin + 1
+            keys = cx * self.mCellYRange + (cy - self.mCellYMin)
+            self.mCellOrder = np.argsort(keys, kind='stable')
+            self.mCellKeys = keys[self.mCellOrder]
+        else:
+            self.mCellKeys = np.empty(0, dtype=np.int64)
+            self.mCellOrder = np.empty(0, dtype=int)
+        self.mGridDirty = False
+
+    def _candidatePoints(self, x: float, y: float, tolerance: float) -> np.ndarray:
+        """
+        Returns the positions of points in grid cells that intersect with the tolerance radius around x, y
+        """
+        self._updateIndex()
+        if len(self.mCellKeys) == 0 or self.mPixelSize is None:
+            return np.empty(0, dtype=int)
+
+        r = int(np.ceil(tolerance / self.mCellSize))
+        qx, qy = self._cells(np.asarray([x]), np.asarray([y]))
+        qx, qy = int(qx[0]), int(qy[0])
+        y0 = max(qy - r - self.mCellYMin, 0)
+        y1 = min(qy + r - self.mCellYMin, self.mCellYRange - 1)
+        if y0 > y1:
+            return np.empty(0, dtype=int)
+
+        slices = []
+        for cx in range(qx - r, qx + r + 1):
+            k0 = cx * self.mCellYRange + y0
+            k1 = cx * self.mCellYRange + y1
+            i0 = np.searchsorted(self.mCellKeys, k0, side='left')
+            i1 = np.searchsorted(self.mCellKeys, k1, side='right')
+            if i1 > i0:
+                slices.append(self.mCellOrder[i0:i1])
+        if len(slices) == 0:
+            return np.empty(0, dtype=int)
+        return np.concatenate(slices)
+
+    def pointsNear(self, x: float, y: float, tolerance: float = 5) -> List[Tuple[PlotDataItem, int, float]]:
+        """
+        Returns the closest point of each plot data item within the tolerance distance
+        :param x: x position in view coordinates
+        :param y: y position in view coordinates
+        :param tolerance: tolerance distance in pixels
+        :return: list of (plot data item, data index, distance in pixel), sorted by distance
+        """
+        candidates = self._candidatePoints(x, y, tolerance)
+        if len(candidates) == 0:
+            return []
+        dx, dy = self.mPixelSize
+        dist = np.hypot((self.mX[candidates] - x) / dx, (self.mY[candidates] - y) / dy)
+        is_near = dist <= tolerance
+        candidates, dist = candidates[is_near], dist[is_near]
+
+        results = []
+        items_done = set()
+        for i in np.argsort(dist, kind='stable'):
+            c = candidates[i]
+            i_item = int(self.mItemIndex[c])
+            if i_item not in items_done:
+                items_done.add(i_item)
+                results.append((self.mItems[i_item], int(self.mPointIndex[c]), float(dist[i])))
+        return results
+
+    def nearestPoint(self, x: float, y: float, tolerance: float = 5) -> Optional[Tuple[PlotDataItem, int]]:
+        """
+        Returns the plot data item and data index of the point closest to x, y
+        :param x: x position in view coordinates
+        :param y: y position in view coordinates
+        :param tolerance: tolerance distance in pixels
+        :return: (plot data item, data index) or None
+        """
+        results = self.pointsNear(x, y, tolerance=tolerance)
+        if len(results) > 0:
+            return results[0][0], results[0][1]
+        return None
+
+    def nearestCurve(self, x: float, y: float, tolerance: float = 5) -> Optional[PlotDataItem]:
+        """
+        Returns the plot data item with the line segment closest to x, y
+        :param x: x position in view coordinates
+        :param y: y position in view coordinates
+        :param tolerance: tolerance distance in pixels
+        :return: plot data item or None
+        """
+        self._updateIndex()
+        if len(self.mSegments) == 0 or self.mPixelSize is None:
+            return None
+        dx, dy = self.mPixelSize
+        tx = tolerance * dx
+
+        # segments with xmin in [x - max. segment width - tolerance, x + tolerance]
+        xmin = self.mSegmentXMin
+        i0 = np.searchsorted(xmin, x - self.mSegmentMaxWidth - tx, side='left')
+        i1 = np.searchsorted(xmin, x + tx, side='right')
+        if i1 <= i0:
+            return None
+        segments = self.mSegments[i0:i1]
+
+        # distance in pixel units
+        x0, y0 = (segments[:, 0] - x) / dx, (segments[:, 1] - y) / dy
+        x1, y1 = (segments[:, 2] - x) / dx, (segments[:, 3] - y) / dy
+        vx, vy = x1 - x0, y1 - y0
+        vv = vx * vx + vy * vy
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = np.where(vv > 0, -(x0 * vx + y0 * vy) / vv, 0.0)
+        t = np.clip(t, 0.0, 1.0)
+        dist = np.hypot(x0 + t * vx, y0 + t * vy)
+        i = int(np.argmin(dist))
+        if dist[i] <= tolerance:
+            return self.mItems[int(self.mSegmentItemIndex[i0 + i])]
+        return None
+
+
 class DateTimePlotItem(pg.PlotItem):
-    pdiPointsHovered = pyqtSignal(object, object, object)
-    pdiPointsClicked = pyqtSignal(object, object, object)
-    pdiCurveClicked = pyqtSignal(object, object)
 
     def __init__(self, *args, **kwds):
         super().__init__(*args, **kwds)
 
-        self.mPlotDataControllerModel: DPDIControllerModel = DPDIControllerModel()
+        # the model is destroyed with this plot item, which stops its background threads
+        self.mPlotDataControllerModel: DPDIControllerModel = DPDIControllerModel(self)
         self.mPlotDataControllerModel.modelUpdated.connect(self.updateDerivedItems)
+        self.mPlotDataControllerModel.derivedItemsReady.connect(self.onDerivedItemsReady)
 
         self.mSelectionTolerance: int = 3
         self.mDerivedItems = list()
 
+        # index to find the points and curves under the mouse cursor
+        self.mPointIndex = DateTimePlotPointIndex()
+        self.mPointIndexItemsChanged: bool = True
+
     def addItem(self, item, *args, **kwds):
         super().addItem(item, *args, **kwds)
 
         if isinstance(item, DateTimePlotDataItem):
             self.mPlotDataControllerModel.mExamplePDI = item
-            item.setCurveClickable(True, self.mSelectionTolerance)
-            item.scatter.sigHovered.connect(self.pdiPointsHovered)
-            item.scatter.sigClicked.connect(self.pdiPointsClicked)
-            item.sigClicked.connect(self.pdiCurveClicked)
+            item.sigPlotChanged.connect(self.mPointIndex.setDirty)
+            item.visibleChanged.connect(self.mPointIndex.setDirty)
+            self.mPointIndexItemsChanged = True
 
     def addDerivedItem(self, item):
         self.mDerivedItems.append(item)
@@ -136,6 +385,17 @@ class DateTimePlotItem(pg.PlotItem):
             if isinstance(item, DateTimePlotDataItem) and item not in self.mDerivedItems:
                 yield item
 
+    def pointIndex(self) -> DateTimePlotPointIndex:
+        """
+        Returns the index of plotted points, scaled to the current view range.
+        """
+        if self.mPointIndexItemsChanged:
+            self.mPointIndex.setItems(self.dateTimePlotDataItems())
+            self.mPointIndexItemsChanged = False
+        dx, dy = self.vb.viewPixelSize()
+        self.mPointIndex.setPixelSize(dx, dy)
+        return self.mPointIndex
+
     def updateDerivedItems(self):
 
         for item in self.mDerivedItems:
@@ -152,19 +412,38 @@ class DateTimePlotItem(pg.PlotItem):
         for item in derived_items:
             self.addDerivedItem(item)
 
+    def onDerivedItemsReady(self, parent: PlotDataItem, derived_items: List[PlotDataItem]):
+        """
+        Adds derived items that have been calculated in background
+        """
+        if parent in self.items:
+            for item in derived_items:
+                self.addDerivedItem(item)
+
     def removeItem(self, item):
         super().removeItem(item)
+        if isinstance(item, DateTimePlotDataItem):
+            self.mPointIndexItemsChanged = True
+            # derived items are not connected to the point index
+            for signal in [item.sigPlotChanged, item.visibleChanged]:
+                try:
+                    signal.disconnect(self.mPointIndex.setDirty)
+                except TypeError:
+                    pass
         for c in self.mPlotDataControllerModel.controllers():
             for d in c.derivedPlotDataItems(item):
                 self.removeItem(d)
 
     def setSelectionTolerance(self, margin: int):
+        """
+        Sets the distance in pixels in which points and curves can be selected
+        """
         assert isinstance(margin, int)
         assert margin >= 0
         self.mSelectionTolerance = margin
-        for item in self.items:
-            if item.curveClickable():
-                item.setCurveClickable(True, margin)
+
+    def selectionTolerance(self) -> int:
+        return self.mSelectionTolerance
 
 
 class DateTimeViewBox(pg.ViewBox):
@@ -412,9 +691,6 @@ class DateTimePlotWidget(pg.PlotWidget):
         self.mDateTimeViewBox = viewBox
         # self.setCentralItem(self.plotItem)
         # self.xAxisInitialized = False
-        self.plotItem.pdiPointsHovered.connect(self.onPointsHovered)
-        self.plotItem.pdiPointsClicked.connect(self.onPointsClicked)
-        self.plotItem.pdiCurveClicked.connect(self.onCurveClicked)
 
         pi: DateTimePlotItem = self.getPlotItem()
         pi.getAxis('bottom').setLabel('Date')
@@ -443,7 +719,6 @@ class DateTimePlotWidget(pg.PlotWidget):
         self.mInfoLabelCursor.setColor(QColor('yellow'))
         self.mInfoHover = pg.TextItem(text='', anchor=QPointF(0.0, 0.0))
         self.mInfoHover.setZValue(9999999)
-        self.mHoverHTML: Dict[SpotItem, str] = dict()
         self.scene().addItem(self.mInfoLabelCursor)
         self.scene().addItem(self.mInfoHover)
         pi = self.getPlotItem()
@@ -457,9 +732,16 @@ class DateTimePlotWidget(pg.PlotWidget):
         pi.addItem(self.mCrosshairLineH, ignoreBounds=True)
         pi.addItem(self.mMapDateRangeItem, ignoreBounds=True)
 
+        # highlights the hovered profile points
+        self.mHoverTolerance: int = 6
+        self.mHoverSpots = pg.ScatterPlotItem(pxMode=True, size=10, pen=pg.mkPen('yellow', width=2), brush=None)
+        self.mHoverSpots.setZValue(9999999)
+        pi.vb.addItem(self.mHoverSpots, ignoreBounds=True)
+
         assert isinstance(self.scene(), pg.GraphicsScene)
         self.mSignalProxyMouseMoved = pg.SignalProxy(self.scene().sigMouseMoved, rateLimit=60, slot=self.onMouseMoved2D)
-        self.mHoveredPositions: Dict[str, List[Tuple[DateTimePlotDataItem, SpotItem]]] = dict()
+        self.scene().sigMouseClicked.connect(self.onSceneMouseClicked)
+        self.mHoveredPoints: List[Tuple[DateTimePlotDataItem, int]] = []
         self.mClickedPositions: Dict[Tuple, Tuple[DateTimePlotDataItem, int]] = dict()
 
         self.mFeaturesToSelect = dict()
@@ -473,48 +755,42 @@ class DateTimePlotWidget(pg.PlotWidget):
     def resetViewBox(self):
         self.plotItem.getViewBox().autoRange()
 
-    def onPointsHovered(self, item: ScatterPlotItem, points: List[SpotItem], event: HoverEvent, **kwarg):
-        s = ""
-        # print(item)
-        # print(event)
-        # info = f'{event.enter} {event.exit} {len(points)}'
-        # self.mPlotWidget.mInfoHover.setHtml(info)
-        # return
-
-        if event.isExit():
-            self.mHoverHTML.clear()
-            self.mInfoHover.setHtml('')
-        else:
-            parent = item.parentItem()
-            if isinstance(parent, DateTimePlotDataItem):
-                if len(points) > 0:
-                    for spot in points:
-                        pos = spot.pos()
-                        x = pos.x()
-                        y = pos.y()
-
-                        dtg = datetime.fromtimestamp(x).isoformat()
-                        dtg = ImageDateUtils.shortISODateString(dtg)
-                        txt = f'<i>{parent.name()}</i><br>[{spot.index()}] {dtg}, {y}'
-                        self.mHoverHTML[parent] = txt
-                else:
-                    if parent in self.mHoverHTML:
-                        self.mHoverHTML.pop(parent)
+    def updateHoverInfo(self, x: float, y: float):
+        """
+        Shows the values of the profile points next to the view position x, y
+        :param x: x position in view coordinates
+        :param y: y position in view coordinates
+        """
+        index = self.plotItem.pointIndex()
+        tolerance = max(self.mHoverTolerance, self.plotItem.selectionTolerance())
+        self.mHoveredPoints = [(pdi, i) for pdi, i, _ in index.pointsNear(x, y, tolerance=tolerance)]
 
         n_max = 5
         html = []
-        for i, txt in enumerate(self.mHoverHTML.values()):
-            if i == n_max:
+        for j, (pdi, i) in enumerate(self.mHoveredPoints):
+            if j == n_max:
                 html.append('...')
                 break
-            else:
-                html.append(txt)
+            dtg = datetime.fromtimestamp(pdi.xData[i]).isoformat()
+            dtg = ImageDateUtils.shortISODateString(dtg)
+            html.append(f'<i>{pdi.name()}</i><br>[{i}] {dtg}, {pdi.yData[i]}')
         self.mInfoLabelCursor.setHtml('<br>'.join(html))
 
-    def hoveredPointItems(self) -> Iterable[Tuple[DateTimePlotDataItem, SpotItem]]:
-        for values in self.mHoveredPositions.values():
-            for (pdi, spotItem) in values:
-                yield pdi, spotItem
+        self.mHoverSpots.setData(x=[pdi.xData[i] for pdi, i in self.mHoveredPoints],
+                                 y=[pdi.yData[i] for pdi, i in self.mHoveredPoints])
+
+    def clearHoverInfo(self):
+        if len(self.mHoveredPoints) > 0:
+            self.mHoveredPoints.clear()
+            self.mInfoLabelCursor.setHtml('')
+            self.mHoverSpots.clear()
+
+    def hoveredPointItems(self) -> Iterable[Tuple[DateTimePlotDataItem, int]]:
+        """
+        Returns the plot data items and data indices of the points next to the mouse cursor
+        """
+        for (pdi, i) in self.mHoveredPoints:
+            yield pdi, i
 
     def selectedPlotDataItems(self) -> Generator[DateTimePlotDataItem, Any, None]:
         """
@@ -531,6 +807,36 @@ class DateTimePlotWidget(pg.PlotWidget):
             if isinstance(item, DateTimePlotDataItem) and item.hasSelectedPoints():
                 yield item
 
+    def onSceneMouseClicked(self, event: MouseClickEvent):
+        """
+        Selects the profile points and curves under the mouse cursor
+        """
+        if event.button() != Qt.LeftButton or event.double():
+            return
+
+        vb = self.plotItem.vb
+        pos = event.scenePos()
+        if not vb.sceneBoundingRect().contains(pos):
+            return
+
+        pt = vb.mapSceneToView(pos)
+        index = self.plotItem.pointIndex()
+        tolerance = self.plotItem.selectionTolerance()
+
+        point = index.nearestPoint(pt.x(), pt.y(), tolerance=max(tolerance, self.mHoverTolerance))
+        if point:
+            pdi, i = point
+            # the scatter plot might not contain non-finite values, so we match the spot position
+            x, y = pdi.xData[i], pdi.yData[i]
+            spots = [p for p in pdi.scatter.points() if p.pos().x() == x and p.pos().y() == y]
+            self.onPointsClicked(pdi.scatter, spots[0:1], event)
+
+        curve = index.nearestCurve(pt.x(), pt.y(), tolerance=tolerance)
+        if curve is None and point:
+            curve = point[0]
+        if isinstance(curve, DateTimePlotDataItem):
+            self.onCurveClicked(curve, event)
+
     def onPointsClicked(self, item: ScatterPlotItem, array: np.ndarray, event: MouseClickEvent):
 
         parent = item.parentItem()
@@ -589,13 +895,13 @@ class DateTimePlotWidget(pg.PlotWidget):
         hovered_layers = []
         dtg = None
 
-        for (item, spotItem) in self.hoveredPointItems():
-            if dtg is None:
-                i = item.mObservationIndices[spotItem.index()]
+        for (item, index) in self.hoveredPointItems():
+            if dtg is None and isinstance(item.mTemporalProfile, dict):
+                i = item.mObservationIndices[index]
                 dtg = item.mTemporalProfile[TemporalProfileUtils.Date][i]
                 dtg = ImageDateUtils.datetime(dtg)
 
-            lyr = item.mLayer()
+            lyr = QgsProject.instance().mapLayer(item.mLayerId) if item.mLayerId else None
             if isinstance(lyr, QgsVectorLayer) and lyr not in hovered_layers:
                 hovered_layers.append(lyr)
             s = ""
@@ -623,7 +929,7 @@ class DateTimePlotWidget(pg.PlotWidget):
         selected0 = self.selectedFeatures()
         selectedPDIs0 = list(self.selectedPlotDataItems())
 
-        parentItem = item.parentItem()
+        parentItem = item if isinstance(item, DateTimePlotDataItem) else item.parentItem()
         if isinstance(parentItem, DateTimePlotDataItem):
             is_ctrl = bool(QgsApplication.instance().keyboardModifiers() & Qt.ControlModifier)
             if is_ctrl:
@@ -671,6 +977,8 @@ class DateTimePlotWidget(pg.PlotWidget):
             self.mCrosshairLineV.setVisible(b)
             self.mCrosshairLineV.setPos(mousePoint.x())
             self.mCrosshairLineH.setPos(mousePoint.y())
+
+            self.updateHoverInfo(x, y)
         else:
             self.hideInfoItems()
 
@@ -681,6 +989,7 @@ class DateTimePlotWidget(pg.PlotWidget):
         self.mCrosshairLineH.setVisible(False)
         self.mCrosshairLineV.setVisible(False)
         self.mInfoLabelCursor.setVisible(False)
+        self.clearHoverInfo()
 
     def leaveEvent(self, ev):
         super().leaveEvent(ev)
@@ -689,6 +998,7 @@ class DateTimePlotWidget(pg.PlotWidget):
         self.mCrosshairLineH.setVisible(False)
         self.mCrosshairLineV.setVisible(False)
         self.mInfoLabelCursor.setVisible(False)
+        self.clearHoverInfo()
 
 
 class DateTimeAxis(pg.DateAxisItem):
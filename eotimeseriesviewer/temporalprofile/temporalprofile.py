@@ -5,7 +5,7 @@ import os.path
 import re
 import types
 import warnings
-from datetime import datetime, timedelta
+from datetime import datetime
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple, Union
 from uuid import uuid4
@@ -14,18 +14,20 @@ import numpy as np
 from osgeo import gdal, osr
 from osgeo.ogr import OGRERR_NONE
 
+from eotimeseriesviewer import iostats
 from eotimeseriesviewer.dateparser import ImageDateUtils
+from eotimeseriesviewer.instrumentation import addBytes, timed
 from eotimeseriesviewer.qgispluginsupport.qps.qgisenums import QMETATYPE_QSTRING, QMETATYPE_QVARIANTMAP
 from eotimeseriesviewer.qgispluginsupport.qps.unitmodel import UnitLookup
 from eotimeseriesviewer.sensors import sensorIDFromLayer, create_sensor_id
-from eotimeseriesviewer.spectralindices import spectral_index_acronyms, spectral_indices
-from eotimeseriesviewer.tasks import EOTSVTask
+from eotimeseriesviewer.spectralindices import spectral_index, spectral_index_acronyms, spectral_index_formula
+from eotimeseriesviewer.tasks import EOTSVTask, WorkStealingExecutor
 from qgis.PyQt.QtCore import NULL, pyqtSignal, QAbstractListModel, QModelIndex, QSortFilterProxyModel, Qt, QVariant
 from qgis.PyQt.QtGui import QIcon
 from qgis.PyQt.QtWidgets import QComboBox, QGroupBox, QHBoxLayout, QLabel, QVBoxLayout, QWidget
 from qgis.core import Qgis, QgsApplication, QgsCoordinateReferenceSystem, QgsCoordinateTransform, QgsEditorWidgetSetup, \
     QgsFeature, QgsField, QgsFieldFormatter, QgsFieldFormatterRegistry, QgsFields, QgsIconUtils, QgsMapLayer, \
-    QgsMapLayerModel, QgsPointXY, QgsProject, QgsRasterDataProvider, QgsRasterLayer, QgsTask, QgsVectorFileWriter, \
+    QgsMapLayerModel, QgsPointXY, QgsProject, QgsRasterDataProvider, QgsRasterLayer, QgsVectorFileWriter, \
     QgsVectorLayer
 from qgis.gui import QgsEditorConfigWidget, QgsEditorWidgetFactory, QgsEditorWidgetRegistry, QgsEditorWidgetWrapper, \
     QgsGui
@@ -507,11 +509,6 @@ class TemporalProfileUtils(object):
         """
         n, nb = bandData.shape
         band_lookup: dict[str, int] = sensor_specs.get('band_lookup', {})
-        index_descriptions = spectral_indices()
-
-        acronyms = spectral_index_acronyms()
-        constants = acronyms['constants']
-        band_identifier = acronyms['band_identifier']
 
         if isinstance(expr, str) and re.match(r'^\d+$', expr):
             expr = int(expr)
@@ -523,10 +520,9 @@ class TemporalProfileUtils(object):
         elif isinstance(expr, str):
             if expr in band_lookup:
                 return bandData[:, band_lookup[expr]]
-            elif expr in index_descriptions:
-                index_info: dict = index_descriptions[expr]
+            elif (index_info := spectral_index(expr)) is not None:
                 required_bands = index_info['bands']
-                formula = index_info['formula']
+                constants = spectral_index_acronyms()['constants']
                 # get spectral index values
 
                 params = {}
@@ -538,7 +534,7 @@ class TemporalProfileUtils(object):
                     else:
                         return np.ones(n) * np.nan
 
-                return eval(formula, {}, params)
+                return eval(spectral_index_formula(expr), {}, params)
             else:
                 return np.ones(n) * np.nan
                 # s = ""
@@ -752,24 +748,38 @@ class TemporalProfileUtils(object):
         return lyr
 
 
-class LoadTemporalProfileSubTask(QgsTask):
+class LoadTemporalProfileTask(EOTSVTask):
+    interimResults = pyqtSignal(dict)
     executed = pyqtSignal(bool, list)
 
-    def __init__(self, sources, points, crs, *args, api: str = 'gdal', **kwds):
+    def __init__(self,
+                 sources: List[Union[str, Path]],
+                 points: List[QgsPointXY],
+                 crs: QgsCoordinateReferenceSystem,
+                 info: dict = None,
+                 loader: str = 'gdal',
+                 save_sources: bool = False,
+                 n_threads: int = 4,
+                 *args, **kwds):
         super().__init__(*args, **kwds)
+        assert n_threads >= 0
+        assert loader in ['gdal', 'qgis']
+        self.mInfo = info.copy() if isinstance(info, dict) else None
+        self.mSources: List[str] = [Path(s).as_posix() for s in sources]
+        self.mPoints = [QgsPointXY(p) for p in points]
+        self.nTotal = len(self.mSources)
+        self.mLoader = loader
+        self.nThreads = n_threads
+        self.mCrs = QgsCoordinateReferenceSystem(crs)
 
-        assert api in ['gdal', 'qgis']
-
-        self.sources = [str(s) for s in sources]
-        self.points = [QgsPointXY(p) for p in points]
-        self.crs = QgsCoordinateReferenceSystem(crs)
-        self.duration = None
-        self.results = []
-        self.api: str = api
+        self.mErrors = None
+        self.mProfiles = None
+        self.mSaveSources = save_sources
 
-    def canCancel(self):
-        return True
+    def profilePoints(self) -> List[QgsPointXY]:
+        return self.mPoints
 
+    @timed()
     def loadFromSourceGDAL(self,
                            source: str,
                            points: List[Tuple],
@@ -777,7 +787,7 @@ class LoadTemporalProfileSubTask(QgsTask):
 
         error = None
         try:
-            ds: gdal.Dataset = gdal.Open(source)
+            ds: gdal.Dataset = iostats.openDataset(source)
             assert isinstance(ds, gdal.Dataset), f'Unable to open {source} as gdal.Dataset'
 
             no_data_values = [ds.GetRasterBand(b + 1).GetNoDataValue() for b in range(ds.RasterCount)]
@@ -819,7 +829,9 @@ class LoadTemporalProfileSubTask(QgsTask):
                 if success:
                     px_x, px_y = int(math.floor(px[0])), math.floor(px[1])
                     if 0 <= px_x < ds.RasterXSize and 0 <= px_y < ds.RasterYSize:
-                        pv = ds.ReadAsArray(px_x, px_y, 1, 1).flatten().tolist()
+                        array = iostats.readAsArray(ds, px_x, px_y, 1, 1, source=source)
+                        addBytes(array.nbytes)
+                        pv = array.flatten().tolist()
                         # set no-data values to None
                         pv = [None if nd == pv else pv for nd, pv in zip(no_data_values, pv)]
 
@@ -834,6 +846,7 @@ class LoadTemporalProfileSubTask(QgsTask):
 
         return results, error
 
+    @timed()
     def loadFromSourceQgsMapLayer(self,
                                   source: str,
                                   points: List[QgsPointXY],
@@ -900,126 +913,57 @@ class LoadTemporalProfileSubTask(QgsTask):
 
         return results, error
 
+    def canCancel(self):
+        return True
+
     def run(self) -> bool:
 
-        if self.api == 'gdal':
+        # create an empty temporal profile for each point
+        temporal_profiles: List[dict] = [TemporalProfileUtils.createEmptyProfile() for _ in self.mPoints]
+        if self.mSaveSources:
+            for tp in temporal_profiles:
+                tp[TemporalProfileUtils.Source] = []
+
+        errors = []
+        if self.mLoader == 'gdal':
             # use GDAL only to open files and read profiles
             # convert CRS to gdal.SpatialReference
             # and QgsPointXY to coordinate tuples
-            crs = self.crs
+            crs = self.mCrs
             wkt = crs.toWkt(Qgis.CrsWktVariant.PreferredGdal)
             srs = osr.SpatialReference()
             srs.ImportFromWkt(wkt)
             assert srs.Validate() == OGRERR_NONE
             if crs.axisOrdering()[0] == Qgis.CrsAxisDirection.North:
-                pts = [(p.y(), p.x()) for p in self.points]
+                pts = [(p.y(), p.x()) for p in self.mPoints]
             else:
-                pts = [(p.x(), p.y()) for p in self.points]
+                pts = [(p.x(), p.y()) for p in self.mPoints]
 
-            loader = lambda src, *args, _points=pts, _srs=srs: (
-                self.loadFromSourceGDAL(src, _points, _srs))
+            loader = lambda src, _points=pts, _srs=srs: self.loadFromSourceGDAL(src, _points, _srs)
 
-        elif self.api == 'qgis':
+        elif self.mLoader == 'qgis':
 
-            loader = self.loadFromSourceQgsMapLayer
+            loader = lambda src: self.loadFromSourceQgsMapLayer(src, self.mPoints, self.mCrs)
         else:
             return False
 
-        t0 = datetime.now()
-        n = len(self.sources)
-
-        for i, source in enumerate(self.sources):
-            result, error = loader(source, self.points, self.crs)
-
-            result = {'source': source,
-                      'data': result,
-                      'error': error}
-
-            self.results.append(result)
+        results: List[dict] = []
+        executor = WorkStealingExecutor(self, loader, self.mSources,
+                                        n_threads=self.nThreads,
+                                        progress_interval=2)
+        for source, result, ex in executor.results():
+            data, error = result if ex is None else (None, str(ex))
+            if error and ex is None:
+                self.addErrors()
+            results.append({'source': source,
+                            'data': data,
+                            'error': error})
 
-            t1 = datetime.now()
-            if (t1 - t0).total_seconds() > 2:
-                t0 = t1
-                self.setProgress((i + 1) / n * 100)
-                if self.isCanceled():
-                    return False
-
-        self.duration = datetime.now() - t0
-        self.executed.emit(True, self.results.copy())
-        return True
-
-
-class LoadTemporalProfileTask(EOTSVTask):
-    interimResults = pyqtSignal(dict)
-    executed = pyqtSignal(bool, list)
-
-    def __init__(self,
-                 sources: List[Union[str, Path]],
-                 points: List[QgsPointXY],
-                 crs: QgsCoordinateReferenceSystem,
-                 info: dict = None,
-                 loader: str = 'gdal',
-                 save_sources: bool = False,
-                 n_threads: int = 4,
-                 *args, **kwds):
-        super().__init__(*args, **kwds)
-        assert n_threads >= 0
-        assert loader in ['gdal', 'qgis']
-        self.mInfo = info.copy() if isinstance(info, dict) else None
-        self.mSources: List[str] = [Path(s).as_posix() for s in sources]
-        self.mPoints = [QgsPointXY(p) for p in points]
-        self.nTotal = len(self.mSources)
-        self.mLoader = loader
-        self.nThreads = n_threads
-        badge_size = math.ceil(self.nTotal / n_threads)
-        self.mCrs = QgsCoordinateReferenceSystem(crs)
-
-        self.nFinished = 0
-
-        self.mProgressInterval = timedelta(seconds=2)
-        self.mSubTaskResults: List[dict] = []
-        self.mErrors = None
-        self.mProfiles = None
-        self.mSubTaskErrors = []
-        self.mSaveSources = save_sources
-
-        added = []
-        badge = []
-        for i, src in enumerate(sources):
-            badge.append(src)
-            if len(badge) >= badge_size or i == self.nTotal - 1:
-                subTask = LoadTemporalProfileSubTask(badge, points, crs, api=self.mLoader,
-                                                     description=self.description())
-                subTask.executed.connect(self.subTaskExecuted)
-                self.addSubTask(subTask, subTaskDependency=QgsTask.SubTaskDependency.ParentDependsOnSubTask)
-                added.extend(badge)
-                badge.clear()
-
-    def profilePoints(self) -> List[QgsPointXY]:
-        return self.mPoints
-
-    def subTaskExecuted(self, success: bool, results: List[Dict]):
-        self.mSubTaskResults.extend(results)
-
-    def canCancel(self):
-        return True
-
-    def run(self) -> bool:
-
-        # create an empty temporal profile for each point
-        temporal_profiles: List[dict] = [TemporalProfileUtils.createEmptyProfile() for _ in self.mPoints]
-        if self.mSaveSources:
-            for tp in temporal_profiles:
-                tp[TemporalProfileUtils.Source] = []
-
-        n_total = len(self.mSources)
-
-        errors = []
         if self.isCanceled():
             return False
 
-        # add subtask results to temporal profiles
-        for i, src_results in enumerate(self.mSubTaskResults):
+        # add source results to temporal profiles
+        for src_results in results:
 
             error = src_results.get('error')
             data = src_results.get('data')
@@ -0,0 +1,33 @@
+# NAME: batch user function
+# CONTRACT: batch
+import numpy as np
+
+global timestamps, values, offsets, names
+assert isinstance(values, np.ndarray)
+assert isinstance(offsets, np.ndarray)
+# timestamps = time stamps of all profiles, float
+# values = profile values of all profiles, e.g., calculated NDVI values
+# offsets = the i-th profile is values[offsets[i]:offsets[i + 1]]
+# names = the names of all profiles
+
+# this example scales each profile to a value range of 0 to 1,
+# using a single vectorized call for all profiles
+n_values = np.diff(offsets)
+starts = offsets[:-1][n_values > 0]
+vmin = np.repeat(np.minimum.reduceat(values, starts), n_values[n_values > 0])
+vmax = np.repeat(np.maximum.reduceat(values, starts), n_values[n_values > 0])
+vrange = np.where(vmax > vmin, vmax - vmin, 1)
+
+results = {
+    'values': (values - vmin) / vrange,
+    'pen': 'yellow',
+}
+
+# `results` needs to be a dictionary with:
+#   required:
+#    'values' - the derived values of all profiles, as ragged array
+#   optional:
+#    'timestamps' - the time stamps of the derived values. Defaults to the input time stamps
+#    'offsets' - the offsets of the derived profiles. Defaults to the input offsets
+#    'names' - a name for each derived profile
+#    style properties like 'pen', 'symbol', 'symbolPen' or 'symbolSize' that apply to all derived profiles
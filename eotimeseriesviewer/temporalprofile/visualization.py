@@ -18,11 +18,12 @@
  *                                                                         *
  ***************************************************************************/
 """
+import json
 import logging
 import os
 import sys
 from itertools import chain
-from typing import Dict, List, Optional, Tuple, Union
+from typing import Dict, List, Optional, Set, Tuple, Union
 
 import numpy as np
 
@@ -30,22 +31,23 @@ from eotimeseriesviewer import DIR_UI
 from eotimeseriesviewer.timeseries.timeseries import TimeSeries
 from qgis.PyQt.QtCore import QMetaObject
 from qgis.PyQt.QtCore import pyqtSignal, QAbstractItemModel, QDateTime, QItemSelectionModel, QModelIndex, QObject, \
-    QPoint, Qt
+    QPoint, Qt, QTimer
 from qgis.PyQt.QtGui import QColor, QPen
 from qgis.PyQt.QtWidgets import QAction, QMenu, QProgressBar, QSlider, QTableView, QToolButton, QWidgetAction
 from qgis.core import QgsApplication, QgsCoordinateTransform, QgsExpression, QgsExpressionContext, \
     QgsExpressionContextUtils, QgsFeature, QgsFeatureRequest, QgsField, QgsFields, QgsGeometry, QgsMapLayer, QgsPointXY, \
-    QgsProject, QgsTaskManager, QgsVectorLayer, QgsVectorLayerUtils
+    QgsProject, QgsRectangle, QgsTaskManager, QgsVectorLayer, QgsVectorLayerUtils
 from qgis.gui import QgsDockWidget, QgsFilterLineEdit
 from .datetimeplot import DateTimePlotDataItem, DateTimePlotWidget
 from .plotsettings import PlotSettingsProxyModel, PlotSettingsTreeModel, PlotSettingsTreeView, \
     PlotSettingsTreeViewDelegate, TPVisGroup
 from .temporalprofile import LoadTemporalProfileTask, TemporalProfileUtils
+from ..instrumentation import timed
 from ..qgispluginsupport.qps.plotstyling.plotstyling import PlotStyle
 from ..qgispluginsupport.qps.pyqtgraph import pyqtgraph as pg
 from ..qgispluginsupport.qps.pyqtgraph.pyqtgraph import mkBrush, mkPen, SignalProxy
 from ..qgispluginsupport.qps.signalproxy import SignalProxyUndecorated
-from ..qgispluginsupport.qps.utils import loadUi, SpatialPoint
+from ..qgispluginsupport.qps.utils import loadUi, SpatialExtent, SpatialPoint
 from ..qgispluginsupport.qps.vectorlayertools import VectorLayerTools
 from ..sensors import SensorInstrument
 from ..utils import addFeatures, doEdit
@@ -190,6 +192,7 @@ class TemporalProfileVisualization(QObject):
 
         self.mLastStyle: dict = dict()
         self.mLastSettings: dict = dict()
+        self.mLastPlotSettings: dict = dict()
         self.mTasks: List[LoadTemporalProfileTask] = list()
         self.mIsInitialized: bool = False
 
@@ -199,6 +202,20 @@ class TemporalProfileVisualization(QObject):
 
         self.mShowSelectedOnly = False
 
+        # plot data items shown in the plot, with key = (visualization index, layer id, feature id)
+        self.mPlotDataItems: Dict[Tuple[int, str, int], DateTimePlotDataItem] = dict()
+
+        # features which have been added, changed or deleted since the last plot update
+        self.mDirtyFeatures: Dict[str, Set[int]] = dict()
+        self.mDirtyFeaturesTimer = QTimer()
+        self.mDirtyFeaturesTimer.setSingleShot(True)
+        self.mDirtyFeaturesTimer.setInterval(int(1000 / 60))
+        self.mDirtyFeaturesTimer.timeout.connect(self.updateDirtyFeatures)
+
+        # change counters of features and layers. Used to decide if a plot item can be reused.
+        self.mFeatureRevisions: Dict[Tuple[str, int], int] = dict()
+        self.mLayerRevisions: Dict[str, int] = dict()
+
     def flushSignals(self):
         """
         Flush task and signals. Useful for debugging and testing.
@@ -209,6 +226,8 @@ class TemporalProfileVisualization(QObject):
             for proxySignal in proxySignals:
                 if isinstance(proxySignal, SignalProxy):
                     proxySignal.flush()
+        if self.mDirtyFeaturesTimer.isActive():
+            self.updateDirtyFeatures()
         s = ""
 
     def removeAllLayerConnections(self):
@@ -233,6 +252,9 @@ class TemporalProfileVisualization(QObject):
 
             self.mLayerConnectionSignalProxys.pop(lid)
 
+        self.mLayerRevisions.pop(lid, None)
+        self.mFeatureRevisions = {k: v for k, v in self.mFeatureRevisions.items() if k[0] != lid}
+
         # to_remove = [l for l in self.mLayerConnections if l.id() == lid]
 
         # for l in to_remove:
@@ -261,13 +283,19 @@ class TemporalProfileVisualization(QObject):
                     # lyr.featureAdded.connect(lambda *args: self.updatePlot()),
                     # lyr.featureDeleted.connect(lambda *args: self.updatePlot()),
                     # lyr.rendererChanged.connect(lambda *args: self.updatePlot()),
-                    SignalProxy(lyr.attributeValueChanged, rateLimit=rl, slot=lambda *args: self.updatePlot()),
+                    # feature changes are collected and update the affected plot items only
+                    lyr.attributeValueChanged.connect(
+                        lambda fid, *args, _lid=lid: self.setFeaturesDirty(_lid, [fid])),
+                    lyr.featureAdded.connect(lambda fid, *args, _lid=lid: self.setFeaturesDirty(_lid, [fid])),
+                    lyr.featureDeleted.connect(lambda fid, *args, _lid=lid: self.setFeaturesDirty(_lid, [fid])),
+                    # changes without feature ids, e.g., a reload or the rollback of edits
+                    lyr.dataChanged.connect(lambda *args, _lid=lid: self.setLayerDirty(_lid)),
+                    lyr.editingStopped.connect(lambda *args, _lid=lid: self.setLayerDirty(_lid)),
                     SignalProxyUndecorated(lyr.selectionChanged, rateLimit=rl,
                                            slot=self.onLayerFeatureSelectionChanged),
-                    SignalProxyUndecorated(lyr.selectionChanged, rateLimit=rl, slot=lambda: self.updatePlot()),
-                    SignalProxyUndecorated(lyr.featureAdded, rateLimit=rl, slot=lambda: self.updatePlot()),
-                    SignalProxyUndecorated(lyr.featureDeleted, rateLimit=rl, slot=lambda: self.updatePlot()),
+                    SignalProxyUndecorated(lyr.selectionChanged, rateLimit=rl, slot=lambda: self.updateSelection()),
                     SignalProxyUndecorated(lyr.rendererChanged, rateLimit=rl, slot=lambda: self.updatePlot()),
+                    SignalProxyUndecorated(lyr.editingStopped, rateLimit=rl, slot=lambda: self.updatePlot()),
 
                 ]
                 self.mLayerConnectionSignalProxys[lid] = proxies
@@ -413,7 +441,11 @@ class TemporalProfileVisualization(QObject):
                         'lid': layer.id(),
                         'field': field,
                         }
-            task = LoadTemporalProfileTask(ts.sourceUris(),
+            # read from sources that cover the profile locations only
+            extent = SpatialExtent(layer.crs(), QgsRectangle(min(p.x() for p in points), min(p.y() for p in points),
+                                                             max(p.x() for p in points), max(p.y() for p in points)))
+            sources = [tss.source() for tss in ts.querySources(extent=extent)]
+            task = LoadTemporalProfileTask(sources,
                                            points=points,
                                            crs=layer.crs(),
                                            n_threads=min(6, os.cpu_count(), ),
@@ -497,7 +529,7 @@ class TemporalProfileVisualization(QObject):
                                     else:
                                         any_change = True
                 if any_change:
-                    self.updatePlot()
+                    self.updatePlot(fids={lid: fids})
 
                 logger.debug(f'Loaded temporal profile: {task.info()}')
             except Exception as ex:
@@ -638,11 +670,77 @@ class TemporalProfileVisualization(QObject):
             if update_heavy:
                 self.updatePlot(settings)
 
-    def updatePlot(self, settings: dict = None):
+    def setFeaturesDirty(self, lid: str, fids: List[int]):
+        """
+        Marks features as changed. Their plot items will be updated with the next call of updateDirtyFeatures.
+        :param lid: layer id
+        :param fids: list of feature ids
+        """
+        self.mDirtyFeatures.setdefault(lid, set()).update(fids)
+        for fid in fids:
+            key = (lid, fid)
+            self.mFeatureRevisions[key] = self.mFeatureRevisions.get(key, 0) + 1
+        if not self.mDirtyFeaturesTimer.isActive():
+            self.mDirtyFeaturesTimer.start()
+
+    def setLayerDirty(self, lid: str):
+        """
+        Marks all features of a layer as changed. Their plot items will be re-created with the next plot update.
+        :param lid: layer id
+        """
+        self.mLayerRevisions[lid] = self.mLayerRevisions.get(lid, 0) + 1
+
+    def updateDirtyFeatures(self):
+        """
+        Updates the plot items of features that have been added, changed or deleted.
+        """
+        self.mDirtyFeaturesTimer.stop()
+        if len(self.mDirtyFeatures) > 0:
+            fids = {lid: list(dirty) for lid, dirty in self.mDirtyFeatures.items()}
+            self.mDirtyFeatures.clear()
+            self.updatePlot(fids=fids)
+
+    def updateSelection(self):
+        """
+        Updates the selection state of the plotted profiles without re-creating them.
+        """
+        if self.showSelectedOnly():
+            # the set of profiles to show has changed
+            self.updatePlot()
+            return
+
+        project = self.project()
+        selected_fids: Dict[str, Set[int]] = dict()
+        for (i, lid, fid), pdi in self.mPlotDataItems.items():
+            if lid not in selected_fids:
+                lyr = project.mapLayer(lid)
+                if isinstance(lyr, QgsVectorLayer):
+                    selected_fids[lid] = set(lyr.selectedFeatureIds())
+                else:
+                    selected_fids[lid] = set()
+            pdi.setSelected(fid in selected_fids[lid])
+
+    def plotDataItems(self) -> List[DateTimePlotDataItem]:
+        """
+        Returns the DateTimePlotDataItems that show the temporal profiles
+        """
+        return list(self.mPlotDataItems.values())
 
+    @timed()
+    def updatePlot(self, settings: dict = None, fids: Optional[Dict[str, List[int]]] = None):
+        """
+        Updates the plot. Plot items are only re-created for features whose profile data, candidate state
+        or visualization settings have changed. Other plot items are kept and only their selection state is updated.
+        :param settings: visualization settings. Defaults to the current settings.
+        :param fids: optional dictionary {layer id: [feature ids]} to update the plot items of these features only.
+        """
         if settings is None:
             settings = self.settings()
 
+        if fids is not None and settings != self.mLastPlotSettings:
+            # visualization settings have changed, all items might need to be updated
+            fids = None
+
         # print('# Update plot')
 
         errors = dict()
@@ -674,10 +772,21 @@ class TemporalProfileVisualization(QObject):
 
         antialias = settingsValue('general/antialias', False)
 
-        new_plotitems = []
+        old_plotitems = self.mPlotDataItems
+        if fids is None:
+            new_plotitems: Dict[Tuple[int, str, int], DateTimePlotDataItem] = dict()
+        else:
+            fids = {lid: set(v) for lid, v in fids.items()}
+            # keep the items of all features that are not to be updated
+            new_plotitems = {k: pdi for k, pdi in old_plotitems.items()
+                             if not (k[1] in fids and k[2] in fids[k[1]])}
+
         project = self.project()
         PROFILE_CANDIDATES = self.profileCandidates()
 
+        # general settings that require a re-creation of all plot items
+        general_key = json.dumps(settings.get('general', {}), sort_keys=True, default=str)
+
         # collects information required to calculate the x and y values for each sensor
         # using use-defined expressions
 
@@ -706,6 +815,16 @@ class TemporalProfileVisualization(QObject):
             if vis_field not in lyr.fields().names():
                 continue
 
+            if fids is None:
+                vis_fids = None
+            else:
+                vis_fids = fids.get(lyr.id())
+                if not vis_fids:
+                    # nothing to update for this visualization
+                    continue
+
+            vis_key = json.dumps(vis, sort_keys=True, default=str)
+
             VIS_PROFILE_CANDIDATES: List[int] = PROFILE_CANDIDATES.get((lyr.id(), vis_field), [])
             layers.append(lyr)
 
@@ -720,26 +839,42 @@ class TemporalProfileVisualization(QObject):
             context.appendScope(QgsExpressionContextUtils.layerScope(lyr))
             request.setExpressionContext(context)
 
-            if len(VIS_PROFILE_CANDIDATES) > 0:
+            vis_candidates = VIS_PROFILE_CANDIDATES
+            if vis_fids is not None:
+                vis_candidates = [fid for fid in VIS_PROFILE_CANDIDATES if fid in vis_fids]
+
+            if len(vis_candidates) > 0:
                 requestCandidates = QgsFeatureRequest()
                 requestCandidates.setExpressionContext(QgsExpressionContext(context))
-                requestCandidates.setFilterFids(VIS_PROFILE_CANDIDATES)
+                requestCandidates.setFilterFids(vis_candidates)
                 candidateFeatures = lyr.getFeatures(requestCandidates)
             else:
                 candidateFeatures = []
 
             filter_expression = vis.get('filter')
+            feature_filter: Optional[QgsExpression] = None
             if filter_expression and filter_expression != '':
                 # print(f'# SET FEATURE FILTER {filter_expression}')
-                request.setFilterExpression(filter_expression)
+                if vis_fids is None:
+                    request.setFilterExpression(filter_expression)
+                else:
+                    # a fid filter replaces the filter expression, so we need to evaluate it for each feature
+                    feature_filter = QgsExpression(filter_expression)
+                    feature_filter.prepare(context)
 
             layer_line_style: PlotStyle = PlotStyle.fromMap(vis['line_style'])
 
             # LUT_SENSOR = {s['sensor_id']: s for s in vis['sensors']}
             selected_fids: List[int] = lyr.selectedFeatureIds()
             if self.showSelectedOnly():
-                request.setFilterFids(selected_fids)
+                if vis_fids is None:
+                    request.setFilterFids(selected_fids)
+                else:
+                    request.setFilterFids([fid for fid in selected_fids if fid in vis_fids])
                 selected_fids.clear()
+            elif vis_fids is not None:
+                request.setFilterFids(list(vis_fids))
+            selected_fids = set(selected_fids)
 
             BAND_EXPRESSIONS = dict()
             SENSOR_VISUALS = dict()
@@ -759,6 +894,21 @@ class TemporalProfileVisualization(QObject):
                 feature_context = QgsExpressionContext(context)
                 feature_context.setFeature(feature)
 
+                if isinstance(feature_filter, QgsExpression) and not is_candidate:
+                    if not feature_filter.evaluate(feature_context):
+                        continue
+
+                # reuse the existing plot item if nothing has changed
+                item_key = (i, lyr.id(), feature.id())
+                signature = hash((general_key, vis_key, is_candidate,
+                                  self.mLayerRevisions.get(lyr.id(), 0),
+                                  self.mFeatureRevisions.get((lyr.id(), feature.id()), 0)))
+                pdi = old_plotitems.get(item_key)
+                if isinstance(pdi, DateTimePlotDataItem) and pdi.mSignature == signature:
+                    pdi.setSelected(feature.id() in selected_fids)
+                    new_plotitems[item_key] = pdi
+                    continue
+
                 attributeMap: dict = feature.attributeMap()
                 tpData = TemporalProfileUtils.profileDict(attributeMap.get(vis_field))
                 if not isinstance(tpData, dict):
@@ -882,7 +1032,6 @@ class TemporalProfileVisualization(QObject):
                                                symbolSize=all_symbol_sizes.tolist(),
                                                symbolPen=all_symbol_pens.tolist(),
                                                symbolBrush=all_symbol_brushes.tolist(),
-                                               hoverable=True,
                                                pxMode=True,
                                                antialias=antialias,
                                                )
@@ -892,9 +1041,7 @@ class TemporalProfileVisualization(QObject):
                     # print(f'#PDI={pdi}')
                     pdi.setTemporalProfile(tpData, results['indices'])
 
-                    pdi.scatter.opts['hoverable'] = True
-                    pdi.scatter.setData(hoverSize=all_symbol_sizes[0] + 2,
-                                        hoverPen=mkPen('yellow'))
+                    # hovered points are resolved and highlighted by the DateTimePlotWidget point index
                     # pdi.scatter.opts['hoverSymbol'] = all_symbols
                     # pdi.scatter.opts['hoverSymbolSize'] = all_symbol_sizes + 2
                     # pdi.scatter.opts['hoverPen'] = QPen(QColor('yellow'))
@@ -916,17 +1063,26 @@ class TemporalProfileVisualization(QObject):
                     # pdi.sigPointsClicked.connect(self.mPlotWidget.onPointsClicked)
                     # pdi.sigPointsHovered.connect(self.mPlotWidget.onPointsHovered)
                     # pdi.sigClicked.connect(self.mPlotWidget.onCurveClicked)
-                    new_plotitems.append(pdi)
-
-        self.mPlotWidget.plotItem.clearPlots()
-        # self.mPlotWidget.mLegendItem1.clear()
-        for item in new_plotitems:
-            # item.scatter.sigHovered.connect(self.mPlotWidget.onPointsHovered)
-            # item.scatter.sigClicked.connect(self.mPlotWidget.onPointsClicked)
-            # item.sigClicked.connect(self.itemClicked)
-            # item.sigPointsHovered.connect(self.pointsHovered)
-            self.mPlotWidget.plotItem.addItem(item)
-            # self.mPlotWidget.mLegendItem1.addLegend(item)
+                    pdi.mSignature = signature
+                    new_plotitems[item_key] = pdi
+
+        # remove outdated items and add new items only
+        plotItem = self.mPlotWidget.plotItem
+        for k, pdi in old_plotitems.items():
+            if new_plotitems.get(k) is not pdi:
+                plotItem.removeItem(pdi)
+
+        for k, pdi in new_plotitems.items():
+            if old_plotitems.get(k) is not pdi:
+                # item.scatter.sigHovered.connect(self.mPlotWidget.onPointsHovered)
+                # item.scatter.sigClicked.connect(self.mPlotWidget.onPointsClicked)
+                # item.sigClicked.connect(self.itemClicked)
+                # item.sigPointsHovered.connect(self.pointsHovered)
+                plotItem.addItem(pdi)
+                # self.mPlotWidget.mLegendItem1.addLegend(item)
+
+        self.mPlotDataItems = new_plotitems
+        self.mLastPlotSettings = settings
 
         if len(errors) > 0:
             info = ['TemporalProfile plotting errors:']
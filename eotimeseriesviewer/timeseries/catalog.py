@@ -0,0 +1,253 @@
+from typing import Dict, Iterable, List, Optional, Union
+
+import numpy as np
+
+from eotimeseriesviewer.qgispluginsupport.qps.utils import SpatialExtent
+from eotimeseriesviewer.sensors import SensorInstrument
+from eotimeseriesviewer.timeseries.source import crsFromWkt, TimeSeriesSource
+from qgis.PyQt.QtCore import QDateTime
+from qgis.core import QgsCoordinateReferenceSystem, QgsCoordinateTransform, QgsProject, QgsRectangle
+
+
+class TimeSeriesCatalog(object):
+    """
+    A columnar index of TimeSeriesSources. Observation times, sensors, CRS, extents and visibility
+    of all sources are stored in numpy arrays, which allows vectorized queries on large time series.
+    Each source is stored in a row. Rows of removed sources are marked as invalid until the catalog
+    gets compacted.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        assert capacity > 0
+        self.mSources: List[Optional[TimeSeriesSource]] = []
+        self.mRows: Dict[str, int] = dict()
+
+        self.mSensors: List[SensorInstrument] = []
+        self.mSensorIndex: Dict[SensorInstrument, int] = dict()
+        self.mCrsKeys: List[str] = []
+        self.mCrsIndex: Dict[str, int] = dict()
+
+        self.mN: int = 0
+        self.mNRemoved: int = 0
+        self._allocate(capacity)
+
+    def _allocate(self, capacity: int):
+        self.mDTG = np.zeros(capacity, dtype=np.int64)
+        self.mSensor = np.zeros(capacity, dtype=np.int32)
+        self.mCrs = np.zeros(capacity, dtype=np.int32)
+        self.mBounds = np.zeros((capacity, 4), dtype=np.float64)
+        self.mBoundsWGS84 = np.zeros((capacity, 4), dtype=np.float64)
+        self.mVisible = np.zeros(capacity, dtype=bool)
+        self.mValid = np.zeros(capacity, dtype=bool)
+
+    def _reserve(self, n: int):
+        """
+        Ensures that n more rows can be added
+        """
+        capacity = len(self.mDTG)
+        if self.mN + n <= capacity:
+            return
+        new_capacity = max(2 * capacity, self.mN + n)
+        for name in ['mDTG', 'mSensor', 'mCrs', 'mBounds', 'mBoundsWGS84', 'mVisible', 'mValid']:
+            old = getattr(self, name)
+            new = np.zeros((new_capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.mN] = old[:self.mN]
+            setattr(self, name, new)
+
+    def __len__(self) -> int:
+        return self.mN - self.mNRemoved
+
+    def __contains__(self, item: Union[str, TimeSeriesSource]) -> bool:
+        if isinstance(item, TimeSeriesSource):
+            item = item.source()
+        return item in self.mRows
+
+    def clear(self):
+        self.mSources.clear()
+        self.mRows.clear()
+        self.mSensors.clear()
+        self.mSensorIndex.clear()
+        self.mCrsKeys.clear()
+        self.mCrsIndex.clear()
+        self.mN = 0
+        self.mNRemoved = 0
+        self.mValid[:] = False
+
+    def _sensorIndex(self, sensor: SensorInstrument) -> int:
+        i = self.mSensorIndex.get(sensor)
+        if i is None:
+            i = len(self.mSensors)
+            self.mSensors.append(sensor)
+            self.mSensorIndex[sensor] = i
+        return i
+
+    def _crsIndex(self, crsKey: str) -> int:
+        i = self.mCrsIndex.get(crsKey)
+        if i is None:
+            i = len(self.mCrsKeys)
+            self.mCrsKeys.append(crsKey)
+            self.mCrsIndex[crsKey] = i
+        return i
+
+    def addSources(self, sources: Iterable[TimeSeriesSource], sensors: Iterable[SensorInstrument]):
+        """
+        Adds sources to the catalog
+        :param sources: list of TimeSeriesSources
+        :param sensors: list with the SensorInstrument of each source
+        """
+        sources = list(sources)
+        sensors = list(sensors)
+        assert len(sources) == len(sensors)
+        self._reserve(len(sources))
+
+        i = self.mN
+        for tss, sensor in zip(sources, sensors):
+            uri = tss.source()
+            if uri in self.mRows:
+                continue
+            self.mRows[uri] = i
+            self.mSources.append(tss)
+            self.mDTG[i] = tss.mDTG
+            self.mSensor[i] = self._sensorIndex(sensor)
+            self.mCrs[i] = self._crsIndex(tss.mCrsKey)
+            self.mBounds[i] = tss.mExtent
+            self.mBoundsWGS84[i] = tss.mExtentWGS84
+            self.mVisible[i] = tss.isVisible()
+            self.mValid[i] = True
+            i += 1
+        self.mN = i
+
+    def removeSources(self, sources: Iterable[Union[str, TimeSeriesSource]]):
+        """
+        Removes sources from the catalog
+        :param sources: list of TimeSeriesSources or source uris
+        """
+        for uri in sources:
+            if isinstance(uri, TimeSeriesSource):
+                uri = uri.source()
+            i = self.mRows.pop(uri, None)
+            if i is not None:
+                self.mValid[i] = False
+                self.mSources[i] = None
+                self.mNRemoved += 1
+
+        if self.mNRemoved > 1024 and self.mNRemoved > 0.5 * self.mN:
+            self.compact()
+
+    def compact(self):
+        """
+        Removes the rows of removed sources
+        """
+        rows = np.flatnonzero(self.mValid[:self.mN])
+        n = len(rows)
+        for name in ['mDTG', 'mSensor', 'mCrs', 'mBounds', 'mBoundsWGS84', 'mVisible', 'mValid']:
+            array = getattr(self, name)
+            array[:n] = array[rows]
+        self.mValid[n:] = False
+        self.mSources = [self.mSources[i] for i in rows]
+        self.mRows = {tss.source(): i for i, tss in enumerate(self.mSources)}
+        self.mN = n
+        self.mNRemoved = 0
+
+    def setVisible(self, source: Union[str, TimeSeriesSource], b: bool):
+        if isinstance(source, TimeSeriesSource):
+            source = source.source()
+        i = self.mRows.get(source)
+        if i is not None:
+            self.mVisible[i] = b
+
+    def query(self,
+              start: Optional[QDateTime] = None,
+              end: Optional[QDateTime] = None,
+              sensors: Optional[List[Union[str, SensorInstrument]]] = None,
+              visible: Optional[bool] = None,
+              extent: Optional[Union[SpatialExtent, QgsRectangle]] = None) -> np.ndarray:
+        """
+        Returns the rows of all sources that match the query
+        :param start: minimum observation time
+        :param end: maximum observation time
+        :param sensors: list of sensors or sensor ids
+        :param visible: True to return visible sources only, False to return hidden sources only
+        :param extent: extent the source bounding boxes need to intersect with. QgsRectangles are
+                       expected to be in EPSG:4326.
+        :return: numpy array with row indices
+        """
+        n = self.mN
+        mask = self.mValid[:n].copy()
+        if isinstance(start, QDateTime):
+            mask &= self.mDTG[:n] >= start.toMSecsSinceEpoch()
+        if isinstance(end, QDateTime):
+            mask &= self.mDTG[:n] <= end.toMSecsSinceEpoch()
+        if sensors is not None:
+            indices = [i for i, s in enumerate(self.mSensors) if s in sensors or s.id() in sensors]
+            mask &= np.isin(self.mSensor[:n], indices)
+        if visible is not None:
+            mask &= self.mVisible[:n] == visible
+        if extent is not None:
+            if isinstance(extent, SpatialExtent):
+                extent = extent.toCrs(QgsCoordinateReferenceSystem('EPSG:4326'))
+            bounds = self.mBoundsWGS84[:n]
+            mask &= ((bounds[:, 0] <= extent.xMaximum()) & (bounds[:, 2] >= extent.xMinimum())
+                     & (bounds[:, 1] <= extent.yMaximum()) & (bounds[:, 3] >= extent.yMinimum()))
+        return np.flatnonzero(mask)
+
+    def rows(self, sources: Iterable[Union[str, TimeSeriesSource]]) -> np.ndarray:
+        """
+        Returns the rows of sources
+        """
+        rows = []
+        for uri in sources:
+            if isinstance(uri, TimeSeriesSource):
+                uri = uri.source()
+            if (i := self.mRows.get(uri)) is not None:
+                rows.append(i)
+        return np.asarray(rows, dtype=int)
+
+    def sources(self, rows: Optional[np.ndarray] = None) -> List[TimeSeriesSource]:
+        """
+        Returns the sources of the given rows. Returns all sources by default.
+        """
+        if rows is None:
+            rows = self.query()
+        return [self.mSources[i] for i in rows]
+
+    def uris(self, rows: Optional[np.ndarray] = None) -> List[str]:
+        """
+        Returns the source uris of the given rows. Returns all source uris by default.
+        """
+        return [tss.source() for tss in self.sources(rows)]
+
+    def sensor(self, row: int) -> SensorInstrument:
+        return self.mSensors[self.mSensor[row]]
+
+    def spatialExtent(self,
+                      rows: Optional[np.ndarray] = None,
+                      crs: Optional[QgsCoordinateReferenceSystem] = None) -> Optional[SpatialExtent]:
+        """
+        Returns the extent of the sources in the given rows. Source extents are combined for each source CRS
+        and transformed into the target CRS afterward.
+        :param rows: rows to return the extent for. All rows by default.
+        :param crs: target CRS. Defaults to the CRS of the first source.
+        :return: SpatialExtent
+        """
+        if rows is None:
+            rows = self.query()
+        if len(rows) == 0:
+            return None
+        if crs is None:
+            crs = crsFromWkt(self.mCrsKeys[self.mCrs[rows[0]]])
+
+        extent = None
+        context = QgsProject.instance().transformContext()
+        crs_indices = self.mCrs[rows]
+        for i_crs in np.unique(crs_indices):
+            bounds = self.mBounds[rows[crs_indices == i_crs]]
+            rect = QgsRectangle(bounds[:, 0].min(), bounds[:, 1].min(), bounds[:, 2].max(), bounds[:, 3].max())
+            src_crs = crsFromWkt(self.mCrsKeys[i_crs])
+            if src_crs != crs:
+                rect = QgsCoordinateTransform(src_crs, crs, context).transformBoundingBox(rect)
+            if extent is None:
+                extent = SpatialExtent(crs, rect)
+            else:
+                extent.combineExtentWith(rect)
+        return extent
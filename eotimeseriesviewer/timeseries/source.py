@@ -1,12 +1,16 @@
 import json
+import sys
 from pathlib import Path
-from typing import Iterator, List, Optional, Tuple, Union
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 
 from osgeo import gdal
 
+from eotimeseriesviewer import iostats
 from eotimeseriesviewer.dateparser import DateTimePrecision, ImageDateUtils
+from eotimeseriesviewer.instrumentation import timed
 from eotimeseriesviewer.qgispluginsupport.qps.utils import SpatialExtent, px2geo
-from eotimeseriesviewer.sensors import create_sensor_id, SensorInstrument
+from eotimeseriesviewer.sensors import cachedSensorId, create_sensor_id, internSensorId, SensorInstrument
+from eotimeseriesviewer.sourceinfo import GDAL_METADATA_OPEN_OPTIONS, gdalOpenMetadataOnly  # noqa: F401
 from qgis.PyQt.QtCore import QMetaType, QPoint
 from qgis.PyQt.QtCore import QObject
 from qgis.PyQt.QtCore import pyqtSignal, QDate, QDateTime, QMimeData, Qt
@@ -19,6 +23,83 @@ class TimeSeriesException(Exception):
     pass
 
 
+# caches to reuse CRS and coordinate transformations for sources with the same CRS
+_CRS_CACHE: Dict[str, QgsCoordinateReferenceSystem] = dict()
+_WGS84_TRANSFORM_CACHE: Dict[str, QgsCoordinateTransform] = dict()
+
+
+def crsFromWkt(wkt: str) -> QgsCoordinateReferenceSystem:
+    """
+    Returns the QgsCoordinateReferenceSystem for a WKT string. CRS are created only once for the same WKT.
+    :param wkt: str
+    :return: QgsCoordinateReferenceSystem
+    """
+    crs = _CRS_CACHE.get(wkt)
+    if crs is None:
+        crs = QgsCoordinateReferenceSystem(wkt)
+        _CRS_CACHE[wkt] = crs
+    return QgsCoordinateReferenceSystem(crs)
+
+
+# authorities whose ids can be restored on other machines. Other ids, like USER:100000, are local only
+CRS_KEY_AUTHORITIES = ('EPSG', 'ESRI', 'IAU', 'OGC')
+
+
+def crsKey(crs: QgsCoordinateReferenceSystem) -> str:
+    """
+    Returns an interned string to restore a QgsCoordinateReferenceSystem with crsFromWkt,
+    i.e. the authority id of a standard authority or, if not available, the WKT.
+    :param crs: QgsCoordinateReferenceSystem
+    :return: str
+    """
+    key = crs.authid()
+    if not key.split(':')[0].upper().startswith(CRS_KEY_AUTHORITIES):
+        key = crs.toWkt()
+    key = sys.intern(key)
+    if key not in _CRS_CACHE:
+        _CRS_CACHE[key] = QgsCoordinateReferenceSystem(crs)
+    return key
+
+
+def transformToWGS84(crs: QgsCoordinateReferenceSystem) -> QgsCoordinateTransform:
+    """
+    Returns a QgsCoordinateTransform from crs to EPSG:4326. Transforms are created only once for the same CRS.
+    :param crs: QgsCoordinateReferenceSystem
+    :return: QgsCoordinateTransform
+    """
+    key = crsKey(crs)
+    transform = _WGS84_TRANSFORM_CACHE.get(key)
+    if transform is None:
+        transform = QgsCoordinateTransform(crs, QgsCoordinateReferenceSystem('EPSG:4326'),
+                                           QgsProject.instance().transformContext())
+        _WGS84_TRANSFORM_CACHE[key] = transform
+    return QgsCoordinateTransform(transform)
+
+
+def extentToWGS84(crs: QgsCoordinateReferenceSystem, extent: QgsRectangle) -> QgsGeometry:
+    """
+    Returns the extent polygon transformed to EPSG:4326
+    :param crs: QgsCoordinateReferenceSystem of the extent
+    :param extent: QgsRectangle
+    :return: QgsGeometry
+    """
+    g = QgsGeometry.fromRect(extent)
+    assert g.transform(transformToWGS84(crs)) == Qgis.GeometryOperationResult.Success
+    return g
+
+
+def utcOffset(dtg: QDateTime) -> Optional[int]:
+    """
+    Returns the offset in seconds to restore the time spec of a QDateTime with QDateTime.fromMSecsSinceEpoch,
+    or None, if the QDateTime is in local time.
+    :param dtg: QDateTime
+    :return: int or None
+    """
+    if dtg.timeSpec() == Qt.LocalTime:
+        return None
+    return dtg.offsetFromUtc()
+
+
 def datasetExtent(ds: gdal.Dataset) -> Tuple[QgsCoordinateReferenceSystem, QgsGeometry]:
     """
     Returns the CRS and the extent as QgsGeometry of a gdal.Dataset
@@ -26,15 +107,24 @@ def datasetExtent(ds: gdal.Dataset) -> Tuple[QgsCoordinateReferenceSystem, QgsGe
     :return:
     """
     assert isinstance(ds, gdal.Dataset)
+    crs = crsFromWkt(ds.GetProjectionRef())
+    extent = geoTransformExtent(ds.GetGeoTransform(), ds.RasterXSize, ds.RasterYSize)
+    return crs, extent
+
 
-    gt = ds.GetGeoTransform()
+def geoTransformExtent(gt: List[float], ns: int, nl: int) -> QgsGeometry:
+    """
+    Returns the extent of a raster as QgsGeometry
+    :param gt: GDAL geotransform
+    :param ns: number of samples
+    :param nl: number of lines
+    :return: QgsGeometry
+    """
     ul = px2geo(QPoint(0, 0), gt, pxCenter=False)
-    ur = px2geo(QPoint(ds.RasterXSize, 0), gt, pxCenter=False)
-    lr = px2geo(QPoint(ds.RasterXSize, ds.RasterYSize), gt, pxCenter=False)
-    ll = px2geo(QPoint(0, ds.RasterYSize), gt, pxCenter=False)
-    crs = QgsCoordinateReferenceSystem(ds.GetProjectionRef())
-    extent = QgsGeometry.fromPolygonXY([[ul, ur, lr, ll, ul]])
-    return crs, extent
+    ur = px2geo(QPoint(ns, 0), gt, pxCenter=False)
+    lr = px2geo(QPoint(ns, nl), gt, pxCenter=False)
+    ll = px2geo(QPoint(0, nl), gt, pxCenter=False)
+    return QgsGeometry.fromPolygonXY([[ul, ur, lr, ll, ul]])
 
 
 class TimeSeriesSource(object):
@@ -52,6 +142,10 @@ class TimeSeriesSource(object):
     MKeyExtent = 'extent'
     MKeyIsVisible = 'visible'
 
+    # fields written by asValues(), in order
+    VALUE_FIELDS = ('source', 'name', 'provider', 'sensor', 'dtg', 'utc_offset', 'dims', 'crs', 'extent',
+                    'extent_wgs84', 'visible')
+
     @classmethod
     def fromMimeData(cls, mimeData: QMimeData) -> List['TimeSeriesSource']:
         sources = []
@@ -118,7 +212,9 @@ class TimeSeriesSource(object):
                         name: Optional[str] = None) -> 'TimeSeriesSource':
 
         if isinstance(ds, (str, Path)):
-            ds = gdal.Open(str(ds))
+            path = str(ds)
+            ds = gdalOpenMetadataOnly(path)
+            assert isinstance(ds, gdal.Dataset), f'Unable to open {path} as gdal.Dataset'
 
         assert isinstance(ds, gdal.Dataset), f'Unable to open {ds} as gdal.Dataset'
 
@@ -146,6 +242,34 @@ class TimeSeriesSource(object):
         )
         return tss
 
+    @classmethod
+    def fromSourceInfo(cls, info: dict) -> 'TimeSeriesSource':
+        """
+        Creates a TimeSeriesSource from the metadata returned by sourceinfo.readSourceInfo.
+        The source is opened again only if its date cannot be read from the file name or the
+        date-time metadata, or if its sensor id is unknown.
+        :param info: dict
+        :return: TimeSeriesSource
+        """
+        path = info['source']
+        sid = cachedSensorId(info['fingerprint'])
+        iostats.countCacheLookup(sid is not None, source=path)
+        dtg = ImageDateUtils.dateTimeFromFilenameAndMetadata(path, info.get('dtg_values', []))
+        if sid is None or dtg is None:
+            return cls.fromGDALDataset(path)
+
+        nb, nl, ns = info['dims']
+        return TimeSeriesSource(
+            source=path,
+            dtg=dtg,
+            sid=sid,
+            dims=[nb, nl, ns],
+            crs=crsFromWkt(info['wkt']),
+            extent=geoTransformExtent(info['gt'], ns, nl),
+            provider='gdal',
+            name=Path(path).name
+        )
+
     @classmethod
     def fromQgsRasterLayer(cls,
                            layer: QgsRasterLayer,
@@ -177,6 +301,7 @@ class TimeSeriesSource(object):
         return tss
 
     @classmethod
+    @timed()
     def create(cls, source: Union[QgsRasterLayer, str, Path]) -> 'TimeSeriesSource':
         """
         Reads the argument and returns a TimeSeriesSource
@@ -195,13 +320,18 @@ class TimeSeriesSource(object):
     FIELDS.append(QgsField(MKeySensor, QMetaType.QString))
     FIELDS.append(QgsField(MKeyDateTime, QMetaType.QDateTime))
 
+    # TimeSeriesSources are kept in memory for each image of a time series. Therefore, they store
+    # only plain python values. CRS, QgsGeometry and QgsFeature objects are created on request.
+    __slots__ = ('mSource', 'mName', 'mProvider', 'mSid', 'mDims', 'mCrsKey', 'mExtent', 'mExtentWGS84',
+                 'mDTG', 'mDTGOffset', 'mIsVisible', 'mTimeSeriesDate', '__weakref__')
+
     def __init__(self,
                  source: str,
                  dtg: Union[str, QDateTime],
                  sid: str,
                  dims: List[int],
                  crs: Union[str, QgsCoordinateReferenceSystem],
-                 extent: Union[str, QgsGeometry],
+                 extent: Union[str, QgsGeometry, QgsRectangle],
                  provider: str = 'gdal',
                  name: Optional[str] = None):
         """
@@ -210,14 +340,14 @@ class TimeSeriesSource(object):
         :param sid: sensor id
         :param dims: source dimensions (nb, nl, ns)
         :param crs: source native coordinate reference system
-        :param extent: the raster extent in source CRS. Should be as precise as possible.
+        :param extent: the raster extent in source CRS.
         :param provider: QgsRasterLayer provider, defaults to 'gdal'
         :param name: name of source
         """
 
         dtg = ImageDateUtils.datetime(dtg)
         if isinstance(crs, str):
-            crs = QgsCoordinateReferenceSystem(crs)
+            crs = crsFromWkt(crs)
         if isinstance(extent, str):
             extent = QgsGeometry.fromWkt(extent)
 
@@ -225,43 +355,50 @@ class TimeSeriesSource(object):
         assert isinstance(source, str) and len(source) > 0
         assert isinstance(dtg, QDateTime) and dtg.isValid()
         assert isinstance(crs, QgsCoordinateReferenceSystem) and crs.isValid()
-        assert isinstance(extent, QgsGeometry)
 
         assert isinstance(dims, (list, tuple)) and len(dims) == 3
         for d in dims:
             assert isinstance(d, int) and d > 0
 
-        if isinstance(extent, QgsRectangle):
-            extent = QgsGeometry.fromRect(extent)
+        if isinstance(extent, QgsGeometry):
+            assert extent.isSimple()
+            extent = extent.boundingBox()
+        assert isinstance(extent, QgsRectangle)
 
-        assert isinstance(extent, QgsGeometry) and extent.isSimple()
-        fields = QgsFields()
-        # super().__init__(fields, hash(source))
-        self.mFeature = QgsFeature(fields, hash(source))
-        # set feature geometry in EPSG:4326
-        transform = QgsCoordinateTransform(crs, QgsCoordinateReferenceSystem('EPSG:4326'),
-                                           QgsProject.instance().transformContext())
-        g = QgsGeometry(extent)
-        assert g.transform(transform) == Qgis.GeometryOperationResult.Success
-        self.mFeature.setGeometry(g)
-        self.mFeature.setAttributes([source, name, provider, sid, dtg])
+        # extent in EPSG:4326
+        extent_wgs84 = extentToWGS84(crs, extent).boundingBox()
 
-        self.mIsVisible: bool = True
-        self.mCrs: QgsCoordinateReferenceSystem = crs
         self.mSource: str = source
-        self.mSourceExtent: Optional[SpatialExtent] = SpatialExtent(crs, QgsRectangle.fromWkt(extent.asWkt()))
         self.mName: Optional[str] = name
-        self.mProvider: str = provider
-        self.mSid: str = sid
-        self.mDims = dims
+        self.mProvider: str = sys.intern(provider)
+        self.mSid: str = internSensorId(sid)
+        self.mDims: Tuple[int, int, int] = tuple(dims)
+        self.mCrsKey: str = crsKey(crs)
+        self.mExtent: Tuple[float, float, float, float] = (
+            extent.xMinimum(), extent.yMinimum(), extent.xMaximum(), extent.yMaximum())
+        self.mExtentWGS84: Tuple[float, float, float, float] = (
+            extent_wgs84.xMinimum(), extent_wgs84.yMinimum(), extent_wgs84.xMaximum(), extent_wgs84.yMaximum())
+        # milliseconds since epoch and the offset from UTC in seconds, None for local time
+        self.mDTG: int = dtg.toMSecsSinceEpoch()
+        self.mDTGOffset: Optional[int] = utcOffset(dtg)
         self.mIsVisible: bool = True
-        self.mDTG: QDateTime = dtg
 
         # will be set later
         self.mTimeSeriesDate: Optional[TimeSeriesDate] = None
 
+    def featureId(self) -> int:
+        """
+        Returns the id used for the QgsFeature of this source
+        :return: int
+        """
+        return hash(self.mSource)
+
     def geometry(self) -> QgsGeometry:
-        return self.mFeature.geometry()
+        """
+        Returns the source extent in EPSG:4326
+        :return: QgsGeometry
+        """
+        return extentToWGS84(self.crs(), QgsRectangle(*self.mExtent))
 
     def provider(self) -> str:
         return self.mProvider
@@ -299,7 +436,7 @@ class TimeSeriesSource(object):
         return self.mSource in MapCanvas.MISSING_SOURCES
 
     def clone(self):
-        return TimeSeriesSource(self.asRasterLayer(False), self.mDTG)
+        return TimeSeriesSource.fromMap(self.asMap())
 
     def asMap(self) -> dict:
 
@@ -307,15 +444,54 @@ class TimeSeriesSource(object):
              self.MKeyName: self.mName,
              self.MKeyProvider: self.mProvider,
              self.MKeySensor: json.loads(self.mSid),
-             self.MKeyDateTime: self.mDTG.toString(Qt.ISODate),
-             self.MKeyExtent: self.mFeature.geometry().asWkt(),
-             self.MKeyDimensions: self.mDims,
-             self.MKeyCrs: self.mCrs.toWkt(),
+             self.MKeyDateTime: self.dtg().toString(Qt.ISODate),
+             self.MKeyExtent: QgsRectangle(*self.mExtent).asWktPolygon(),
+             self.MKeyDimensions: list(self.mDims),
+             self.MKeyCrs: self.crs().toWkt(),
              self.MKeyIsVisible: self.mIsVisible,
              }
 
         return d
 
+    def asValues(self, sensors: Dict[str, int], crs: Dict[str, int]) -> list:
+        """
+        Returns the normalized values of this source as list, see VALUE_FIELDS.
+        Sensor ids and CRS are stored as indices into lookup lists.
+        :param sensors: dictionary that maps sensor ids to their index. New sensor ids will be added.
+        :param crs: dictionary that maps CRS keys to their index. New CRS keys will be added.
+        :return: list
+        """
+        i_sensor = sensors.setdefault(self.mSid, len(sensors))
+        i_crs = crs.setdefault(self.mCrsKey, len(crs))
+        return [self.mSource, self.mName, self.mProvider, i_sensor, self.mDTG, self.mDTGOffset, list(self.mDims),
+                i_crs, list(self.mExtent), list(self.mExtentWGS84), self.mIsVisible]
+
+    @classmethod
+    def fromValues(cls, values: list, sensors: List[str], crs: List[str]) -> 'TimeSeriesSource':
+        """
+        Restores a TimeSeriesSource from the values returned by asValues().
+        Values are expected to be normalized already and are therefore not validated again.
+        :param values: list of values
+        :param sensors: list of interned sensor ids
+        :param crs: list of interned CRS keys
+        :return: TimeSeriesSource
+        """
+        source, name, provider, i_sensor, dtg, utc_offset, dims, i_crs, extent, extent_wgs84, visible = values
+        tss = cls.__new__(cls)
+        tss.mSource = source
+        tss.mName = name
+        tss.mProvider = sys.intern(provider)
+        tss.mSid = sensors[i_sensor]
+        tss.mDims = tuple(dims)
+        tss.mCrsKey = crs[i_crs]
+        tss.mExtent = tuple(extent)
+        tss.mExtentWGS84 = tuple(extent_wgs84)
+        tss.mDTG = dtg
+        tss.mDTGOffset = utc_offset
+        tss.mIsVisible = visible
+        tss.mTimeSeriesDate = None
+        return tss
+
     def json(self) -> str:
         """
         JSON representation of this for fast restore
@@ -367,7 +543,10 @@ class TimeSeriesSource(object):
         Returns the Date-Time-Group this observation is related to
         :return: QDateTime
         """
-        return self.mDTG
+        if self.mDTGOffset is None:
+            return QDateTime.fromMSecsSinceEpoch(self.mDTG)
+        # an offset of 0 seconds results in Qt.UTC
+        return QDateTime.fromMSecsSinceEpoch(self.mDTG, Qt.OffsetFromUTC, self.mDTGOffset)
 
     def crs(self) -> QgsCoordinateReferenceSystem:
         """
@@ -375,7 +554,7 @@ class TimeSeriesSource(object):
         :return:
         :rtype:
         """
-        return self.mCrs
+        return crsFromWkt(self.mCrsKey)
 
     def spatialExtent(self, source_crs: bool = True) -> SpatialExtent:
         """
@@ -384,11 +563,9 @@ class TimeSeriesSource(object):
         :return: SpatialExtent
         """
         if source_crs:
-            if self.mSourceExtent is None:
-                self.mSourceExtent = SpatialExtent.fromRasterSource(self.mSource)
-            return self.mSourceExtent
+            return SpatialExtent(self.crs(), QgsRectangle(*self.mExtent))
         else:
-            return SpatialExtent(QgsCoordinateReferenceSystem('EPSG:4326'), self.geometry().boundingBox())
+            return SpatialExtent(crsFromWkt('EPSG:4326'), QgsRectangle(*self.mExtentWGS84))
 
     def asDataset(self) -> gdal.Dataset:
         """
@@ -399,14 +576,27 @@ class TimeSeriesSource(object):
         return gdal.Open(self.mSource)
 
     def feature(self) -> QgsFeature:
-        return self.mFeature
+        """
+        Returns a QgsFeature with the source extent in EPSG:4326 as geometry
+        :return: QgsFeature
+        """
+        feature = QgsFeature(QgsFields(), self.featureId())
+        feature.setGeometry(self.geometry())
+        feature.setAttributes([self.mSource, self.mName, self.mProvider, self.mSid, self.dtg()])
+        return feature
 
     def isVisible(self) -> bool:
         return self.mIsVisible
 
     def setIsVisible(self, b: bool):
         assert isinstance(b, bool)
+        changed = b != self.mIsVisible
         self.mIsVisible = b
+        tsd = self.mTimeSeriesDate
+        if isinstance(tsd, TimeSeriesDate) and tsd.mTimeSeries is not None:
+            tsd.mTimeSeries.mCatalog.setVisible(self.mSource, b)
+            if changed:
+                tsd.mTimeSeries.markChanged([tsd])
 
     def __eq__(self, other):
         if not isinstance(other, TimeSeriesSource):
@@ -415,7 +605,7 @@ class TimeSeriesSource(object):
 
     def __lt__(self, other):
         assert isinstance(other, TimeSeriesSource)
-        return self.dtg() < other.dtg()
+        return self.mDTG < other.mDTG
 
     def __hash__(self):
         return hash(self.mSource)
@@ -1,12 +1,19 @@
 import datetime
 import math
+import multiprocessing
+import os
+import re
 import warnings
-from typing import Dict, List, Tuple
+from concurrent.futures import as_completed, ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
 
 from osgeo import gdal
 
+from eotimeseriesviewer import iostats
+from eotimeseriesviewer.instrumentation import addBytes, timed
 from eotimeseriesviewer.qgispluginsupport.qps.utils import SpatialExtent, geo2px
-from eotimeseriesviewer.tasks import EOTSVTask
+from eotimeseriesviewer.sourceinfo import pythonExecutable, readSourceInfos
+from eotimeseriesviewer.tasks import EOTSVTask, WorkStealingExecutor
 from eotimeseriesviewer.timeseries.source import TimeSeriesSource, datasetExtent
 from qgis.PyQt.QtCore import pyqtSignal, QDateTime
 from qgis.core import Qgis, QgsCoordinateReferenceSystem, QgsCoordinateTransform, QgsCoordinateTransformContext, \
@@ -16,6 +23,7 @@ from qgis.core import QgsRasterDataProvider, QgsPointXY
 EMPTY_STATS: QgsRasterBandStats = QgsRasterBandStats()
 
 
+@timed()
 def hasValidPixel(source: str,
                   crs: QgsCoordinateReferenceSystem,
                   extent: QgsRectangle,
@@ -33,7 +41,7 @@ def hasValidPixel(source: str,
     error = None
     if use_gdal:
         # use GDAL only
-        ds: gdal.Dataset = gdal.Open(source)
+        ds: gdal.Dataset = iostats.openDataset(source)
         if not isinstance(ds, gdal.Dataset):
             return False, f'Unable to open {source} as GDAL Dataset'
 
@@ -75,7 +83,9 @@ def hasValidPixel(source: str,
         n_total = 0
         for x in range(ul.x() + step_x, lr.x(), step_x):
             for y in range(ul.y() + step_y, lr.y(), step_y):
-                value = band1.ReadAsArray(x, y, 1, 1)[0][0]
+                array = iostats.readAsArray(band1, x, y, 1, 1, source=source)
+                addBytes(array.nbytes)
+                value = array[0][0]
                 n_total += 1
                 if value != no_data:
                     return True, ''
@@ -120,71 +130,6 @@ def hasValidPixel(source: str,
         return (stats.minimumValue, stats.maximumValue) != (EMPTY_STATS.minimumValue, EMPTY_STATS.maximumValue), ''
 
 
-class TimeSeriesFindOverlapSubTask(QgsTask):
-    """
-    A task to check which time series sources have valid data within a give spatial extent
-    """
-    foundSourceOverlaps = pyqtSignal(dict)
-    executed = pyqtSignal(bool, dict)
-    emptyStats: QgsRasterBandStats = QgsRasterBandStats()
-
-    def __init__(self,
-                 extent: QgsRectangle,
-                 crs: QgsCoordinateReferenceSystem,
-                 sources: List[str],
-                 progress_interval: int = 5,
-                 sample_size: int = 16):
-        super().__init__(flags=QgsTask.CancelWithoutPrompt)
-        assert isinstance(extent, QgsRectangle)
-        assert isinstance(crs, QgsCoordinateReferenceSystem)
-        assert isinstance(sources, list)
-        assert isinstance(sample_size, int) and sample_size > 0
-
-        self.progress_interval = progress_interval
-        self.extent = extent
-        self.sources = [str(s) for s in sources]
-        self.crs = crs
-        self.sample_size = sample_size
-        self.errors: List[str] = []
-        self.transformContext: QgsCoordinateTransformContext = QgsCoordinateTransformContext(
-            QgsProject.instance().transformContext())
-        self.intersections: Dict[str, bool] = dict()
-
-    def canCancel(self):
-        return True
-
-    def run(self) -> bool:
-
-        n_total = len(self.sources)
-
-        intersections = dict()
-
-        t0 = datetime.datetime.now()
-
-        for i, source in enumerate(self.sources):
-
-            if self.isCanceled():
-                return False
-            b, err = hasValidPixel(source, self.crs, self.extent, use_gdal=True)
-
-            intersections[source] = b
-            if err not in ['', None]:
-                self.errors.append(err)
-
-            dt = datetime.datetime.now() - t0
-            if dt.total_seconds() > self.progress_interval or i >= n_total - 1:
-                self.setProgress(100 * (i + 1) / n_total)
-                self.foundSourceOverlaps.emit(intersections.copy())
-                self.intersections.update(intersections)
-                intersections.clear()
-                t0 = datetime.datetime.now()
-
-        assert len(intersections) == 0
-        assert len(self.intersections) == len(self.sources)
-        self.executed.emit(True, self.intersections)
-        return True
-
-
 class TimeSeriesFindOverlapTask(EOTSVTask):
     sigTimeSeriesSourceOverlap = pyqtSignal(dict)
     executed = pyqtSignal(bool, EOTSVTask)
@@ -224,31 +169,12 @@ class TimeSeriesFindOverlapTask(EOTSVTask):
         self.mExtent = QgsRectangle(extent)
         self.mCrs = extent.crs()
         self.mSampleSize = sample_size
+        self.mSources: List[str] = [s.source() for s in sources]
+        self.mThreads = n_threads
+        self.mTransformContext = QgsCoordinateTransformContext(QgsProject.instance().transformContext())
         self.mIntersections: Dict[str, bool] = dict()
         self.mErrors: List[str] = []
-        self.mErrors: List[str] = []
-
-        n_sources = len(sources)
-        n_badge = math.ceil(n_sources / n_threads)
-
-        self.mLastProgress = datetime.datetime.now()
-        self.mLoadingProgress = dict()
         self.mProgressInterval = 3
-        current_badge = []
-        for s in sources:
-            current_badge.append(s.source())
-            if len(current_badge) >= n_badge:
-                subTask = TimeSeriesFindOverlapSubTask(
-                    QgsRectangle(self.mExtent),
-                    QgsCoordinateReferenceSystem(self.mCrs),
-                    current_badge[:],
-                    sample_size=self.mSampleSize
-                )
-                # subTask.foundSourceOverlaps.connect(self.sigTimeSeriesSourceOverlap)
-                subTask.foundSourceOverlaps.connect(self.collect_loading_progress)
-                subTask.executed.connect(self.subTaskExecuted)
-                self.addSubTask(subTask, subTaskDependency=QgsTask.SubTaskDependency.ParentDependsOnSubTask)
-                current_badge.clear()
 
     def errors(self) -> List[str]:
         return self.mErrors[:]
@@ -256,31 +182,44 @@ class TimeSeriesFindOverlapTask(EOTSVTask):
     def intersections(self):
         return self.mIntersections
 
-    def collect_loading_progress(self, data: dict):
-
-        dt = datetime.datetime.now() - self.mLastProgress
-        self.mLoadingProgress.update(data)
-        if dt.total_seconds() > self.mProgressInterval:
-            self.sigTimeSeriesSourceOverlap.emit(self.mLoadingProgress.copy())
-            self.mLoadingProgress.clear()
-            self.mLastProgress = datetime.datetime.now()
-
-    def subTaskExecuted(self, success: bool, results: dict):
-        if success:
-            self.mIntersections.update(results)
+    def findOverlap(self, source: str) -> Tuple[bool, str]:
+        return hasValidPixel(source, self.mCrs, self.mExtent,
+                             sample_size=self.mSampleSize,
+                             use_gdal=True,
+                             transform_context=self.mTransformContext)
 
     def run(self):
         """
         Start the Task and returns the results.
         :return:
         """
-        if len(self.mLoadingProgress) > 0:
-            self.sigTimeSeriesSourceOverlap.emit(self.mLoadingProgress.copy())
+        executor = WorkStealingExecutor(self, self.findOverlap, self.mSources, n_threads=self.mThreads)
 
-        for subTask in self.subTasks():
-            subTask: TimeSeriesFindOverlapSubTask
-            self.mIntersections.update(subTask.intersections)
-            self.mErrors.extend(subTask.errors)
+        intersections = dict()
+        t0 = datetime.datetime.now()
+        for source, result, ex in executor.results():
+            if ex is not None:
+                b, err = False, str(ex)
+            else:
+                b, err = result
+            intersections[source] = b
+            if err not in ['', None]:
+                self.mErrors.append(err)
+                if ex is None:
+                    self.addErrors()
+
+            if (datetime.datetime.now() - t0).total_seconds() > self.mProgressInterval:
+                self.sigTimeSeriesSourceOverlap.emit(intersections.copy())
+                self.mIntersections.update(intersections)
+                intersections.clear()
+                t0 = datetime.datetime.now()
+
+        if self.isCanceled():
+            return False
+
+        if len(intersections) > 0:
+            self.sigTimeSeriesSourceOverlap.emit(intersections.copy())
+            self.mIntersections.update(intersections)
 
         self.executed.emit(True, self)
 
@@ -290,113 +229,281 @@ class TimeSeriesFindOverlapTask(EOTSVTask):
         return True
 
 
-class TimeSeriesLoadingSubTask(QgsTask):
+class TimeSeriesLoadingTask(EOTSVTask):
     imagesLoaded = pyqtSignal(object)
 
+    executed = pyqtSignal(bool, EOTSVTask)
+
     def __init__(self,
-                 sources: List[str], *args,
+                 files: List[str],
+                 description: str = "Load Images",
+                 report_block_size=500,
+                 n_threads: int = 4,
                  progress_interval: int = 5,
-                 report_block_size: int = 25, **kwds):
-        super().__init__(*args, **kwds)
-        assert 0 < report_block_size
-        self.report_block_size = report_block_size
-        self.sources = [str(s) for s in sources]
-        self.progress_interval = progress_interval
-        self.invalid_sources: List[Tuple[str, Exception]] = []
-        self.valid_sources: List[TimeSeriesSource] = []
-
-    def canCancel(self):
+                 use_processes: bool = False,
+                 process_chunk_size: int = 50,
+                 force_products: bool = False):
+        """
+        :param files: list of files to load
+        :param description:
+        :param report_block_size: number of images to load before emitting them via the sigFoundSources signal.
+        :param n_threads: number of loading threads running in parallel.
+        :param progress_interval: minimum number of seconds between two progress updates.
+        :param use_processes: set True to read the source metadata in n_threads worker processes.
+        :param process_chunk_size: number of files a worker process reads at once.
+        :param force_products: set True to create the sources of FORCE products in data cube tile folders
+                               from their file names and the cube definition, without opening each file.
+        """
+        super().__init__(description=description,
+                         flags=QgsTask.Silent | QgsTask.CanCancel | QgsTask.CancelWithoutPrompt)
+
+        assert progress_interval >= 1
+        assert process_chunk_size >= 1
+
+        self.mFiles: List[str] = [str(f) for f in files]
+        self.mThreads = n_threads
+        self.mProgressInterval = progress_interval
+        self.mReportBlockSize = report_block_size
+        self.mProcessChunkSize = process_chunk_size
+        self.mPythonExecutable = pythonExecutable() if use_processes else None
+        # worker processes need a python interpreter to start with
+        self.mUseProcesses = use_processes and self.mPythonExecutable is not None
+        self.mForceProducts = force_products
+
+        self.mInvalidSources: List[Tuple[str, Exception]] = []
+        self.mValidSources: List[TimeSeriesSource] = []
+
+    def canCancel(self) -> bool:
         return True
 
-    def run(self):
+    def validSources(self) -> List[TimeSeriesSource]:
+        return self.mValidSources[:]
 
-        n_total = len(self.sources)
-        block: List[TimeSeriesSource] = []
+    def invalidSources(self) -> List[Tuple[str, Exception]]:
+        return self.mInvalidSources[:]
 
-        t0 = datetime.datetime.now()
+    def useProcesses(self) -> bool:
+        return self.mUseProcesses
+
+    def run(self) -> bool:
+        if self.mForceProducts and not self.runFORCEProducts():
+            return False
+        if self.mUseProcesses:
+            success = self.runProcesses()
+        else:
+            success = self.runThreads()
+        if not success:
+            return False
+        self.executed.emit(True, self)
+        return True
 
-        for i, source in enumerate(self.sources):
+    @staticmethod
+    def loadSource(source: str) -> TimeSeriesSource:
+        tss = TimeSeriesSource.create(source)
+        assert isinstance(tss, TimeSeriesSource), f'Unable to open {source} as TimeSeriesSource'
+        return tss
+
+    def runFORCEProducts(self) -> bool:
+        """
+        Creates the TimeSeriesSources of FORCE products in data cube tile folders.
+        All other files remain to be loaded by runThreads or runProcesses.
+        """
+        from eotimeseriesviewer.forceinputs import create_force_sources
+        sources, self.mFiles = create_force_sources(self.mFiles)
+        self.mValidSources.extend(sources)
+        for i in range(0, len(sources), self.mReportBlockSize):
             if self.isCanceled():
                 return False
+            self.imagesLoaded.emit(sources[i:i + self.mReportBlockSize])
+        return not self.isCanceled()
 
-            try:
-                tss = TimeSeriesSource.create(source)
-                assert isinstance(tss, TimeSeriesSource), f'Unable to open {source} as TimeSeriesSource'
-                # self.mSources.append(tss)
-                self.valid_sources.append(tss)
-                block.append(tss)
-                del tss
-            except Exception as ex:
-                self.invalid_sources.append((source, ex))
-
-            dts = (datetime.datetime.now() - t0).seconds
-            if dts > self.progress_interval:
-                self.setProgress(100 * (i + 1) / n_total)
-                t0 = datetime.datetime.now()
-
-            if len(block) >= self.report_block_size:
+    def runThreads(self) -> bool:
+        """
+        Creates the TimeSeriesSources in n_threads worker threads
+        """
+        block: List[TimeSeriesSource] = []
+        executor = WorkStealingExecutor(self, self.loadSource, self.mFiles,
+                                        n_threads=self.mThreads,
+                                        progress_interval=self.mProgressInterval)
+        for source, tss, ex in executor.results():
+            if ex is not None:
+                self.mInvalidSources.append((source, ex))
+                continue
+            self.mValidSources.append(tss)
+            block.append(tss)
+            if len(block) >= self.mReportBlockSize:
                 self.imagesLoaded.emit(block[:])
                 block.clear()
 
+        if self.isCanceled():
+            return False
+
         if len(block) > 0:
             self.imagesLoaded.emit(block)
-        self.setProgress(100.0)
         return True
 
+    def runProcesses(self) -> bool:
+        """
+        Reads the source metadata with GDAL in worker processes and creates
+        the TimeSeriesSources from the returned metadata in this process.
+        """
+        ctx = multiprocessing.get_context('spawn')
+        ctx.set_executable(self.mPythonExecutable)
+
+        chunks = [self.mFiles[i:i + self.mProcessChunkSize]
+                  for i in range(0, len(self.mFiles), self.mProcessChunkSize)]
+        if len(chunks) == 0:
+            return True
 
-class TimeSeriesLoadingTask(EOTSVTask):
-    imagesLoaded = pyqtSignal(object)
+        block: List[TimeSeriesSource] = []
+        executor = ProcessPoolExecutor(max_workers=self.mThreads, mp_context=ctx)
+        self.setItemCount(len(self.mFiles), n_workers=self.mThreads)
+        with iostats.collect(self.ioStats()):
+            try:
+                futures = [executor.submit(readSourceInfos, chunk) for chunk in chunks]
+                for n_done, future in enumerate(as_completed(futures), start=1):
+                    if self.isCanceled():
+                        return False
+                    infos = future.result()
+                    n_invalid = len(self.mInvalidSources)
+                    for info in infos:
+                        # sources are opened in the worker processes, which do not share the I/O accounting
+                        if 'error' in info:
+                            iostats.count(info['source'], open_errors=1)
+                            self.mInvalidSources.append((info['source'], Exception(info['error'])))
+                            continue
+                        iostats.count(info['source'], opens=1)
+                        try:
+                            tss = TimeSeriesSource.fromSourceInfo(info)
+                            self.mValidSources.append(tss)
+                            block.append(tss)
+                        except Exception as ex:
+                            self.mInvalidSources.append((info['source'], ex))
+                    self.addItemsStarted(len(infos))
+                    self.addItemsDone(len(infos), n_errors=len(self.mInvalidSources) - n_invalid)
+
+                    if len(block) >= self.mReportBlockSize:
+                        self.imagesLoaded.emit(block[:])
+                        block.clear()
+                    self.setProgress(100 * n_done / len(chunks))
+            finally:
+                executor.shutdown(wait=not self.isCanceled(), cancel_futures=True)
 
-    executed = pyqtSignal(bool, EOTSVTask)
+        if len(block) > 0:
+            self.imagesLoaded.emit(block)
+        return True
+
+
+class TimeSeriesRestoreTask(TimeSeriesLoadingTask):
+    """
+    Restores TimeSeriesSources from their map representation, e.g. the sources of a saved project.
+    Sources are created from the stored metadata. Only sources whose metadata cannot be used are opened with GDAL.
+    Sources are emitted via imagesLoaded in the order of the input list, as far as the worker threads allow.
+    """
 
     def __init__(self,
-                 files: List[str],
-                 description: str = "Load Images",
-                 report_block_size=500,
-                 n_threads: int = 4,
-                 progress_interval: int = 5):
+                 sources: List[Tuple[dict, Optional[str]]],
+                 description: str = 'Restore Images',
+                 report_block_size: int = 500,
+                 n_threads: int = 2,
+                 progress_interval: int = 1):
         """
-        :param files: list of files to load
+        :param sources: list of (source map, sensor id) tuples, see TimeSeriesSource.asMap()
         :param description:
-        :param report_block_size: number of images to load before emitting them via the sigFoundSources signal.
-        :param n_threads: number of loading threads running in parallel.
-        :param progress_interval:
+        :param report_block_size: number of sources to restore before emitting them via the imagesLoaded signal.
+        :param n_threads: number of restoring threads running in parallel.
+        :param progress_interval: minimum number of seconds between two progress updates.
         """
-        super().__init__(description=description,
-                         flags=QgsTask.Silent | QgsTask.CanCancel | QgsTask.CancelWithoutPrompt)
+        super().__init__([],
+                         description=description,
+                         report_block_size=report_block_size,
+                         n_threads=n_threads,
+                         progress_interval=progress_interval)
+        self.mSources: List[Tuple[dict, Optional[str]]] = list(sources)
+
+    @staticmethod
+    def restoreSource(item: Tuple[dict, Optional[str]]) -> TimeSeriesSource:
+        """
+        Creates a TimeSeriesSource from a (source map, sensor id) tuple
+        """
+        d, sid = item
+        try:
+            return TimeSeriesSource.fromMap(d, sid=sid)
+        except Exception as ex:
+            # incomplete metadata, read it from the source
+            if src := d.get(TimeSeriesSource.MKeySource):
+                tss = TimeSeriesSource.create(src)
+                tss.setIsVisible(d.get(TimeSeriesSource.MKeyIsVisible, True))
+                return tss
+            raise ex
 
-        assert progress_interval >= 1
+    def run(self) -> bool:
+        block: List[TimeSeriesSource] = []
+        executor = WorkStealingExecutor(self, self.restoreSource, self.mSources,
+                                        n_threads=self.mThreads,
+                                        progress_interval=self.mProgressInterval)
+        for (d, sid), tss, ex in executor.results():
+            if ex is not None:
+                self.mInvalidSources.append((d.get(TimeSeriesSource.MKeySource, str(d)), ex))
+                continue
+            self.mValidSources.append(tss)
+            block.append(tss)
+            if len(block) >= self.mReportBlockSize:
+                self.imagesLoaded.emit(block[:])
+                block.clear()
 
-        n_badge = math.ceil(len(files) / n_threads)
+        if self.isCanceled():
+            return False
 
-        badge = []
-        n_files = len(files)
-        for i, file in enumerate(files):
-            badge.append(file)
-            if len(badge) >= n_badge or i == (n_files - 1):
-                subTask = TimeSeriesLoadingSubTask(badge[:],
-                                                   report_block_size=report_block_size,
-                                                   description=self.description())
-                subTask.imagesLoaded.connect(self.imagesLoaded)
-                badge.clear()
-                self.addSubTask(subTask, subTaskDependency=QgsTask.SubTaskDependency.ParentDependsOnSubTask)
+        if len(block) > 0:
+            self.imagesLoaded.emit(block)
+        self.executed.emit(True, self)
+        return True
 
-        self.mInvalidSources: List[Tuple[str, Exception]] = []
-        self.mValidSources: List[TimeSeriesSource] = []
+
+class TimeSeriesCheckSourcesTask(EOTSVTask):
+    """
+    Checks in the background if the files of time series sources exist, e.g. after
+    loading a time series definition file without opening each source.
+    """
+    executed = pyqtSignal(bool, EOTSVTask)
+
+    # uris that do not describe a plain file, e.g. /vsicurl/... or NETCDF:"file.nc":var
+    rxNoFile = re.compile(r'^(/vsi|[A-Za-z][A-Za-z0-9_]+:)')
+
+    def __init__(self,
+                 sources: List[str],
+                 description: str = 'Check sources',
+                 progress_interval: int = 1000):
+        super().__init__(description=description,
+                         flags=QgsTask.Silent | QgsTask.CanCancel | QgsTask.CancelWithoutPrompt)
+        assert progress_interval > 0
+        self.mSources: List[str] = [str(s) for s in sources]
+        self.mMissingSources: List[str] = []
+        self.mProgressInterval = progress_interval
 
     def canCancel(self) -> bool:
         return True
 
-    def validSources(self) -> List[TimeSeriesSource]:
-        return self.mValidSources[:]
-
-    def invalidSources(self) -> List[Tuple[str, Exception]]:
-        return self.mInvalidSources[:]
+    def missingSources(self) -> List[str]:
+        return self.mMissingSources[:]
 
     def run(self) -> bool:
-        for subTask in self._sub_tasks:
-            assert isinstance(subTask, TimeSeriesLoadingSubTask)
-            self.mInvalidSources.extend(subTask.invalid_sources)
-            self.mValidSources.extend(subTask.valid_sources)
+        n = len(self.mSources)
+        n_reported = 0
+        self.setItemCount(n)
+        for i, source in enumerate(self.mSources):
+            if self.isCanceled():
+                return False
+            if not self.rxNoFile.match(source) and not os.path.exists(source):
+                self.mMissingSources.append(source)
+            if i % self.mProgressInterval == 0:
+                self.setProgress(100 * (i + 1) / n)
+                self.addItemsStarted(i + 1 - n_reported)
+                self.addItemsDone(i + 1 - n_reported)
+                n_reported = i + 1
+        self.addItemsStarted(n - n_reported)
+        self.addItemsDone(n - n_reported)
+        self.setProgress(100.0)
         self.executed.emit(True, self)
         return True
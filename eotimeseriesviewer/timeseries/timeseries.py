@@ -21,10 +21,11 @@
 import datetime
 import json
 import logging
+import os
 import re
 import sys
 from pathlib import Path
-from typing import Any, Iterator, List, Optional, Set, Union, Dict, Tuple, Generator
+from typing import Any, Iterable, Iterator, List, Optional, Set, Union, Dict, Tuple, Generator
 
 import numpy as np
 from osgeo import gdal
@@ -32,10 +33,13 @@ from osgeo import gdal
 from eotimeseriesviewer import messageLog
 from eotimeseriesviewer.dateparser import DateTimePrecision, ImageDateUtils
 from eotimeseriesviewer.qgispluginsupport.qps.utils import relativePath, SpatialExtent
-from eotimeseriesviewer.sensors import sensorIDtoProperties, SensorInstrument, SensorMatching, sensorIDfromMap
+from eotimeseriesviewer.sensors import internSensorId, sensorIDtoProperties, SensorInstrument, SensorMatching, \
+    sensorIDfromMap
 from eotimeseriesviewer.settings.settings import EOTSVSettingsManager
+from eotimeseriesviewer.timeseries.catalog import TimeSeriesCatalog
 from eotimeseriesviewer.timeseries.source import TimeSeriesDate, TimeSeriesSource
-from eotimeseriesviewer.timeseries.tasks import TimeSeriesFindOverlapTask, TimeSeriesLoadingTask
+from eotimeseriesviewer.timeseries.tasks import TimeSeriesCheckSourcesTask, TimeSeriesFindOverlapTask, \
+    TimeSeriesLoadingTask, TimeSeriesRestoreTask
 from eotimeseriesviewer.utils import findNearestDateIndex
 from qgis.PyQt.QtCore import pyqtSignal, QAbstractItemModel, QDateTime, QModelIndex, Qt
 from qgis.PyQt.QtGui import QColor
@@ -122,6 +126,7 @@ class TimeSeries(QAbstractItemModel):
     sigTimeSeriesDatesRemoved = pyqtSignal(list)
 
     sigLoadingTaskFinished = pyqtSignal()
+    sigRestoreTaskFinished = pyqtSignal()
     sigFindOverlapTaskFinished = pyqtSignal()
 
     sigSensorAdded = pyqtSignal(SensorInstrument)
@@ -144,6 +149,10 @@ class TimeSeries(QAbstractItemModel):
     cCRS = 5
     cImages = 6
 
+    # format and version of JSON Lines time series definition files
+    JSONL_FORMAT = 'eotsv-timeseries'
+    JSONL_VERSION = 1
+
     def __init__(self, imageFiles=None, parent=None):
         super(TimeSeries, self).__init__(parent=parent)
 
@@ -152,6 +161,10 @@ class TimeSeries(QAbstractItemModel):
         self.mTSS2TSD: Dict[str, TimeSeriesDate] = {}
         self.mTSS2Sensor: Dict[str, SensorInstrument] = {}
         self.mSensors: List[SensorInstrument] = []
+        # sensor ids resolved by findMatchingSensor
+        self.mSid2Sensor: Dict[str, SensorInstrument] = {}
+        # columnar index of all sources to run vectorized queries on
+        self.mCatalog: TimeSeriesCatalog = TimeSeriesCatalog()
 
         # self.mTSDs: List[TimeSeriesDate] = list()
 
@@ -184,6 +197,13 @@ class TimeSeries(QAbstractItemModel):
         }
         self.mRootIndex = QModelIndex()
         self.mTasks = dict()
+        # (source map, sensor id) items of sources that are still restored in the background, see fromMap()
+        self.mPendingSources: Dict[str, Tuple[dict, Optional[str]]] = dict()
+
+        # change tracking, see revision() and asJson()
+        self.mRevision: int = 0
+        self.mJsonChunks: Dict[TimeSeriesDate, str] = dict()
+        self.mJsonSids: Dict[str, int] = dict()
 
         if imageFiles is not None:
             self.addSourceInputs(imageFiles)
@@ -200,7 +220,12 @@ class TimeSeries(QAbstractItemModel):
         """
         assert isinstance(ext, SpatialExtent)
 
-        sources = list(self.sources())
+        # sources whose bounding box does not intersect the extent can be hidden without reading any pixel
+        rows = self.mCatalog.query(extent=ext)
+        outside = np.setdiff1d(self.mCatalog.query(), rows)
+        if len(outside) > 0:
+            self.onFoundOverlap({uri: False for uri in self.mCatalog.uris(outside)})
+        sources = self.mCatalog.sources(rows)
 
         if len(sources) > 0:
             settings = EOTSVSettingsManager.settings()
@@ -257,14 +282,22 @@ class TimeSeries(QAbstractItemModel):
 
     def findMatchingSensor(self, sensorID: Union[str, tuple, dict]) -> Optional[SensorInstrument]:
         if isinstance(sensorID, str):
-            nb, px_size_x, px_size_y, dt, wl, wlu, name = sensorIDtoProperties(sensorID)
+            sensor = self.mSid2Sensor.get(sensorID)
+            if isinstance(sensor, SensorInstrument):
+                return sensor
+            sensor = self._findMatchingSensor(sensorIDtoProperties(sensorID))
+            if isinstance(sensor, SensorInstrument):
+                self.mSid2Sensor[sensorID] = sensor
+            return sensor
+        return self._findMatchingSensor(sensorID)
 
-        elif isinstance(sensorID, tuple):
-            assert len(sensorID) == 7
-            nb, px_size_x, px_size_y, dt, wl, wlu, name = sensorID
-        else:
+    def _findMatchingSensor(self, sensorID: tuple) -> Optional[SensorInstrument]:
+        if not isinstance(sensorID, tuple):
             raise NotImplementedError()
 
+        assert len(sensorID) == 7
+        nb, px_size_x, px_size_y, dt, wl, wlu, name = sensorID
+
         PX_DIMS = (nb, px_size_y, px_size_x, dt)
         for sensor in self.sensors():
             PX_DIMS2 = (sensor.nb, sensor.px_size_y, sensor.px_size_x, sensor.dataType)
@@ -313,12 +346,13 @@ class TimeSeries(QAbstractItemModel):
         """
         return self.mSensors[:]
 
-    def loadFromFile(self, path: Union[str, Path], n_max=None, runAsync: bool = None):
+    def loadFromFile(self, path: Union[str, Path], n_max=None, runAsync: bool = None, verify: bool = True):
         """
         Loads a CSV file with source images of a TimeSeries
         :param path: str, Path of CSV file
         :param n_max: optional, maximum number of files to load
         :param runAsync: optional,
+        :param verify: set True to check in background if sources restored from a JSON Lines file exist.
         """
 
         images = self.sourcesFromFile(path)
@@ -329,6 +363,28 @@ class TimeSeries(QAbstractItemModel):
 
         self.addSourceInputs(images, runAsync=runAsync)
 
+        if verify and Path(path).suffix == '.jsonl' and len(images) > 0:
+            self.checkSources([tss.source() for tss in images], runAsync=runAsync)
+
+    def checkSources(self, sources: List[str], runAsync: bool = None):
+        """
+        Checks if the files of the given sources exist. Missing sources are reported to the message log
+        :param sources: list of source uris
+        :param runAsync: optional
+        """
+        if runAsync is None:
+            runAsync = EOTSVSettingsManager.settings().qgsTaskAsync
+
+        qgsTask = TimeSeriesCheckSourcesTask(sources, description=f'Check {len(sources)} sources')
+        qgsTask.executed.connect(self.onTaskFinished)
+        self.mTasks[id(qgsTask)] = qgsTask
+
+        if runAsync:
+            tm: QgsTaskManager = QgsApplication.taskManager()
+            tm.addTask(qgsTask)
+        else:
+            qgsTask.run_serial()
+
     @classmethod
     def sourcesFromFile(cls, path: Union[str, Path]) -> List[Union[str, TimeSeriesSource]]:
         path = Path(path)
@@ -338,7 +394,9 @@ class TimeSeries(QAbstractItemModel):
 
         errors = dict()
 
-        if path.suffix in ['.csv', '.txt']:
+        if path.suffix == '.jsonl':
+            images.extend(cls.sourcesFromJsonLines(path))
+        elif path.suffix in ['.csv', '.txt']:
             with open(path, 'r') as f:
                 lines = f.readlines()
                 for line in lines:
@@ -383,9 +441,44 @@ class TimeSeries(QAbstractItemModel):
             print(msg, file=sys.stderr)
         return images
 
+    @classmethod
+    def sourcesFromJsonLines(cls, path: Union[str, Path]) -> List[TimeSeriesSource]:
+        """
+        Reads the sources from a JSON Lines time series definition file as written by saveToFile.
+        Sources are restored from their stored metadata, i.e. without accessing the source files.
+        :param path: str, path of JSON Lines file
+        :return: [list-of-TimeSeriesSources]
+        """
+        path = Path(path)
+        refDir = path.parent.as_posix()
+        sources = []
+        with open(path, 'r', encoding='utf-8') as f:
+            header = json.loads(f.readline())
+            if header.get('format') != cls.JSONL_FORMAT:
+                raise Exception(f'{path} is not a time series definition file')
+            if header.get('version', 0) > cls.JSONL_VERSION:
+                raise Exception(f'{path} requires a newer version of the EO Time Series Viewer '
+                                f'(file format version {header["version"]})')
+            if tuple(header.get('fields', [])) != TimeSeriesSource.VALUE_FIELDS:
+                raise Exception(f'{path} has unknown fields: {header.get("fields")}')
+
+            sensors = [internSensorId(sid) for sid in header.get('sensors', [])]
+            crs = [sys.intern(c) for c in header.get('crs', [])]
+
+            for line in f:
+                if line.strip() == '':
+                    continue
+                values = json.loads(line)
+                source = values[0]
+                if not (os.path.isabs(source) or TimeSeriesCheckSourcesTask.rxNoFile.match(source)):
+                    values[0] = os.path.normpath(os.path.join(refDir, source))
+                sources.append(TimeSeriesSource.fromValues(values, sensors, crs))
+        return sources
+
     def saveToFile(self, path: Union[str, Path], relative_path: bool = True) -> Optional[Path]:
         """
-        Saves the TimeSeries sources into a CSV or JSON file
+        Saves the TimeSeries sources into a CSV, JSON or JSON Lines file.
+        JSON Lines files contain the normalized metadata of all sources and are the fastest to load.
         :param path: str, path of CSV file
         :return: path of CSV file
         """
@@ -393,11 +486,35 @@ class TimeSeries(QAbstractItemModel):
             path = Path(path)
         assert isinstance(path, Path)
 
-        assert path.suffix in ['.csv', '.txt', '.json']
+        assert path.suffix in ['.csv', '.txt', '.json', '.jsonl']
 
         to_write = None
 
-        if path.suffix in ['.csv', '.txt']:
+        if path.suffix == '.jsonl':
+            sensors = dict()
+            crs = dict()
+            lines = []
+            pending = []
+            for item in self.mPendingSources.values():
+                try:
+                    pending.append(TimeSeriesRestoreTask.restoreSource(item))
+                except Exception as ex:
+                    messageLog(f'Unable to write {item[0].get(TimeSeriesSource.MKeySource)}: {ex}', Qgis.Warning)
+            for tss in list(self.mCatalog.sources()) + pending:
+                values = tss.asValues(sensors, crs)
+                if relative_path:
+                    values[0] = str(relativePath(values[0], path.parent))
+                lines.append(json.dumps(values, ensure_ascii=False))
+            header = {'format': self.JSONL_FORMAT,
+                      'version': self.JSONL_VERSION,
+                      'fields': list(TimeSeriesSource.VALUE_FIELDS),
+                      'sensors': list(sensors.keys()),
+                      'crs': list(crs.keys()),
+                      }
+            lines.insert(0, json.dumps(header, ensure_ascii=False))
+            to_write = '\n'.join(lines) + '\n'
+
+        elif path.suffix in ['.csv', '.txt']:
             lines = []
             lines.append('#Time series definition file: {}'.format(np.datetime64('now').astype(str)))
             lines.append('#<image path>')
@@ -408,6 +525,11 @@ class TimeSeries(QAbstractItemModel):
                     if relative_path:
                         uri = relativePath(uri, path.parent)
                     lines.append(str(uri))
+            for d, sid in self.mPendingSources.values():
+                uri = d.get(TimeSeriesSource.MKeySource)
+                if relative_path:
+                    uri = relativePath(uri, path.parent)
+                lines.append(str(uri))
             to_write = '\n'.join(lines)
         elif path.suffix == '.json':
             data = self.asMap()
@@ -442,16 +564,7 @@ class TimeSeries(QAbstractItemModel):
         :param crs: QgsCoordinateSystem to express the SpatialExtent coordinates.
         :return:
         """
-        extent = None
-        for i, tsd in enumerate(self.mTSDs.values()):
-            assert isinstance(tsd, TimeSeriesDate)
-            ext = tsd.spatialExtent(crs=crs)
-            if isinstance(extent, SpatialExtent):
-                extent = extent.combineExtentWith(ext)
-            else:
-                extent = ext
-
-        return extent
+        return self.mCatalog.spatialExtent(crs=crs)
 
     def setSourceVisibility(self, sources: List[Union[str, TimeSeriesSource, TimeSeriesDate]], b: bool = True):
         """
@@ -510,6 +623,7 @@ class TimeSeries(QAbstractItemModel):
                     self.mTSS.pop(uri)
                     self.mTSS2TSD.pop(uri)
                     self.mTSS2Sensor.pop(uri)
+                self.mCatalog.removeSources(tsd.sourceUris())
                 self.mTSDs.pop(k)
                 removed.append(tsd)
 
@@ -524,11 +638,13 @@ class TimeSeries(QAbstractItemModel):
                     self.mTSS.pop(uri)
                     self.mTSS2TSD.pop(uri)
                     self.mTSS2Sensor.pop(uri)
+                self.mCatalog.removeSources(tsd.sourceUris())
                 self.mTSDs.pop(k)
                 removed.append(tsd)
                 self.endRemoveRows()
 
         if len(removed) > 0:
+            self.markChanged()
             self.checkSensorList()
             self.sigTimeSeriesDatesRemoved.emit(removed)
 
@@ -537,24 +653,36 @@ class TimeSeries(QAbstractItemModel):
                 sensor: Optional[SensorInstrument] = None) -> Generator[TimeSeriesSource | Any, Any, None]:
         """
         Returns a flat list of all sources
-        :param copy:
+        :param copy: set True to return copies of the sources
+        :param sensor: SensorInstrument to return the sources for
         :return:
         """
+        sensors = [sensor] if isinstance(sensor, SensorInstrument) else None
 
-        if isinstance(sensor, SensorInstrument):
-            sid = sensor.id
-        else:
-            sid = None
-
-        for tss in self.mTSS.values():
-            if sid and tss.sid() != sid:
-                continue
-
+        for tss in self.querySources(sensors=sensors):
             if copy:
                 tss = tss.clone()
 
             yield tss
 
+    def querySources(self,
+                     start: Optional[QDateTime] = None,
+                     end: Optional[QDateTime] = None,
+                     sensors: Optional[List[Union[str, SensorInstrument]]] = None,
+                     visible: Optional[bool] = None,
+                     extent: Optional[SpatialExtent] = None) -> List[TimeSeriesSource]:
+        """
+        Returns the sources that match all given criteria.
+        :param start: minimum observation time
+        :param end: maximum observation time
+        :param sensors: list of SensorInstruments or sensor ids
+        :param visible: True to return visible sources only, False to return hidden sources only
+        :param extent: SpatialExtent the source extents need to intersect with
+        :return: [list-of-TimeSeriesSource]
+        """
+        rows = self.mCatalog.query(start=start, end=end, sensors=sensors, visible=visible, extent=extent)
+        return self.mCatalog.sources(rows)
+
     def tsds(self,
              date: np.datetime64 = None,
              sensor: SensorInstrument = None,
@@ -578,16 +706,25 @@ class TimeSeries(QAbstractItemModel):
 
     def _clear(self):
 
+        self.markChanged()
         self.mTSS.clear()
         self.mTSS2TSD.clear()
         self.mTSS2Sensor.clear()
         self.mTSDs.clear()
         self.mSensors.clear()
+        self.mSid2Sensor.clear()
+        self.mCatalog.clear()
 
     def clear(self):
         """
         Removes all data sources from the TimeSeries (which will be empty after calling this routine).
         """
+        # sources that are still restored in the background belong to the previous time series
+        for task in list(self.mTasks.values()):
+            if isinstance(task, TimeSeriesRestoreTask):
+                task.cancel()
+                self.onRemoveTask(task)
+        self.mPendingSources.clear()
         allTSDs = list(self.mTSDs.values())
         self.beginResetModel()
         self._clear()
@@ -640,6 +777,7 @@ class TimeSeries(QAbstractItemModel):
 
         tss = self.mTSS.pop(uri)
         if isinstance(tss, TimeSeriesSource):
+            self.mCatalog.removeSources([uri])
             self.mTSS2Sensor.pop(uri)
             tsd = self.mTSS2TSD.pop(uri)
             tsd.removeSource(tss)
@@ -668,8 +806,11 @@ class TimeSeries(QAbstractItemModel):
             for uri in uri_to_remove:
                 self._removeTSS(uri)
             removed_tsds = self._removeEmptyTSDs()
+            self.markChanged()
             self.endResetModel()
             self.mSensors.remove(sensor)
+            for sid in [sid for sid, s in self.mSid2Sensor.items() if s == sensor]:
+                self.mSid2Sensor.pop(sid)
 
             self.sigTimeSeriesDatesRemoved.emit(removed_tsds)
             self.sigSensorRemoved.emit(sensor)
@@ -680,12 +821,15 @@ class TimeSeries(QAbstractItemModel):
     def addSourceInputs(self,
                         sources: List[Union[str, Path, TimeSeriesSource, gdal.Dataset, QgsRasterLayer]],
                         runAsync: Optional[bool] = None,
-                        n_threads: Optional[int] = None):
+                        n_threads: Optional[int] = None,
+                        force_products: bool = False):
         """
         Adds source images to the TimeSeries
         :param sources: list of source images, e.g., a list of file paths
         :param runAsync: bool
         :param n_threads:
+        :param force_products: set True to create the sources of FORCE products in data cube tile folders
+                               from their file names and the cube definition, see TimeSeriesLoadingTask.
         """
 
         if runAsync is None:
@@ -713,12 +857,14 @@ class TimeSeries(QAbstractItemModel):
             self.addSources(ts_sources)
 
         if len(source_paths) > 0:
+            settings = EOTSVSettingsManager.settings()
             if n_threads is None:
-                settings = EOTSVSettingsManager.settings()
                 n_threads = settings.qgsTaskFileReadingThreads
             qgsTask = TimeSeriesLoadingTask(source_paths,
                                             description=f'Load {len(source_paths)} images',
-                                            n_threads=n_threads)
+                                            n_threads=n_threads,
+                                            use_processes=settings.qgsTaskFileReadingProcesses,
+                                            force_products=force_products)
 
             qgsTask.imagesLoaded.connect(self.addSources)
             qgsTask.progressChanged.connect(self.sigProgress.emit)
@@ -752,6 +898,24 @@ class TimeSeries(QAbstractItemModel):
 
             self.sigLoadingTaskFinished.emit()
 
+        if isinstance(task, TimeSeriesRestoreTask) and self.mTasks.get(id(task)) is task:
+            # sources that could not be restored are not kept
+            for d, sid in task.mSources:
+                self.mPendingSources.pop(d.get(TimeSeriesSource.MKeySource), None)
+            self.sigRestoreTaskFinished.emit()
+
+        if isinstance(task, TimeSeriesCheckSourcesTask):
+            missing = task.missingSources()
+            if len(missing) > 0:
+                from eotimeseriesviewer.mapcanvas import MapCanvas
+                t = datetime.datetime.now()
+                for uri in missing:
+                    MapCanvas.MISSING_SOURCES[uri] = t
+                info = [f'{len(missing)} source(s) do not exist:'] + missing[0:10]
+                if len(missing) > 10:
+                    info.append('...')
+                messageLog('\n'.join(info), Qgis.Warning)
+
         elif isinstance(task, TimeSeriesFindOverlapTask):
             # if success:
             #    intersections = task.intersections()
@@ -760,6 +924,36 @@ class TimeSeries(QAbstractItemModel):
             self.sigFindOverlapTaskFinished.emit()
         self.onRemoveTask(task)
 
+    def onSourcesRestored(self, sources: List[TimeSeriesSource]):
+        task = self.sender()
+        if isinstance(task, TimeSeriesRestoreTask) and self.mTasks.get(id(task)) is not task:
+            # restore task has been removed by clear()
+            return
+        self.addSources(sources)
+        for tss in sources:
+            self.mPendingSources.pop(tss.source(), None)
+
+    def pendingSources(self) -> List[Tuple[dict, Optional[str]]]:
+        """
+        Returns the (source map, sensor id) items of sources that are still restored in a background task.
+        They are written by asMap(), asJson() and saveToFile() until they have been added.
+        :return: list
+        """
+        return list(self.mPendingSources.values())
+
+    def _pendingSourceMap(self, item: Tuple[dict, Optional[str]], sensors: Dict[str, int]) -> dict:
+        """
+        Returns the source map of a pending source with the sensor index taken from sensors
+        """
+        d, sid = item
+        d = dict(d)
+        if isinstance(sid, str):
+            d[TimeSeriesSource.MKeySensor] = sensors.setdefault(sid, len(sensors))
+        else:
+            # unknown sensor, will be read from the source
+            d.pop(TimeSeriesSource.MKeySensor, None)
+        return d
+
     def addSources(self, tss: Union[TimeSeriesSource, List[TimeSeriesSource]]):
         """
         :param tss:
@@ -777,6 +971,7 @@ class TimeSeries(QAbstractItemModel):
         new_uri2tss = dict()
         new_tss2tsd = dict()
         new_tss2sensor = dict()
+        new_sources = list()
         # new_dateSensor2tsd = dict()
         new_tsds = list()
         self.beginResetModel()
@@ -804,15 +999,19 @@ class TimeSeries(QAbstractItemModel):
                 tsd = TimeSeriesDate(dtr, sensor)
                 tsd.mTimeSeries = self
                 self.mTSDs[k] = tsd
-                new_tss2tsd[uri] = tsd
                 new_tsds.append(tsd)
                 # new_dateSensor2tsd[k] = tsd
+            new_tss2tsd[uri] = tsd
+            new_sources.append(t)
             tsd.addSources(t)
             self.mTSS.update({uri: t})
-            self.mSpatialIndex.addFeature(t.feature())
+            self.mSpatialIndex.addFeature(t.featureId(), t.spatialExtent(source_crs=False))
 
         self.mTSS2TSD.update(new_tss2tsd)
         self.mTSS2Sensor.update(new_tss2sensor)
+        if len(new_sources) > 0:
+            self.markChanged(set(new_tss2tsd.values()))
+        self.mCatalog.addSources(new_sources, [new_tss2sensor[t.source()] for t in new_sources])
         #  self.mTSDs.update(new_dateSensor2tsd)
 
         self.endResetModel()
@@ -849,17 +1048,14 @@ class TimeSeries(QAbstractItemModel):
         assert isinstance(flags, SensorMatching)
         assert bool(flags & SensorMatching.PX_DIMS), 'SensorMatching flags PX_DIMS needs to be set'
         self.mSensorMatchingFlags = flags
+        self.mSid2Sensor.clear()
 
     def sourceUris(self) -> List[str]:
         """
         Returns the uris of all sources
         :return: [list-of-str]
         """
-        uris = []
-        for tsd in self:
-            assert isinstance(tsd, TimeSeriesDate)
-            uris.extend(tsd.sourceUris())
-        return uris
+        return self.mCatalog.uris()
 
     def __len__(self) -> int:
         return len(self.mTSDs)
@@ -1008,7 +1204,58 @@ class TimeSeries(QAbstractItemModel):
         :rtype:
         """
 
-        return sorted([tsd for tsd in self.tsds() if not tsd.checkState() == Qt.Unchecked])
+        tsds = {tss.timeSeriesDate() for tss in self.querySources(visible=True)}
+        return sorted(tsd for tsd in tsds if isinstance(tsd, TimeSeriesDate))
+
+    def revision(self) -> int:
+        """
+        Returns a number that increases with each change of the sources, e.g. to find out if the
+        time series needs to be saved again.
+        """
+        return self.mRevision
+
+    def markChanged(self, tsds: Optional[Iterable[TimeSeriesDate]] = None):
+        """
+        Increases the revision and marks the JSON representation of the sources of
+        changed TimeSeriesDates as outdated.
+        :param tsds: changed TimeSeriesDates. Defaults to all.
+        """
+        self.mRevision += 1
+        if tsds is None:
+            self.mJsonChunks.clear()
+            self.mJsonSids.clear()
+        else:
+            for tsd in tsds:
+                self.mJsonChunks.pop(tsd, None)
+
+    def asJson(self) -> str:
+        """
+        Returns the JSON representation of asMap(). The sources of a TimeSeriesDate are serialized
+        again only if they have changed since the last call, see markChanged().
+        The sensor indices may differ from asMap().
+        :return: str
+        """
+        chunks = dict()
+        for tsd in self.mTSDs.values():
+            if (chunk := self.mJsonChunks.get(tsd)) is None:
+                parts = []
+                for tss in tsd:
+                    d = tss.asMap()
+                    d[TimeSeriesSource.MKeySensor] = self.mJsonSids.setdefault(tss.sid(), len(self.mJsonSids))
+                    parts.append(json.dumps(d, ensure_ascii=False))
+                chunk = ', '.join(parts)
+            chunks[tsd] = chunk
+        # drop the chunks of TimeSeriesDates that do not exist anymore
+        self.mJsonChunks = chunks
+
+        parts = [c for c in chunks.values() if c != '']
+        for item in self.mPendingSources.values():
+            parts.append(json.dumps(self._pendingSourceMap(item, self.mJsonSids), ensure_ascii=False))
+
+        sensors = {i: json.loads(sid) for sid, i in self.mJsonSids.items()}
+        sensors = json.dumps(sensors, ensure_ascii=False)
+        sources = ', '.join(parts)
+        return f'{{"sensors": {sensors}, "sources": [{sources}]}}'
 
     def asMap(self) -> dict:
 
@@ -1021,6 +1268,9 @@ class TimeSeries(QAbstractItemModel):
             d[TimeSeriesSource.MKeySensor] = sensors.setdefault(sid, len(sensors))
             sources.append(d)
 
+        for item in self.mPendingSources.values():
+            sources.append(self._pendingSourceMap(item, sensors))
+
         results['sensors'] = {i: sid if isinstance(sid, dict) else json.loads(sid)
                               for sid, i in sensors.items()}
         results['sources'] = sources
@@ -1028,19 +1278,29 @@ class TimeSeries(QAbstractItemModel):
 
     def fromMap(self,
                 data: dict, feedback: QgsProcessingFeedback = QgsProcessingFeedback(),
-                clear: bool = True):
-
+                clear: bool = True,
+                runAsync: bool = False,
+                date_of_interest: Union[None, str, QDateTime] = None,
+                n_dates: int = 1):
+        """
+        Restores the time series from its map representation, see asMap().
+        :param data: dict
+        :param feedback: QgsProcessingFeedback
+        :param clear: set True to remove existing sources first
+        :param runAsync: set True to restore only the sources of the n_dates visible observation dates
+                         closest to date_of_interest immediately and all other sources in a background task.
+                         The background task restores sources closer to the date_of_interest first.
+        :param date_of_interest: date to restore first, e.g. the current map date. Defaults to the first date.
+        :param n_dates: number of visible observation dates to restore immediately if runAsync is True.
+        """
         multistep = QgsProcessingMultiStepFeedback(4, feedback)
         multistep.setCurrentStep(1)
         multistep.setProgressText('Clean')
         if clear:
             self.clear()
 
-        uri_vis = dict()
-
         multistep.setCurrentStep(2)
         multistep.setProgressText('Read Sources')
-        sources = []
 
         SENSORS = data.get('sensors', {})
         # make the '0' json key an integer
@@ -1048,38 +1308,31 @@ class TimeSeries(QAbstractItemModel):
         for sensor in SENSORS.values():
             self.addSensors(sensor)
 
-        errors = set()
-
+        items: List[Tuple[dict, Optional[str]]] = []
         for d in data.get('sources', []):
             sid = d.get(TimeSeriesSource.MKeySensor)
             if isinstance(sid, int):
                 sensor = SENSORS.get(sid)
-                if isinstance(sensor, SensorInstrument):
-                    sid = sensor.id()
+                sid = sensor.id() if isinstance(sensor, SensorInstrument) else None
             elif isinstance(sid, dict):
                 sid = sensorIDfromMap(sid)
             else:
                 sid = None
+            items.append((d, sid))
 
-            tss = None
+        restore_later = []
+        if runAsync and len(items) > 0:
+            items, restore_later = self._splitRestoreItems(items, date_of_interest, n_dates)
+
+        sources = []
+        errors = set()
+        for item in items:
             try:
-                tss = TimeSeriesSource.fromMap(d, sid=sid)
-                s = ""
-            except Exception as ex1:
-                errors.add(str(ex1))
+                sources.append(TimeSeriesRestoreTask.restoreSource(item))
+            except Exception as ex:
+                errors.add(str(ex))
+                feedback.reportError(f'Unable to open source: {item[0]}')
 
-            if tss is None:
-                try:
-                    if src := d.get('source'):
-                        tss = TimeSeriesSource.create(src)
-                        tss.setIsVisible(d.get('visible', True))
-                except Exception as ex2:
-                    errors.add(str(ex2))
-
-            if isinstance(tss, TimeSeriesSource):
-                sources.append(tss)
-            else:
-                feedback.reportError(f'Unable to open source: {d}')
         if len(errors) > 0:
             msg = 'The following error(s) occurred one or multiple times when loading sources:'
             for err in errors:
@@ -1091,8 +1344,58 @@ class TimeSeries(QAbstractItemModel):
         if len(sources) > 0:
             self.addSources(sources)
 
-        for tss in self.sources():
-            tss.setIsVisible(uri_vis.get(tss.source(), tss.isVisible()))
+        if len(restore_later) > 0:
+            multistep.setCurrentStep(4)
+            multistep.setProgressText(f'Restore {len(restore_later)} sources in background')
+            settings = EOTSVSettingsManager.settings()
+            qgsTask = TimeSeriesRestoreTask(restore_later,
+                                            description=f'Restore {len(restore_later)} images',
+                                            n_threads=settings.qgsTaskFileReadingThreads)
+            qgsTask.imagesLoaded.connect(self.onSourcesRestored)
+            qgsTask.progressChanged.connect(self.sigProgress.emit)
+            qgsTask.executed.connect(self.onTaskFinished)
+            self.mTasks[id(qgsTask)] = qgsTask
+            for item in restore_later:
+                self.mPendingSources[item[0].get(TimeSeriesSource.MKeySource)] = item
+            tm: QgsTaskManager = QgsApplication.taskManager()
+            tm.addTask(qgsTask)
+
+    def _splitRestoreItems(self,
+                           items: List[Tuple[dict, Optional[str]]],
+                           date_of_interest: Union[None, str, QDateTime],
+                           n_dates: int) -> Tuple[List[Tuple[dict, Optional[str]]], List[Tuple[dict, Optional[str]]]]:
+        """
+        Sorts (source map, sensor id) items by their temporal distance to the date of interest and
+        splits them into the items of the n_dates closest visible observation dates and all others.
+        """
+        if isinstance(date_of_interest, str):
+            date_of_interest = QDateTime.fromString(date_of_interest, Qt.ISODate)
+
+        dtgs = [QDateTime.fromString(d.get(TimeSeriesSource.MKeyDateTime, ''), Qt.ISODate) for d, _ in items]
+        if isinstance(date_of_interest, QDateTime) and date_of_interest.isValid():
+            t0 = date_of_interest.toMSecsSinceEpoch()
+        else:
+            t0 = min((dtg.toMSecsSinceEpoch() for dtg in dtgs if dtg.isValid()), default=0)
+
+        # items without a valid date-time cannot be sorted and are restored immediately
+        first = [item for item, dtg in zip(items, dtgs) if not dtg.isValid()]
+        order = sorted((abs(dtg.toMSecsSinceEpoch() - t0), i) for i, dtg in enumerate(dtgs) if dtg.isValid())
+
+        dates = set()
+        i_split = len(order)
+        for j, (_, i) in enumerate(order):
+            d, _ = items[i]
+            if d.get(TimeSeriesSource.MKeyIsVisible, True):
+                date = ImageDateUtils.dateRange(dtgs[i], self.mDateTimePrecision).begin()
+                if date not in dates:
+                    if len(dates) >= n_dates:
+                        i_split = j
+                        break
+                    dates.add(date)
+
+        first.extend(items[i] for _, i in order[:i_split])
+        later = [items[i] for _, i in order[i_split:]]
+        return first, later
 
     def data(self, index: QModelIndex, role: Qt.DisplayRole):
         """
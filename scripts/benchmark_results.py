@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+
+"""
+***************************************************************************
+    benchmark_results.py
+    Stores benchmark results and compares them between git revisions.
+
+    Results are appended to a JSON Lines file, one line per benchmark run. Each run is keyed by
+    the git revision, a fingerprint of the machine it ran on and the names of its benchmarks.
+    Existing lines are never changed.
+
+    python scripts/benchmark_results.py add benchmark.json
+    python scripts/benchmark_results.py list
+    python scripts/benchmark_results.py compare <base revision> <head revision> --threshold 0.1
+***************************************************************************
+*                                                                         *
+*   This program is free software; you can redistribute it and/or modify  *
+*   it under the terms of the GNU General Public License as published by  *
+*   the Free Software Foundation; either version 2 of the License, or     *
+*   (at your option) any later version.                                   *
+*                                                                         *
+***************************************************************************
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+DIR_REPO = Path(__file__).parents[1]
+PATH_STORE = DIR_REPO / 'benchmarks' / 'results.jsonl'
+
+STORE_FORMAT = 'eotsv-benchmark-run'
+STORE_VERSION = 1
+
+# environment properties that identify a machine
+MACHINE_KEYS = ['node', 'platform', 'machine', 'processor', 'cpu_count', 'memory_total']
+
+
+def machineFingerprint(environment: Dict[str, Any]) -> str:
+    """
+    Returns a short id of the machine described by an environment info dictionary,
+    see eotimeseriesviewer.systeminfo.environmentInfo()
+    """
+    values = [(k, environment.get(k)) for k in MACHINE_KEYS]
+    return hashlib.sha1(json.dumps(values).encode('utf-8')).hexdigest()[0:12]
+
+
+def benchmarkKey(result: Dict[str, Any]) -> str:
+    """
+    Returns the key of a benchmark result, i.e. its name and parameters, e.g. 'find_overlap[extent=center,n_threads=4]'
+    """
+    params = result.get('params', {})
+    if len(params) == 0:
+        return result['name']
+    return '{}[{}]'.format(result['name'], ','.join(f'{k}={params[k]}' for k in sorted(params.keys())))
+
+
+def resolveRevision(revision: str, repo: Union[str, Path] = DIR_REPO) -> str:
+    """
+    Resolves git references like HEAD~1 or branch names to a commit hash.
+    Returns the input if it cannot be resolved, e.g. for abbreviated hashes of foreign repositories.
+    """
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--verify', f'{revision}^{{commit}}'], cwd=repo,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return revision
+
+
+class BenchmarkStore(object):
+    """
+    An append-only store of benchmark runs
+    """
+
+    def __init__(self, path: Union[str, Path] = PATH_STORE):
+        self.mPath = Path(path)
+
+    def path(self) -> Path:
+        return self.mPath
+
+    def addRun(self,
+               results: List[Dict[str, Any]],
+               environment: Dict[str, Any],
+               revision: Optional[str],
+               config: Dict[str, Any] = None,
+               created: str = None) -> Dict[str, Any]:
+        """
+        Appends a benchmark run
+        :param results: list of benchmark results, each with 'name', 'seconds' and optional 'params'
+        :param environment: environment info, see eotimeseriesviewer.systeminfo.environmentInfo()
+        :param revision: git revision
+        :param config: benchmark configuration
+        :param created: ISO timestamp of the run. Defaults to now.
+        :return: the stored run
+        """
+        for r in results:
+            assert 'name' in r and len(r.get('seconds', [])) > 0, f'Invalid benchmark result: {r}'
+        run = {'format': STORE_FORMAT,
+               'version': STORE_VERSION,
+               'created': created if created else datetime.datetime.now().isoformat(),
+               'revision': revision,
+               'machine': machineFingerprint(environment),
+               'environment': environment,
+               'config': config if config else {},
+               'results': [dict(r, key=benchmarkKey(r)) for r in results],
+               }
+        self.mPath.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.mPath, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(run, sort_keys=True) + '\n')
+        return run
+
+    def addBenchmarkFile(self, path: Union[str, Path]) -> Dict[str, Any]:
+        """
+        Appends the results written by scripts/benchmark_suite.py
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return self.addRun(data['results'], data['environment'], data.get('git_revision'),
+                           config=data.get('config'), created=data.get('created'))
+
+    def runs(self,
+             revision: Optional[str] = None,
+             machine: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Returns the stored runs
+        :param revision: revision or revision prefix the runs need to belong to
+        :param machine: machine fingerprint the runs need to belong to
+        """
+        if not self.mPath.is_file():
+            return
+        with open(self.mPath, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line == '':
+                    continue
+                run = json.loads(line)
+                if run.get('format') != STORE_FORMAT:
+                    continue
+                if revision and not str(run.get('revision')).startswith(revision):
+                    continue
+                if machine and run.get('machine') != machine:
+                    continue
+                yield run
+
+    def samples(self, revision: str, machine: Optional[str] = None) -> Dict[str, List[float]]:
+        """
+        Returns the durations of all runs of a revision, pooled by benchmark key
+        """
+        samples: Dict[str, List[float]] = dict()
+        for run in self.runs(revision=revision, machine=machine):
+            for result in run['results']:
+                samples.setdefault(result['key'], []).extend(result['seconds'])
+        return samples
+
+
+def relativeChange(base: List[float],
+                   head: List[float],
+                   confidence: float = 0.95,
+                   n_bootstrap: int = 2000,
+                   seed: int = 0) -> Tuple[float, float, float]:
+    """
+    Returns the relative change of the mean duration from base to head, e.g. 0.1 for 10 % slower,
+    and its confidence interval. The interval is estimated by bootstrapping the samples of both revisions.
+    :return: (change, lower bound, upper bound)
+    """
+    a = np.asarray(base, dtype=float)
+    b = np.asarray(head, dtype=float)
+    change = float(b.mean() / a.mean() - 1)
+    if len(a) < 2 or len(b) < 2:
+        # no repeated runs, no estimate of the variance
+        return change, float('-inf'), float('inf')
+    rng = np.random.default_rng(seed)
+    ma = rng.choice(a, size=(n_bootstrap, len(a))).mean(axis=1)
+    mb = rng.choice(b, size=(n_bootstrap, len(b))).mean(axis=1)
+    changes = mb / ma - 1
+    alpha = 0.5 * (1 - confidence)
+    lower, upper = np.quantile(changes, [alpha, 1 - alpha])
+    return change, float(lower), float(upper)
+
+
+def compareRevisions(store: BenchmarkStore,
+                     base: str,
+                     head: str,
+                     machine: Optional[str] = None,
+                     threshold: float = 0.1,
+                     thresholds: Dict[str, float] = None,
+                     confidence: float = 0.95) -> List[Dict[str, Any]]:
+    """
+    Compares the benchmark results of two revisions. A benchmark fails if its duration increased by more than
+    the threshold with the given confidence, i.e. if the lower bound of the confidence interval exceeds the threshold.
+    :param store: BenchmarkStore
+    :param base: base revision
+    :param head: revision to compare with the base revision
+    :param machine: machine fingerprint. Use None to compare results of all machines.
+    :param threshold: default threshold for the relative change, e.g. 0.1 for 10 %
+    :param thresholds: thresholds for single benchmarks by benchmark name or key
+    :param confidence: confidence level of the confidence interval
+    :return: list with a comparison for each benchmark key that exists in both revisions
+    """
+    if thresholds is None:
+        thresholds = dict()
+    samplesBase = store.samples(base, machine=machine)
+    samplesHead = store.samples(head, machine=machine)
+
+    comparisons = []
+    for key in sorted(set(samplesBase.keys()) & set(samplesHead.keys())):
+        name = key.split('[')[0]
+        limit = thresholds.get(key, thresholds.get(name, threshold))
+        change, lower, upper = relativeChange(samplesBase[key], samplesHead[key], confidence=confidence)
+        comparisons.append({'key': key,
+                            'base_mean': float(np.mean(samplesBase[key])),
+                            'head_mean': float(np.mean(samplesHead[key])),
+                            'n_base': len(samplesBase[key]),
+                            'n_head': len(samplesHead[key]),
+                            'change': change,
+                            'ci_lower': lower,
+                            'ci_upper': upper,
+                            'threshold': limit,
+                            'failed': lower > limit,
+                            })
+    return comparisons
+
+
+def printComparisons(comparisons: List[Dict[str, Any]], confidence: float = 0.95):
+    print(f'{"benchmark":<60} {"base [s]":>10} {"head [s]":>10} {"change":>9}  {int(confidence * 100)}% CI')
+    for c in comparisons:
+        status = 'FAILED' if c['failed'] else ''
+        print(f'{c["key"]:<60} {c["base_mean"]:>10.4f} {c["head_mean"]:>10.4f} {c["change"]:>+9.1%}  '
+              f'[{c["ci_lower"]:+.1%}, {c["ci_upper"]:+.1%}] {status}')
+
+
+def parseThresholds(values: List[str]) -> Dict[str, float]:
+    thresholds = dict()
+    for v in values:
+        name, value = v.split('=', 1)
+        thresholds[name] = float(value)
+    return thresholds
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Store and compare EO Time Series Viewer benchmark results')
+    parser.add_argument('--store', default=PATH_STORE.as_posix(), help='JSON Lines file with the benchmark runs')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    pAdd = subparsers.add_parser('add', help='add results written by scripts/benchmark_suite.py')
+    pAdd.add_argument('files', nargs='+')
+
+    pList = subparsers.add_parser('list', help='list stored runs')
+    pList.add_argument('--revision', default=None)
+    pList.add_argument('--machine', default=None)
+
+    pCompare = subparsers.add_parser('compare', help='compare two revisions')
+    pCompare.add_argument('base', help='base revision')
+    pCompare.add_argument('head', help='revision to compare with')
+    pCompare.add_argument('--machine', default=None,
+                          help='machine fingerprint. Defaults to the machine of the latest run of the head revision')
+    pCompare.add_argument('--all-machines', action='store_true', help='pool results of all machines')
+    pCompare.add_argument('--threshold', type=float, default=0.1,
+                          help='maximum allowed relative increase of the mean duration, e.g. 0.1 for 10 %%')
+    pCompare.add_argument('--threshold-for', nargs='*', default=[], metavar='NAME=VALUE',
+                          help='thresholds for single benchmarks, e.g. load_sources=0.05')
+    pCompare.add_argument('--confidence', type=float, default=0.95)
+    pCompare.add_argument('--json', action='store_true', help='print the comparison as JSON')
+
+    args = parser.parse_args()
+    STORE = BenchmarkStore(args.store)
+
+    if args.command == 'add':
+        for file in args.files:
+            run = STORE.addBenchmarkFile(file)
+            print(f'Added {len(run["results"])} results of revision {run["revision"]} '
+                  f'on machine {run["machine"]} to {STORE.path()}')
+
+    elif args.command == 'list':
+        revision = resolveRevision(args.revision) if args.revision else None
+        for run in STORE.runs(revision=revision, machine=args.machine):
+            print(f'{run["created"]} {run["revision"]} {run["machine"]} {len(run["results"])} results')
+
+    elif args.command == 'compare':
+        base = resolveRevision(args.base)
+        head = resolveRevision(args.head)
+        machine = args.machine
+        if machine is None and not args.all_machines:
+            runs = list(STORE.runs(revision=head))
+            if len(runs) == 0:
+                print(f'No results for revision {head}', file=sys.stderr)
+                sys.exit(2)
+            machine = runs[-1]['machine']
+
+        COMPARISONS = compareRevisions(STORE, base, head,
+                                       machine=machine,
+                                       threshold=args.threshold,
+                                       thresholds=parseThresholds(args.threshold_for),
+                                       confidence=args.confidence)
+        if len(COMPARISONS) == 0:
+            print(f'No common benchmarks for revisions {base} and {head}', file=sys.stderr)
+            sys.exit(2)
+        if args.json:
+            print(json.dumps(COMPARISONS, indent=2))
+        else:
+            printComparisons(COMPARISONS, confidence=args.confidence)
+        if any(c['failed'] for c in COMPARISONS):
+            sys.exit(1)
@@ -0,0 +1,499 @@
+# -*- coding: utf-8 -*-
+
+"""
+***************************************************************************
+    benchmark_suite.py
+    Benchmarks the EO Time Series Viewer on synthetic time series.
+    The time series are created in a temporary directory, so the benchmarks run offline
+    and without any external data, e.g. to track performance regressions per commit.
+
+    python scripts/benchmark_suite.py --n-sources 200 --output benchmark.json
+***************************************************************************
+*                                                                         *
+*   This program is free software; you can redistribute it and/or modify  *
+*   it under the terms of the GNU General Public License as published by  *
+*   the Free Software Foundation; either version 2 of the License, or     *
+*   (at your option) any later version.                                   *
+*                                                                         *
+***************************************************************************
+"""
+import argparse
+import datetime
+import json
+import os
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+from osgeo import gdal, osr
+
+from eotimeseriesviewer import DIR_REPO, iostats
+
+BENCHMARK_FORMAT = 'eotsv-benchmark'
+BENCHMARK_VERSION = 1
+
+# synthetic sensors: name, wavelengths in micrometers, pixel size in meters, data type
+SYNTHETIC_SENSORS: Dict[str, dict] = {
+    'LND': dict(wavelengths=[0.49, 0.56, 0.66, 0.84, 1.65, 2.2], pixel_size=30, data_type=gdal.GDT_Int16),
+    'SEN2': dict(wavelengths=[0.49, 0.56, 0.665, 0.705, 0.74, 0.783, 0.842, 0.865, 1.61, 2.19],
+                 pixel_size=10, data_type=gdal.GDT_Int16),
+    'MOD': dict(wavelengths=[0.645, 0.858, 0.469, 0.555], pixel_size=250, data_type=gdal.GDT_Int16),
+}
+
+SYNTHETIC_FORMATS = {'GTiff': '.tif', 'VRT': '.vrt', 'ENVI': '.bsq'}
+
+NO_DATA = -9999
+
+ALL_BENCHMARKS = ['load_sources', 'find_overlap', 'temporal_profiles', 'plot_update', 'map_refresh']
+
+
+def gitRevision(path: Union[str, Path] = DIR_REPO) -> Optional[str]:
+    """
+    Returns the git revision of the repository the benchmarks run in
+    """
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=path,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def createSyntheticTimeSeries(directory: Union[str, Path],
+                              n_sources: int = 100,
+                              size: Tuple[int, int] = (256, 256),
+                              sensors: List[str] = None,
+                              formats: List[str] = None,
+                              crs: List[str] = None,
+                              nodata_fraction: float = 0.25,
+                              center: Tuple[float, float] = (13.4, 52.5),
+                              start_date: str = '2020-01-01',
+                              seed: int = 42) -> List[str]:
+    """
+    Creates a synthetic time series of raster files. Sensors, file formats and CRS are assigned to
+    the sources in turn, so that each combination occurs in a time series of sufficient length.
+    All images cover approximately the same area around the center coordinate.
+    :param directory: directory to write the files into
+    :param n_sources: number of sources
+    :param size: image size in pixels (columns, rows)
+    :param sensors: list of SYNTHETIC_SENSORS names, defaults to all sensors
+    :param formats: list of GDAL drivers, see SYNTHETIC_FORMATS. Defaults to all formats
+    :param crs: list of CRS authority ids, defaults to a mix of UTM and LAEA
+    :param nodata_fraction: fraction of image columns on the left side that is filled with no-data values
+    :param center: center coordinate (lon, lat)
+    :param start_date: date of the first observation
+    :param seed: seed of the random number generator
+    :return: list of file paths
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    if sensors is None:
+        sensors = list(SYNTHETIC_SENSORS.keys())
+    if formats is None:
+        formats = list(SYNTHETIC_FORMATS.keys())
+    if crs is None:
+        crs = ['EPSG:32633', 'EPSG:3035']
+    assert 0 <= nodata_fraction <= 1
+    assert all(s in SYNTHETIC_SENSORS for s in sensors)
+    assert all(f in SYNTHETIC_FORMATS for f in formats)
+
+    rng = np.random.default_rng(seed)
+    ns, nl = size
+    srs_wgs84 = osr.SpatialReference()
+    srs_wgs84.SetFromUserInput('EPSG:4326')
+    srs_wgs84.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+
+    # center coordinate of the common image area in each CRS
+    origins: Dict[str, Tuple[float, float, str]] = dict()
+    for c in crs:
+        srs = osr.SpatialReference()
+        srs.SetFromUserInput(c)
+        srs.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+        trans = osr.CoordinateTransformation(srs_wgs84, srs)
+        x, y, _ = trans.TransformPoint(center[0], center[1])
+        origins[c] = (x, y, srs.ExportToWkt())
+
+    drvMEM: gdal.Driver = gdal.GetDriverByName('MEM')
+    d0 = np.datetime64(start_date)
+    files = []
+    for i in range(n_sources):
+        sensor = sensors[i % len(sensors)]
+        fmt = formats[(i // len(sensors)) % len(formats)]
+        c = crs[i % len(crs)]
+        specs = SYNTHETIC_SENSORS[sensor]
+        nb = len(specs['wavelengths'])
+        px = specs['pixel_size']
+        date = d0 + np.timedelta64(int(i * 3), 'D')
+        x0, y0, wkt = origins[c]
+
+        ds: gdal.Dataset = drvMEM.Create('', ns, nl, nb, specs['data_type'])
+        ds.SetProjection(wkt)
+        ds.SetGeoTransform([x0 - 0.5 * ns * px, px, 0, y0 + 0.5 * nl * px, 0, -px])
+        ds.SetMetadataItem('ACQUISITIONDATETIME', f'{date}T10:30:00', 'IMAGERY')
+        n_nodata = int(round(nodata_fraction * ns))
+        for b in range(nb):
+            band: gdal.Band = ds.GetRasterBand(b + 1)
+            band.SetNoDataValue(NO_DATA)
+            band.SetDescription(f'{sensor} band {b + 1}')
+            band.SetMetadataItem('wavelength', str(specs['wavelengths'][b]))
+            band.SetMetadataItem('wavelength_units', 'micrometers')
+            array = rng.integers(0, 10000, size=(nl, ns), dtype=np.int16)
+            array[:, 0:n_nodata] = NO_DATA
+            band.WriteArray(array)
+
+        basename = f'{date.astype(object):%Y%m%d}_{sensor}_{i:05d}'
+        if fmt == 'VRT':
+            path_data = directory / 'data' / f'{basename}.tif'
+            path_data.parent.mkdir(exist_ok=True)
+            gdal.Translate(path_data.as_posix(), ds, format='GTiff')
+            path = directory / f'{basename}{SYNTHETIC_FORMATS[fmt]}'
+            gdal.Translate(path.as_posix(), path_data.as_posix(), format='VRT')
+        else:
+            path = directory / f'{basename}{SYNTHETIC_FORMATS[fmt]}'
+            gdal.Translate(path.as_posix(), ds, format=fmt)
+        del ds
+        files.append(path.as_posix())
+    return files
+
+
+def measure(func: Callable[[], Any], repeats: int = 3) -> List[float]:
+    """
+    Calls func repeatedly and returns the durations in seconds.
+    Resets the GDAL I/O totals, which then count the I/O of all repetitions.
+    """
+    iostats.clear()
+    durations = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - t0)
+    return durations
+
+
+def summary(durations: List[float]) -> Dict[str, float]:
+    d = np.asarray(durations)
+    return {'mean': float(d.mean()),
+            'median': float(np.median(d)),
+            'min': float(d.min()),
+            'max': float(d.max()),
+            'std': float(d.std())}
+
+
+class SyntheticBenchmarkSuite(object):
+    """
+    Runs the benchmarks on a synthetic time series
+    """
+
+    def __init__(self,
+                 files: List[str],
+                 n_threads: int = 4,
+                 n_points: int = 10,
+                 n_maps: int = 4,
+                 repeats: int = 3):
+        self.mFiles = files
+        self.mThreads = n_threads
+        self.mPoints = n_points
+        self.mMaps = n_maps
+        self.mRepeats = repeats
+        self.mSources = []
+        self.mProfiles = []
+        self.mResults: List[Dict[str, Any]] = []
+
+    def addResult(self, name: str, durations: List[float], n_items: int, **params):
+        result = {'name': name,
+                  'n_items': n_items,
+                  'params': params,
+                  'seconds': durations,
+                  'summary': summary(durations),
+                  }
+        if iostats.isEnabled():
+            # GDAL I/O of all repetitions
+            result['io'] = iostats.TOTALS.asMap()
+            if network := iostats.networkStatistics():
+                result['io']['network'] = network
+        self.mResults.append(result)
+        print(f'{name}: {result["summary"]["median"]:.3f}s (n={n_items}, repeats={len(durations)})')
+        return result
+
+    def results(self) -> List[Dict[str, Any]]:
+        return self.mResults[:]
+
+    def run(self, benchmarks: List[str] = None) -> List[Dict[str, Any]]:
+        """
+        Runs the benchmarks. Later benchmarks depend on the sources loaded by the 'load_sources' benchmark,
+        which is therefore always run.
+        """
+        if benchmarks is None:
+            benchmarks = ALL_BENCHMARKS
+        self.benchmarkLoadSources()
+        if 'find_overlap' in benchmarks:
+            self.benchmarkFindOverlap()
+        if 'temporal_profiles' in benchmarks or 'plot_update' in benchmarks:
+            self.benchmarkTemporalProfiles()
+        if 'plot_update' in benchmarks:
+            self.benchmarkPlotUpdate()
+        if 'map_refresh' in benchmarks:
+            self.benchmarkMapRefresh()
+        return self.results()
+
+    def sourceExtent(self):
+        from eotimeseriesviewer.timeseries.source import TimeSeriesSource
+        tss: TimeSeriesSource = self.mSources[0]
+        return tss.spatialExtent()
+
+    def benchmarkLoadSources(self):
+        from eotimeseriesviewer.sensors import clearSensorIdCache
+        from eotimeseriesviewer.sourceinfo import pythonExecutable
+        from eotimeseriesviewer.timeseries.tasks import TimeSeriesLoadingTask
+
+        for use_processes in [False, True]:
+            task = None
+
+            def load():
+                nonlocal task
+                clearSensorIdCache()
+                task = TimeSeriesLoadingTask(self.mFiles, n_threads=self.mThreads, use_processes=use_processes)
+                task.run_serial()
+
+            if use_processes and pythonExecutable() is None:
+                continue
+            durations = measure(load, self.mRepeats)
+            assert len(task.invalidSources()) == 0, f'Unable to load sources: {task.invalidSources()[0:5]}'
+            self.mSources = task.validSources()
+            self.addResult('load_sources', durations, len(self.mFiles),
+                           n_threads=self.mThreads, use_processes=use_processes)
+
+    def benchmarkFindOverlap(self):
+        from eotimeseriesviewer.qgispluginsupport.qps.utils import SpatialExtent
+        from eotimeseriesviewer.timeseries.tasks import TimeSeriesFindOverlapTask
+
+        ext = self.sourceExtent()
+        # a small extent at the image center and an extent at the left image edge,
+        # which covers the no-data columns of images with the same pixel size
+        w, h = ext.width(), ext.height()
+        extents = {'center': SpatialExtent(ext.crs(), ext.center().x() - 0.05 * w, ext.center().y() - 0.05 * h,
+                                           ext.center().x() + 0.05 * w, ext.center().y() + 0.05 * h),
+                   'edge': SpatialExtent(ext.crs(), ext.xMinimum(), ext.yMinimum(),
+                                           ext.xMinimum() + 0.05 * w, ext.yMaximum()),
+                   }
+        for name, extent in extents.items():
+            def find():
+                task = TimeSeriesFindOverlapTask(extent, self.mSources, n_threads=self.mThreads)
+                task.run_serial()
+
+            durations = measure(find, self.mRepeats)
+            self.addResult('find_overlap', durations, len(self.mSources), n_threads=self.mThreads, extent=name)
+
+    def profilePoints(self):
+        from qgis.core import QgsPointXY
+        ext = self.sourceExtent()
+        rng = np.random.default_rng(0)
+        x = rng.uniform(ext.xMinimum(), ext.xMaximum(), self.mPoints)
+        y = rng.uniform(ext.yMinimum(), ext.yMaximum(), self.mPoints)
+        return [QgsPointXY(float(px), float(py)) for px, py in zip(x, y)], ext.crs()
+
+    def benchmarkTemporalProfiles(self):
+        from eotimeseriesviewer.temporalprofile.temporalprofile import LoadTemporalProfileTask
+
+        points, crs = self.profilePoints()
+        sources = [tss.source() for tss in self.mSources]
+        task = None
+
+        def load():
+            nonlocal task
+            task = LoadTemporalProfileTask(sources, points, crs, n_threads=self.mThreads)
+            task.run_serial()
+
+        durations = measure(load, self.mRepeats)
+        self.mProfiles = list(zip(task.profilePoints(), task.profiles()))
+        self.addResult('temporal_profiles', durations, len(sources),
+                       n_threads=self.mThreads, n_points=len(points))
+
+    def benchmarkPlotUpdate(self):
+        from eotimeseriesviewer.temporalprofile.temporalprofile import TemporalProfileUtils
+        from eotimeseriesviewer.temporalprofile.visualization import TemporalProfileDock
+        from eotimeseriesviewer.timeseries.timeseries import TimeSeries
+        from qgis.core import edit, QgsFeature, QgsGeometry, QgsProject
+
+        ts = TimeSeries()
+        ts.addSources([tss.asMap() for tss in self.mSources])
+
+        layer = TemporalProfileUtils.createProfileLayer()
+        field = TemporalProfileUtils.temporalProfileFields(layer)[0].name()
+        features = []
+        for point, profile in self.mProfiles:
+            if profile:
+                f = QgsFeature(layer.fields())
+                f.setGeometry(QgsGeometry.fromPointXY(point))
+                f.setAttribute(field, profile)
+                features.append(f)
+        with edit(layer):
+            layer.addFeatures(features)
+
+        project = QgsProject()
+        project.addMapLayer(layer)
+
+        docks = []
+
+        def plotInitial():
+            # creates the visualization and plots all profiles
+            dock = TemporalProfileDock()
+            dock.setTimeSeries(ts)
+            dock.setProject(project)
+            docks.append(dock)
+
+        durations = measure(plotInitial, self.mRepeats)
+        self.addResult('plot_update', durations, len(features), mode='initial')
+
+        dock = docks[-1]
+        durations = measure(lambda: dock.mVis.updatePlot(), self.mRepeats)
+        self.addResult('plot_update', durations, len(features), mode='update')
+
+        for d in docks:
+            d.mVis.removeAllLayerConnections()
+        project.removeAllMapLayers()
+        ts.clear()
+
+    def benchmarkMapRefresh(self):
+        from eotimeseriesviewer.main import EOTimeSeriesViewer
+        from qgis.core import QgsApplication
+
+        eotsv = EOTimeSeriesViewer()
+        eotsv.ui.show()
+        eotsv.timeSeries().addSources([tss.asMap() for tss in self.mSources])
+        eotsv.setMapsPerMapView(self.mMaps, 1)
+        eotsv.setSpatialExtent(self.sourceExtent())
+        QgsApplication.processEvents()
+
+        tsds = list(eotsv.timeSeries())
+        i_tsd = 0
+
+        def refresh():
+            nonlocal i_tsd
+            # move to other dates, so that the canvases need to load new layers
+            i_tsd = (i_tsd + self.mMaps) % len(tsds)
+            eotsv.setCurrentDate(tsds[i_tsd])
+            eotsv.mapWidget().timedRefresh(load_async=False)
+            QgsApplication.processEvents()
+            for canvas in eotsv.mapCanvases():
+                canvas.waitWhileRendering()
+
+        durations = measure(refresh, self.mRepeats)
+        self.addResult('map_refresh', durations, len(eotsv.mapCanvases()), n_maps=self.mMaps)
+        eotsv.close()
+        QgsApplication.processEvents()
+
+
+def runBenchmarks(directory: Union[str, Path] = None,
+                  benchmarks: List[str] = None,
+                  n_threads: int = 4,
+                  n_points: int = 10,
+                  n_maps: int = 4,
+                  repeats: int = 3,
+                  io_stats: bool = True,
+                  **kwds) -> Dict[str, Any]:
+    """
+    Creates a synthetic time series and runs the benchmarks on it
+    :param directory: directory to create the time series in. Defaults to a temporary directory.
+    :param benchmarks: list of benchmark names, see ALL_BENCHMARKS
+    :param n_threads: number of threads used by the tasks
+    :param n_points: number of temporal profiles to load
+    :param n_maps: number of maps to refresh
+    :param repeats: number of times each benchmark is repeated
+    :param io_stats: set False to disable the GDAL I/O accounting, see eotimeseriesviewer.iostats
+    :param kwds: keywords for createSyntheticTimeSeries
+    :return: dict with the benchmark results, the configuration and environment information
+    """
+    from eotimeseriesviewer.systeminfo import environmentInfo
+
+    with tempfile.TemporaryDirectory(prefix='eotsv_benchmark_') as tmp:
+        if directory is None:
+            directory = tmp
+        t0 = time.perf_counter()
+        files = createSyntheticTimeSeries(directory, **kwds)
+        print(f'Created {len(files)} synthetic sources in {time.perf_counter() - t0:.1f}s')
+
+        suite = SyntheticBenchmarkSuite(files, n_threads=n_threads, n_points=n_points, n_maps=n_maps,
+                                        repeats=repeats)
+        wasEnabled = iostats.isEnabled()
+        iostats.setEnabled(io_stats)
+        try:
+            results = suite.run(benchmarks)
+        finally:
+            iostats.setEnabled(wasEnabled)
+
+    config = dict(kwds)
+    config.update(n_threads=n_threads, n_points=n_points, n_maps=n_maps, repeats=repeats, io_stats=io_stats)
+    return {'format': BENCHMARK_FORMAT,
+            'version': BENCHMARK_VERSION,
+            'created': datetime.datetime.now().isoformat(),
+            'git_revision': gitRevision(),
+            'environment': environmentInfo(),
+            'config': config,
+            'results': results,
+            }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run EO Time Series Viewer benchmarks on a synthetic time series')
+    parser.add_argument('-n', '--n-sources', type=int, default=100, help='number of sources')
+    parser.add_argument('--size', type=int, nargs=2, default=[256, 256], metavar=('COLUMNS', 'ROWS'),
+                        help='image size in pixels')
+    parser.add_argument('--sensors', nargs='+', default=list(SYNTHETIC_SENSORS.keys()),
+                        choices=list(SYNTHETIC_SENSORS.keys()))
+    parser.add_argument('--formats', nargs='+', default=list(SYNTHETIC_FORMATS.keys()),
+                        choices=list(SYNTHETIC_FORMATS.keys()))
+    parser.add_argument('--crs', nargs='+', default=['EPSG:32633', 'EPSG:3035'], help='CRS authority ids')
+    parser.add_argument('--nodata-fraction', type=float, default=0.25,
+                        help='fraction of image columns filled with no-data values')
+    parser.add_argument('--benchmarks', nargs='+', default=ALL_BENCHMARKS, choices=ALL_BENCHMARKS)
+    parser.add_argument('--threads', type=int, default=4, help='number of threads')
+    parser.add_argument('--points', type=int, default=10, help='number of temporal profiles')
+    parser.add_argument('--maps', type=int, default=4, help='number of maps')
+    parser.add_argument('--repeats', type=int, default=3, help='number of repetitions')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-io-stats', action='store_true', help='do not count GDAL I/O operations')
+    parser.add_argument('--directory', default=None,
+                        help='directory to create the synthetic time series in. Defaults to a temporary directory')
+    parser.add_argument('-o', '--output', default=None, help='JSON file to write the results to')
+    parser.add_argument('--store', default=None,
+                        help='JSON Lines file to append the results to, see scripts/benchmark_results.py')
+    args = parser.parse_args()
+
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from eotimeseriesviewer import initAll
+    from eotimeseriesviewer.tests import start_app
+
+    app = start_app()
+    initAll()
+
+    RESULTS = runBenchmarks(directory=args.directory,
+                            benchmarks=args.benchmarks,
+                            n_threads=args.threads,
+                            n_points=args.points,
+                            n_maps=args.maps,
+                            repeats=args.repeats,
+                            io_stats=not args.no_io_stats,
+                            n_sources=args.n_sources,
+                            size=tuple(args.size),
+                            sensors=args.sensors,
+                            formats=args.formats,
+                            crs=args.crs,
+                            nodata_fraction=args.nodata_fraction,
+                            seed=args.seed)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(RESULTS, f, indent=2)
+        print(f'Results written to {args.output}')
+    elif not args.store:
+        print(json.dumps(RESULTS, indent=2))
+
+    if args.store:
+        from scripts.benchmark_results import BenchmarkStore
+
+        BenchmarkStore(args.store).addRun(RESULTS['results'], RESULTS['environment'], RESULTS['git_revision'],
+                                          config=RESULTS['config'], created=RESULTS['created'])
+        print(f'Results appended to {args.store}')
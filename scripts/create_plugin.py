@@ -171,6 +171,10 @@ def create_plugin(include_testdata: bool = False,
         os.makedirs(fileDst.parent, exist_ok=True)
         shutil.copy(fileSrc, fileDst.parent)
 
+    # precompile the spyndex index, so that the plugin does not need to parse the spyndex JSON files
+    from eotimeseriesviewer.spectralindices import write_spyndex_index
+    write_spyndex_index(PLUGIN_DIR / 'eotimeseriesviewer' / 'spyndex' / 'data' / 'spyndex.pkl')
+
     # update metadata version
 
     with open(DIR_REPO / 'eotimeseriesviewer' / '__init__.py', encoding='utf-8') as f:
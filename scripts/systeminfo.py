@@ -1,15 +1,8 @@
-import platform
-import sys
+import json
 
-from qgis.core import Qgis
+from eotimeseriesviewer.systeminfo import environmentInfo
 
-print(platform.platform())
-print(platform.processor())
-print(platform.python_implementation())
-print(platform.python_version())
-print(f'Sys exe: {sys.executable}')
-
-print(f'QGIS: {Qgis.version()} {Qgis.devVersion()}')
+print(json.dumps(environmentInfo(), indent=2))
 
 print('Package locations:')
 packages = ['osgeo.gdal', 'numpy', 'scipy', 'OpenGL',
@@ -5,7 +5,6 @@ import unittest
 from pathlib import Path
 from typing import Union
 
-import numpy as np
 import tqdm
 from openpyxl.reader.excel import load_workbook
 from openpyxl.styles import Alignment, Border, Font, Side
@@ -21,9 +20,12 @@ from eotimeseriesviewer.force import FORCEUtils
 from eotimeseriesviewer.forceinputs import FindFORCEProductsTask
 from eotimeseriesviewer.main import EOTimeSeriesViewer
 from eotimeseriesviewer.processing.processingalgorithms import ReadTemporalProfiles
+from eotimeseriesviewer.systeminfo import environmentInfo
 from eotimeseriesviewer.tests import EOTSVTestCase, start_app
 from eotimeseriesviewer.timeseries.source import TimeSeriesSource
 from eotimeseriesviewer.timeseries.tasks import hasValidPixel
+from scripts.benchmark_results import BenchmarkStore
+from scripts.benchmark_suite import gitRevision
 
 start_app()
 initAll()
@@ -58,10 +60,37 @@ def get_sheet(name: str, book: Workbook) -> Worksheet:
 @unittest.skipIf(EOTSVTestCase.runsInCI(), 'Benchmark Tests. Not to run in CI')
 class BenchmarkTestCase(EOTSVTestCase):
 
+    def test_synthetic_benchmarks(self):
+        from scripts.benchmark_results import compareRevisions
+        from scripts.benchmark_suite import ALL_BENCHMARKS, BENCHMARK_FORMAT, runBenchmarks
+
+        dir_ts = self.createTestOutputDirectory() / 'synthetic_timeseries'
+        results = runBenchmarks(directory=dir_ts, n_sources=12, size=(64, 64), n_points=3, n_maps=2, repeats=2)
+
+        self.assertEqual(results['format'], BENCHMARK_FORMAT)
+        self.assertIsInstance(results['environment'], dict)
+        self.assertEqual(set(r['name'] for r in results['results']), set(ALL_BENCHMARKS))
+        for r in results['results']:
+            self.assertEqual(len(r['seconds']), 2)
+            self.assertIsInstance(r['io'], dict)
+        io = {(r['name'], tuple(sorted(r['params'].items()))): r['io'] for r in results['results']}
+        for (name, params), counts in io.items():
+            if name == 'load_sources':
+                self.assertTrue(counts['opens'] >= 2 * 12, msg=f'{params}: {counts}')
+            elif name == 'temporal_profiles':
+                self.assertTrue(counts['reads'] > 0 and counts['bytes'] > 0)
+        store = BenchmarkStore(self.createTestOutputDirectory() / 'benchmark_results.jsonl')
+        store.addRun(results['results'], results['environment'], 'base', config=results['config'])
+        store.addRun(results['results'], results['environment'], 'head', config=results['config'])
+        comparisons = compareRevisions(store, 'base', 'head', threshold=0.1)
+        self.assertEqual(len(comparisons), len(results['results']))
+        for c in comparisons:
+            self.assertAlmostEqual(c['change'], 0)
+            self.assertFalse(c['failed'])
+
     @unittest.skipIf(not FORCE_MOSAICS.is_dir(), 'Missing FORCE_CUBE')
     def test_load_mosaic_overlap(self):
         path_files = DIR_BENCHMARKS / 'benchmark_load_mosaics_files.json'
-        path_json = DIR_BENCHMARKS / 'benchmark_load_mosaics_overlap.json'
         files = None
 
         if not path_files.is_file():
@@ -106,40 +135,14 @@ class BenchmarkTestCase(EOTSVTestCase):
                     duration_gdal.append(t2)
                 pbar.update(1)
 
-        if path_json.is_file():
-            with open(path_json, 'r') as f:
-                RESULTS = json.load(f)
-        else:
-            RESULTS = dict()
-
-        dur_gdal = np.asarray(duration_gdal)
-        dur_ts = np.asarray(duration_lyr)
-
-        descr = 'test mosaic overlap'
-        INFO = {'description': descr,
-                'n_files': n,
-                'root': FORCE_MOSAICS.as_posix(),
-                't_lyr_total': float(dur_ts.sum()),
-                't_lyr_mean': float(dur_ts.mean()),
-                't_lyr_min': float(dur_ts.min()),
-                't_lyr_max': float(dur_ts.max()),
-                't_lyr_std': float(dur_ts.std()),
-                't_gdal_total': float(dur_gdal.sum()),
-                't_gdal_mean': float(dur_gdal.mean()),
-                't_gdal_min': float(dur_gdal.min()),
-                't_gdal_max': float(dur_gdal.max()),
-                't_gdal_std': float(dur_gdal.std())
-                }
-
-        RESULTS[descr] = INFO
-
-        with open(path_json, 'w') as f:
-            json.dump(RESULTS, f, indent=2)
+        results = [{'name': 'force_mosaic_overlap', 'params': {'api': 'qgis'}, 'seconds': duration_lyr},
+                   {'name': 'force_mosaic_overlap', 'params': {'api': 'gdal'}, 'seconds': duration_gdal}]
+        BenchmarkStore().addRun(results, environmentInfo(), gitRevision(),
+                                config={'n_files': n, 'root': FORCE_MOSAICS.as_posix()})
 
     @unittest.skipIf(not FORCE_MOSAICS.is_dir(), 'Missing FORCE_CUBE')
     def test_load_mosaic_sources(self):
         path_files = DIR_BENCHMARKS / 'benchmark_load_mosaics_files.json'
-        path_json = DIR_BENCHMARKS / 'benchmark_load_mosaics_results.json'
         files = None
 
         if not path_files.is_file():
@@ -187,35 +190,12 @@ class BenchmarkTestCase(EOTSVTestCase):
                 duration_gdal.append(t2_get_gdal_with_md(file))
                 pbar.update(1)
 
-        if path_json.is_file():
-            with open(path_json, 'r') as f:
-                RESULTS = json.load(f)
-        else:
-            RESULTS = dict()
-
-        dur_gdal = np.asarray([d.total_seconds() for d in duration_gdal])
-        dur_ts = np.asarray([d.total_seconds() for d in duration_ts])
-
-        descr = 'load mosaics, improved TimeSeriesSource.create(file)'
-        INFO = {'description': descr,
-                'n_files': n,
-                'root': FORCE_MOSAICS.as_posix(),
-                't_ts_total': float(dur_ts.sum()),
-                't_ts_mean': float(dur_ts.mean()),
-                't_ts_min': float(dur_ts.min()),
-                't_ts_max': float(dur_ts.max()),
-                't_ts_std': float(dur_ts.std()),
-                't_gdal_total': float(dur_gdal.sum()),
-                't_gdal_mean': float(dur_gdal.mean()),
-                't_gdal_min': float(dur_gdal.min()),
-                't_gdal_max': float(dur_gdal.max()),
-                't_gdal_std': float(dur_gdal.std())
-                }
-
-        RESULTS[descr] = INFO
-
-        with open(path_json, 'w') as f:
-            json.dump(RESULTS, f, indent=2)
+        results = [{'name': 'force_mosaic_sources', 'params': {'api': 'timeseriessource'},
+                    'seconds': [d.total_seconds() for d in duration_ts]},
+                   {'name': 'force_mosaic_sources', 'params': {'api': 'gdal'},
+                    'seconds': [d.total_seconds() for d in duration_gdal]}]
+        BenchmarkStore().addRun(results, environmentInfo(), gitRevision(),
+                                config={'n_files': n, 'root': FORCE_MOSAICS.as_posix()})
 
     @unittest.skipIf(not FORCE_CUBE.is_dir(), 'Missing FORCE_CUBE')
     def test_benchmark_load_eotsv(self):
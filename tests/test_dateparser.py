@@ -1,10 +1,12 @@
 import datetime
+import re
 import unittest
 
 import numpy as np
 from osgeo import gdal, gdal_array
 
-from eotimeseriesviewer.dateparser import DateTimePrecision, ImageDateUtils
+from eotimeseriesviewer.dateparser import DateTimePrecision, FilenameDateRule, ImageDateUtils
+from eotimeseriesviewer.sourceinfo import readSourceInfo
 from eotimeseriesviewer.tests import EOTSVTestCase, start_app, TestObjects
 from example import exampleLandsat8, exampleNoDataImage, exampleRapidEye
 from qgis.PyQt.QtCore import QDate, QDateTime, Qt, QTime
@@ -147,6 +149,107 @@ class TestDateParser(EOTSVTestCase):
         self.assertIsInstance(dtg, QDateTime)
         print(dtg)
 
+    def test_filename_rules(self):
+
+        examples = [
+            ('20180101_LEVEL2_LND08_BOA.tif', QDateTime(QDate(2018, 1, 1), QTime()), 'FORCE L2'),
+            ('LC08_L1TP_227065_20140115_20170307_01_T1.tif', QDateTime(QDate(2014, 1, 15), QTime()),
+             'Landsat Product ID'),
+            ('/data/2014-01-15_LC82270652014015LGN00_BOA.tif', QDateTime(QDate(2014, 1, 15), QTime()),
+             'Landsat Scene ID'),
+            ('S2A_MSIL2A_20170105T013442_N0204_R031_T53NMJ_20170105T013443.tif',
+             QDateTime(QDate(2017, 1, 5), QTime(1, 34, 42)), 'Sentinel-2 Product ID'),
+            ('T33UUU_20200101T101031_B02.jp2', QDateTime(QDate(2020, 1, 1), QTime(10, 10, 31)),
+             'Sentinel-2 Granule Image'),
+            ('image.tif', None, None),
+        ]
+
+        ImageDateUtils.resetFilenameRuleStatistics()
+        for path, expected, rule in examples:
+            dtg = ImageDateUtils.dateTimeFromFilename(path)
+            self.assertEqual(dtg, expected, msg=path)
+
+        stats = ImageDateUtils.filenameRuleStatistics()
+        for path, expected, rule in examples:
+            if rule:
+                self.assertEqual(stats[rule], 1)
+
+        # register a custom rule
+        rule = FilenameDateRule('My Product', re.compile(r'^my_(?P<dtg>\d{8})_'), 'dtg', 'YYYYMMDD')
+        ImageDateUtils.registerFilenameRule(rule, 0)
+        self.assertEqual(ImageDateUtils.filenameRules()[0], rule)
+        self.assertEqual(ImageDateUtils.dateTimeFromFilename('my_20200304_img.tif'),
+                         QDateTime(QDate(2020, 3, 4), QTime()))
+        self.assertEqual(rule.nHits, 1)
+        ImageDateUtils.unregisterFilenameRule('My Product')
+        self.assertTrue(rule not in ImageDateUtils.filenameRules())
+
+    def test_filename_rules_metadata(self):
+
+        arr = np.ones((2, 2))
+
+        # date-only file names: use the more precise metadata time stamp of the same date
+        path = '/vsimem/LC08_L1TP_227065_20140115_20170307_01_T1.tif'
+        ds: gdal.Dataset = gdal_array.SaveArray(arr, path, format='GTiff')
+        ds.SetMetadataItem('ACQUISITIONDATETIME', '2014-01-15T13:48:10', 'IMAGERY')
+        ds.FlushCache()
+        self.assertEqual(ImageDateUtils.dateTimeFromGDALDataset(ds),
+                         QDateTime(QDate(2014, 1, 15), QTime(13, 48, 10)))
+        del ds
+        self.assertEqual(ImageDateUtils.dateTimeFromLayer(path),
+                         QDateTime(QDate(2014, 1, 15), QTime(13, 48, 10)))
+
+        # metadata of another date does not override the file name
+        path = '/vsimem/LC08_L1TP_227065_20140116_20170307_01_T1.tif'
+        ds: gdal.Dataset = gdal_array.SaveArray(arr, path, format='GTiff')
+        ds.SetMetadataItem('ACQUISITIONDATETIME', '2017-03-07T10:00:00', 'IMAGERY')
+        ds.FlushCache()
+        self.assertEqual(ImageDateUtils.dateTimeFromGDALDataset(ds), QDateTime(QDate(2014, 1, 16), QTime()))
+        del ds
+
+        # file names with time of day are used as they are
+        path = '/vsimem/T33UUU_20200101T101031_B02.tif'
+        ds: gdal.Dataset = gdal_array.SaveArray(arr, path, format='GTiff')
+        ds.SetMetadataItem('ACQUISITIONDATETIME', '2020-01-01T00:00:00', 'IMAGERY')
+        ds.FlushCache()
+        self.assertEqual(ImageDateUtils.dateTimeFromGDALDataset(ds),
+                         QDateTime(QDate(2020, 1, 1), QTime(10, 10, 31)))
+        del ds
+
+        # FORCE file names are used without any metadata lookup
+        path = '/vsimem/20180101_LEVEL2_LND08_BOA.tif'
+        ds: gdal.Dataset = gdal_array.SaveArray(arr, path, format='GTiff')
+        ds.SetMetadataItem('ACQUISITIONDATETIME', '2018-01-01T10:00:00', 'IMAGERY')
+        ds.FlushCache()
+
+        def noMetadata():
+            raise AssertionError('metadata must not be read')
+
+        self.assertEqual(ImageDateUtils.dateTimeFromFilenameAndMetadata(path, noMetadata),
+                         QDateTime(QDate(2018, 1, 1), QTime()))
+        self.assertEqual(ImageDateUtils.dateTimeFromGDALDataset(ds), QDateTime(QDate(2018, 1, 1), QTime()))
+        del ds
+
+        # the metadata read by worker processes results in the same date-times
+        for path in ['/vsimem/LC08_L1TP_227065_20140115_20170307_01_T1.tif',
+                     '/vsimem/20180101_LEVEL2_LND08_BOA.tif',
+                     '/vsimem/T33UUU_20200101T101031_B02.tif']:
+            info = readSourceInfo(path)
+            ds = gdal.Open(path)
+            self.assertEqual(ImageDateUtils.dateTimeFromFilenameAndMetadata(path, info['dtg_values']),
+                             ImageDateUtils.dateTimeFromGDALDataset(ds))
+            del ds
+
+        # the rules are used for plain strings as well
+        self.assertEqual(ImageDateUtils.dateTimeFromString('S2A_MSIL2A_20170105T013442_N0204_R031_T53NMJ'),
+                         QDateTime(QDate(2017, 1, 5), QTime(1, 34, 42)))
+
+        for path in ['/vsimem/LC08_L1TP_227065_20140115_20170307_01_T1.tif',
+                     '/vsimem/LC08_L1TP_227065_20140116_20170307_01_T1.tif',
+                     '/vsimem/T33UUU_20200101T101031_B02.tif',
+                     '/vsimem/20180101_LEVEL2_LND08_BOA.tif']:
+            gdal.Unlink(path)
+
     def test_datetime(self):
 
         example = QDateTime(QDate(2023, 4, 3), QTime(0, 8, 15))
@@ -1,12 +1,17 @@
 import os
 import unittest
 from pathlib import Path
+from typing import List
 
-from eotimeseriesviewer.force import FORCEUtils
-from eotimeseriesviewer.forceinputs import find_tile_folders, FindFORCEProductsTask, FORCEProductImportDialog, \
-    read_tileids, rx_FORCE_TILEFOLDER
+from osgeo import gdal, osr
+
+from eotimeseriesviewer.dateparser import ImageDateUtils
+from eotimeseriesviewer.force import FORCECubeDefinition, FORCEUtils
+from eotimeseriesviewer.forceinputs import clear_directory_listings, create_force_sources, find_tile_folders, \
+    FindFORCEProductsTask, FORCEProductImportDialog, list_directory, read_tileids, rx_FORCE_TILEFOLDER
 from eotimeseriesviewer.main import EOTimeSeriesViewer
 from eotimeseriesviewer.tests import EOTSVTestCase, start_app
+from eotimeseriesviewer.timeseries.tasks import TimeSeriesLoadingTask
 from qgis.PyQt.QtCore import QDate
 from qgis.core import QgsCoordinateReferenceSystem, QgsCoordinateTransform, QgsProject, QgsRasterLayer
 
@@ -168,5 +173,134 @@ class FORCEImportTestCases(EOTSVTestCase):
             break
 
 
+class FORCESearchTestCases(EOTSVTestCase):
+
+    def createCube(self) -> Path:
+        # a FORCE cube with empty files, which is sufficient to search by file names
+        root = self.createTestOutputDirectory() / 'force_cube' / self._testMethodName
+        for tile_id in ['X0001_Y0001', 'X0001_Y0002', 'X0002_Y0001']:
+            tile_dir = root / 'level2' / tile_id
+            os.makedirs(tile_dir, exist_ok=True)
+            for date in ['20181231', '20190101', '20190615', '20200101']:
+                for product in ['BOA', 'QAI']:
+                    with open(tile_dir / f'{date}_LEVEL2_SEN2A_{product}.tif', 'w'):
+                        pass
+        return root
+
+    def test_find_products_parallel(self):
+        root = self.createCube()
+
+        folders = find_tile_folders(root)
+        self.assertEqual([f.name for f in folders], ['X0001_Y0001', 'X0001_Y0002', 'X0002_Y0001'])
+
+        task = FindFORCEProductsTask('BOA', root, n_threads=2)
+        self.assertTrue(task.run())
+        self.assertEqual(len(task.files()), 3 * 4)
+        self.assertEqual(task.mFileTiles, {f.name for f in folders})
+        self.assertEqual(task.files(), sorted(task.files()))
+
+        task = FindFORCEProductsTask('QAI', root, tile_ids=['X0001_Y0002'],
+                                     dateMin=QDate(2019, 1, 1), dateMax=QDate(2019, 12, 31))
+        self.assertTrue(task.run())
+        self.assertEqual([f.name for f in task.files()],
+                         ['20190101_LEVEL2_SEN2A_QAI.tif', '20190615_LEVEL2_SEN2A_QAI.tif'])
+
+    def test_find_products_errors(self):
+        root = self.createCube()
+
+        # a symbolic link cycle must not cause an endless recursion
+        try:
+            os.symlink(root, root / 'level2' / 'loop', target_is_directory=True)
+        except (OSError, NotImplementedError):
+            pass
+        folders = find_tile_folders(root)
+        self.assertEqual([f.name for f in folders], ['X0001_Y0001', 'X0001_Y0002', 'X0002_Y0001'])
+
+        class FailingSearchTask(FindFORCEProductsTask):
+
+            def scanFolder(self, folder: Path) -> List[Path]:
+                if folder.name == 'X0001_Y0002':
+                    raise PermissionError(f'Unable to read {folder}')
+                return super().scanFolder(folder)
+
+        # an unreadable tile folder must not stop the search in other tile folders
+        task = FailingSearchTask('BOA', root, n_threads=2)
+        self.assertTrue(task.run())
+        self.assertEqual(len(task.files()), 2 * 4)
+        self.assertEqual(task.mFileTiles, {'X0001_Y0001', 'X0002_Y0001'})
+        self.assertEqual(len(task.errors()), 1)
+        self.assertEqual(task.errors()[0][0].name, 'X0001_Y0002')
+        self.assertEqual(task.statistics()['n_errors'], 1)
+
+    def test_directory_listing_cache(self):
+        root = self.createCube()
+        folder = find_tile_folders(root)[0]
+        clear_directory_listings()
+
+        names1 = list_directory(folder, use_cache=True)
+        self.assertIs(list_directory(folder, use_cache=True), names1)
+
+        # a changed folder modification time invalidates the cached listing
+        stat = os.stat(folder)
+        new_file = folder / '20210101_LEVEL2_SEN2A_BOA.tif'
+        with open(new_file, 'w'):
+            pass
+        os.utime(folder, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        names2 = list_directory(folder, use_cache=True)
+        self.assertIn(new_file.name, names2)
+        self.assertEqual(len(names2), len(names1) + 1)
+        clear_directory_listings()
+
+    def test_create_force_sources(self):
+        root = self.createTestOutputDirectory() / 'force_cube' / self._testMethodName / 'level2'
+        os.makedirs(root, exist_ok=True)
+        srs = osr.SpatialReference()
+        srs.ImportFromEPSG(3035)
+        with open(root / FORCECubeDefinition.FILE_NAME, 'w') as f:
+            f.write('\n'.join([srs.ExportToWkt(), '-25', '60', '2456026', '4574919', '300', '150']))
+
+        cube = FORCECubeDefinition.fromFile(root / FORCECubeDefinition.FILE_NAME)
+        self.assertEqual(cube.tileExtent('X0001_Y0002'), (2456326, 4574019, 2456626, 4574319))
+
+        files = []
+        for i, tile_id in enumerate(['X0001_Y0001', 'X0001_Y0002']):
+            tile_dir = root / tile_id
+            os.makedirs(tile_dir, exist_ok=True)
+            for date in ['20190101', '20190615']:
+                path = tile_dir / f'{date}_LEVEL2_SEN2A_BOA.tif'
+                if len(files) == 0:
+                    # the first file of a sensor and product is opened to read the band metadata
+                    xmin, ymin, xmax, ymax = cube.tileExtent(tile_id)
+                    ds: gdal.Dataset = gdal.GetDriverByName('GTiff').Create(path.as_posix(), 10, 10, 6, gdal.GDT_Int16)
+                    ds.SetProjection(srs.ExportToWkt())
+                    ds.SetGeoTransform([xmin, 30, 0, ymax, 0, -30])
+                    del ds
+                else:
+                    # other files are not opened at all
+                    with open(path, 'w'):
+                        pass
+                files.append(path)
+
+        mosaic = root.parent / 'mosaic' / '20190101_LEVEL2_SEN2A_BOA.vrt'
+        sources, remaining = create_force_sources(files + [mosaic])
+        self.assertEqual(remaining, [str(mosaic)])
+        self.assertEqual(len(sources), len(files))
+
+        sample = sources[0]
+        self.assertEqual(sample.nb(), 6)
+        for tss, file in zip(sources, files):
+            self.assertEqual(tss.source(), str(file))
+            self.assertEqual(tss.sid(), sample.sid())
+            self.assertEqual(tss.crs(), sample.crs())
+            self.assertEqual(tss.mExtent, cube.tileExtent(file.parent.name))
+            self.assertEqual(tss.dtg(), ImageDateUtils.dateTimeFromFilename(file.name))
+
+        # the loading task creates FORCE sources in the background and loads other files as usual
+        task = TimeSeriesLoadingTask(files + [mosaic], force_products=True)
+        self.assertTrue(task.run_serial())
+        self.assertEqual(sorted(tss.source() for tss in task.validSources()), sorted(str(f) for f in files))
+        self.assertEqual([source for source, ex in task.invalidSources()], [str(mosaic)])
+
+
 if __name__ == '__main__':
     unittest.main()
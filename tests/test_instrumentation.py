@@ -0,0 +1,180 @@
+import json
+import threading
+import time
+import unittest
+
+from eotimeseriesviewer import instrumentation
+from eotimeseriesviewer.instrumentation import addBytes, timed, timer
+from eotimeseriesviewer.tests import EOTSVTestCase, start_app, TestObjects
+from eotimeseriesviewer.timeseries.source import TimeSeriesSource
+
+start_app()
+
+
+class TestInstrumentation(EOTSVTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.mWasEnabled = instrumentation.isEnabled()
+        instrumentation.clear()
+
+    def tearDown(self):
+        instrumentation.setEnabled(self.mWasEnabled)
+        instrumentation.clear()
+        super().tearDown()
+
+    def test_disabled(self):
+        instrumentation.setEnabled(False)
+
+        @timed()
+        def func(x):
+            return x * 2
+
+        self.assertEqual(func(2), 4)
+        with timer('block') as t:
+            t.addBytes(10)
+            addBytes(10)
+        self.assertEqual(instrumentation.metrics(), dict())
+        self.assertEqual(instrumentation.chromeTrace()['traceEvents'], [])
+
+    def test_timed(self):
+        instrumentation.setEnabled(True)
+
+        @timed()
+        def func(n_bytes: int):
+            addBytes(n_bytes)
+            time.sleep(0.01)
+
+        @timed('custom name')
+        def failing():
+            raise ValueError()
+
+        threads = [threading.Thread(target=func, args=(100,)) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        with self.assertRaises(ValueError):
+            failing()
+
+        with timer('outer'):
+            addBytes(1)
+            with timer('inner'):
+                addBytes(2)
+            addBytes(3)
+
+        metrics = instrumentation.metrics()
+        m = metrics[func.__qualname__]
+        self.assertEqual(m['count'], 4)
+        self.assertEqual(m['bytes'], 400)
+        self.assertTrue(0.01 <= m['p50'] <= m['p95'] <= m['max'] <= m['total'])
+        self.assertEqual(metrics['custom name']['count'], 1)
+        self.assertEqual(metrics['outer']['bytes'], 4)
+        self.assertEqual(metrics['inner']['bytes'], 2)
+
+        trace = instrumentation.chromeTrace()
+        self.assertEqual(len(trace['traceEvents']), 7)
+        for e in trace['traceEvents']:
+            self.assertEqual(e['ph'], 'X')
+            self.assertTrue(e['dur'] >= 0)
+
+        test_dir = self.createTestOutputDirectory() / 'instrumentation'
+        test_dir.mkdir(parents=True, exist_ok=True)
+        path_json = test_dir / 'timings.json'
+        path_trace = test_dir / 'timings.trace.json'
+        instrumentation.writeJson(path_json)
+        instrumentation.writeChromeTrace(path_trace)
+        with open(path_json) as f:
+            self.assertEqual(json.load(f).keys(), metrics.keys())
+        with open(path_trace) as f:
+            self.assertEqual(len(json.load(f)['traceEvents']), 7)
+
+        instrumentation.clear()
+        self.assertEqual(instrumentation.metrics(), dict())
+
+    def test_hot_paths(self):
+        instrumentation.setEnabled(True)
+        for file in TestObjects.exampleImagePaths()[0:2]:
+            TimeSeriesSource.create(file)
+
+        metrics = instrumentation.metrics()
+        self.assertEqual(metrics['TimeSeriesSource.create']['count'], 2)
+
+    def test_startup_report(self):
+        instrumentation.setEnabled(True)
+        instrumentation.endStartup()
+        instrumentation.beginStartup()
+        self.assertTrue(instrumentation.isStartupRunning())
+        with instrumentation.startupPhase('outer'):
+            instrumentation.beginStartup()  # ignored while the startup is running
+            with instrumentation.startupPhase('inner'):
+                time.sleep(0.01)
+        total = instrumentation.endStartup()
+        self.assertFalse(instrumentation.isStartupRunning())
+        self.assertTrue(total >= 0.01)
+        self.assertIsNone(instrumentation.endStartup())
+
+        report = instrumentation.startupReport()
+        self.assertTrue(report['finished'])
+        self.assertEqual([p['name'] for p in report['phases']], ['outer', 'inner'])
+        self.assertEqual([p['level'] for p in report['phases']], [0, 1])
+        self.assertTrue(report['phases'][1]['duration'] <= report['phases'][0]['duration'] <= total)
+        self.assertIn('inner', instrumentation.formatStartupReport())
+        self.assertEqual(instrumentation.metrics()['startup: inner']['count'], 1)
+
+        # phases after the startup are recorded as timers only
+        with instrumentation.startupPhase('later'):
+            pass
+        self.assertEqual(len(instrumentation.startupReport()['phases']), 2)
+        self.assertEqual(instrumentation.metrics()['startup: later']['count'], 1)
+
+    def test_lazy_dock(self):
+        from qgis.PyQt.QtWidgets import QLabel
+        from eotimeseriesviewer.docks import LazyDockWidget
+
+        created = []
+
+        def factory():
+            created.append(QLabel('Content'))
+            return created[-1]
+
+        dock = LazyDockWidget('Lazy', factory)
+        self.assertFalse(dock.isCreated())
+        self.assertEqual(created, [])
+        dock.show()
+        self.assertTrue(dock.isCreated())
+        self.assertEqual(len(created), 1)
+        self.assertEqual(dock.createWidget(), created[0])
+        self.assertEqual(len(created), 1)
+        self.showGui(dock)
+
+    def test_systeminfo_dock(self):
+        from eotimeseriesviewer.systeminfo import SystemInfoDock
+        instrumentation.setEnabled(False)
+        dock = SystemInfoDock()
+        # the content is created when the dock is shown for the first time
+        self.assertFalse(dock.isCreated())
+        dock.createWidget()
+        self.assertTrue(dock.isCreated())
+        dock.cbRecordTimings.setChecked(True)
+        self.assertTrue(instrumentation.isEnabled())
+        with timer('dock test'):
+            pass
+        dock.timingMetricsModel.refresh()
+        self.assertEqual(dock.timingMetricsModel.rowCount(), 1)
+
+        path = self.createTestOutputDirectory() / 'instrumentation' / 'dock.trace.json'
+        path.parent.mkdir(parents=True, exist_ok=True)
+        dock.exportTimings(path.as_posix())
+        self.assertTrue(path.is_file())
+
+        dock.resetTimings()
+        self.assertEqual(dock.timingMetricsModel.rowCount(), 0)
+        dock.cbRecordTimings.setChecked(False)
+        self.assertFalse(instrumentation.isEnabled())
+        self.showGui(dock)
+
+
+if __name__ == '__main__':
+    unittest.main()
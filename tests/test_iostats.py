@@ -0,0 +1,83 @@
+import unittest
+
+from eotimeseriesviewer import iostats
+from eotimeseriesviewer.qgispluginsupport.qps.utils import SpatialPoint
+from eotimeseriesviewer.sensors import clearSensorIdCache
+from eotimeseriesviewer.temporalprofile.temporalprofile import LoadTemporalProfileTask
+from eotimeseriesviewer.tests import EOTSVTestCase, start_app
+from eotimeseriesviewer.timeseries.tasks import TimeSeriesLoadingTask
+from qgis.core import QgsCoordinateReferenceSystem, QgsRasterLayer
+
+start_app()
+
+
+class TestIOStats(EOTSVTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.mWasEnabled = iostats.isEnabled()
+        iostats.clear()
+
+    def tearDown(self):
+        iostats.setEnabled(self.mWasEnabled)
+        iostats.clear()
+        super().tearDown()
+
+    def test_iostats(self):
+        stats = iostats.IOStats()
+        stats.add('a.tif', opens=1, reads=2, bytes=10)
+        stats.add(None, cache_hits=1)
+        self.assertEqual(stats.totals()['opens'], 1)
+        self.assertEqual(stats.totals()['cache_hits'], 1)
+        self.assertEqual(stats.sources()['a.tif']['bytes'], 10)
+
+        other = iostats.IOStats()
+        other.merge(stats)
+        other.merge(stats)
+        self.assertEqual(other.totals()['reads'], 4)
+        self.assertEqual(other.totals()['cache_hits'], 2)
+        self.assertEqual(other.asMap(per_source=True)['sources']['a.tif']['opens'], 2)
+
+        iostats.setEnabled(False)
+        with iostats.collect(stats):
+            iostats.count('a.tif', opens=1)
+        self.assertEqual(stats.totals()['opens'], 1)
+
+        iostats.setEnabled(True)
+        with iostats.collect(stats):
+            # nested collection of the same stats must not count twice
+            with iostats.collect(stats):
+                iostats.count('a.tif', opens=1)
+        iostats.count('a.tif', opens=1)
+        self.assertEqual(stats.totals()['opens'], 2)
+        self.assertEqual(iostats.TOTALS.totals()['opens'], 2)
+
+    def test_task_iostats(self):
+        iostats.setEnabled(True)
+        files = self.exampleRasterFiles()[1:]
+        clearSensorIdCache()
+
+        task = TimeSeriesLoadingTask(files, n_threads=2)
+        self.assertTrue(task.run_serial())
+        io = task.ioStats().totals()
+        self.assertEqual(io['opens'], len(files))
+        self.assertEqual(io['cache_hits'] + io['cache_misses'], len(files))
+        self.assertEqual(set(task.ioStats().sources().keys()), set(files))
+
+        lyr = QgsRasterLayer(files[0])
+        crs = QgsCoordinateReferenceSystem('EPSG:4326')
+        points = [SpatialPoint.fromPixelPosition(lyr, 4, 4).toCrs(crs)]
+        task = LoadTemporalProfileTask(files, points, crs=crs, n_threads=2)
+        self.assertTrue(task.run_serial())
+        io = task.ioStats().totals()
+        self.assertEqual(io['opens'], len(files))
+        self.assertTrue(io['reads'] > 0)
+        self.assertTrue(io['blocks'] >= io['reads'])
+        self.assertTrue(io['bytes'] > 0)
+
+        totals = iostats.TOTALS.totals()
+        self.assertTrue(totals['opens'] >= 2 * len(files))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -670,7 +670,6 @@ class TestLabeling(EOTSVTestCase):
         tsd: TimeSeriesDate = TS[0]
         # tsd.setDTG(np.datetime64('2019-02-05T11:23:42.00'))
         tss = tsd[0]
-        tss.mUri = '/path/to/image'
         tsd.sensor().setName('LND')
 
         context = QgsExpressionContext()
@@ -16,16 +16,24 @@
 *                                                                         *
 ***************************************************************************
 """
+import json
 import os
+import subprocess
+import sys
 import unittest
+from unittest.mock import patch
 
 from osgeo import gdal
 
-from eotimeseriesviewer import initAll
+from eotimeseriesviewer import DIR_REPO, initAll
 from eotimeseriesviewer.main import EOTimeSeriesViewer, SaveAllMapsDialog
+from eotimeseriesviewer.settings.settings import EOTSVSettingsManager
+from eotimeseriesviewer.sourceinfo import pythonExecutable
 from eotimeseriesviewer.tests import EOTSVTestCase, start_app, TestObjects
 from eotimeseriesviewer.timeseries.source import TimeSeriesSource
 from example import examplePoints, exampleLandsat8
+from qgis.PyQt.QtWidgets import QApplication, QMessageBox
+from qgis.PyQt.QtXml import QDomDocument
 from qgis.core import QgsCoordinateReferenceSystem, QgsProject
 from qgis.gui import QgsMapCanvas
 
@@ -131,6 +139,129 @@ class TestMain(EOTSVTestCase):
         TSV.close()
         QgsProject.instance().removeAllMapLayers()
 
+    def test_startup_report(self):
+        from eotimeseriesviewer import instrumentation
+        instrumentation.endStartup()
+        TSV = EOTimeSeriesViewer()
+        TSV.show()
+        self.assertTrue(instrumentation.isStartupRunning())
+        TSV.onStartupFinished()
+        self.assertFalse(instrumentation.isStartupRunning())
+        names = [p['name'] for p in instrumentation.startupReport()['phases']]
+        for name in ['create main window', 'create temporal profile dock', 'apply settings']:
+            self.assertIn(name, names)
+        # the task manager and system info widgets are created on demand
+        TSV.ui.dockTaskManager.createWidget()
+        self.assertTrue(TSV.ui.dockTaskManager.isCreated())
+        self.assertFalse(TSV.ui.dockSystemInfo.isCreated())
+        TSV.ui.dockSystemInfo.show()
+        self.assertTrue(TSV.ui.dockSystemInfo.isCreated())
+        TSV.close()
+        QgsProject.instance().removeAllMapLayers()
+
+    def test_plugin_load_imports(self):
+        # QGIS loads the plugin at its own startup. The viewer and its plot modules must not be imported then.
+        # Note: pyqtgraph itself can be loaded by the qps editor widgets that are registered by initAll()
+        python = pythonExecutable()
+        if python is None:
+            self.skipTest('No python interpreter to start a QGIS application with')
+
+        code = '\n'.join([
+            'import json, sys',
+            'from eotimeseriesviewer.tests import start_app',
+            'app = start_app()',
+            'from qgis.utils import iface',
+            'from eotimeseriesviewer.eotimeseriesviewerplugin import EOTimeSeriesViewerPlugin',
+            'plugin = EOTimeSeriesViewerPlugin(iface)',
+            'plugin.initProcessing()',
+            'plugin.initGui()',
+            'print(json.dumps(sorted(m for m in sys.modules if m.startswith("eotimeseriesviewer"))))',
+        ])
+        env = os.environ.copy()
+        env['PYTHONPATH'] = os.pathsep.join([DIR_REPO.as_posix()] + sys.path)
+        result = subprocess.run([python, '-c', code], env=env, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, msg=result.stderr)
+        modules = json.loads(result.stdout.strip().splitlines()[-1])
+        self.assertIn('eotimeseriesviewer.processing.processingalgorithms', modules)
+        for m in ['eotimeseriesviewer.main',
+                  'eotimeseriesviewer.mapvisualization',
+                  'eotimeseriesviewer.temporalprofile.datetimeplot',
+                  'eotimeseriesviewer.temporalprofile.plotsettings',
+                  'eotimeseriesviewer.temporalprofile.visualization']:
+            self.assertNotIn(m, modules, msg=f'{m} is imported when the plugin is loaded')
+
+    def test_unsaved_changes(self):
+        TSV = EOTimeSeriesViewer()
+        TSV.loadExampleTimeSeries(loadAsync=False)
+        self.assertTrue(TSV.hasUnsavedChanges())
+
+        path = self.createTestOutputDirectory() / 'test_unsaved_changes.qgs'
+        QgsProject.instance().write(path.as_posix())
+        self.assertFalse(TSV.hasUnsavedChanges())
+        self.assertEqual(json.loads(TSV.asJson()).keys(), TSV.asMap().keys())
+
+        tss = TSV.timeSeries()[0][0]
+        tss.setIsVisible(not tss.isVisible())
+        self.assertTrue(TSV.hasUnsavedChanges())
+        QgsProject.instance().write(path.as_posix())
+        self.assertFalse(TSV.hasUnsavedChanges())
+        TSV.close()
+        QgsProject.instance().removeAllMapLayers()
+
+    def test_unsaved_changes_after_read(self):
+        TSV = EOTimeSeriesViewer()
+        TSV.loadExampleTimeSeries(loadAsync=False)
+        TSV.setMapsPerMapView(1, 1)
+        uris = sorted(TSV.timeSeries().sourceUris())
+        doc = QDomDocument()
+        doc.appendChild(doc.createElement('qgis'))
+        TSV.onWriteProject(doc)
+        TSV.timeSeries().clear()
+        self.assertTrue(TSV.hasUnsavedChanges())
+
+        # restore the sources not shown in the single map in a background task
+        settings = EOTSVSettingsManager.settings()
+        settings.qgsTaskAsync = True
+        with patch('eotimeseriesviewer.main.QMessageBox.question', return_value=QMessageBox.Yes), \
+                patch('eotimeseriesviewer.main.EOTSVSettingsManager.settings', return_value=settings):
+            self.assertTrue(TSV.onReadProject(doc))
+        self.assertFalse(TSV.hasUnsavedChanges())
+        self.assertTrue(len(TSV.timeSeries().pendingSources()) > 0)
+
+        # sources restored by the background task do not count as changes
+        self.taskManagerProcessEvents()
+        QApplication.processEvents()
+        self.assertEqual(sorted(TSV.timeSeries().sourceUris()), uris)
+        self.assertFalse(TSV.hasUnsavedChanges())
+
+        tss = TSV.timeSeries()[0][0]
+        tss.setIsVisible(not tss.isVisible())
+        self.assertTrue(TSV.hasUnsavedChanges())
+        TSV.close()
+        QgsProject.instance().removeAllMapLayers()
+
+    def test_write_project_pending_restore(self):
+        TSV = EOTimeSeriesViewer()
+        TSV.loadExampleTimeSeries(loadAsync=False)
+        data = TSV.timeSeries().asMap()
+        uris = sorted(TSV.timeSeries().sourceUris())
+
+        # restore most sources in a background task and write the project before it has finished
+        TSV.timeSeries().fromMap(data, runAsync=True, n_dates=1)
+        self.assertTrue(len(TSV.timeSeries().pendingSources()) > 0)
+
+        doc = QDomDocument()
+        doc.appendChild(doc.createElement('qgis'))
+        TSV.onWriteProject(doc)
+        text = doc.documentElement().firstChildElement('EOTSV').firstChildElement('jsonSettings').text()
+        written = json.loads(text)['TimeSeries']['sources']
+        self.assertEqual(sorted(d['source'] for d in written), uris)
+
+        self.taskManagerProcessEvents()
+        self.assertEqual(sorted(TSV.timeSeries().sourceUris()), uris)
+        TSV.close()
+        QgsProject.instance().removeAllMapLayers()
+
     # @unittest.skip('test')
     def test_TimeSeriesViewerInvalidSource(self):
 
@@ -15,7 +15,8 @@ from eotimeseriesviewer.qgispluginsupport.qps.utils import SpatialPoint
 from eotimeseriesviewer.qgispluginsupport.qps.vectorlayertools import VectorLayerTools
 from eotimeseriesviewer.sensors import SensorInstrument
 from eotimeseriesviewer.sensorvisualization import SensorDockUI
-from eotimeseriesviewer.temporalprofile.datetimeplot import copyProfiles, DateTimePlotDataItem, DateTimePlotWidget
+from eotimeseriesviewer.temporalprofile.datetimeplot import copyProfiles, DateTimePlotDataItem, \
+    DateTimePlotPointIndex, DateTimePlotWidget
 from eotimeseriesviewer.temporalprofile.plotsettings import PlotSettingsTreeView, PythonCodeItem, TPVisSensor, \
     TPVisSettings
 from eotimeseriesviewer.temporalprofile.temporalprofile import TemporalProfileEditorWidgetFactory, TemporalProfileUtils
@@ -298,6 +299,69 @@ class PlotSettingsTests(EOTSVTestCase):
 
         self.showGui(w)
 
+    def test_DateTimePlotPointIndex(self):
+
+        n_items = 50
+        n_obs = 200
+        x = np.arange(n_obs) * 86400 + 1.5e9
+        items = []
+        for i in range(n_items):
+            y = np.sin(np.arange(n_obs) * 0.1) + i
+            y[5] = np.nan
+            items.append(DateTimePlotDataItem(x, y, name=f'Profile {i}'))
+
+        index = DateTimePlotPointIndex()
+        index.setItems(items)
+        index.setPixelSize(86400, 0.01)
+        self.assertEqual(len(index), n_items * (n_obs - 1))
+
+        # hit a point
+        pdi, i = index.nearestPoint(x[10], items[3].yData[10])
+        self.assertEqual(pdi, items[3])
+        self.assertEqual(i, 10)
+
+        # points of other profiles are too far away
+        results = index.pointsNear(x[10], items[3].yData[10], tolerance=5)
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0][0], items[3])
+
+        # nothing close to the cursor
+        self.assertIsNone(index.nearestPoint(x[0] - 100 * 86400, 0))
+        self.assertIsNone(index.nearestCurve(x[0] - 100 * 86400, 0))
+
+        # hit a curve between two observations
+        xc = 0.5 * (x[20] + x[21])
+        yc = 0.5 * (items[7].yData[20] + items[7].yData[21])
+        self.assertEqual(index.nearestCurve(xc, yc), items[7])
+
+        # no curve between the gap of a missing value
+        self.assertIsNone(index.nearestCurve(x[5], items[7].yData[5 - 1] + 0.3))
+
+        # changed data requires an index update
+        items[7].setData(x, np.zeros(n_obs) - 100)
+        index.setDirty()
+        self.assertIsNone(index.nearestCurve(xc, yc))
+        self.assertEqual(index.nearestCurve(xc, -100), items[7])
+
+        w = DateTimePlotWidget()
+        for item in items:
+            w.plotItem.addItem(item)
+        index = w.plotItem.pointIndex()
+        self.assertIsInstance(index, DateTimePlotPointIndex)
+        self.assertEqual(set(index.items()), set(items))
+
+        # removed items do not change the index anymore
+        removed = items[0]
+        w.plotItem.removeItem(removed)
+        index = w.plotItem.pointIndex()
+        self.assertNotIn(removed, index.items())
+        self.assertEqual(len(index), sum(int(np.isfinite(item.yData).sum()) for item in items[1:]))
+        self.assertFalse(index.mDataDirty)
+        removed.setData(x, np.zeros(n_obs))
+        self.assertFalse(index.mDataDirty)
+        items[1].setData(x, np.zeros(n_obs))
+        self.assertTrue(index.mDataDirty)
+
     # @unittest.skip("Needs to be rewritten / segfaults")
     def test_TemporalProfileDock(self):
 
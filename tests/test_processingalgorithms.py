@@ -211,6 +211,65 @@ class ProcessingAlgorithmTests(EOTSVTestCase):
 
         tsv.close()
 
+    def test_read_temporal_profiles_chunked(self):
+        lyr = QgsVectorLayer(examplePoints.as_posix())
+        n_features = lyr.featureCount()
+        self.assertTrue(n_features > 2)
+
+        tsv = EOTimeSeriesViewer()
+        tsv.loadExampleTimeSeries(loadAsync=False)
+
+        written_chunks = []
+
+        # QgsProcessingAlgorithm.run() executes a new instance, created with createInstance(),
+        # so the chunk size needs to be defined on the class level
+        class ChunkedReadTemporalProfiles(ReadTemporalProfiles):
+            CHUNK_SIZE = max(1, n_features // 3)
+
+            def writeProfileChunk(self, features, *args, **kwds) -> bool:
+                written_chunks.append(len(features))
+                return super().writeProfileChunk(features, *args, **kwds)
+
+        path_out1 = self.createTestOutputDirectory() / 'output_layer_chunk1.geojson'
+        path_out2 = self.createTestOutputDirectory() / 'output_layer_chunk2.geojson'
+
+        layers = []
+        for algClass, path in [(ReadTemporalProfiles, path_out1), (ChunkedReadTemporalProfiles, path_out2)]:
+            alg = algClass()
+            alg.initAlgorithm({})
+            context, feedback = self.createProcessingContextFeedback()
+            context.setProject(QgsProject())
+            parm = {alg.INPUT: lyr,
+                    alg.FIELD_NAME: 'tp',
+                    alg.OUTPUT: path.as_posix()}
+            results, success = alg.run(parm, context, feedback)
+            self.assertTrue(success)
+            layers.append(QgsVectorLayer(results[alg.OUTPUT]))
+
+        self.assertTrue(ChunkedReadTemporalProfiles.CHUNK_SIZE < n_features)
+        self.assertTrue(len(written_chunks) > 1)
+        self.assertEqual(sum(written_chunks), n_features)
+
+        lyr1, lyr2 = layers
+        self.assertEqual(n_features, lyr1.featureCount())
+        self.assertEqual(n_features, lyr2.featureCount())
+        self.assertEqual(lyr1.fields().names(), lyr2.fields().names())
+        n_profiles = 0
+        for f1, f2 in zip(lyr1.getFeatures(), lyr2.getFeatures()):
+            self.assertGeometriesEqual(f1.geometry(), f2.geometry())
+            for name in lyr1.fields().names():
+                if name == 'tp':
+                    d1 = TemporalProfileUtils.profileDict(f1.attribute(name))
+                    d2 = TemporalProfileUtils.profileDict(f2.attribute(name))
+                    self.assertEqual(d1, d2)
+                    if d1:
+                        n_profiles += 1
+                else:
+                    self.assertEqual(f1.attribute(name), f2.attribute(name))
+        self.assertTrue(n_profiles > 0)
+
+        tsv.close()
+
     def randomSampleLayer(self, path: Path, lyr: QgsMapLayer,
                           extent: Optional[QgsRectangle] = None,
                           n: int = 25,
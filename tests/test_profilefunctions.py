@@ -1,11 +1,14 @@
 import json
+import pickle
 import unittest
 
 import numpy as np
 from qgis.PyQt.QtWidgets import QTableView
 from qgis.core import QgsFeature
 
-from eotimeseriesviewer.spectralindices import spectral_index_acronyms, SpectralIndexBandIdentifierModel, \
+from eotimeseriesviewer import spectralindices
+from eotimeseriesviewer.spectralindices import spectral_index, spectral_index_acronyms, spectral_index_formula, \
+    spectral_indices, spectral_indices_by_band, spectral_indices_for_bands, SpectralIndexBandIdentifierModel, \
     SpectralIndexConstantModel
 from eotimeseriesviewer.temporalprofile.temporalprofile import TemporalProfileUtils
 from eotimeseriesviewer.tests import EOTSVTestCase, start_app, TestObjects
@@ -56,6 +59,57 @@ class ProfileFunctionTestCases(EOTSVTestCase):
         view.setModel(model)
         self.showGui(view)
 
+    def test_spyndex_index(self):
+        index = spectralindices.compile_spyndex_index()
+        self.assertEqual(index['indices'], spectral_indices())
+        self.assertEqual(spectral_index('NDVI')['formula'], index['indices']['NDVI']['formula'])
+        self.assertIsNone(spectral_index('unknown'))
+        self.assertIsNone(spectral_index_formula('unknown'))
+        self.assertEqual(eval(spectral_index_formula('NDVI'), {}, {'N': 3.0, 'R': 1.0}), 0.5)
+        self.assertIs(spectral_index_formula('NDVI'), spectral_index_formula('NDVI'))
+
+        self.assertIn('NDVI', spectral_indices_by_band('N'))
+        self.assertNotIn('NDVI', spectral_indices_by_band('G'))
+        acronyms = spectral_indices_for_bands(['N', 'R'])
+        self.assertIn('NDVI', acronyms)
+        self.assertNotIn('EVI', acronyms)
+        # constants like g, C1, C2 and L are not required
+        self.assertIn('EVI', spectral_indices_for_bands(['N', 'R', 'B']))
+
+        # the precompiled index is used if it is up to date
+        path = self.createTestOutputDirectory() / 'spyndex.pkl'
+        spectralindices.write_spyndex_index(path)
+        with open(path, 'rb') as f:
+            self.assertEqual(pickle.load(f)['by_band'], index['by_band'])
+
+        path_default = spectralindices.PATH_SPYNDEX_INDEX
+        try:
+            spectralindices.PATH_SPYNDEX_INDEX = path
+            self.assertEqual(spectralindices._read_spyndex_index()['indices'], index['indices'])
+            # fallback to the JSON files if the index is outdated
+            outdated = dict(index, source_hash='outdated', indices={})
+            with open(path, 'wb') as f:
+                pickle.dump(outdated, f)
+            self.assertEqual(spectralindices._read_spyndex_index()['indices'], index['indices'])
+        finally:
+            spectralindices.PATH_SPYNDEX_INDEX = path_default
+
+    def test_cachedMap(self):
+        model = SpectralIndexConstantModel()
+        model.loadFromSpyndex()
+        m1 = model.cachedMap()
+        self.assertIs(m1, model.cachedMap())
+        self.assertEqual(m1, model.asMap())
+        model.removeConstants(['g'])
+        self.assertNotIn('g', model.cachedMap())
+
+        model = SpectralIndexBandIdentifierModel()
+        model.loadFromSpyndex()
+        m1 = model.cachedMap()
+        self.assertIs(m1, model.cachedMap())
+        model.loadFromMap({})
+        self.assertEqual(model.cachedMap(), dict())
+
     def test_sensorSpecs(self):
 
         ts = TestObjects.createTimeSeries()
@@ -4,7 +4,7 @@ from eotimeseriesviewer.mapcanvas import MapCanvas
 from eotimeseriesviewer.qgispluginsupport.qps.utils import SpatialPoint
 from eotimeseriesviewer.sensors import has_sensor_id
 from eotimeseriesviewer.tests import EOTSVTestCase, start_app
-from qgis.core import QgsProject
+from qgis.core import QgsApplication, QgsProject
 
 start_app()
 
@@ -39,9 +39,14 @@ class TestSpectralProfiles(EOTSVTestCase):
         self.assertEqual(len(atdws), 0)
         self.assertEqual(len(sldws), 0)
 
-        n = len(EOTSV.loadCurrentSpectralProfile(pt, c1))
-        self.assertIsInstance(n, int)
-        self.assertTrue(n > 0)
+        EOTSV.mCurrentMapSpectraDates = 'CANVAS'
+        n = len(EOTSV.loadCurrentSpectralProfile(pt, c1, runAsync=False))
+        self.assertEqual(n, 1)
+
+        # profiles of all dates shown in the maps
+        EOTSV.mCurrentMapSpectraDates = 'VISIBLE'
+        n = len(EOTSV.loadCurrentSpectralProfile(pt, c1, runAsync=False))
+        self.assertTrue(1 <= n <= len(EOTSV.mapWidget().visibleTSDs()))
 
         atdws = EOTSV.attributeTableDockWidgets()
         sldws = EOTSV.spectralLibraryDockWidgets()
@@ -49,6 +54,14 @@ class TestSpectralProfiles(EOTSVTestCase):
         self.assertEqual(len(atdws), 0)
         self.assertEqual(len(sldws), 1)
 
+        # profiles of all dates, collected in the background
+        EOTSV.mCurrentMapSpectraDates = 'ALL'
+        self.assertEqual(EOTSV.loadCurrentSpectralProfile(pt, c1, runAsync=True), [])
+        self.assertEqual(len(EOTSV.mSpectralProfileTasks), 1)
+        self.taskManagerProcessEvents()
+        QgsApplication.processEvents()
+        self.assertEqual(len(EOTSV.mSpectralProfileTasks), 0)
+
         self.showGui(EOTSV.ui)
         EOTSV.close()
         QgsProject.instance().removeAllMapLayers()
@@ -0,0 +1,78 @@
+import time
+import unittest
+
+from eotimeseriesviewer.taskmonitor import STATUS_COMPLETED, TaskMonitorDock, TaskMonitorModel
+from eotimeseriesviewer.tasks import EOTSVTask, WorkStealingExecutor
+from eotimeseriesviewer.tests import EOTSVTestCase, start_app
+from qgis.core import QgsTask
+
+start_app()
+
+
+class SleepTask(EOTSVTask):
+
+    def __init__(self, items, n_threads: int = 2):
+        super().__init__(description='Sleep task', flags=QgsTask.CanCancel | QgsTask.Silent)
+        self.mItems = items
+        self.mThreads = n_threads
+
+    def work(self, i: int) -> int:
+        if i < 0:
+            raise ValueError(f'invalid item {i}')
+        time.sleep(0.01)
+        return i
+
+    def run(self) -> bool:
+        executor = WorkStealingExecutor(self, self.work, self.mItems, n_threads=self.mThreads)
+        for _ in executor.results():
+            pass
+        return not self.isCanceled()
+
+
+class TestTaskMonitor(EOTSVTestCase):
+
+    def test_task_statistics(self):
+        items = list(range(20)) + [-1, -2]
+        task = SleepTask(items)
+        self.assertTrue(task.run_serial())
+        stats = task.statistics()
+        self.assertEqual(stats['n_items'], len(items))
+        self.assertEqual(stats['n_done'], len(items))
+        self.assertEqual(stats['n_errors'], 2)
+        self.assertEqual(stats['n_workers'], 2)
+        self.assertEqual(stats['queue_depth'], 0)
+        self.assertEqual(stats['in_flight'], 0)
+        self.assertTrue(stats['throughput'] > 0)
+        self.assertTrue(0 < stats['utilization'] <= 1)
+        self.assertTrue(stats['result'])
+
+    def test_task_monitor_model(self):
+        model = TaskMonitorModel()
+        dock = TaskMonitorDock(taskManager=None)
+
+        for n in [10, 5]:
+            task = SleepTask(list(range(n)))
+            task.run_task_manager()
+            self.assertTrue(task.progress() == 100)
+
+        model.refresh()
+        history = model.history()
+        self.assertEqual(len(history), 2)
+        for record in history:
+            self.assertEqual(record['status'], STATUS_COMPLETED)
+            self.assertEqual(record['type'], SleepTask.__name__)
+        self.assertEqual([r['n_done'] for r in history], [10, 5])
+
+        summary = model.summary()
+        self.assertEqual(len(summary), 1)
+        self.assertEqual(summary[0]['n_tasks'], 2)
+        self.assertEqual(summary[0]['n_done'], 15)
+        self.assertEqual(model.rowCount(), 2)
+
+        model.clearHistory()
+        self.assertEqual(model.rowCount(), 0)
+        self.showGui(dock)
+
+
+if __name__ == '__main__':
+    unittest.main()
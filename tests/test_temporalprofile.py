@@ -73,6 +73,73 @@ class TestTemporalProfilesV2(EOTSVTestCase):
 
         QgsProject.instance().removeAllMapLayers()
 
+    def test_incremental_plot_update(self):
+
+        TSV = EOTimeSeriesViewer()
+
+        from example import exampleProfiles as path_vector
+
+        vl = QgsVectorLayer(path_vector.as_posix(), 'Profiles', 'ogr')
+        self.assertTrue(vl.isValid())
+        TSV.project().addMapLayers([vl])
+
+        vis: TemporalProfileVisualization = TSV.profileDock.mVis
+        vis.createVisualization()
+        vis.updatePlot()
+        items1 = vis.plotDataItems()
+        self.assertTrue(len(items1) > 0)
+
+        # nothing changed -> keep all plot items
+        vis.updatePlot()
+        items2 = vis.plotDataItems()
+        self.assertEqual(len(items1), len(items2))
+        for pdi in items2:
+            self.assertIn(pdi, items1)
+
+        # selection changes do not re-create plot items
+        fid = items1[0].mFeatureID
+        vl.selectByIds([fid])
+        vis.updateSelection()
+        items3 = vis.plotDataItems()
+        for pdi in items3:
+            self.assertIn(pdi, items1)
+            self.assertEqual(pdi.isSelected(), pdi.mFeatureID == fid)
+
+        # update a single feature only
+        vis.updatePlot(fids={vl.id(): [fid]})
+        items4 = vis.plotDataItems()
+        self.assertEqual(len(items1), len(items4))
+        changed = [pdi for pdi in items4 if pdi not in items1]
+        self.assertTrue(len(changed) <= 1)
+
+        # changed features are re-created, even by a full update, without comparing all attribute values
+        vis.setFeaturesDirty(vl.id(), [fid])
+        vis.updateDirtyFeatures()
+        vis.updatePlot()
+        items4b = vis.plotDataItems()
+        self.assertEqual(len(items4), len(items4b))
+        self.assertEqual([pdi.mFeatureID for pdi in items4b if pdi not in items4], [fid])
+
+        # layer-wide changes, e.g. a reload, re-create all items
+        vis.setLayerDirty(vl.id())
+        vis.updatePlot()
+        items4c = vis.plotDataItems()
+        self.assertEqual(len(items4c), len(items4b))
+        for pdi in items4c:
+            self.assertNotIn(pdi, items4b)
+
+        # deleted features are removed from the plot
+        vl.startEditing()
+        vl.deleteFeatures([fid])
+        vis.updatePlot(fids={vl.id(): [fid]})
+        items5 = vis.plotDataItems()
+        self.assertEqual(len(items5), len(items1) - 1)
+        self.assertNotIn(fid, [pdi.mFeatureID for pdi in items5])
+        vl.rollBack()
+
+        TSV.close()
+        QgsProject.instance().removeAllMapLayers()
+
     def test_load_timeseries_profiledata_tm(self):
         files = self.exampleRasterFiles()[1:]
 
@@ -4,34 +4,41 @@ import json
 import logging
 import os
 import re
+import subprocess
+import sys
+import time
 import unittest
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 
 import numpy as np
 from osgeo import gdal
 
 import example
 import example.Images
+from eotimeseriesviewer import DIR_REPO
 from eotimeseriesviewer.dateparser import DateTimePrecision, ImageDateUtils
 from eotimeseriesviewer.main import EOTimeSeriesViewer
 from eotimeseriesviewer.qgispluginsupport.qps.subdatasets import subLayerDetails
 from eotimeseriesviewer.qgispluginsupport.qps.utils import file_search, SpatialExtent, SpatialPoint
-from eotimeseriesviewer.sensors import registerDataProvider, sensorID, SensorInstrument, SensorMockupDataProvider
-from eotimeseriesviewer.tasks import EOTSVTask
+from eotimeseriesviewer.sensors import clearSensorIdCache, create_sensor_id, registerDataProvider, sensorID, \
+    SensorInstrument, SensorMockupDataProvider
+from eotimeseriesviewer.sourceinfo import pythonExecutable
+from eotimeseriesviewer.tasks import EOTSVTask, WorkStealingExecutor
 from eotimeseriesviewer.tests import EOTSVTestCase, start_app, TestObjects, EOTSV_TIMESERIES_JSON
-from eotimeseriesviewer.timeseries.source import TimeSeriesDate, TimeSeriesSource
-from eotimeseriesviewer.timeseries.tasks import TimeSeriesFindOverlapSubTask, TimeSeriesFindOverlapTask, \
-    TimeSeriesLoadingTask
+from eotimeseriesviewer.timeseries.source import crsKey, gdalOpenMetadataOnly, TimeSeriesDate, TimeSeriesSource, \
+    transformToWGS84
+from eotimeseriesviewer.timeseries.tasks import TimeSeriesCheckSourcesTask, TimeSeriesFindOverlapTask, \
+    TimeSeriesLoadingTask, TimeSeriesRestoreTask
 from eotimeseriesviewer.timeseries.timeseries import TimeSeries
 from eotimeseriesviewer.timeseries.widgets import TimeSeriesDock
-from qgis.PyQt.QtCore import QAbstractItemModel, QDateTime, QMimeData, QPointF, \
-    QSortFilterProxyModel, Qt, QUrl
+from qgis.PyQt.QtCore import QAbstractItemModel, QDate, QDateTime, QMimeData, QPointF, \
+    QSortFilterProxyModel, Qt, QTime, QUrl
 from qgis.PyQt.QtGui import QDropEvent
 from qgis.PyQt.QtWidgets import QTreeView
-from qgis.core import Qgis, QgsApplication, QgsCoordinateReferenceSystem, QgsDateTimeRange, QgsMimeDataUtils, \
-    QgsProject, QgsRasterLayer, QgsVector
+from qgis.core import Qgis, QgsApplication, QgsCoordinateReferenceSystem, QgsCoordinateTransform, \
+    QgsDateTimeRange, QgsMimeDataUtils, QgsProject, QgsRasterLayer, QgsRectangle, QgsVector
 from qgis.core import QgsGeometry, QgsFeature
 from qgis.gui import QgsTaskManagerWidget
 
@@ -146,6 +153,71 @@ class TestTimeSeries(EOTSVTestCase):
         for tss in tsAbs.sources():
             self.assertTrue(Path(tss.source()).is_file())
 
+    def test_loadfromfile_jsonl(self):
+        ts = TestObjects.createTimeSeries()
+        next(ts.sources()).setIsVisible(False)
+
+        for relative_path in [True, False]:
+            path = self.createTestOutputDirectory() / f'timeseries_{relative_path}.jsonl'
+            ts.saveToFile(path, relative_path=relative_path)
+            self.assertTrue(path.is_file())
+
+            ts2 = TimeSeries()
+            ts2.loadFromFile(path, runAsync=False)
+            self.assertEqual(len(ts2), len(ts))
+            self.assertEqual(set(ts2.sourceUris()), set(ts.sourceUris()))
+            self.assertEqual(len(ts2.sensors()), len(ts.sensors()))
+
+            for tss2 in ts2.sources():
+                tss1 = ts.findSource(tss2)
+                self.assertEqual(tss1.asMap(), tss2.asMap())
+                self.assertEqual(tss1.spatialExtent(), tss2.spatialExtent())
+                self.assertEqual(tss1.isVisible(), tss2.isVisible())
+                self.assertIs(tss2.sid(), tss1.sid())
+
+        # missing sources are reported by the verification task
+        sources = ts.sourceUris()
+        missing = (self.createTestOutputDirectory() / 'does_not_exist.tif').as_posix()
+        task = TimeSeriesCheckSourcesTask(sources + [missing, '/vsimem/not_checked.tif'])
+        self.assertTrue(task.run())
+        self.assertEqual(task.missingSources(), [missing])
+
+    def test_loadfromfile_jsonl_custom_crs(self):
+        # custom projections, e.g. of FORCE data cubes, can have machine-local USER:<id> authority ids
+        crs = QgsCoordinateReferenceSystem.fromProj(
+            '+proj=laea +lat_0=52 +lon_0=10.5 +x_0=4321000 +y_0=3210000 +ellps=GRS80 +units=m +no_defs')
+        self.assertTrue(crs.isValid())
+        registry = QgsApplication.coordinateReferenceSystemRegistry()
+        user_id = registry.addUserCrs(crs, 'EOTSV test CRS')
+        try:
+            user_crs = QgsCoordinateReferenceSystem(f'USER:{user_id}')
+            self.assertTrue(user_crs.authid().startswith('USER:'))
+            self.assertFalse(crsKey(user_crs).startswith('USER:'))
+
+            path = self.createTestOutputDirectory() / 'custom_crs.tif'
+            ds: gdal.Dataset = gdal.GetDriverByName('GTiff').Create(path.as_posix(), 10, 10, 1, gdal.GDT_Byte)
+            ds.SetProjection(user_crs.toWkt(Qgis.CrsWktVariant.PreferredGdal))
+            ds.SetGeoTransform([4321000, 30, 0, 3210000, 0, -30])
+            ds.FlushCache()
+            del ds
+
+            ts = TimeSeries()
+            ts.addSourceInputs([path.as_posix()], runAsync=False)
+            self.assertEqual(len(ts), 1)
+            path_jsonl = self.createTestOutputDirectory() / 'custom_crs.jsonl'
+            ts.saveToFile(path_jsonl)
+        finally:
+            registry.removeUserCrs(user_id)
+
+        with open(path_jsonl, 'r', encoding='utf-8') as f:
+            header = json.loads(f.readline())
+        self.assertFalse(any(c.startswith('USER:') for c in header['crs']))
+
+        sources = TimeSeries.sourcesFromJsonLines(path_jsonl)
+        self.assertEqual(len(sources), 1)
+        self.assertTrue(sources[0].crs().isValid())
+        self.assertEqual(sources[0].crs().toProj(), crs.toProj())
+
     def test_focus_visibility(self):
 
         ts = TestObjects.createTimeSeries()
@@ -175,19 +247,74 @@ class TestTimeSeries(EOTSVTestCase):
 
         ts.clear()
 
-    def test_TimeSeriesFindOverlapSubTask(self):
+    def test_WorkStealingExecutor(self):
+
+        class ExecutorTask(EOTSVTask):
+
+            def __init__(self, items, **kwds):
+                super().__init__(description='Test executor')
+                self.mItems = items
+                self.mResults = dict()
+                self.mErrors = dict()
+                self.mKwds = kwds
+
+            def work(self, i: int) -> int:
+                if i == 3:
+                    raise ValueError(f'invalid item {i}')
+                if i % 10 == 0:
+                    # a slow item must not block the others
+                    time.sleep(0.05)
+                return i * i
+
+            def run(self) -> bool:
+                executor = WorkStealingExecutor(self, self.work, self.mItems, **self.mKwds)
+                for i, result, ex in executor.results():
+                    if ex is None:
+                        self.mResults[i] = result
+                    else:
+                        self.mErrors[i] = ex
+                return not self.isCanceled()
+
+        items = list(range(100))
+        for kwds in [dict(n_threads=1), dict(n_threads=4, max_pending=2)]:
+            task = ExecutorTask(items, **kwds)
+            self.assertTrue(task.run_serial())
+            self.assertEqual(task.progress(), 100)
+            self.assertEqual(set(task.mResults.keys()), set(items) - {3})
+            self.assertIsInstance(task.mErrors[3], ValueError)
+            for i, result in task.mResults.items():
+                self.assertEqual(result, i * i)
+
+        task = ExecutorTask(items, n_threads=2)
+        task.cancel()
+        self.assertFalse(task.run())
+        self.assertTrue(len(task.mResults) + len(task.mErrors) < len(items))
+
+        class FailingStatsTask(ExecutorTask):
+
+            def addItemsStarted(self, n: int = 1):
+                # fails outside the per-item error handling of the workers
+                raise RuntimeError('failed to update the task statistics')
+
+        # workers that fail must not block the results iterator
+        for kwds in [dict(n_threads=1), dict(n_threads=4, max_pending=2)]:
+            task = FailingStatsTask(items, **kwds)
+            self.assertTrue(task.run())
+            self.assertEqual(len(task.mResults) + len(task.mErrors), 0)
+
+    def test_TimeSeriesFindOverlapTask_intersections(self):
 
         ts = TestObjects.createTimeSeries()
-        sources = [str(example.exampleNoDataImage)] + ts.sourceUris()
+        sources = [TimeSeriesSource.create(example.exampleNoDataImage)] + list(ts.sources())
 
         crs = QgsCoordinateReferenceSystem('EPSG:4326')
         extent = ts.maxSpatialExtent().toCrs(crs)
 
-        task = TimeSeriesFindOverlapSubTask(extent, crs, sources)
-        self.assertTrue(task.run())
+        task = TimeSeriesFindOverlapTask(extent, sources, n_threads=3)
+        self.assertTrue(task.run_serial())
 
-        for src in sources:
-            self.assertTrue(src in task.intersections)
+        for tss in sources:
+            self.assertTrue(tss.source() in task.intersections())
 
         ts.clear()
 
@@ -389,6 +516,124 @@ class TestTimeSeries(EOTSVTestCase):
             self.assertEqual(tss, tss3)
             self.assertEqual(tss.dtg(), tss3.dtg())
 
+    def test_TimeSeriesSource_compact(self):
+
+        tss = TimeSeriesSource.create(example.Images.Img_2014_03_20_LC82270652014079LGN00_BOA)
+        self.assertFalse(hasattr(tss, '__dict__'))
+
+        # features and geometries are created on request
+        self.assertIsInstance(tss.feature(), QgsFeature)
+        self.assertEqual(tss.feature().geometry().boundingBox(), tss.geometry().boundingBox())
+        self.assertEqual(tss.spatialExtent(source_crs=False), tss.geometry().boundingBox())
+
+        # round-trip keeps the extent in the source CRS
+        tss2 = TimeSeriesSource.fromMap(tss.asMap())
+        self.assertEqual(tss2.spatialExtent(), tss.spatialExtent())
+        self.assertEqual(tss2.crs(), tss.crs())
+        self.assertEqual(tss2.dtg(), tss.dtg())
+        self.assertEqual(tss2.dtg().toString(Qt.ISODate), tss.dtg().toString(Qt.ISODate))
+        self.assertIs(tss2.sid(), tss.sid())
+
+        # sources with the same CRS share the same CRS key
+        tss3 = TimeSeriesSource.create(example.Images.Img_2014_01_15_LC82270652014015LGN00_BOA)
+        self.assertIs(tss3.mCrsKey, tss.mCrsKey)
+        self.assertTrue(tss3 < tss)
+        self.assertEqual(sorted([tss, tss3]), [tss3, tss])
+
+        # the geometry is the transformed extent polygon
+        g = QgsGeometry.fromRect(tss.spatialExtent())
+        g.transform(QgsCoordinateTransform(tss.crs(), QgsCoordinateReferenceSystem('EPSG:4326'),
+                                           QgsProject.instance()))
+        self.assertTrue(tss.geometry().equals(g))
+
+        # date-times keep their time spec and offset from UTC, i.e. their calendar date
+        extent = tss.spatialExtent()
+        for dtg in [QDateTime(QDate(2024, 1, 1), QTime(1, 30), Qt.OffsetFromUTC, 3 * 3600),
+                    QDateTime(QDate(2024, 1, 1), QTime(23, 30), Qt.OffsetFromUTC, -5 * 3600),
+                    QDateTime(QDate(2024, 1, 1), QTime(12, 0), Qt.UTC),
+                    QDateTime(QDate(2024, 1, 1), QTime(12, 0), Qt.LocalTime)]:
+            tss4 = TimeSeriesSource('/data/image.tif', dtg, tss.sid(), [tss.nb(), tss.nl(), tss.ns()],
+                                    tss.crs(), extent)
+            sensors, crs = dict(), dict()
+            tss5 = TimeSeriesSource.fromValues(tss4.asValues(sensors, crs), list(sensors.keys()), list(crs.keys()))
+            for t in [tss4, tss5, TimeSeriesSource.fromMap(tss4.asMap())]:
+                self.assertEqual(t.dtg(), dtg)
+                self.assertEqual(t.dtg().timeSpec(), dtg.timeSpec())
+                self.assertEqual(t.dtg().offsetFromUtc(), dtg.offsetFromUtc())
+                self.assertEqual(t.dtg().date(), QDate(2024, 1, 1))
+
+    def test_TimeSeries_catalog(self):
+
+        ts = TestObjects.createTimeSeries()
+        catalog = ts.mCatalog
+        self.assertEqual(len(catalog), len(list(ts.sources())))
+        self.assertEqual(set(ts.sourceUris()), set(ts.mTSS.keys()))
+
+        # query by date
+        tsds = ts.tsds(sort=True)
+        t0 = tsds[0].dtg()
+        sources = ts.querySources(end=t0)
+        self.assertTrue(len(sources) > 0)
+        for tss in sources:
+            self.assertTrue(tss.dtg() <= t0)
+
+        # query by sensor
+        for sensor in ts.sensors():
+            sources = ts.querySources(sensors=[sensor])
+            self.assertEqual(len(sources), len(list(ts.sources(sensor=sensor))))
+            self.assertEqual(sources, ts.querySources(sensors=[sensor.id()]))
+            for tss in sources:
+                self.assertEqual(tss.timeSeriesDate().sensor(), sensor)
+
+        # query by visibility
+        tss0 = list(ts.sources())[0]
+        tss0.setIsVisible(False)
+        self.assertNotIn(tss0, ts.querySources(visible=True))
+        self.assertIn(tss0, ts.querySources(visible=False))
+        tss0.setIsVisible(True)
+        self.assertIn(tss0, ts.querySources(visible=True))
+
+        # query by extent
+        ext = ts.maxSpatialExtent()
+        self.assertEqual(len(ts.querySources(extent=ext)), len(catalog))
+        ext_outside = SpatialExtent(ext.crs(), QgsRectangle(ext.xMaximum() + 100, ext.yMaximum() + 100,
+                                                            ext.xMaximum() + 200, ext.yMaximum() + 200))
+        self.assertEqual(ts.querySources(extent=ext_outside), [])
+
+        # removing sources updates the catalog
+        n = len(catalog)
+        ts.removeTSDs([tsds[0]])
+        self.assertEqual(len(catalog), n - len(tsds[0]))
+        self.assertNotIn(tsds[0][0].source(), catalog)
+        catalog.compact()
+        self.assertEqual(set(catalog.uris()), set(ts.mTSS.keys()))
+
+        ts.clear()
+        self.assertEqual(len(catalog), 0)
+
+    def test_TimeSeriesSource_metadata_only(self):
+
+        files = list(file_search(Path(example.Images.__file__).parent, '*.tif'))
+        self.assertTrue(len(files) > 2)
+
+        for file in files:
+            ds = gdalOpenMetadataOnly(file)
+            self.assertIsInstance(ds, gdal.Dataset)
+            # the lean open path must return the same sensor ids as the default one
+            self.assertEqual(create_sensor_id(ds), create_sensor_id(gdal.Open(file)))
+
+            tss1 = TimeSeriesSource.create(file)
+            tss2 = TimeSeriesSource.fromQgsRasterLayer(QgsRasterLayer(file))
+            self.assertEqual(tss1.sid(), tss2.sid())
+            self.assertEqual(tss1.dtg(), tss2.dtg())
+            self.assertEqual(tss1.crs(), tss2.crs())
+
+        crs = QgsCoordinateReferenceSystem('EPSG:32621')
+        t1 = transformToWGS84(crs)
+        t2 = transformToWGS84(crs)
+        self.assertEqual(t1.sourceCrs(), crs)
+        self.assertEqual(t2.destinationCrs(), QgsCoordinateReferenceSystem('EPSG:4326'))
+
     def test_datetimeprecision(self):
 
         img1 = TestObjects.createRasterDataset()
@@ -538,6 +783,115 @@ class TestTimeSeries(EOTSVTestCase):
         self.assertTrue(len(files) == len(TS))
         self.showGui(w)
 
+    def test_timeseries_load_processes(self):
+
+        files = list(file_search(Path(example.Images.__file__).parent, '*.tif'))
+        self.assertTrue(len(files) > 0)
+
+        task1 = TimeSeriesLoadingTask(files, n_threads=2)
+        task2 = TimeSeriesLoadingTask(files + ['not_existing.tif'], n_threads=2,
+                                      use_processes=True, process_chunk_size=3)
+        if not task2.useProcesses():
+            self.skipTest('No python interpreter to start worker processes with')
+
+        for task in [task1, task2]:
+            task.run_serial()
+
+        sources1 = sorted(task1.validSources(), key=lambda t: t.source())
+        sources2 = sorted(task2.validSources(), key=lambda t: t.source())
+        self.assertEqual(len(task2.invalidSources()), 1)
+        self.assertEqual(len(sources1), len(sources2))
+        for tss1, tss2 in zip(sources1, sources2):
+            self.assertEqual(tss1.asMap(), tss2.asMap())
+
+    def test_sourceinfo_without_qgis(self):
+        # worker processes import the sourceinfo module to read the source metadata with GDAL only
+        python = pythonExecutable()
+        if python is None:
+            self.skipTest('No python interpreter to start worker processes with')
+
+        code = 'import sys; import eotimeseriesviewer.sourceinfo; ' \
+               'print(sorted(m for m in sys.modules if m.split(".")[0] in ["qgis", "PyQt5"]))'
+        env = os.environ.copy()
+        env['PYTHONPATH'] = os.pathsep.join([DIR_REPO.as_posix()] + sys.path)
+        result = subprocess.run([python, '-c', code], env=env, capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, msg=result.stderr)
+        self.assertEqual(result.stdout.strip(), '[]')
+
+    def test_timeseries_restore_async(self):
+
+        ts1 = TestObjects.createTimeSeries()
+        data = ts1.asMap()
+        tsds = ts1.tsds()
+        doi = tsds[len(tsds) // 2].dtg()
+
+        ts2 = TimeSeries()
+        ts2.fromMap(data, runAsync=True, date_of_interest=doi, n_dates=3)
+        # the dates around the date of interest are restored immediately
+        self.assertTrue(0 < len(ts2.sources()) < len(ts1.sources()))
+        self.assertIsInstance(ts2.findDate(doi), TimeSeriesDate)
+        self.assertTrue(any(isinstance(t, TimeSeriesRestoreTask) for t in ts2.mTasks.values()))
+
+        # sources that are still restored are written as well
+        self.assertEqual(len(ts2.pendingSources()) + len(ts2.sourceUris()), len(ts1.sourceUris()))
+        uris = sorted(ts1.sourceUris())
+        self.assertEqual(sorted(d['source'] for d in ts2.asMap()['sources']), uris)
+        self.assertEqual(sorted(d['source'] for d in json.loads(ts2.asJson())['sources']), uris)
+        ts3 = TimeSeries()
+        ts3.fromMap(json.loads(ts2.asJson()))
+        self.assertEqual(sorted(ts3.sourceUris()), uris)
+        path = self.createTestOutputDirectory() / 'timeseries_restore_async.jsonl'
+        ts2.saveToFile(path, relative_path=False)
+        self.assertEqual(sorted(tss.source() for tss in TimeSeries.sourcesFromJsonLines(path)), uris)
+
+        self.taskManagerProcessEvents()
+        self.assertEqual(sorted(ts2.sourceUris()), sorted(ts1.sourceUris()))
+        self.assertEqual(ts2.pendingSources(), [])
+
+        task = TimeSeriesRestoreTask([(d, None) for d in data['sources']] + [({'source': 'not_existing.tif'}, None)])
+        self.assertTrue(task.run_serial())
+        self.assertEqual(len(task.validSources()), len(data['sources']))
+        self.assertEqual(len(task.invalidSources()), 1)
+
+        # sources of a pending restore are not added after clearing the time series
+        ts2.fromMap(data, runAsync=True, date_of_interest=doi, n_dates=1)
+        ts2.clear()
+        self.assertEqual(ts2.pendingSources(), [])
+        self.taskManagerProcessEvents()
+        self.assertEqual(len(ts2), 0)
+
+    def test_timeseries_asJson(self):
+
+        ts = TestObjects.createTimeSeries()
+
+        def restored(text: str) -> List[str]:
+            ts2 = TimeSeries()
+            ts2.fromMap(json.loads(text))
+            return sorted(json.dumps(tss.asMap(), sort_keys=True) for tss in ts2.sources())
+
+        def expected() -> List[str]:
+            return sorted(json.dumps(tss.asMap(), sort_keys=True) for tss in ts.sources())
+
+        r0 = ts.revision()
+        text = ts.asJson()
+        self.assertEqual(len(ts.mJsonChunks), len(ts))
+        self.assertEqual(ts.asJson(), text)
+        self.assertEqual(ts.revision(), r0)
+        self.assertEqual(restored(text), expected())
+
+        # a visibility change invalidates the sources of a single date only
+        tsd = ts[0]
+        tsd[0].setIsVisible(not tsd[0].isVisible())
+        self.assertTrue(ts.revision() > r0)
+        self.assertNotIn(tsd, ts.mJsonChunks)
+        self.assertEqual(len(ts.mJsonChunks), len(ts) - 1)
+        self.assertEqual(restored(ts.asJson()), expected())
+
+        r1 = ts.revision()
+        ts.removeTSDs([ts[1]])
+        self.assertTrue(ts.revision() > r1)
+        self.assertEqual(restored(ts.asJson()), expected())
+
     def test_blockremove(self):
 
         TS = TestObjects.createTimeSeries()
@@ -654,6 +1008,31 @@ class TestTimeSeries(EOTSVTestCase):
         lyr = sensor.proxyRasterLayer()
         self.assertIsInstance(lyr, QgsRasterLayer)
 
+    def test_sensor_id_cache(self):
+
+        files = [example.Images.Img_2014_01_15_LC82270652014015LGN00_BOA,
+                 example.Images.Img_2014_03_20_LC82270652014079LGN00_BOA]
+
+        clearSensorIdCache()
+        sids = [create_sensor_id(gdal.Open(f)) for f in files]
+        self.assertEqual(sids[0], sids[1])
+        # sources of the same sensor share the same sid object
+        self.assertIs(sids[0], sids[1])
+        self.assertEqual(sids[0], create_sensor_id(QgsRasterLayer(files[0])))
+
+        # different band structure -> different sensor id
+        ds = TestObjects.createRasterDataset(nb=3)
+        self.assertNotEqual(create_sensor_id(ds), sids[0])
+
+        ts = TimeSeries()
+        ts.addSources([TimeSeriesSource.create(f) for f in files])
+        self.assertEqual(len(ts.sensors()), 1)
+        sensor = ts.sensors()[0]
+        self.assertIs(ts.findMatchingSensor(sids[0]), sensor)
+        self.assertIs(ts.mSid2Sensor[sids[0]], sensor)
+        ts.removeSensor(sensor)
+        self.assertEqual(len(ts.mSid2Sensor), 0)
+
     def test_TimeSeriesTreeModel(self):
 
         TS: TimeSeries = TimeSeries()
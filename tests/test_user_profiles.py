@@ -5,13 +5,15 @@ import numpy as np
 from eotimeseriesviewer import DIR_REPO
 from eotimeseriesviewer import initAll
 from eotimeseriesviewer.dateparser import ImageDateUtils
-from eotimeseriesviewer.derivedplotdataitems.dpdicontroller import DPDIController, DPDIControllerSettingsDialog, \
-    DPDIControllerModel
+from eotimeseriesviewer.derivedplotdataitems.dpdicontroller import dpdiArrayData, dpdiExecute, DPDIController, \
+    DPDIControllerModel, DPDIControllerSettingsDialog, DPDIGuiThreadRequired
 from eotimeseriesviewer.main import EOTimeSeriesViewer
 from eotimeseriesviewer.qgispluginsupport.qps.pyqtgraph.pyqtgraph import mkPen, PlotDataItem
 from eotimeseriesviewer.temporalprofile.datetimeplot import DateTimePlotDataItem, DateTimePlotWidget
 from eotimeseriesviewer.tests import start_app, TestCase, TestObjects
+from qgis.PyQt.QtCore import QEvent
 from qgis.PyQt.QtWidgets import QDialog
+from qgis.core import QgsApplication
 
 start_app()
 initAll()
@@ -51,6 +53,212 @@ class UserFunctionTests(TestCase):
         eotsv.loadCurrentTemporalProfile(eotsv.spatialCenter())
         self.showGui(eotsv.ui)
 
+    def test_controller_model_async(self):
+
+        dates, ndvi_values = TestObjects.generate_seasonal_ndvi_dates()
+        x = np.asarray([ImageDateUtils.timestamp(d) for d in dates])
+
+        items = [DateTimePlotDataItem(x=x, y=ndvi_values * (i + 1), name=f'Profile {i}') for i in range(10)]
+
+        c = DPDIController()
+        self.assertTrue(c.setFunction("results = {'x': x, 'y': y * 0.5, 'name': 'half'}"), c.error())
+
+        model = DPDIControllerModel()
+        model.setAsync(True)
+        model.addController(c)
+
+        ready = dict()
+
+        def onReady(parent, derived):
+            ready[parent] = derived
+
+        model.derivedItemsReady.connect(onReady)
+
+        # 1st run: calculated in background
+        self.assertEqual(model.createDerivedItems(items), [])
+        while model.hasPendingResults():
+            QgsApplication.processEvents()
+        self.assertEqual(len(ready), len(items))
+        for parent, derived in ready.items():
+            self.assertEqual(len(derived), 1)
+            self.assertTrue(np.array_equal(derived[0].yData, parent.yData * 0.5))
+            self.assertEqual(c.derivedPlotDataItems(parent), derived)
+
+        # 2nd run: results are taken from the cache
+        ready.clear()
+        derived = model.createDerivedItems(items)
+        self.assertEqual(len(derived), len(items))
+        self.assertFalse(model.hasPendingResults())
+        self.assertEqual(len(ready), 0)
+
+    def test_controller_model_executor_shutdown(self):
+
+        def executor_is_shut_down(executor) -> bool:
+            try:
+                executor.submit(int).result()
+            except RuntimeError:
+                return True
+            return False
+
+        model = DPDIControllerModel()
+        model.setAsync(True)
+        executor = model.executor()
+        self.assertFalse(executor_is_shut_down(executor))
+
+        # turning off async mode stops the threads
+        model.setAsync(False)
+        self.assertTrue(executor_is_shut_down(executor))
+        self.assertFalse(model.hasPendingResults())
+
+        # clearing the model stops the threads
+        model.setAsync(True)
+        executor = model.executor()
+        model.clearController()
+        self.assertTrue(executor_is_shut_down(executor))
+        self.assertIsNot(model.executor(), executor)
+
+        # destroying the model stops the threads
+        executor = model.executor()
+        model.deleteLater()
+        QgsApplication.sendPostedEvents(None, QEvent.DeferredDelete)
+        self.assertTrue(executor_is_shut_down(executor))
+
+    def test_controller_model_async_gui_thread(self):
+
+        dates, ndvi_values = TestObjects.generate_seasonal_ndvi_dates()
+        x = np.asarray([ImageDateUtils.timestamp(d) for d in dates])
+
+        items = [DateTimePlotDataItem(x=x, y=ndvi_values * (i + 1), name=f'Profile {i}') for i in range(3)]
+
+        path_ufunc_example = DIR_REPO / 'eotimeseriesviewer/temporalprofile/userfunctions/user_function_example2.py'
+        with open(path_ufunc_example, 'r') as f:
+            code_pdis = f.read()
+        code_item = "results = {'x': x, 'y': y * 2, 'name': _item_.name() + ' x2'}"
+
+        c0 = DPDIController()
+        self.assertTrue(c0.setFunction("results = {'x': x, 'y': y * 0.5}"), c0.error())
+        self.assertFalse(c0.requiresGuiThread())
+
+        for code in [code_item, code_pdis]:
+            c = DPDIController()
+            self.assertTrue(c.setFunction(code), c.error())
+            self.assertTrue(c.requiresGuiThread())
+
+            with self.assertRaises(DPDIGuiThreadRequired):
+                dpdiExecute(c.function(), dpdiArrayData(items[0]))
+
+            # _item_ and PlotDataItem results work the same way in both modes
+            results = []
+            for run_async in [False, True]:
+                model = DPDIControllerModel()
+                model.setAsync(run_async)
+                model.addController(c)
+                derived = model.createDerivedItems(items)
+                self.assertFalse(model.hasPendingResults())
+                results.append(derived)
+
+            derived_sync, derived_async = results
+            self.assertTrue(len(derived_sync) >= len(items))
+            self.assertEqual(len(derived_sync), len(derived_async))
+            for pdi1, pdi2 in zip(derived_sync, derived_async):
+                self.assertEqual(pdi1.name(), pdi2.name())
+                self.assertTrue(np.array_equal(pdi1.yData, pdi2.yData))
+            if code == code_item:
+                self.assertEqual(derived_async[0].name(), 'Profile 0 x2')
+
+    def test_controller_model_batch(self):
+
+        dates, ndvi_values = TestObjects.generate_seasonal_ndvi_dates()
+        x = np.asarray([ImageDateUtils.timestamp(d) for d in dates])
+
+        items = [DateTimePlotDataItem(x=x[i:], y=ndvi_values[i:] * (i + 1), name=f'Profile {i}') for i in range(5)]
+
+        path_ufunc_example = DIR_REPO / 'eotimeseriesviewer/temporalprofile/userfunctions' \
+            / 'user_function_batch_example.py'
+        with open(path_ufunc_example, 'r') as f:
+            code = f.read()
+
+        c = DPDIController()
+        self.assertTrue(c.setFunction(code), c.error())
+        self.assertEqual(c.contract(), DPDIController.CONTRACT_BATCH)
+
+        c2 = DPDIController()
+        self.assertTrue(c2.setFunction("results = {'x': x, 'y': y * 0.5}"), c2.error())
+        self.assertEqual(c2.contract(), DPDIController.CONTRACT_PROFILE)
+
+        for run_async in [False, True]:
+            model = DPDIControllerModel()
+            model.setAsync(run_async)
+            model.addController(c)
+            c.mDerivedCurves.clear()
+            ready = dict()
+
+            def onReady(parent, derived):
+                ready[parent] = derived
+
+            model.derivedItemsReady.connect(onReady)
+            derived = model.createDerivedItems(items)
+            while model.hasPendingResults():
+                QgsApplication.processEvents()
+            if run_async:
+                self.assertEqual(derived, [])
+                self.assertEqual(len(ready), len(items))
+            else:
+                self.assertEqual(len(derived), len(items))
+
+            for item in items:
+                derived = c.derivedPlotDataItems(item)
+                self.assertEqual(len(derived), 1)
+                self.assertTrue(np.array_equal(derived[0].xData, item.xData))
+                self.assertAlmostEqual(np.min(derived[0].yData), 0)
+                self.assertAlmostEqual(np.max(derived[0].yData), 1)
+
+    def test_function_contract(self):
+
+        # batch contract needs to be declared explicitly
+        code_batch = """# CONTRACT: batch
+import numpy as np
+results = {'values': np.concatenate([values[i0:i1] * 2 for i0, i1 in zip(offsets[:-1], offsets[1:])])}
+"""
+        code_batch_lower = code_batch.replace('# CONTRACT: batch', '#contract:BATCH')
+        # refers to offsets, but in a nested function of a batch contract function
+        code_batch_nested = """# CONTRACT: batch
+import numpy as np
+
+def scale(i):
+    return values[offsets[i]:offsets[i + 1]] * 2
+
+results = {'values': np.concatenate([scale(i) for i in range(n)])}
+"""
+        # profile functions can use variables named like batch inputs
+        code_profile_local = """offsets = [0.5]
+results = {'x': x + offsets[0], 'y': y}
+"""
+        code_profile_attribute = """import types
+ns = types.SimpleNamespace(offsets=1)
+results = {'x': x, 'y': y + ns.offsets}
+"""
+        code_profile_declared = '# CONTRACT: profile\n' + code_profile_local
+
+        for code in [code_batch, code_batch_lower, code_batch_nested]:
+            self.assertEqual(DPDIController.functionContract(code), DPDIController.CONTRACT_BATCH)
+            c = DPDIController()
+            self.assertTrue(c.setFunction(code), c.error())
+            self.assertEqual(c.contract(), DPDIController.CONTRACT_BATCH)
+
+        for code in [code_profile_local, code_profile_attribute, code_profile_declared]:
+            self.assertEqual(DPDIController.functionContract(code), DPDIController.CONTRACT_PROFILE)
+            c = DPDIController()
+            self.assertTrue(c.setFunction(code), c.error())
+            self.assertEqual(c.contract(), DPDIController.CONTRACT_PROFILE)
+
+        # the contract of a precompiled function can not be read from its code
+        func = compile(code_batch, '<batch>', 'exec')
+        c = DPDIController()
+        self.assertTrue(c.setFunction(func, contract=DPDIController.CONTRACT_BATCH), c.error())
+        self.assertEqual(c.contract(), DPDIController.CONTRACT_BATCH)
+        self.assertFalse(DPDIController().setFunction(func))
+
     def test_controller_model(self):
 
         dates, ndvi_values = TestObjects.generate_seasonal_ndvi_dates()